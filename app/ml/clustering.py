@@ -6,7 +6,10 @@ from datetime import datetime, timezone
 UTC = timezone.utc
 from pathlib import Path
 import json
+import os
 import pickle
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 # ML imports - lazy loaded to avoid slow startup
 _sklearn_imports = None
@@ -14,13 +17,14 @@ _sklearn_imports = None
 def _get_sklearn_imports():
     global _sklearn_imports
     if _sklearn_imports is None:
-        from sklearn.cluster import KMeans, DBSCAN, AgglomerativeClustering
+        from sklearn.cluster import KMeans, MiniBatchKMeans, DBSCAN, AgglomerativeClustering
         from sklearn.preprocessing import StandardScaler, MinMaxScaler
         from sklearn.decomposition import PCA
         from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
         from sklearn.manifold import TSNE
         _sklearn_imports = {
             'KMeans': KMeans,
+            'MiniBatchKMeans': MiniBatchKMeans,
             'DBSCAN': DBSCAN,
             'AgglomerativeClustering': AgglomerativeClustering,
             'StandardScaler': StandardScaler,
@@ -49,11 +53,22 @@ except ImportError:
     MATPLOTLIB_AVAILABLE = False
 
 # Database imports
+from sqlalchemy import func, select, union
 from app.db import get_session, safe_db_context
 from app.models import Score, Response, User
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip when streaming scores for bulk feature extraction
+FEATURE_QUERY_CHUNK_SIZE = 50000
+
+# Scalable clustering: used automatically from this many users (exact KMeans,
+# silhouette and hierarchical clustering are O(n²) in time or memory)
+SCALABLE_MIN_USERS = 5000
+MINIBATCH_SIZE = 1024
+# Points sampled for silhouette scores in scalable mode
+SILHOUETTE_SAMPLE_SIZE = 5000
+
 
 # ==============================================================================
 # EMOTIONAL PROFILE DEFINITIONS
@@ -285,36 +300,154 @@ class EmotionalFeatureExtractor:
             logger.error(f"Error extracting features for {username}: {e}")
             return None
     
-    def extract_all_users_features(self) -> pd.DataFrame:
+    def extract_all_users_features(self, since: Optional[str] = None) -> pd.DataFrame:
         """Extract features for all users in the database.
 
+        Set-based equivalent of calling extract_user_features for every user:
+        scores are streamed in one query ordered by (username, timestamp) and
+        responses are aggregated per user in a second, so the cost no longer
+        grows with one session and two queries per user. Statistics are then
+        computed for all users at once with grouped NumPy/pandas operations.
+
+        Args:
+            since (Optional[str]): ISO timestamp; if given, only users with a score
+                or response recorded at or after it are included.
+
         Returns:
             pd.DataFrame: DataFrame containing features for all users with sufficient data.
         """
-        features_list = []
-        
         try:
             with safe_db_context() as session:
-                # Get all unique usernames
-                usernames = session.query(Score.username).distinct().all()
-                usernames = [u[0] for u in usernames if u[0]]
-                
+                users = self._changed_users_query(since) if since else None
+                scores = self._load_scores(session, users)
+                responses = self._load_response_aggregates(session, users)
         except Exception as e:
-            logger.error(f"Error getting usernames: {e}")
+            logger.error(f"Error loading clustering data: {e}")
             return pd.DataFrame()
-        
-        for username in usernames:
-            features = self.extract_user_features(username)
-            if features:
-                features_list.append(features)
-        
-        if not features_list:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(features_list)
+
+        df = self._compute_features(scores, responses)
+        if df.empty:
+            return df
+
         logger.info(f"Extracted features for {len(df)} users")
         return df
-    
+
+    def _changed_users_query(self, since: str):
+        """Usernames with a score or response recorded at or after `since`."""
+        return union(
+            select(Score.username).where(Score.timestamp >= since),
+            select(Response.username).where(Response.timestamp >= since),
+        )
+
+    def _load_scores(self, session, users=None) -> pd.DataFrame:
+        """Stream (username, total_score, sentiment_score) for all users in chronological order."""
+        query = (
+            select(Score.username, Score.total_score, Score.sentiment_score)
+            .where(Score.username.isnot(None), Score.username != '')
+            .order_by(Score.username, Score.timestamp, Score.id)
+            .execution_options(yield_per=FEATURE_QUERY_CHUNK_SIZE)
+        )
+        if users is not None:
+            query = query.where(Score.username.in_(users))
+        result = session.execute(query)
+        frames = [
+            pd.DataFrame(chunk, columns=['username', 'total_score', 'sentiment_score'])
+            for chunk in result.partitions()
+        ]
+        if not frames:
+            return pd.DataFrame(columns=['username', 'total_score', 'sentiment_score'])
+        scores = pd.concat(frames, ignore_index=True)
+        scores['total_score'] = pd.to_numeric(scores['total_score']).astype(float)
+        scores['sentiment_score'] = pd.to_numeric(scores['sentiment_score']).astype(float)
+        return scores
+
+    def _load_response_aggregates(self, session, users=None) -> pd.DataFrame:
+        """Per-user response counts and integer sums, aggregated by the database."""
+        query = (
+            select(
+                Response.username,
+                func.count().label('n_responses'),
+                func.count(Response.response_value).label('n_values'),
+                func.sum(Response.response_value).label('value_sum'),
+                func.sum(Response.response_value * Response.response_value).label('value_sq_sum'),
+            )
+            .where(Response.username.isnot(None))
+            .group_by(Response.username)
+        )
+        if users is not None:
+            query = query.where(Response.username.in_(users))
+        rows = session.execute(query).all()
+        return pd.DataFrame(
+            rows, columns=['username', 'n_responses', 'n_values', 'value_sum', 'value_sq_sum']
+        ).set_index('username')
+
+    def _compute_features(self, scores: pd.DataFrame, responses: pd.DataFrame) -> pd.DataFrame:
+        """Vectorized version of the per-user feature formulas in extract_user_features."""
+        if scores.empty:
+            return pd.DataFrame()
+
+        assessment_frequency = scores.groupby('username', sort=True).size()
+
+        # Score statistics over non-null total_score values (population std, as np.std)
+        valid = scores[scores['total_score'].notna()].copy()
+        if valid.empty:
+            return pd.DataFrame()
+        by_user = valid.groupby('username', sort=True)['total_score']
+        score_stats = pd.DataFrame({
+            'avg_total_score': by_user.mean(),
+            'score_std': by_user.std(ddof=0),
+            'emotional_range': by_user.max() - by_user.min(),
+        })
+
+        # Trend: correlation between position in the series and score, per user
+        valid['x'] = valid.groupby('username').cumcount().astype(float)
+        valid['dx'] = valid['x'] - valid.groupby('username')['x'].transform('mean')
+        valid['dy'] = valid['total_score'] - by_user.transform('mean')
+        sums = pd.DataFrame({
+            'xy': valid['dx'] * valid['dy'],
+            'xx': valid['dx'] ** 2,
+            'yy': valid['dy'] ** 2,
+            'username': valid['username'],
+        }).groupby('username', sort=True).sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            trend = sums['xy'] / np.sqrt(sums['xx'] * sums['yy'])
+        score_stats['score_trend'] = trend.where((sums['yy'] > 0) & np.isfinite(trend), 0.0)
+
+        sentiments = scores[scores['sentiment_score'].notna()].groupby('username', sort=True)['sentiment_score']
+        users = score_stats.index
+        avg_sentiment = sentiments.mean().reindex(users).fillna(0.0)
+        sentiment_std = sentiments.std(ddof=0).reindex(users).fillna(0.0)
+
+        # Response features from the aggregated counts and sums
+        agg = responses.reindex(users)
+        n_responses = agg['n_responses'].fillna(0).astype(np.int64)
+        n_values = agg['n_values'].fillna(0).astype(np.int64)
+        value_sum = agg['value_sum'].fillna(0).astype(np.int64)
+        value_sq_sum = agg['value_sq_sum'].fillna(0).astype(np.int64)
+        safe_n = n_values.where(n_values > 0, 1)
+        # Exact integer numerator: var = (n * Σv² - (Σv)²) / n²
+        variance = (n_values * value_sq_sum - value_sum ** 2) / (safe_n ** 2)
+
+        consistency = (1 - variance / 4.0).clip(0, 1)
+        consistency = consistency.where(n_values >= 2, 1.0).where(n_responses > 0, 0.0)
+        avg_response_value = (value_sum / safe_n).where(n_values > 0, 2.5)
+        response_variance = variance.where(n_values > 1, 0.0)
+
+        df = pd.DataFrame({
+            'username': users,
+            'avg_total_score': score_stats['avg_total_score'].values,
+            'score_std': score_stats['score_std'].values,
+            'avg_sentiment': avg_sentiment.values,
+            'sentiment_std': sentiment_std.values,
+            'score_trend': score_stats['score_trend'].values,
+            'response_consistency': consistency.values,
+            'emotional_range': score_stats['emotional_range'].values,
+            'assessment_frequency': assessment_frequency.reindex(users).values,
+            'avg_response_value': avg_response_value.values,
+            'response_variance': response_variance.values,
+        })
+        return df.reset_index(drop=True)
+
     def _calculate_trend(self, scores: List[float]) -> float:
         """Calculate score trend using linear correlation.
 
@@ -393,18 +526,45 @@ class EmotionalFeatureExtractor:
 # CLUSTERING ENGINE
 # ==============================================================================
 
+def _score_k_candidate(X: np.ndarray, k: int, random_state: int, sample_size: int) -> float:
+    """Fit MiniBatchKMeans with k clusters and return its sampled silhouette score.
+
+    Module-level so it can run in a process pool worker.
+    """
+    sklearn = _get_sklearn_imports()
+    kmeans = sklearn['MiniBatchKMeans'](
+        n_clusters=k, random_state=random_state, batch_size=MINIBATCH_SIZE, n_init=3
+    )
+    labels = kmeans.fit_predict(X)
+    try:
+        return float(sklearn['silhouette_score'](
+            X, labels, sample_size=min(sample_size, len(X)), random_state=random_state
+        ))
+    except ValueError:
+        return -1.0
+
+
 class EmotionalProfileClusterer:
     """Main clustering engine for emotional profile categorization."""
     
-    def __init__(self, n_clusters: int = 4, random_state: int = 42):
+    def __init__(self, n_clusters: int = 4, random_state: int = 42,
+                 scalable: Optional[bool] = None, n_jobs: Optional[int] = None):
         """Initialize the clusterer.
 
         Args:
             n_clusters (int, optional): Number of emotional profile clusters. Defaults to 4.
             random_state (int, optional): Random seed for reproducibility. Defaults to 42.
+            scalable (Optional[bool], optional): Use MiniBatchKMeans, sampled silhouette and
+                skip the O(n²) hierarchical/DBSCAN passes. None (default) enables it
+                from SCALABLE_MIN_USERS users.
+            n_jobs (Optional[int], optional): Worker processes for evaluating k candidates
+                in scalable mode. Defaults to the number of CPUs.
         """
         self.n_clusters = n_clusters
         self.random_state = random_state
+        self.scalable = scalable
+        self.n_jobs = n_jobs
+        self.last_fit_at = None
         
         self.scaler = None
         self.pca = None
@@ -429,6 +589,10 @@ class EmotionalProfileClusterer:
             self.pca = _get_sklearn_imports()['PCA'](n_components=2)
         return self.pca
 
+    def _use_scalable(self, n_samples: int) -> bool:
+        scalable = getattr(self, 'scalable', None)
+        return n_samples >= SCALABLE_MIN_USERS if scalable is None else scalable
+
     def _initialize_attributes(self):
         """Helper to initialize attributes if they are missing (e.g. unpickling issues)"""
         if not hasattr(self, 'user_profiles'):
@@ -472,6 +636,8 @@ class EmotionalProfileClusterer:
         # STEP 1: FEATURE EXTRACTION
         # Extract emotional features from database if not provided
         # Features include: average scores, sentiment analysis, response patterns, etc.
+        # Users whose data changes after this point are picked up by partial_fit()
+        fit_started_at = datetime.now(UTC).replace(tzinfo=None).isoformat()
         if data is None:
             data = self.feature_extractor.extract_all_users_features()
 
@@ -495,6 +661,7 @@ class EmotionalProfileClusterer:
         # This ensures all features contribute equally to clustering regardless of scale
         # Formula: X_scaled = (X - mean) / std
         X_scaled = self._get_scaler().fit_transform(X)
+        scalable = self._use_scalable(len(X_scaled))
 
         # STEP 4: OPTIMAL CLUSTER NUMBER DETECTION
         # Use silhouette analysis to find statistically optimal number of clusters
@@ -512,12 +679,21 @@ class EmotionalProfileClusterer:
         # 3. Update centers as mean of assigned points
         # 4. Repeat until convergence or max iterations
         # Mathematical foundation: Minimizes within-cluster sum of squared distances
-        self.kmeans = _get_sklearn_imports()['KMeans'](
-            n_clusters=self.n_clusters,
-            random_state=self.random_state,  # Ensures reproducible results
-            n_init=10,                       # Try 10 different initializations, pick best
-            max_iter=300                     # Maximum iterations per initialization
-        )
+        if scalable:
+            # Mini-batch updates: linear in n and supports partial_fit() warm starts
+            self.kmeans = _get_sklearn_imports()['MiniBatchKMeans'](
+                n_clusters=self.n_clusters,
+                random_state=self.random_state,
+                batch_size=MINIBATCH_SIZE,
+                n_init=3
+            )
+        else:
+            self.kmeans = _get_sklearn_imports()['KMeans'](
+                n_clusters=self.n_clusters,
+                random_state=self.random_state,  # Ensures reproducible results
+                n_init=10,                       # Try 10 different initializations, pick best
+                max_iter=300                     # Maximum iterations per initialization
+            )
         # fit_predict() performs clustering and returns cluster labels for each user
         self.labels_ = self.kmeans.fit_predict(X_scaled)
         # Store cluster centers for analysis and prediction
@@ -530,7 +706,11 @@ class EmotionalProfileClusterer:
         # 2. Find closest pair of clusters and merge them
         # 3. Repeat until desired number of clusters reached
         # Ward linkage: Minimizes increase in within-cluster variance
-        if len(X_scaled) >= self.n_clusters:
+        # Skipped in scalable mode: Ward linkage needs O(n²) memory
+        if scalable:
+            self.hierarchical = None
+            hierarchical_labels = self.labels_
+        elif len(X_scaled) >= self.n_clusters:
             self.hierarchical = _get_sklearn_imports()['AgglomerativeClustering'](
                 n_clusters=self.n_clusters,
                 linkage='ward'  # Ward's method minimizes within-cluster variance
@@ -568,13 +748,20 @@ class EmotionalProfileClusterer:
         #
         # USE CASE: Identifies users with anomalous emotional profiles that don't
         # fit typical patterns, potentially indicating unique needs or data issues
-        self.dbscan = _get_sklearn_imports()['DBSCAN'](eps=0.5, min_samples=2)
-        dbscan_labels = self.dbscan.fit_predict(X_scaled)
+        # Skipped in scalable mode: neighborhoods degrade to O(n²) on dense data
+        if scalable:
+            self.dbscan = None
+            dbscan_labels = None
+        else:
+            self.dbscan = _get_sklearn_imports()['DBSCAN'](eps=0.5, min_samples=2)
+            dbscan_labels = self.dbscan.fit_predict(X_scaled)
         # DBSCAN labels: -1 for noise/outliers, 0+ for clusters
 
         # STEP 8: CLUSTERING QUALITY ASSESSMENT
         # Calculate multiple metrics to evaluate clustering effectiveness
-        metrics = self._calculate_clustering_metrics(X_scaled, self.labels_)
+        metrics = self._calculate_clustering_metrics(
+            X_scaled, self.labels_, silhouette_sample_size=SILHOUETTE_SAMPLE_SIZE if scalable else None
+        )
 
         # STEP 9: EMOTIONAL PROFILE ASSIGNMENT
         # Map numerical cluster IDs to predefined emotional profile categories
@@ -599,6 +786,7 @@ class EmotionalProfileClusterer:
 
         # Mark model as fitted and save for future use
         self.is_fitted = True
+        self.last_fit_at = fit_started_at
         self._save_model()
         
         # Save model
@@ -843,6 +1031,12 @@ class EmotionalProfileClusterer:
         - Select k that maximizes average silhouette score
         - Higher scores indicate better-defined, more separated clusters
 
+        SCALABLE MODE (large populations, see _use_scalable):
+        - MiniBatchKMeans instead of KMeans(n_init=10) for each candidate
+        - Silhouette computed on a random sample of SILHOUETTE_SAMPLE_SIZE points,
+          since the exact score needs all n² pairwise distances
+        - Candidates evaluated in parallel in a process pool (n_jobs)
+
         Args:
             X (np.ndarray): Feature matrix (already scaled)
             max_k (int, optional): Maximum number of clusters to test. Defaults to 8.
@@ -858,6 +1052,10 @@ class EmotionalProfileClusterer:
         silhouette_scores = []
         k_range = range(2, max_k + 1)
 
+        if self._use_scalable(len(X)):
+            silhouette_scores = self._score_k_candidates_parallel(X, k_range)
+            return k_range[int(np.argmax(silhouette_scores))]
+
         # Evaluate clustering quality for each candidate k
         for k in k_range:
             # Fit K-Means for current k value
@@ -877,8 +1075,109 @@ class EmotionalProfileClusterer:
         # np.argmax returns index of maximum value
         optimal_k = k_range[np.argmax(silhouette_scores)]
         return optimal_k
+
+    def _score_k_candidates_parallel(self, X: np.ndarray, k_range: range) -> List[float]:
+        """Sampled silhouette score for each k, evaluated across a process pool.
+
+        Falls back to evaluating in-process when only one worker is requested or
+        a pool cannot be started.
+        """
+        score_k = partial(_score_k_candidate, X, random_state=self.random_state,
+                          sample_size=SILHOUETTE_SAMPLE_SIZE)
+        workers = min(getattr(self, 'n_jobs', None) or os.cpu_count() or 1, len(k_range))
+        if workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    return list(pool.map(score_k, k_range))
+            except Exception as e:
+                logger.warning(f"Parallel k evaluation failed, evaluating serially: {e}")
+        return [score_k(k) for k in k_range]
+
+    def partial_fit(self, data: Optional[pd.DataFrame] = None, since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Warm-start update of a fitted model with new or changed users only.
+
+        Intended for nightly re-clustering: instead of refitting every user, the
+        users whose scores or responses were recorded since the last fit are
+        passed through MiniBatchKMeans.partial_fit, which moves the existing
+        centers towards them, and only those users are (re)assigned. The
+        scaler from the last full fit is kept, so the feature space stays the
+        one the centers live in; run fit() periodically to rebase it.
+
+        A model fitted with exact KMeans is converted to MiniBatchKMeans
+        initialised at its current centers.
+
+        Args:
+            data: Optional DataFrame with features of the users to update. If None,
+                extracts users changed since `since` from the database.
+            since: ISO timestamp; defaults to the start of the last fit().
+
+        Returns:
+            Dictionary with the number of users updated and the new distribution
+        """
+        if not self.is_fitted and not self._load_model():
+            logger.warning("Model not fitted. Call fit() first.")
+            return {"error": "Model not fitted"}
+
+        update_started_at = datetime.now(UTC).replace(tzinfo=None).isoformat()
+        if data is None:
+            since = since or getattr(self, 'last_fit_at', None)
+            if not since:
+                return {"error": "No previous fit time; pass since or data"}
+            data = self.feature_extractor.extract_all_users_features(since=since)
+
+        if data.empty:
+            self.last_fit_at = update_started_at
+            return {'n_users_updated': 0, 'cluster_distribution': self._get_profile_distribution()}
+
+        usernames = data['username'].tolist()
+        X = np.nan_to_num(data[self.feature_extractor.feature_names].values.astype(float), nan=0.0)
+        X_scaled = self._get_scaler().transform(X)
+
+        if not hasattr(self.kmeans, 'partial_fit'):
+            self.kmeans = _get_sklearn_imports()['MiniBatchKMeans'](
+                n_clusters=self.n_clusters,
+                init=np.asarray(self.cluster_centers_),
+                n_init=1,
+                random_state=self.random_state,
+                batch_size=MINIBATCH_SIZE
+            )
+        for start in range(0, len(X_scaled), MINIBATCH_SIZE):
+            self.kmeans.partial_fit(X_scaled[start:start + MINIBATCH_SIZE])
+        self.cluster_centers_ = self.kmeans.cluster_centers_
+
+        labels = self.kmeans.predict(X_scaled)
+        assigned_at = datetime.now(UTC).isoformat()
+        for username, label in zip(usernames, labels):
+            profile_data = EMOTIONAL_PROFILES.get(label, EMOTIONAL_PROFILES[0])
+            self.user_profiles[username] = {
+                'cluster_id': int(label),
+                'profile': profile_data,
+                'profile_name': profile_data['name'],
+                'assigned_at': assigned_at
+            }
+
+        self.last_fit_at = update_started_at
+        self._save_model()
+
+        logger.info(f"Partial fit complete: {len(usernames)} users updated")
+        return {
+            'n_users_updated': len(usernames),
+            'usernames': usernames,
+            'labels': labels.tolist(),
+            'cluster_distribution': self._get_profile_distribution()
+        }
+
+    def _get_profile_distribution(self) -> Dict[int, int]:
+        """Users per cluster across all assigned profiles (fit and partial_fit)."""
+        distribution: Dict[int, int] = {}
+        for profile in self.user_profiles.values():
+            cluster_id = int(profile.get('cluster_id', 0))
+            distribution[cluster_id] = distribution.get(cluster_id, 0) + 1
+        return dict(sorted(distribution.items()))
     
-    def _calculate_clustering_metrics(self, X: np.ndarray, labels: np.ndarray) -> Dict[str, float]:
+    def _calculate_clustering_metrics(self, X: np.ndarray, labels: np.ndarray,
+                                      silhouette_sample_size: Optional[int] = None) -> Dict[str, float]:
         """
         Calculate multiple clustering quality metrics to evaluate algorithm performance.
 
@@ -919,6 +1218,8 @@ class EmotionalProfileClusterer:
         Args:
             X (np.ndarray): Feature matrix (scaled)
             labels (np.ndarray): Cluster labels from clustering algorithm
+            silhouette_sample_size (Optional[int]): Estimate the silhouette score from
+                this many sampled points instead of all n² distances
 
         Returns:
             Dict[str, float]: Dictionary containing all calculated metrics
@@ -939,7 +1240,12 @@ class EmotionalProfileClusterer:
         # Calculate silhouette score with error handling
         try:
             # silhouette_score computes average silhouette coefficient across all samples
-            metrics['silhouette_score'] = float(_get_sklearn_imports()['silhouette_score'](X, labels))
+            if silhouette_sample_size and len(X) > silhouette_sample_size:
+                metrics['silhouette_score'] = float(_get_sklearn_imports()['silhouette_score'](
+                    X, labels, sample_size=silhouette_sample_size, random_state=self.random_state
+                ))
+            else:
+                metrics['silhouette_score'] = float(_get_sklearn_imports()['silhouette_score'](X, labels))
         except Exception as e:
             logger.warning(f"Silhouette score calculation failed: {e}")
             metrics['silhouette_score'] = 0.0
@@ -1019,6 +1325,7 @@ class EmotionalProfileClusterer:
                 'user_profiles': self.user_profiles,
                 'n_clusters': self.n_clusters,
                 'feature_names': self.feature_extractor.feature_names,
+                'last_fit_at': self.last_fit_at,
                 'saved_at': datetime.now(UTC).isoformat()
             }
             
@@ -1051,6 +1358,7 @@ class EmotionalProfileClusterer:
             self.cluster_centers_ = model_data['cluster_centers']
             self.user_profiles = model_data['user_profiles']
             self.n_clusters = model_data['n_clusters']
+            self.last_fit_at = model_data.get('last_fit_at')
             self.is_fitted = True
             
             logger.info(f"Model loaded from {model_file}")
@@ -1364,6 +1672,7 @@ def main():
         epilog="""
 Examples:
   python emotional_profile_clustering.py --fit                    # Cluster all users
+  python emotional_profile_clustering.py --update                 # Re-cluster users changed since last fit
   python emotional_profile_clustering.py --predict <username>     # Predict user profile
   python emotional_profile_clustering.py --summary                # Show profile summary
   python emotional_profile_clustering.py --visualize              # Generate visualizations
@@ -1371,6 +1680,8 @@ Examples:
     )
     
     parser.add_argument('--fit', action='store_true', help='Fit clustering model on all users')
+    parser.add_argument('--update', action='store_true', help='Warm-start the fitted model with users changed since the last fit')
+    parser.add_argument('--since', type=str, metavar='ISO_TIMESTAMP', help='With --update: users changed since this time')
     parser.add_argument('--predict', type=str, metavar='USERNAME', help='Predict profile for a user')
     parser.add_argument('--summary', action='store_true', help='Show profile summary')
     parser.add_argument('--visualize', action='store_true', help='Generate cluster visualizations')
@@ -1406,6 +1717,16 @@ Examples:
             profile = EMOTIONAL_PROFILES.get(cluster_id, {})
             print(f"   {profile.get('emoji', '')} {profile.get('name', f'Cluster {cluster_id}')}: {count} users")
     
+    elif args.update:
+        print("\n🔄 Updating emotional profile clustering model...")
+        results = clusterer.partial_fit(since=args.since)
+
+        if 'error' in results:
+            print(f"❌ Error: {results['error']}")
+            return
+
+        print(f"\n✅ Update Complete! Users re-assigned: {results['n_users_updated']}")
+
     elif args.predict:
         print(f"\n🔍 Predicting profile for user: {args.predict}")
         profile = clusterer.predict(args.predict)
@@ -5,6 +5,7 @@ import time
 from datetime import datetime, timedelta
 from functools import lru_cache
 import threading
+from bisect import bisect_right
 from typing import List, Tuple, Optional, Dict, Any, Union, Callable
 from sqlalchemy.orm import Session
 
@@ -22,6 +23,11 @@ logger = logging.getLogger(__name__)
 # Tuple structure: (id, question_text, tooltip, min_age, max_age)
 _ALL_QUESTIONS: List[Tuple[int, str, Optional[str], int, int]] = []
 
+# Age-bracket index over _ALL_QUESTIONS: (source list, bracket start ages, questions per bracket).
+# The distinct min_age and max_age + 1 values split the age axis into brackets in which the
+# eligible questions do not change. Rebuilt whenever _ALL_QUESTIONS is replaced.
+_AGE_INDEX: Tuple[Optional[list], List[int], List[List[Tuple[int, str, Optional[str], int, int]]]] = (None, [], [])
+
 # Fair reader-writer lock to prevent writer starvation
 _RW_LOCK = get_fair_reader_writer_lock()
 
@@ -59,6 +65,18 @@ def initialize_questions() -> bool:
             logger.error(f"Failed to initialize questions: {e}")
             return False
 
+def _questions_for_age(age: int) -> List[Tuple[int, str, Optional[str], int, int]]:
+    """Questions whose [min_age, max_age] contains age, looked up in the age-bracket index."""
+    global _AGE_INDEX
+    source, bounds, brackets = _AGE_INDEX
+    if source is not _ALL_QUESTIONS:
+        source = _ALL_QUESTIONS
+        bounds = sorted({q[3] for q in source} | {q[4] + 1 for q in source})
+        brackets = [[q for q in source if q[3] <= start <= q[4]] for start in bounds]
+        _AGE_INDEX = (source, bounds, brackets)
+    position = bisect_right(bounds, age) - 1
+    return brackets[position] if position >= 0 else []
+
 def safe_thread_run(func: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
     """Wrapper to run a function safely in a thread with exception logging."""
     def wrapper() -> None:
@@ -96,8 +114,7 @@ def load_questions(
                 # Return a copy to prevent modification of global list
                 return list(_ALL_QUESTIONS)
 
-            # In-memory filter is extremely fast
-            return [q for q in _ALL_QUESTIONS if q[3] <= age <= q[4]]
+            return list(_questions_for_age(age))
 
     # Need to initialize - use write lock for this
     with _RW_LOCK.write_lock():
@@ -110,8 +127,7 @@ def load_questions(
             # Return a copy to prevent modification of global list
             return list(_ALL_QUESTIONS)
 
-        # In-memory filter is extremely fast
-        return [q for q in _ALL_QUESTIONS if q[3] <= age <= q[4]]
+        return list(_questions_for_age(age))
 
 
 SATISFACTION_QUESTIONS = {
@@ -339,7 +355,7 @@ def get_question_count(age: Optional[int] = None) -> int:
             if age is None:
                 return len(_ALL_QUESTIONS)
 
-            return len([q for q in _ALL_QUESTIONS if q[3] <= age <= q[4]])
+            return len(_questions_for_age(age))
 
     # Need to initialize - use write lock for this
     with _RW_LOCK.write_lock():
@@ -349,7 +365,7 @@ def get_question_count(age: Optional[int] = None) -> int:
         if age is None:
             return len(_ALL_QUESTIONS)
 
-        return len([q for q in _ALL_QUESTIONS if q[3] <= age <= q[4]])
+        return len(_questions_for_age(age))
 
 def preload_all_question_sets():
     """Deprecated: In-memory loading handles this automatically"""
@@ -9,7 +9,7 @@ from api.services.export_service_v2 import ExportServiceV2
 from api.services.background_task_service import BackgroundTaskService, TaskStatus
 from api.services.db_service import AsyncSessionLocal
 from api.services.dlq_service import DLQService
-from sqlalchemy import select
+from sqlalchemy import Text, select, type_coerce
 from api.config import get_settings_instance
 from api.models import User, NotificationLog, JournalEntry
 from api.services.embedding_service import embedding_service
@@ -464,25 +464,34 @@ async def _execute_journal_embedding(journal_entry_id: int):
     enforce_memory_limit(threshold_mb=768)
     from datetime import datetime
     async with AsyncSessionLocal() as db:
-        stmt = select(JournalEntry).where(JournalEntry.id == journal_entry_id)
+        from api.services.semantic_search_service import SemanticSearchService
+        # The stored ciphertext alongside the entry: the worker has no DEK in context
+        stmt = select(JournalEntry, type_coerce(JournalEntry.content, Text)).where(JournalEntry.id == journal_entry_id)
         res = await db.execute(stmt)
-        entry = res.scalar_one_or_none()
+        row = res.one_or_none()
         
-        if not entry:
+        if not row:
             return
+        entry, stored_content = row
             
         try:
             # Generate the embedding
             # Combine title and content if title exists
-            text_to_embed = f"{entry.title}: {entry.content}" if entry.title else entry.content
+            text_to_embed = await SemanticSearchService.entry_text(db, {}, entry.user_id, entry.title, stored_content)
+            if text_to_embed is None:
+                logger.warning(f"Skipping embedding for journal entry {journal_entry_id}: its content can't be decrypted")
+                return
             embedding = await embedding_service.generate_embedding(text_to_embed)
             
             if embedding:
                 entry.embedding = embedding
-                entry.embedding_model = embedding_service.model_name
+                entry.embedding_model = embedding_service.active_model_name
                 entry.last_indexed_at = datetime.utcnow()
                 await db.commit()
                 logger.info(f"Successfully generated embedding for journal entry {journal_entry_id}")
+
+                # Keep the local ANN shard (non-pgvector deployments) current
+                SemanticSearchService.update_local_index([(entry.user_id, entry.id, embedding)])
                 
                 # Proactive Predictive Analytics for Burnout (#1133)
                 try:
@@ -497,16 +506,18 @@ async def _execute_journal_embedding(journal_entry_id: int):
             raise e
 
 @celery_app.task(name="api.celery_tasks.reindex_all_entries_task")
-def reindex_all_entries_task(user_id: Optional[int] = None):
+def reindex_all_entries_task(user_id: Optional[int] = None, force: bool = False):
     """
     Background job to re-index all journals for a user or all users.
-    Useful for system-wide migration or model updates.
+    Useful for system-wide migration or model updates (force=True re-embeds everything).
+    Runs in chunks and resumes from its checkpoint if a previous run was interrupted.
     """
     async def _do_reindex():
+        enforce_memory_limit(threshold_mb=768)
         async with AsyncSessionLocal() as db:
             from api.services.semantic_search_service import SemanticSearchService
-            count = await SemanticSearchService.reindex_journal_entries(db, user_id)
-            return count
+            stats = await SemanticSearchService.reindex_journal_entries(db, user_id, force=force)
+            return stats
 
     return run_async(_do_reindex())
 
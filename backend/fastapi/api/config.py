@@ -117,7 +117,72 @@ class BaseAppSettings(BaseSettings):
     redis_db: int = Field(default=0, description="Redis database index")
     redis_connection_url: Optional[str] = Field(default=None, description="Redis URL (if set, overrides individual host/port)")
     redis_ttl_seconds: int = Field(default=60, description="Default lock TTL in seconds")
+
+    # Tenant quota counters (#1135)
+    quota_flush_interval_seconds: int = Field(default=300, ge=1, description="Interval for writing buffered quota counters back to tenant_quotas")
+    quota_config_cache_ttl_seconds: int = Field(default=60, ge=0, description="In-process cache TTL for tenant quota tier configuration")
+
+    # CacheService in-process L1 tier (#1123)
+    cache_l1_max_entries: int = Field(default=4096, ge=0, description="Maximum entries held in each worker's in-process cache (0 disables the L1 tier)")
+    cache_l1_ttl_seconds: int = Field(default=30, ge=1, description="Upper bound on how long a value is served from the in-process cache")
+
+    # Search index outbox relay (#1176)
+    outbox_relay_mode: str = Field(default="bulk", description="'bulk' (coalesced _bulk requests per batch) or 'serial' (one ES call per event)")
+    outbox_relay_batch_size: int = Field(default=500, ge=1, description="Outbox events claimed per relay iteration in bulk mode")
+    outbox_relay_workers: int = Field(default=1, ge=1, description="Concurrent relay loops; claims use FOR UPDATE SKIP LOCKED so batches never overlap")
+
+    # Journal full-text search
+    journal_search_count_cap: int = Field(default=1000, ge=0, description="Stop counting journal search matches at this many (0 counts every match)")
+
+    # Semantic search embedding reindex
+    embedding_reindex_chunk_size: int = Field(default=256, ge=1, description="Journal entries embedded and written back per reindex chunk (one commit and checkpoint per chunk)")
+    embedding_reindex_checkpoint_ttl_seconds: int = Field(default=7 * 24 * 3600, ge=60, description="How long an interrupted reindex checkpoint is kept for resuming")
+    embedding_cache_max_entries: int = Field(default=10000, ge=0, description="Embeddings kept in each worker's in-process LRU (0 disables the local tier)")
+    embedding_cache_ttl_seconds: int = Field(default=30 * 24 * 3600, ge=60, description="TTL of cached embeddings in Redis; keys are content hashes so entries never go stale")
+    embedding_cache_redis_enabled: bool = Field(default=True, description="Share cached embeddings across workers through Redis")
+
+    # Local ANN index used for semantic search when pgvector is unavailable
+    vector_index_dir: str = Field(default="app_data/vector_index", description="Directory holding the per-user vector shard files")
+    vector_index_nprobe: int = Field(default=8, ge=1, description="IVF lists scanned per query (higher = better recall, slower)")
+    vector_index_ivf_min_vectors: int = Field(default=2048, ge=1, description="Shards smaller than this are searched exhaustively instead of through IVF lists")
+    vector_index_max_loaded_shards: int = Field(default=256, ge=1, description="Per-process limit on memory-mapped user shards kept open")
     
+    # ML inference server (api/ml/inference_server.py)
+    ml_inference_workers: int = Field(default=1, ge=1, description="Inference worker processes started by run_ml_server")
+    ml_inference_max_batch_size: int = Field(default=32, ge=1, description="Requests a worker drains from the queue into one micro-batch")
+    ml_inference_max_wait_ms: float = Field(default=5.0, ge=0, description="How long a worker waits for a micro-batch to fill after its first request")
+
+    # Daily analytics rollups backing the KPI endpoints (services/activity_rollups.py)
+    analytics_rollup_exact_max_users: int = Field(default=2048, ge=0, description="Daily active-user sets up to this size are stored exactly; larger ones switch to HyperLogLog (~0.8% error)")
+
+    # Buffered analytics event ingestion (services/analytics_ingest.py)
+    analytics_ingest_enabled: bool = Field(default=True, description="Queue logged analytics events and bulk-insert them from a background flusher")
+    analytics_ingest_max_queue: int = Field(default=10000, ge=1, description="Events buffered per worker before requests see backpressure")
+    analytics_ingest_batch_size: int = Field(default=500, ge=1, description="Events written per multi-row INSERT / commit")
+    analytics_ingest_flush_interval_ms: float = Field(default=250.0, gt=0, description="Longest time an event waits in the buffer before a partial batch is flushed")
+    analytics_ingest_enqueue_timeout_ms: float = Field(default=50.0, ge=0, description="How long a request waits for room in a full buffer before spilling or dropping the event")
+    analytics_ingest_redis_stream: Optional[str] = Field(default=None, description="Redis Stream shared by all workers for overflow and failed batches, e.g. 'analytics:events'")
+
+    # Write-behind exam session state (services/exam_session_store.py)
+    exam_session_buffer_enabled: bool = Field(default=True, description="Buffer exam answers in the session store and insert them in one batch when the score is saved")
+    exam_session_sweep_interval_seconds: int = Field(default=60, ge=1, description="How often expired exam sessions are flushed to responses and marked ABANDONED")
+    exam_session_retention_seconds: int = Field(default=86400, ge=60, description="How long a session's buffered answers stay in Redis past the exam's expiry, awaiting the sweeper")
+
+    # WebSocket fan-out (services/websocket_manager.py)
+    ws_send_queue_size: int = Field(default=256, ge=1, description="Messages queued per WebSocket connection before the slow-consumer policy applies")
+    ws_slow_consumer_policy: str = Field(default="drop_oldest", description="What to do when a connection's send queue is full: 'drop_oldest' or 'disconnect'")
+
+    # Resource-versioned ETags (services/resource_versions.py, middleware/etag_middleware.py)
+    etag_versioned_resources: bool = Field(default=True, description="Derive question/category ETags from stored content versions and answer 304 before running the handler")
+    etag_body_cache_entries: int = Field(default=512, ge=0, description="Response bodies (with gzip variants) cached per worker by resource, version, language and URL")
+    resource_version_ttl_seconds: int = Field(default=3600, ge=1, description="Lifetime of a stored resource version; expiry forces a recompute that also catches out-of-band edits")
+
+    # In-memory question catalog (services/question_catalog.py)
+    question_catalog_enabled: bool = Field(default=True, description="Serve active-question lists, age lookups and random exam samples from an in-memory index reloaded when the question version changes")
+
+    # XP leaderboards (services/leaderboard_service.py)
+    leaderboard_reconcile_interval_seconds: int = Field(default=3600, ge=60, description="How often the leaderboard sorted sets are rebuilt from user_xp to repair missed updates")
+
     # Celery configuration
     celery_broker_url: Optional[str] = Field(default=None, description="Celery broker URL")
     celery_result_backend: Optional[str] = Field(default=None, description="Celery result backend")
@@ -200,6 +265,12 @@ class BaseAppSettings(BaseSettings):
         default=["X-API-Version", "X-Request-ID", "X-Process-Time"],
         description="Headers to expose via CORS"
     )
+
+    # Client IP Resolution (utils/network.py)
+    TRUSTED_PROXIES: list[str] = Field(
+        default_factory=list,
+        description="Proxy addresses whose X-Forwarded-For header is trusted"
+    )
     # Storage Configuration (S3 / Blob) (#1125)
     storage_type: str = Field(default="s3", description="Cloud storage provider (s3, azure, local)")
     s3_bucket_name: str = Field(default="soulsense-archival", description="S3 bucket for cold storage")
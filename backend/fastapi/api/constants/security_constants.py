@@ -11,5 +11,10 @@ BCRYPT_ROUNDS = 12
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Short-lived access tokens
 REFRESH_TOKEN_EXPIRE_DAYS = 7     # Longer-lived refresh tokens
 
+# Access token claim carrying the UserSession id. "jti" stays unique per
+# token (revocation); the session id is what step-up records and device
+# fingerprints are keyed by.
+SESSION_ID_CLAIM = "sid"
+
 # Password Policy
 PASSWORD_HISTORY_LIMIT = 5        # Number of previous passwords to remember
@@ -101,15 +101,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Clock skew monitoring initialization failed: {e}")
         print(f"[WARNING] Clock skew monitoring not available: {e}")
-    
+
+    # Refuse to start with an embedding provider whose vectors don't fit the
+    # journal_entries.embedding column (raises, aborting startup)
+    from .services.embedding_service import embedding_service
+    embedding_service.validate_dimension()
+
     # Initialize database tables
     try:
         from .services.db_service import Base, engine, AsyncSessionLocal
+        from .services.journal_search import JournalSearchIndex
         # Note: metadata.create_all is typically sync, for async we use run_sync
         async def init_models():
             async with engine.begin() as conn:
                 # await conn.run_sync(Base.metadata.drop_all)
                 await conn.run_sync(Base.metadata.create_all)
+                await JournalSearchIndex.ensure_schema(conn)
         
         await init_models()
         logger.info("Database tables initialized/verified (Async)")
@@ -292,6 +299,51 @@ async def lifespan(app: FastAPI):
             logger.warning(f"Failed to start cache invalidation listener: {e}")
             print(f"[WARNING] Distributed cache invalidation unavailable: {e}")
         
+        # Quota counter write-behind flusher (#1135)
+        try:
+            from .services.quota_counter_service import quota_counters
+            from .services.db_service import AsyncSessionLocal
+            app.state.quota_flush_task = asyncio.create_task(
+                quota_counters.run_flush_loop(AsyncSessionLocal, settings.quota_flush_interval_seconds)
+            )
+            print(f"[OK] Quota counter flusher started ({settings.quota_flush_interval_seconds}s interval)")
+        except Exception as e:
+            logger.warning(f"Failed to start quota counter flusher: {e}")
+            print(f"[WARNING] Quota counters will not be persisted: {e}")
+
+        # Buffered analytics event ingestion
+        if settings.analytics_ingest_enabled:
+            try:
+                from .services.analytics_ingest import analytics_ingest
+                from .services.db_service import AsyncSessionLocal
+                app.state.analytics_ingest_task = asyncio.create_task(analytics_ingest.run(AsyncSessionLocal))
+                print(f"[OK] Analytics ingest buffer started (batch {settings.analytics_ingest_batch_size}, "
+                      f"{settings.analytics_ingest_flush_interval_ms:.0f}ms interval)")
+            except Exception as e:
+                logger.warning(f"Failed to start analytics ingest buffer: {e}")
+                print(f"[WARNING] Analytics events will be written synchronously: {e}")
+
+        # Write-behind exam session sweeper
+        if settings.exam_session_buffer_enabled:
+            try:
+                from .services.exam_session_store import exam_sessions
+                from .services.db_service import AsyncSessionLocal
+                app.state.exam_session_sweeper_task = asyncio.create_task(exam_sessions.run_sweeper(AsyncSessionLocal))
+                print(f"[OK] Exam session sweeper started ({settings.exam_session_sweep_interval_seconds}s interval)")
+            except Exception as e:
+                logger.warning(f"Failed to start exam session sweeper: {e}")
+                print(f"[WARNING] Abandoned exam sessions will not be flushed: {e}")
+
+        # XP leaderboard reconciler
+        try:
+            from .services.leaderboard_service import leaderboards
+            from .services.db_service import AsyncSessionLocal
+            app.state.leaderboard_reconcile_task = asyncio.create_task(leaderboards.run_reconciler(AsyncSessionLocal))
+            print(f"[OK] Leaderboard reconciler started ({settings.leaderboard_reconcile_interval_seconds}s interval)")
+        except Exception as e:
+            logger.warning(f"Failed to start leaderboard reconciler: {e}")
+            print(f"[WARNING] Leaderboards will not be reconciled against user_xp: {e}")
+
         # Initialize Search Index Outbox Relay (#1146) with memory-safe worker management
         try:
             from .services.outbox_relay_service import OutboxRelayService
@@ -392,6 +444,38 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             logger.info("Cache invalidation listener cancelled successfully")
 
+    if hasattr(app.state, 'quota_flush_task'):
+        logger.info("Stopping quota counter flusher (final flush)...")
+        app.state.quota_flush_task.cancel()
+        try:
+            await app.state.quota_flush_task
+        except asyncio.CancelledError:
+            logger.info("Quota counter flusher stopped successfully")
+
+    if hasattr(app.state, 'analytics_ingest_task'):
+        logger.info("Stopping analytics ingest buffer (final flush)...")
+        app.state.analytics_ingest_task.cancel()
+        try:
+            await app.state.analytics_ingest_task
+        except asyncio.CancelledError:
+            logger.info("Analytics ingest buffer stopped successfully")
+
+    if hasattr(app.state, 'exam_session_sweeper_task'):
+        logger.info("Stopping exam session sweeper (final flush)...")
+        app.state.exam_session_sweeper_task.cancel()
+        try:
+            await app.state.exam_session_sweeper_task
+        except asyncio.CancelledError:
+            logger.info("Exam session sweeper stopped successfully")
+
+    if hasattr(app.state, 'leaderboard_reconcile_task'):
+        logger.info("Stopping leaderboard reconciler...")
+        app.state.leaderboard_reconcile_task.cancel()
+        try:
+            await app.state.leaderboard_reconcile_task
+        except asyncio.CancelledError:
+            logger.info("Leaderboard reconciler stopped successfully")
+
     if hasattr(app.state, 'thread_pool_executor'):
         app.state.thread_pool_executor.shutdown(wait=False, cancel_futures=True)
 
@@ -431,6 +515,13 @@ async def lifespan(app: FastAPI):
             except Exception as e2:
                 logger.error(f"Error on Redis pool disconnect: {e2}")
 
+    # Release the shared async cache pool
+    try:
+        from .utils.cache import cache_manager
+        await cache_manager.close()
+    except Exception as e:
+        logger.warning(f"Cache pool shutdown failed: {e}")
+
     # Stop Kafka Producer (#1085)
     if hasattr(app.state, 'kafka_producer'):
         logger.info("Stopping Kafka Producer...")
@@ -527,6 +618,21 @@ def create_app() -> FastAPI:
     app.state.limiter = limiter
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+    # ETag Middleware for HTTP caching optimization
+    # Adds ETag headers to static resources (questions, prompts, translations)
+    # Returns 304 Not Modified when content hasn't changed, saving bandwidth.
+    # Question/category ETags come from stored content versions, so 304s and
+    # cached bodies skip the handler; added inside the auth middlewares and
+    # GZip, which passes the precompressed variants through unchanged.
+    from .middleware.etag_middleware import ETagMiddleware
+    from .services.resource_versions import resource_versions
+    resource_versions.install_listeners()
+    app.add_middleware(
+        ETagMiddleware,
+        versions=resource_versions if settings.etag_versioned_resources else None,
+        body_cache_entries=settings.etag_body_cache_entries,
+    )
+
     # Request Logging Middleware (inner-most for full request lifecycle tracking)
     # Provides: Request IDs, JSON logging, PII protection, X-Request-ID headers
     from .middleware.logging_middleware import RequestLoggingMiddleware
@@ -563,37 +669,22 @@ def create_app() -> FastAPI:
     from .middleware.device_fingerprint_middleware import DeviceFingerprintValidationMiddleware
     app.add_middleware(DeviceFingerprintValidationMiddleware)
 
-    # Step-Up Authentication Middleware (#1245)
-    # Enforces 2FA re-verification for privileged operations
-    from .middleware.step_up_auth_middleware import StepUpAuthMiddleware
-    app.add_middleware(StepUpAuthMiddleware)
-
-    # Consent Validation Middleware for privacy compliance
-    # Blocks analytics data collection without user consent
-    from .middleware.consent_middleware import ConsentValidationMiddleware
-    app.add_middleware(ConsentValidationMiddleware)
-
-    # ETag Middleware for HTTP caching optimization
-    # Adds ETag headers to static resources (questions, prompts, translations)
-    # Returns 304 Not Modified when content hasn't changed, saving bandwidth
-    from .middleware.etag_middleware import ETagMiddleware
-    app.add_middleware(ETagMiddleware)
-
-    # Server-side RBAC enforcement middleware
-    from starlette.middleware.base import BaseHTTPMiddleware
-    from .middleware.quota_middleware import DynamicQuotaMiddleware
-    from .middleware.rbac_middleware import rbac_middleware
-    from .middleware.feature_flags import feature_flag_middleware
     from .middleware.redaction_middleware import redaction_middleware
     
     # Internal Middlewares (Inner to Outer)
     # The last one added is the first one receiving the request.
-    # Order: App -> CircuitBreaker -> DynamicQuota -> RBAC
+    # Order: App -> CircuitBreaker -> RequestPipeline
     from .middleware.circuit_breaker_middleware import CircuitBreakerMiddleware
     app.add_middleware(CircuitBreakerMiddleware)
-    app.add_middleware(DynamicQuotaMiddleware)
-    app.add_middleware(BaseHTTPMiddleware, dispatch=rbac_middleware)
-    app.add_middleware(BaseHTTPMiddleware, dispatch=feature_flag_middleware)
+
+    # Single-pass ASGI auth/context pipeline
+    # Decodes the JWT once, then runs maintenance (#1112) -> feature flags ->
+    # RBAC (#1145) -> tenant quota (#1135) -> analytics consent -> step-up
+    # auth (#1245) as ordered stages, skipped per route by precompiled path tables.
+    # Maintenance used to be the outermost middleware; as a stage it runs
+    # inside CORS, so its 503s carry CORS headers and preflights are not blocked
+    from .middleware.request_pipeline import RequestPipelineMiddleware
+    app.add_middleware(RequestPipelineMiddleware)
 
     # CORS middleware with security hardening
     # Environment-specific configuration for security
@@ -640,11 +731,6 @@ def create_app() -> FastAPI:
     # Version header middleware
     # app.add_middleware(VersionHeaderMiddleware)
     
-    # Global Maintenance Mode Middleware (#1112)
-    # Blocks or restricts access during critical updates
-    from .middleware.maintenance import MaintenanceMiddleware
-    app.add_middleware(MaintenanceMiddleware)
-    
     # Mount static files for avatars
     from fastapi.staticfiles import StaticFiles
     import os
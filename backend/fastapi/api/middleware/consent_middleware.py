@@ -6,13 +6,45 @@ This middleware checks user consent before allowing analytics data collection.
 
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
-from typing import Callable
+from typing import Callable, Optional
 import json
 
 from ..services.analytics_service import AnalyticsService
 from ..services.db_service import AsyncSessionLocal
 
 
+ANALYTICS_PATHS = (
+    "/api/v1/analytics/",
+    "/api/v1/analytics/events",
+    "/api/v1/analytics/track",
+    "/api/v1/analytics/log"
+)
+
+
+async def consent_denied_response(anonymous_id: str) -> Optional[JSONResponse]:
+    """Return a 403 response if ``anonymous_id`` has not consented to analytics."""
+    try:
+        async with AsyncSessionLocal() as db:
+            consent_status = await AnalyticsService.check_analytics_consent_async(db, anonymous_id)
+    except Exception as e:
+        # Log error but don't block - fail open for now
+        print(f"Consent validation error: {e}")
+        return None
+
+    if consent_status.get('analytics_consent_given', False):
+        return None
+
+    # Consent not given, block analytics
+    return JSONResponse(
+        status_code=403,
+        content={
+            "error": "Analytics consent required",
+            "message": "User has not provided consent for analytics data collection",
+            "consent_required": True
+        }
+    )
+
+
 class ConsentValidationMiddleware:
     """
     Middleware to validate user consent before analytics operations.
@@ -34,25 +66,10 @@ class ConsentValidationMiddleware:
             anonymous_id = self._extract_anonymous_id(request)
 
             if anonymous_id:
-                try:
-                    async with AsyncSessionLocal() as db:
-                        consent_status = await AnalyticsService.check_analytics_consent_async(db, anonymous_id)
-
-                        if not consent_status.get('analytics_consent_given', False):
-                            # Consent not given, block analytics
-                            response = JSONResponse(
-                                status_code=403,
-                                content={
-                                    "error": "Analytics consent required",
-                                    "message": "User has not provided consent for analytics data collection",
-                                    "consent_required": True
-                                }
-                            )
-                            await response(scope, receive, send)
-                            return
-                except Exception as e:
-                    # Log error but don't block - fail open for now
-                    print(f"Consent validation error: {e}")
+                response = await consent_denied_response(anonymous_id)
+                if response is not None:
+                    await response(scope, receive, send)
+                    return
 
         await self.app(scope, receive, send)
 
@@ -60,13 +77,7 @@ class ConsentValidationMiddleware:
         """
         Check if the request path is an analytics endpoint.
         """
-        analytics_paths = [
-            "/api/v1/analytics/",
-            "/api/v1/analytics/events",
-            "/api/v1/analytics/track",
-            "/api/v1/analytics/log"
-        ]
-        return any(path.startswith(analytics_path) for analytics_path in analytics_paths)
+        return path.startswith(ANALYTICS_PATHS)
 
     def _extract_anonymous_id(self, request: Request) -> str:
         """
@@ -114,14 +114,13 @@ class DeviceFingerprintValidationMiddleware(BaseHTTPMiddleware):
         auth_header = request.headers.get("authorization", "")
         if auth_header.startswith("Bearer "):
             token = auth_header[7:]
-            # Extract session ID from JWT token (jti claim)
+            # Extract session ID from JWT token (session claim)
             try:
                 from jose import jwt
-                from ..config import get_settings_instance
-                settings = get_settings_instance()
+                from ..constants.security_constants import SESSION_ID_CLAIM
 
                 payload = jwt.get_unverified_claims(token)
-                return payload.get("jti")  # JWT ID claim
+                return payload.get(SESSION_ID_CLAIM)
             except Exception:
                 pass
 
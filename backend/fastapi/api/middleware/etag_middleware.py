@@ -6,12 +6,23 @@ Provides HTTP ETag header support for caching static resources.
 - Returns 304 Not Modified when content hasn't changed
 - Skips ETag computation for streaming responses
 - Reduces bandwidth for repeated requests to static endpoints
+
+Versioned mode (when a ResourceVersions registry is passed): paths backed by a
+versioned resource get an ETag built from the resource's stored content
+version and the request language, so a matching If-None-Match is answered
+with 304 before the handler runs. 200 bodies are cached per worker by
+(resource, version, language, URL) together with a precompressed gzip
+variant; a new version simply stops matching the old entries.
 """
 
+import gzip
 import hashlib
 import json
 import logging
-from typing import Callable, Optional, Set
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from cachetools import LRUCache
 
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -19,6 +30,48 @@ from starlette.responses import Response, StreamingResponse
 
 logger = logging.getLogger("api.etag")
 
+# Responses smaller than this are not worth a gzip variant (matches the app's GZipMiddleware)
+GZIP_MIN_SIZE = 1000
+
+# Headers that belong to one response and must not be replayed from the body cache
+_PER_RESPONSE_HEADERS = {
+    "content-length", "content-encoding", "etag", "vary", "date", "set-cookie",
+    "x-request-id", "x-correlation-id",
+}
+
+
+@dataclass
+class CachedBody:
+    """A cached 200 response with its optional precompressed variant."""
+    body: bytes
+    gzip_body: Optional[bytes]
+    media_type: Optional[str]
+    headers: Dict[str, str]
+
+
+def request_language(request: Request) -> str:
+    """Primary language subtag of the first Accept-Language entry ("en" by default)."""
+    header = request.headers.get("accept-language", "")
+    tag = header.split(",", 1)[0].split(";", 1)[0].strip()
+    language = tag.split("-", 1)[0].lower()
+    return language if language.isalpha() else "en"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak If-None-Match comparison against a list of entity tags (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
 
 class ETagMiddleware(BaseHTTPMiddleware):
     """
@@ -48,9 +101,16 @@ class ETagMiddleware(BaseHTTPMiddleware):
     ETAG_ENABLED_PREFIXES: Set[str] = {
         "/api/v1/questions/",
     }
+
+    # Path prefix -> versioned resource, most specific first
+    VERSIONED_RESOURCES: Tuple[Tuple[str, str], ...] = (
+        ("/api/v1/questions/categories", "question_categories"),
+        ("/api/v1/questions", "questions"),
+    )
     
     def __init__(self, app: Callable, enabled_paths: Optional[Set[str]] = None, 
-                 enabled_prefixes: Optional[Set[str]] = None):
+                 enabled_prefixes: Optional[Set[str]] = None,
+                 versions=None, body_cache_entries: int = 512):
         """
         Initialize ETag middleware.
         
@@ -58,12 +118,18 @@ class ETagMiddleware(BaseHTTPMiddleware):
             app: The ASGI application
             enabled_paths: Set of exact paths to enable ETag for (optional, extends defaults)
             enabled_prefixes: Set of path prefixes to enable ETag for (optional, extends defaults)
+            versions: ResourceVersions registry enabling versioned ETags (optional)
+            body_cache_entries: Response bodies kept for versioned resources (0 disables)
         """
         super().__init__(app)
         if enabled_paths:
             self.ETAG_ENABLED_PATHS = self.ETAG_ENABLED_PATHS | enabled_paths
         if enabled_prefixes:
             self.ETAG_ENABLED_PREFIXES = self.ETAG_ENABLED_PREFIXES | enabled_prefixes
+        self.versions = versions
+        self.body_cache_entries = body_cache_entries
+        self._bodies: LRUCache = LRUCache(maxsize=max(body_cache_entries, 1))
+        self.stats = {"not_modified": 0, "body_hits": 0, "body_misses": 0}
     
     def _should_process_etag(self, request: Request) -> bool:
         """
@@ -88,6 +154,12 @@ class ETagMiddleware(BaseHTTPMiddleware):
         
         return False
     
+    def _versioned_resource(self, path: str) -> Optional[str]:
+        for prefix, resource in self.VERSIONED_RESOURCES:
+            if path == prefix or path.startswith(prefix + "/"):
+                return resource
+        return None
+
     def _compute_etag(self, body: bytes) -> str:
         """
         Compute ETag (MD5 hash) for response body.
@@ -115,6 +187,17 @@ class ETagMiddleware(BaseHTTPMiddleware):
         """
         # Check if we should process ETag for this request
         should_process = self._should_process_etag(request)
+
+        if should_process and self.versions is not None:
+            resource = self._versioned_resource(request.url.path)
+            if resource is not None:
+                try:
+                    version = await self.versions.get(resource)
+                except Exception as e:
+                    # Fall back to hashing the body
+                    logger.warning(f"Resource version lookup failed for {resource}: {e}")
+                else:
+                    return await self._dispatch_versioned(request, call_next, resource, version)
         
         # Process the request
         response = await call_next(request)
@@ -183,6 +266,56 @@ class ETagMiddleware(BaseHTTPMiddleware):
             return response
 
 
+    async def _dispatch_versioned(self, request: Request, call_next: Callable,
+                                  resource: str, version: str) -> Response:
+        """Answer from the resource version and the body cache, running the handler only on a miss."""
+        language = request_language(request)
+        etag = f'"{resource}-{version}-{language}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "private, must-revalidate",
+            "Vary": "Accept-Encoding, Accept-Language",
+        }
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+
+        key = (resource, version, language, str(request.url.path), str(request.url.query))
+        cached = self._bodies.get(key) if self.body_cache_entries > 0 else None
+        if cached is None:
+            self.stats["body_misses"] += 1
+            response = await call_next(request)
+            if response.status_code != 200 or isinstance(response, StreamingResponse):
+                return response
+            cached = await self._capture(response)
+            if self.body_cache_entries > 0:
+                self._bodies[key] = cached
+        else:
+            self.stats["body_hits"] += 1
+
+        accepts_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+        body = cached.body
+        if accepts_gzip and cached.gzip_body is not None:
+            body = cached.gzip_body
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, status_code=200, headers={**cached.headers, **headers},
+                        media_type=cached.media_type)
+
+    async def _capture(self, response: Response) -> CachedBody:
+        """Read a downstream response into a CachedBody, adding whichever encoding is missing."""
+        chunks = []
+        async for chunk in response.body_iterator:
+            chunks.append(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        body = b"".join(chunks)
+        if response.headers.get("content-encoding") == "gzip":
+            gzip_body, body = body, gzip.decompress(body)
+        else:
+            gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _PER_RESPONSE_HEADERS}
+        return CachedBody(body=body, gzip_body=gzip_body, media_type=response.media_type, headers=headers)
+
+
 class ConditionalETagMiddleware(BaseHTTPMiddleware):
     """
     Alternative ETag middleware that operates on all JSON GET responses
@@ -9,10 +9,18 @@ from ..config import get_settings_instance
 
 logger = logging.getLogger(__name__)
 
+def resolve_features(user_id=None, tenant_id=None) -> dict:
+    """Evaluate every known flag for the given user/tenant."""
+    feature_service = get_feature_service()
+    all_flags = feature_service.get_all_flags()
+    return {
+        name: feature_service.is_enabled(name, user_id, tenant_id)
+        for name in all_flags.keys()
+    }
+
+
 async def feature_flag_middleware(request: Request, call_next):
     """Middleware to inject checked flags for the current user into request.state.features."""
-    feature_service = get_feature_service()
-    
     # 1. Extract context (user_id, tenant_id) from JWT if present
     auth_header = request.headers.get("Authorization")
     user_id = None
@@ -29,11 +37,7 @@ async def feature_flag_middleware(request: Request, call_next):
             pass # Invalid token doesn't crash the middleware, flags default to false
 
     # 2. Pre-cache relevant flags for this request lifecycle
-    all_flags = feature_service.get_all_flags()
-    request.state.features = {
-        name: feature_service.is_enabled(name, user_id, tenant_id)
-        for name in all_flags.keys()
-    }
+    request.state.features = resolve_features(user_id, tenant_id)
     
     return await call_next(request)
 
@@ -1,6 +1,7 @@
 
 import json
 import logging
+from typing import Optional
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
@@ -12,16 +13,47 @@ settings = get_settings_instance()
 
 MAINTENANCE_KEY = "soulsense:maintenance_state"
 
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def maintenance_block_response(state: dict, method: str, is_admin: bool) -> Optional[JSONResponse]:
+    """Return the 503 response for a request blocked by ``state``, or None if it may proceed."""
+    mode = state.get("mode", "NORMAL")
+    if mode == "NORMAL" or is_admin:
+        return None
+
+    # READ_ONLY: only block writes (POST/PUT/PATCH/DELETE)
+    if mode == "READ_ONLY":
+        if method.upper() in SAFE_METHODS:
+            return None
+        error, default_message = "READ_ONLY_MODE", "System is currently in read-only mode for maintenance."
+    # MAINTENANCE: block ALL requests for non-admins
+    elif mode == "MAINTENANCE":
+        error, default_message = "MAINTENANCE_MODE", "System is down for scheduled maintenance."
+    else:
+        return None
+
+    return JSONResponse(
+        status_code=503,
+        content={
+            "error": error,
+            "message": state.get("reason", default_message),
+            "retry_after": state.get("retry_after", 60)
+        },
+        headers={"Retry-After": str(state.get("retry_after", 60))}
+    )
+
+
 class MaintenanceMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         # 1. Skip for internal health checks if needed
         if request.url.path == "/health":
             return await call_next(request)
 
-        # 2. Check Redis for maintenance state
-        # Cached for performance? For now, straight hit or small internal cache.
-        # Given it's a 'global switch', we can check Redis on every request but with a 5s local TTL if we expect high volume.
-        # For simplicity, we'll hit cache_service (which hits Redis).
+        # 2. Check maintenance state
+        # Served from cache_service's in-process tier on the fast path (including
+        # the common "key not set" case); changes made through cache_service.set
+        # reach every worker via the invalidation channel.
         
         state = await cache_service.get(MAINTENANCE_KEY)
         if not state:
@@ -44,39 +76,12 @@ class MaintenanceMiddleware(BaseHTTPMiddleware):
             except (JWTError, Exception):
                 pass
 
-        # 4. Handle READ_ONLY mode
-        if mode == "READ_ONLY":
-            # Only Allow GET, HEAD, OPTIONS
-            if request.method.upper() in {"GET", "HEAD", "OPTIONS"}:
-                response = await call_next(request)
-                response.headers["X-Maintenance-Mode"] = "READ_ONLY"
-                return response
-            
-            # If it's a write (POST/PUT/PATCH/DELETE) and NOT an admin, block it
-            if not is_admin:
-                return JSONResponse(
-                    status_code=503,
-                    content={
-                        "error": "READ_ONLY_MODE",
-                        "message": state.get("reason", "System is currently in read-only mode for maintenance."),
-                        "retry_after": state.get("retry_after", 60)
-                    },
-                    headers={"Retry-After": str(state.get("retry_after", 60))}
-                )
-
-        # 5. Handle MAINTENANCE mode
-        if mode == "MAINTENANCE":
-            # Block ALL requests for non-admins
-            if not is_admin:
-                return JSONResponse(
-                    status_code=503,
-                    content={
-                        "error": "MAINTENANCE_MODE",
-                        "message": state.get("reason", "System is down for scheduled maintenance."),
-                        "retry_after": state.get("retry_after", 60)
-                    },
-                    headers={"Retry-After": str(state.get("retry_after", 60))}
-                )
+        # 4. Block non-admins according to the mode
+        blocked = maintenance_block_response(state, request.method, is_admin)
+        if blocked is not None:
+            return blocked
 
-        # Allowed (either admin or normal)
-        return await call_next(request)
+        response = await call_next(request)
+        if mode == "READ_ONLY":
+            response.headers["X-Maintenance-Mode"] = "READ_ONLY"
+        return response
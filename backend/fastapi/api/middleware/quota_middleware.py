@@ -1,6 +1,6 @@
 import time
 import logging
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 from fastapi import Request, Response, HTTPException, status
 from starlette.middleware.base import BaseHTTPMiddleware
 from ..utils.network import get_real_ip
@@ -10,59 +10,80 @@ from ..config import get_settings_instance
 
 logger = logging.getLogger(__name__)
 
+def is_quota_exempt(path: str) -> bool:
+    return path.startswith("/api/v1/health") or not path.startswith("/api")
+
+
+async def enforce_quota(tenant_id, client_ip: Optional[str]) -> Optional[dict]:
+    """
+    Consume one request from the tenant's quota (or the IP limiter when there
+    is no tenant) and return the quota status for response headers.
+
+    Raises 429 when the request is over quota. Tenant quota backend errors
+    fail open and return None.
+    """
+    if tenant_id:
+        try:
+            # We need a DB session to check the quota record
+            async with AsyncSessionLocal() as db:
+                allowed, status_data = await QuotaService.check_and_consume_quota(
+                    db, tenant_id=tenant_id, tokens_requested=1
+                )
+        except Exception as e:
+            logger.error(f"QuotaMiddleware error for tenant {tenant_id}: {e}", exc_info=True)
+            # Fail-open for reliability, but log heavily
+            return None
+
+        if not allowed:
+            logger.warning(f"Quota exceeded for tenant {tenant_id}: {status_data.get('error')}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit or daily quota exceeded: {status_data.get('error')}"
+            )
+        return status_data
+
+    # Fallback for anonymous or tenant-less requests (Legacy IP-based limiter)
+    from ..middleware.rate_limiter import auth_limiter
+    allowed, remaining = await auth_limiter.is_rate_limited(client_ip)
+    if not allowed:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many requests from this IP")
+    return None
+
+
+def quota_headers(quota_info: dict) -> Dict[str, str]:
+    """Response headers describing the tenant's remaining quota."""
+    return {
+        "X-Tenant-Tier": quota_info["tier"],
+        "X-Quota-Remaining-Today": str(quota_info["daily_limit"] - quota_info["daily_count"]),
+        "X-RateLimit-Remaining": str(quota_info["tokens_remaining"]),
+    }
+
+
 class DynamicQuotaMiddleware(BaseHTTPMiddleware):
     """
     Middleware for Dynamic Multi-Tenant Rate Limiting & Quota Management (#1135).
     Replaces static fixed-rate limits with a Dynamic Token Bucket algorithm.
     """
     async def dispatch(self, request: Request, call_next):
-        if request.url.path.startswith("/api/v1/health") or not request.url.path.startswith("/api"):
+        if is_quota_exempt(request.url.path):
             return await call_next(request)
 
         # 1. Extract context (tenant_id) — usually populated by RBAC middleware
         tenant_id = getattr(request.state, "tenant_id", None)
         
         # 2. Enforce Quota
-        if tenant_id:
-            try:
-                # We need a DB session to check the quota record
-                async with AsyncSessionLocal() as db:
-                    allowed, status_data = await QuotaService.check_and_consume_quota(
-                        db, tenant_id=tenant_id, tokens_requested=1
-                    )
-                    
-                    if not allowed:
-                        logger.warning(f"Quota exceeded for tenant {tenant_id}: {status_data.get('error')}")
-                        raise HTTPException(
-                            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                            detail=f"Rate limit or daily quota exceeded: {status_data.get('error')}"
-                        )
-                    
-                    # Store usage for the response headers
-                    request.state.quota_info = status_data
-            except HTTPException:
-                raise
-            except Exception as e:
-                logger.error(f"QuotaMiddleware error for tenant {tenant_id}: {e}", exc_info=True)
-                # Fail-open for reliability, but log heavily
-                return await call_next(request)
-        else:
-            # Fallback for anonymous or tenant-less requests (Legacy IP-based limiter)
-            from ..middleware.rate_limiter import auth_limiter
-            client_ip = get_real_ip(request)
-            allowed, remaining = await auth_limiter.is_rate_limited(client_ip)
-            if not allowed:
-                raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many requests from this IP")
+        client_ip = None if tenant_id else get_real_ip(request)
+        quota_info = await enforce_quota(tenant_id, client_ip)
+        if quota_info:
+            # Store usage for the response headers
+            request.state.quota_info = quota_info
 
         # 3. Process Request
         response: Response = await call_next(request)
 
         # 4. Append Quota Headers to Response
-        quota_info = getattr(request.state, "quota_info", None)
         if quota_info:
-            response.headers["X-Tenant-Tier"] = quota_info["tier"]
-            response.headers["X-Quota-Remaining-Today"] = str(quota_info["daily_limit"] - quota_info["daily_count"])
-            response.headers["X-RateLimit-Remaining"] = str(quota_info["tokens_remaining"])
+            response.headers.update(quota_headers(quota_info))
             
             # Analytics Collector Integration: Feed real-time usage back to dashboard context
             # (In a real app, this could be a push to a websocket or analytics stream)
@@ -23,7 +23,7 @@ Key improvements over the original:
 """
 
 import logging
-from typing import Callable
+from typing import Callable, Optional, Tuple
 
 from fastapi import Request, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -62,6 +62,89 @@ def _is_exempt(path: str) -> bool:
     return False
 
 
+async def authorize_user(username: str, payload: dict, path: str) -> Tuple[Optional[int], bool]:
+    """
+    Resolve the authoritative ``(user_id, is_admin)`` for a verified token.
+
+    Consults the sidecar cache first and falls back to an independent DB
+    session on a miss. Raises 401 for unknown users and 403 when the token's
+    ``is_admin`` claim disagrees with the stored role. Shared by
+    ``rbac_middleware`` and the ASGI request pipeline.
+    """
+    token_is_admin: bool = payload.get("is_admin", False)
+    user_id = None
+
+    # ── 4a. Sidecar cache lookup (no DB) ────────────────────────────
+    user_id_for_version = payload.get("uid")
+
+    if not user_id_for_version:
+         # Legacy token fallback: No user_id in JWT
+         log.debug("[RBAC] Legacy token (no uid) — performing one-time DB lookup for ID")
+         from sqlalchemy import select
+         from ..models import User
+         from ..services.db_service import AsyncSessionLocal
+         async with AsyncSessionLocal() as db:
+             id_stmt = select(User.id).filter(User.username == username)
+             id_res = await db.execute(id_stmt)
+             user_id_for_version = id_res.scalar()
+
+    if user_id_for_version:
+        cached_is_admin = await rbac_permission_cache.get(username, user_id_for_version)
+    else:
+        cached_is_admin = None
+
+    if cached_is_admin is not None:
+         # Cache hit — validate JWT claim against cached value
+         db_is_admin = cached_is_admin
+         log.debug("[RBAC] Cache hit for %s → is_admin=%s", username, db_is_admin)
+         user_id = user_id_for_version
+    else:
+        # ── 4b. Cache miss — open independent DB session ─────────────
+        log.debug("[RBAC] Cache miss for %s — querying DB", username)
+        from sqlalchemy import select
+        from ..models import User
+        from ..services.db_service import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            stmt = select(User.id, User.is_admin, User.version).filter(User.username == username)
+            result = await db.execute(stmt)
+            row = result.first()
+
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
+            )
+
+        user_id_from_db, db_is_admin, current_v = row.id, row.is_admin, row.version
+
+        # Populate user_id from DB (more reliable than JWT claim)
+        user_id = user_id_from_db
+
+        # Write to sidecar cache with authoritative version
+        await rbac_permission_cache.set(username, bool(db_is_admin), version=current_v)
+
+        # Ensure Redis truth mapping is also populated for future version checks
+        from ..services.cache_service import cache_service
+        await cache_service.update_version("user", user_id_from_db, current_v)
+
+    # ── 5. Privilege-escalation check ───────────────────────────────
+    if bool(token_is_admin) != bool(db_is_admin):
+        log.warning(
+            "[RBAC] Role mismatch for %s: token=%s db=%s path=%s",
+            username, token_is_admin, db_is_admin, path,
+        )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Role tampering detected",
+        )
+
+    if user_id is None:
+        # Might still be None if cache was hit (no DB row fetched above)
+        user_id = payload.get("uid")
+
+    return user_id, bool(db_is_admin)
+
+
 async def rbac_middleware(request: Request, call_next: Callable):
     """
     FastAPI middleware that validates the user's RBAC role.
@@ -112,7 +195,6 @@ async def rbac_middleware(request: Request, call_next: Callable):
                 token, settings.SECRET_KEY, algorithms=[settings.jwt_algorithm]
             )
             username: str | None = payload.get("sub")
-            token_is_admin: bool = payload.get("is_admin", False)
             request.state.tenant_id = payload.get("tid") # Extract tenant ID (#1135)
         except JWTError as exc:
             log.warning("[RBAC] JWT decode error for %s: %s", path, exc)
@@ -125,74 +207,9 @@ async def rbac_middleware(request: Request, call_next: Callable):
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Token missing subject"
             )
 
-        # ── 4a. Sidecar cache lookup (no DB) ────────────────────────────
-        user_id_for_version = payload.get("uid")
-
-        if not user_id_for_version:
-             # Legacy token fallback: No user_id in JWT
-             log.debug("[RBAC] Legacy token (no uid) — performing one-time DB lookup for ID")
-             from sqlalchemy import select
-             from ..models import User
-             from ..services.db_service import AsyncSessionLocal
-             async with AsyncSessionLocal() as db:
-                 id_stmt = select(User.id).filter(User.username == username)
-                 id_res = await db.execute(id_stmt)
-                 user_id_for_version = id_res.scalar()
-
-        if user_id_for_version:
-            cached_is_admin = await rbac_permission_cache.get(username, user_id_for_version)
-        else:
-            cached_is_admin = None
-
-        if cached_is_admin is not None:
-             # Cache hit — validate JWT claim against cached value
-             db_is_admin = cached_is_admin
-             log.debug("[RBAC] Cache hit for %s → is_admin=%s", username, db_is_admin)
-             request.state.user_id = user_id_for_version
-        else:
-            # ── 4b. Cache miss — open independent DB session ─────────────
-            log.debug("[RBAC] Cache miss for %s — querying DB", username)
-            from sqlalchemy import select
-            from ..models import User
-            from ..services.db_service import AsyncSessionLocal
-
-            async with AsyncSessionLocal() as db:
-                stmt = select(User.id, User.is_admin, User.version).filter(User.username == username)
-                result = await db.execute(stmt)
-                row = result.first()
-
-            if row is None:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
-                )
-
-            user_id_from_db, db_is_admin, current_v = row.id, row.is_admin, row.version
-
-            # Populate user_id from DB (more reliable than JWT claim)
-            request.state.user_id = user_id_from_db
-
-            # Write to sidecar cache with authoritative version
-            await rbac_permission_cache.set(username, bool(db_is_admin), version=current_v)
-            
-            # Ensure Redis truth mapping is also populated for future version checks
-            from ..services.cache_service import cache_service
-            await cache_service.update_version("user", user_id_from_db, current_v)
-
-        # ── 5. Privilege-escalation check ───────────────────────────────
-        if bool(token_is_admin) != bool(db_is_admin):
-            log.warning(
-                "[RBAC] Role mismatch for %s: token=%s db=%s path=%s",
-                username, token_is_admin, db_is_admin, path,
-            )
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Role tampering detected",
-            )
-
-        request.state.is_admin = bool(db_is_admin)
-        if request.state.user_id is None:
-            # Might still be None if cache was hit (no DB row fetched above)
-            request.state.user_id = payload.get("uid")
+        user_id, is_admin = await authorize_user(username, payload, path)
+        request.state.user_id = user_id
+        request.state.is_admin = is_admin
 
     finally:
         # Always clear the re-entry guard so sub-requests are unaffected
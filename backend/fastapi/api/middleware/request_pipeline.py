@@ -0,0 +1,355 @@
+"""
+Single-pass ASGI request pipeline for auth, context and policy checks.
+
+The maintenance switch, feature flags, RBAC, tenant quota, analytics consent
+and step-up authentication used to run as separate middleware layers — most
+of them ``BaseHTTPMiddleware``, which costs an extra task and a
+response-streaming hop per layer — and several of them decoded the bearer
+token independently.
+
+``RequestPipelineMiddleware`` decodes and verifies the token once into a
+``RequestContext`` and runs the checks as ordered stages. Each stage
+declares the routes it applies to with precompiled ``PathTable`` matchers;
+the stage list for a given method/path is resolved once and memoized, so
+public and non-API routes skip the inapplicable stages without any per-stage
+string matching.
+
+Stages reuse the same check functions as the standalone middlewares, which
+remain importable for callers that mount them individually.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, status
+from jose import JWTError, jwt
+from starlette.responses import JSONResponse, Response
+
+from ..config import get_settings_instance
+from ..constants.security_constants import SESSION_ID_CLAIM
+from ..services.cache_service import cache_service
+from ..utils.network import get_real_ip
+from .consent_middleware import ANALYTICS_PATHS, consent_denied_response
+from .feature_flags import resolve_features
+from .maintenance import MAINTENANCE_KEY, maintenance_block_response
+from .quota_middleware import enforce_quota, quota_headers
+from .rbac_middleware import _EXEMPT_EXACT, _EXEMPT_PREFIXES, authorize_user
+from .step_up_auth_middleware import DEFAULT_PRIVILEGED_ROUTES, has_valid_step_up_auth
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestContext:
+    """Per-request identity, decoded from the bearer token exactly once."""
+
+    token: Optional[str] = None
+    claims: Dict = field(default_factory=dict)
+    token_error: Optional[str] = None
+    # Authoritative values, filled in by the RBAC stage
+    user_id: Optional[int] = None
+    is_admin: bool = False
+    # Extra headers stages want on the downstream response
+    response_headers: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def username(self) -> Optional[str]:
+        return self.claims.get("sub")
+
+    @property
+    def tenant_id(self) -> Optional[str]:
+        return self.claims.get("tid")
+
+    @property
+    def session_id(self) -> Optional[str]:
+        return self.claims.get(SESSION_ID_CLAIM)
+
+    @property
+    def claimed_admin(self) -> bool:
+        return bool(self.claims.get("is_admin", False))
+
+    @classmethod
+    def from_request(cls, request: Request) -> "RequestContext":
+        auth_header = request.headers.get("authorization")
+        if not auth_header:
+            return cls()
+        scheme, _, token = auth_header.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return cls()
+
+        settings = get_settings_instance()
+        try:
+            claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.jwt_algorithm])
+        except JWTError as exc:
+            return cls(token=token, token_error=str(exc))
+        return cls(token=token, claims=claims)
+
+
+class PathTable:
+    """
+    Precompiled route matcher.
+
+    Matches a request when its method is allowed and its path is one of
+    ``exact``, starts with one of ``prefixes`` or contains one of ``contains``.
+    """
+
+    __slots__ = ("exact", "prefixes", "contains", "methods")
+
+    def __init__(
+        self,
+        exact: Iterable[str] = (),
+        prefixes: Iterable[str] = (),
+        contains: Iterable[str] = (),
+        methods: Optional[Iterable[str]] = None,
+    ):
+        self.exact = frozenset(exact)
+        self.prefixes = tuple(prefixes)
+        self.contains = tuple(contains)
+        self.methods = frozenset(m.upper() for m in methods) if methods is not None else None
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods is not None and method not in self.methods:
+            return False
+        if path in self.exact:
+            return True
+        if self.prefixes and path.startswith(self.prefixes):
+            return True
+        return any(fragment in path for fragment in self.contains)
+
+
+ALL_PATHS = PathTable(prefixes=("/",))
+
+
+class PipelineStage:
+    """
+    One check in the pipeline.
+
+    ``run`` returns a response to short-circuit the request, or None to let
+    it continue. Raising ``HTTPException`` is equivalent to returning the
+    matching JSON error response.
+    """
+
+    name = "stage"
+    include: PathTable = ALL_PATHS
+    exclude: Optional[PathTable] = None
+
+    def applies(self, method: str, path: str) -> bool:
+        if not self.include.matches(method, path):
+            return False
+        return self.exclude is None or not self.exclude.matches(method, path)
+
+    async def run(self, request: Request, ctx: RequestContext) -> Optional[Response]:
+        raise NotImplementedError
+
+
+class MaintenanceStage(PipelineStage):
+    """Global maintenance / read-only switch (#1112)."""
+
+    name = "maintenance"
+    exclude = PathTable(exact=("/health",))
+
+    async def run(self, request, ctx):
+        state = await cache_service.get(MAINTENANCE_KEY)
+        if not state:
+            return None
+
+        blocked = maintenance_block_response(state, request.method, ctx.claimed_admin)
+        if blocked is None and state.get("mode") == "READ_ONLY":
+            ctx.response_headers["X-Maintenance-Mode"] = "READ_ONLY"
+        return blocked
+
+
+class FeatureFlagStage(PipelineStage):
+    """Evaluates feature flags for the caller into ``request.state.features``."""
+
+    name = "feature_flags"
+
+    async def run(self, request, ctx):
+        request.state.features = resolve_features(ctx.username, ctx.tenant_id)
+        return None
+
+
+class RBACStage(PipelineStage):
+    """Verifies the caller's role against the RBAC sidecar cache / DB (#1145)."""
+
+    name = "rbac"
+    include = PathTable(prefixes=("/api/v1",))
+    exclude = PathTable(exact=_EXEMPT_EXACT, prefixes=_EXEMPT_PREFIXES)
+
+    async def run(self, request, ctx):
+        if ctx.token is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Missing authentication token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if ctx.token_error is not None:
+            logger.warning("[RBAC] JWT decode error for %s: %s", request.url.path, ctx.token_error)
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        if not ctx.username:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token missing subject")
+
+        request.state.tenant_id = ctx.tenant_id  # (#1135)
+        ctx.user_id, ctx.is_admin = await authorize_user(ctx.username, ctx.claims, request.url.path)
+        request.state.user_id = ctx.user_id
+        request.state.is_admin = ctx.is_admin
+        return None
+
+
+class QuotaStage(PipelineStage):
+    """Tenant token bucket / daily quota, or the IP limiter for anonymous callers (#1135)."""
+
+    name = "quota"
+    include = PathTable(prefixes=("/api",))
+    exclude = PathTable(prefixes=("/api/v1/health",))
+
+    async def run(self, request, ctx):
+        client_ip = None if ctx.tenant_id else get_real_ip(request)
+        quota_info = await enforce_quota(ctx.tenant_id, client_ip)
+        if quota_info:
+            request.state.quota_info = quota_info
+            ctx.response_headers.update(quota_headers(quota_info))
+        return None
+
+
+class ConsentStage(PipelineStage):
+    """Blocks analytics collection for anonymous IDs without consent."""
+
+    name = "consent"
+    include = PathTable(prefixes=ANALYTICS_PATHS)
+
+    async def run(self, request, ctx):
+        anonymous_id = request.headers.get("X-Anonymous-ID") or request.query_params.get("anonymous_id")
+        if not anonymous_id:
+            return None
+        return await consent_denied_response(anonymous_id)
+
+
+class StepUpStage(PipelineStage):
+    """Requires recent step-up verification for privileged operations (#1245)."""
+
+    name = "step_up"
+
+    def __init__(self, privileged_routes: Optional[Sequence[dict]] = None):
+        self.privileged_routes = list(privileged_routes or DEFAULT_PRIVILEGED_ROUTES)
+        self.include = PathTable(
+            contains=[route["path"] for route in self.privileged_routes],
+            methods={m for route in self.privileged_routes for m in route["methods"]},
+        )
+
+    def _route_config(self, method: str, path: str) -> Optional[dict]:
+        for route in self.privileged_routes:
+            if route["path"] in path and method in route["methods"]:
+                return route
+        return None
+
+    async def run(self, request, ctx):
+        route_config = self._route_config(request.method, request.url.path)
+        if route_config is None or ctx.user_id is None or not ctx.session_id:
+            # No authenticated session; RBAC / route dependencies handle it
+            return None
+
+        try:
+            has_valid_auth = await has_valid_step_up_auth(ctx.user_id, ctx.session_id, route_config["purpose"])
+        except Exception as e:
+            logger.error(f"Step-up auth check failed, allowing request to proceed: {e}")
+            return None
+
+        if not has_valid_auth:
+            logger.warning(
+                f"Blocked privileged operation without step-up auth: "
+                f"user={ctx.username}, path={request.url.path}, method={request.method}, "
+                f"purpose={route_config['purpose']}"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Step-up authentication required for this operation. "
+                       "Please complete step-up verification first."
+            )
+        return None
+
+
+def default_stages() -> Tuple[PipelineStage, ...]:
+    """Stages in the order the former middleware stack applied them."""
+    return (
+        MaintenanceStage(),
+        FeatureFlagStage(),
+        RBACStage(),
+        QuotaStage(),
+        ConsentStage(),
+        StepUpStage(),
+    )
+
+
+class RequestPipelineMiddleware:
+    """
+    Pure ASGI middleware running the request pipeline in a single pass.
+
+    Populates ``request.state`` with ``request_context``, ``is_admin``,
+    ``user_id``, ``tenant_id``, ``features`` and ``quota_info`` as the
+    individual middlewares did.
+    """
+
+    def __init__(self, app, stages: Optional[Sequence[PipelineStage]] = None, plan_cache_size: int = 4096):
+        self.app = app
+        self.stages = tuple(stages) if stages is not None else default_stages()
+        self._plan_cache_size = plan_cache_size
+        self._plans: Dict[Tuple[str, str], Tuple[PipelineStage, ...]] = {}
+
+    def plan_for(self, method: str, path: str) -> Tuple[PipelineStage, ...]:
+        """Stages that apply to ``method path``, memoized per route."""
+        key = (method, path)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = tuple(stage for stage in self.stages if stage.applies(method, path))
+            if len(self._plans) >= self._plan_cache_size:
+                # Paths with IDs make the key space unbounded; start over
+                self._plans.clear()
+            self._plans[key] = plan
+        return plan
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        ctx = RequestContext.from_request(request)
+        request.state.request_context = ctx
+        request.state.is_admin = False
+        request.state.user_id = None
+
+        response = None
+        try:
+            for stage in self.plan_for(request.method, scope["path"]):
+                response = await stage.run(request, ctx)
+                if response is not None:
+                    break
+        except HTTPException as exc:
+            response = JSONResponse(
+                status_code=exc.status_code,
+                content={"detail": exc.detail},
+                headers=exc.headers,
+            )
+
+        if response is not None:
+            await response(scope, receive, send)
+            return
+
+        if not ctx.response_headers:
+            await self.app(scope, receive, send)
+            return
+
+        extra_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in ctx.response_headers.items()
+        ]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + extra_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
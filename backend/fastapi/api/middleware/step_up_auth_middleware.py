@@ -13,11 +13,38 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..services.auth_service import AuthService
-from ..services.db_router import get_db_session
+from ..services.db_service import AsyncSessionLocal
 from ..models import User
 
 logger = logging.getLogger(__name__)
 
+# Valid for 30 minutes after verification
+STEP_UP_MAX_AGE_MINUTES = 30
+
+DEFAULT_PRIVILEGED_ROUTES = [
+    {
+        "path": "/users/me",
+        "methods": ["DELETE"],
+        "purpose": "delete_account"
+    },
+    {
+        "path": "/auth/2fa/disable",
+        "methods": ["POST"],
+        "purpose": "disable_2fa"
+    }
+]
+
+
+async def has_valid_step_up_auth(user_id: int, session_id: str, purpose: str) -> bool:
+    """Check for a recent step-up verification using a short-lived DB session."""
+    async with AsyncSessionLocal() as db:
+        return await AuthService(db).check_step_up_auth_valid(
+            user_id=user_id,
+            session_id=session_id,
+            purpose=purpose,
+            max_age_minutes=STEP_UP_MAX_AGE_MINUTES
+        )
+
 
 class StepUpAuthMiddleware(BaseHTTPMiddleware):
     """
@@ -40,18 +67,7 @@ class StepUpAuthMiddleware(BaseHTTPMiddleware):
                 - purpose: Step-up purpose identifier (e.g., "delete_account")
         """
         super().__init__(app)
-        self.privileged_routes = privileged_routes or [
-            {
-                "path": "/users/me",
-                "methods": ["DELETE"],
-                "purpose": "delete_account"
-            },
-            {
-                "path": "/auth/2fa/disable",
-                "methods": ["POST"],
-                "purpose": "disable_2fa"
-            }
-        ]
+        self.privileged_routes = privileged_routes or DEFAULT_PRIVILEGED_ROUTES
 
     async def dispatch(self, request: Request, call_next):
         # Check if this route requires step-up authentication
@@ -69,17 +85,8 @@ class StepUpAuthMiddleware(BaseHTTPMiddleware):
                 # No authenticated user, let auth middleware handle it
                 return await call_next(request)
 
-            # Get database session
-            db = get_db_session()
-            auth_service = AuthService(db)
-
             # Check if user has valid step-up auth for this purpose
-            has_valid_auth = await auth_service.check_step_up_auth_valid(
-                user_id=user.id,
-                session_id=session_id,
-                purpose=route_config["purpose"],
-                max_age_minutes=30  # Valid for 30 minutes after verification
-            )
+            has_valid_auth = await has_valid_step_up_auth(user.id, session_id, route_config["purpose"])
 
             if not has_valid_auth:
                 logger.warning(
@@ -58,7 +58,7 @@ class BurnoutDetectionService:
         # 3. Offload Inference to Dedicated Process
         # This isolates the main memory from heavy ML libs if they were used
         try:
-            inference_result = inference_proxy.run_inference(
+            inference_result = await inference_proxy.run_inference(
                 "burnout_detection", 
                 {"stats": stats}
             )
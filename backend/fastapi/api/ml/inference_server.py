@@ -1,3 +1,4 @@
+import asyncio
 import os
 import logging
 import time
@@ -5,7 +6,8 @@ import json
 import uuid
 import numpy as np
 import redis
-from typing import Dict, Any, Optional
+import redis.asyncio as aioredis
+from typing import Dict, Any, List, Optional, Tuple
 from api.config import get_settings_instance
 
 logger = logging.getLogger(__name__)
@@ -28,117 +30,265 @@ class ModelPersistenceSingleton:
                 cls._models[model_name] = {"status": "loaded", "name": model_name}
         return cls._models[model_name]
 
-def run_ml_server():
+REQUEST_QUEUE = "ml_inference_requests"
+REPLY_QUEUE_PREFIX = "ml_inference_replies:"
+REPLY_TTL_SECONDS = 60
+
+EMBEDDING_TASKS = ("generate_embedding", "generate_embeddings")
+
+
+def _burnout_zscores(payload: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    # Z-Score computation logic
+    stats = payload.get("stats")
+    if not stats or len(stats) < 5:
+        return None
+    sentiments = [s["sentiment"] for s in stats]
+    stresses = [s["stress"] for s in stats]
+
+    baseline_sent_mean = np.mean(sentiments[:-1])
+    baseline_sent_std = np.std(sentiments[:-1]) or 1.0
+    baseline_stress_mean = np.mean(stresses[:-1])
+    baseline_stress_std = np.std(stresses[:-1]) or 1.0
+
+    z_sent = (sentiments[-1] - baseline_sent_mean) / baseline_sent_std
+    z_stress = (stresses[-1] - baseline_stress_mean) / baseline_stress_std
+
+    return {
+        "z_sentiment": float(z_sent),
+        "z_stress": float(z_stress),
+        "baseline_sent_mean": float(baseline_sent_mean),
+        "baseline_stress_mean": float(baseline_stress_mean)
+    }
+
+
+def process_batch(messages: List[Dict[str, Any]], now: Optional[float] = None) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
     """
-    The main loop for the standalone ML inference server.
-    This should be run as a separate process/container.
+    Runs one micro-batch of requests and returns ``(message, reply)`` pairs.
+
+    Embedding requests for the same model are merged into a single ``encode``
+    call over all their texts and split back per request. Requests whose
+    client deadline has already passed are dropped without a reply.
     """
+    now = time.time() if now is None else now
+    replies = []
+    embedding_groups: Dict[str, List[Tuple[Dict[str, Any], List[str]]]] = {}
+
+    for message in messages:
+        deadline = message.get("deadline")
+        if deadline is not None and deadline < now:
+            continue
+        task_type = message.get("type")
+        payload = message.get("payload") or {}
+        try:
+            if task_type in EMBEDDING_TASKS:
+                texts = [payload.get("text")] if task_type == "generate_embedding" else (payload.get("texts") or [])
+                model_name = payload.get("model_name", "all-MiniLM-L6-v2")
+                embedding_groups.setdefault(model_name, []).append((message, texts))
+            elif task_type == "burnout_detection":
+                replies.append((message, {"result": _burnout_zscores(payload)}))
+            elif task_type == "ping":
+                replies.append((message, {"result": "pong"}))
+            else:
+                replies.append((message, {"result": None}))
+        except Exception as e:
+            replies.append((message, {"error": str(e)}))
+
+    for model_name, requests in embedding_groups.items():
+        try:
+            model = ModelPersistenceSingleton.get_model(model_name, "sentence_transformer")
+            all_texts = [text for _, texts in requests for text in texts]
+            vectors = model.encode(all_texts, batch_size=max(len(all_texts), 1)).tolist() if all_texts else []
+            offset = 0
+            for message, texts in requests:
+                chunk = vectors[offset:offset + len(texts)]
+                offset += len(texts)
+                result = chunk[0] if message["type"] == "generate_embedding" else chunk
+                replies.append((message, {"result": result}))
+        except Exception as e:
+            replies.extend((message, {"error": str(e)}) for message, _ in requests)
+
+    return replies
+
+
+def next_batch(r, max_batch_size: int, max_wait: float, idle_timeout: float = 5.0) -> List[Dict[str, Any]]:
+    """
+    Blocks for the first request, then keeps draining the queue until the batch
+    is full or ``max_wait`` seconds have passed since the first one arrived.
+    """
+    first = r.blpop(REQUEST_QUEUE, timeout=idle_timeout)
+    if not first:
+        return []
+    raw = [first[1]]
+    deadline = time.monotonic() + max_wait
+    while len(raw) < max_batch_size:
+        more = r.lpop(REQUEST_QUEUE, max_batch_size - len(raw))
+        if more:
+            raw.extend(more)
+            continue
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        item = r.blpop(REQUEST_QUEUE, timeout=remaining)
+        if not item:
+            break
+        raw.append(item[1])
+    return [json.loads(m) for m in raw]
+
+
+def _serve_forever(redis_url: Optional[str] = None, max_batch_size: Optional[int] = None,
+                   max_wait_ms: Optional[float] = None):
+    """One inference worker: dynamic micro-batching over the shared request queue."""
     from api.utils.memory_guard import check_memory_usage
     settings = get_settings_instance()
-    r = redis.from_url(settings.redis_url)
-    
-    logger.info(f"ML Inference Server started via Redis (PID: {os.getpid()})")
-    
+    r = redis.from_url(redis_url or settings.redis_url)
+    max_batch_size = max_batch_size or settings.ml_inference_max_batch_size
+    max_wait = (settings.ml_inference_max_wait_ms if max_wait_ms is None else max_wait_ms) / 1000
+
+    logger.info(f"ML Inference worker started via Redis (PID: {os.getpid()}, batch<= {max_batch_size}, wait<= {max_wait * 1000:.0f}ms)")
+
     while True:
+        messages = []
         try:
             # 1. Proactive Health Check: Memory
             # If this process uses too much, we exit and let the supervisor restart us
-            if not check_memory_usage(threshold_mb=2048): 
+            if not check_memory_usage(threshold_mb=2048):
                  logger.error("ML Process exceeding memory threshold. Shutting down for safety.")
                  break
 
-            # 2. Wait for a request from the queue (blocking pop)
-            # Timeout allows for periodic health checks
-            request_data = r.blpop("ml_inference_requests", timeout=5)
-            if not request_data:
+            # 2. Collect a micro-batch (timeout allows for periodic health checks)
+            messages = next_batch(r, max_batch_size, max_wait)
+            if not messages:
                 continue
-                
-            _, message_raw = request_data
-            message = json.loads(message_raw)
-            
-            task_type = message.get("type")
-            payload = message.get("payload")
-            reply_to = message.get("reply_to")
-            
-            result = None
-            
-            if task_type == "burnout_detection":
-                # Z-Score computation logic
-                stats = payload.get("stats")
-                if stats and len(stats) >= 5:
-                    sentiments = [s["sentiment"] for s in stats]
-                    stresses = [s["stress"] for s in stats]
-                    
-                    baseline_sent_mean = np.mean(sentiments[:-1])
-                    baseline_sent_std = np.std(sentiments[:-1]) or 1.0
-                    baseline_stress_mean = np.mean(stresses[:-1])
-                    baseline_stress_std = np.std(stresses[:-1]) or 1.0
-                    
-                    current_sent = sentiments[-1]
-                    current_stress = stresses[-1]
-                    
-                    z_sent = (current_sent - baseline_sent_mean) / baseline_sent_std
-                    z_stress = (current_stress - baseline_stress_mean) / baseline_stress_std
-                    
-                    result = {
-                        "z_sentiment": float(z_sent),
-                        "z_stress": float(z_stress),
-                        "baseline_sent_mean": float(baseline_sent_mean),
-                        "baseline_stress_mean": float(baseline_stress_mean)
-                    }
-            
-            elif task_type == "generate_embedding":
-                model_name = payload.get("model_name", "all-MiniLM-L6-v2")
-                text = payload.get("text")
-                model = ModelPersistenceSingleton.get_model(model_name, "sentence_transformer")
-                embedding = model.encode(text)
-                result = embedding.tolist()
-                
-            elif task_type == "ping":
-                result = "pong"
-                
-            # 3. Publish result to the unique reply channel
-            r.setex(reply_to, 60, json.dumps({"result": result}))
-            r.publish(f"done:{reply_to}", "READY")
-            
+
+            replies = process_batch(messages)
         except Exception as e:
             logger.error(f"Error in ML Inference Server: {e}")
-            if 'reply_to' in locals():
-                r.setex(reply_to, 60, json.dumps({"error": str(e)}))
-                r.publish(f"done:{reply_to}", "READY")
+            replies = [(m, {"error": str(e)}) for m in messages]
+
+        # 3. Push each result onto its client's reply queue
+        if replies:
+            try:
+                with r.pipeline(transaction=False) as pipe:
+                    for message, reply in replies:
+                        pipe.rpush(message["reply_to"], json.dumps(dict(reply, id=message["id"])))
+                        pipe.expire(message["reply_to"], REPLY_TTL_SECONDS)
+                    pipe.execute()
+            except Exception as e:
+                logger.error(f"Failed to deliver ML inference replies: {e}")
+
+
+def run_ml_server(workers: Optional[int] = None):
+    """
+    The main loop for the standalone ML inference server.
+    This should be run as a separate process/container. With more than one
+    worker, each runs in its own process and is restarted if it exits.
+    """
+    import multiprocessing
+
+    workers = workers or get_settings_instance().ml_inference_workers
+    if workers <= 1:
+        _serve_forever()
+        return
+
+    processes = {}
+    logger.info(f"ML Inference Server starting {workers} workers (PID: {os.getpid()})")
+    while True:
+        for slot in range(workers):
+            proc = processes.get(slot)
+            if proc is None or not proc.is_alive():
+                if proc is not None:
+                    logger.warning(f"ML inference worker {proc.pid} exited ({proc.exitcode}); restarting")
+                proc = multiprocessing.Process(target=_serve_forever, name=f"ml-inference-{slot}", daemon=True)
+                proc.start()
+                processes[slot] = proc
+        time.sleep(1.0)
 
 class InferenceProxy:
     """
-    Proxy that communicates with the ML Inference Server via Redis.
-    Shared across all Celery workers.
+    Asyncio client for the ML Inference Server.
+
+    Requests go onto the shared queue tagged with this process's reply queue.
+    A single listener task BLPOPs that queue and resolves the waiting future by
+    request id, so concurrent calls share one connection for replies instead of
+    one pubsub subscription each.
+
+    The reply queue, connection and pending futures belong to one process:
+    a proxy inherited across ``fork`` (Celery prefork, gunicorn ``--preload``)
+    starts fresh in the child rather than sharing the parent's reply queue.
     """
-    def __init__(self):
+    def __init__(self, redis_url: Optional[str] = None):
         self.settings = get_settings_instance()
-        self.r = redis.from_url(self.settings.redis_url)
+        self.redis_url = redis_url or self.settings.redis_url
+        self._pid = os.getpid()
+        self._reply_queue = f"{REPLY_QUEUE_PREFIX}{uuid.uuid4().hex}"
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._reply_queue = f"{REPLY_QUEUE_PREFIX}{uuid.uuid4().hex}"
+            self._redis = None
+            self._loop = None
+            self._pending = {}
+            self._listener = None
+
+    @property
+    def reply_queue(self) -> str:
+        self._check_pid()
+        return self._reply_queue
 
-    def run_inference(self, task_type: str, payload: Any, timeout: float = 30.0) -> Any:
+    def _client(self):
+        self._check_pid()
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Clients and futures are bound to the loop that created them
+            # (Celery tasks may each run on a fresh loop)
+            self._redis = aioredis.from_url(self.redis_url)
+            self._loop = loop
+            self._pending = {}
+            self._listener = None
+        return self._redis
+
+    def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self):
+        r = self._redis
+        try:
+            while self._pending:
+                item = await r.blpop(self.reply_queue, timeout=1)
+                if not item:
+                    continue
+                reply = json.loads(item[1])
+                future = self._pending.pop(reply.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in reply:
+                    future.set_exception(RuntimeError(f"ML Inference Error: {reply['error']}"))
+                else:
+                    future.set_result(reply.get("result"))
+        except Exception as e:
+            logger.error(f"ML inference reply listener failed: {e}")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            self._pending.clear()
+
+    async def run_inference(self, task_type: str, payload: Any, timeout: float = 30.0) -> Any:
         """
-        Sends a request to the ML process via Redis and waits for a response.
-        Protected by Circuit Breaker (#1135).
+        Sends a request to the ML process via Redis and waits for a response
+        without blocking the event loop.
         """
-        from ..services.circuit_breaker import CircuitBreaker
-        breaker = CircuitBreaker(f"ml_inference:{task_type}", failure_threshold=3, latency_threshold=0.5)
-
-        async def _call():
-            return await self._run_inference_internal(task_type, payload, timeout)
-            
-        # Circuit breaker expects a callable. Since InferenceProxy is currently synchronous blocking 
-        # but the breaker is async-friendly, we might need a bridge if this is called from async context.
-        # However, run_inference is mostly called from Celery tasks (sync).
-        
-        return self._run_inference_with_breaker(task_type, payload, timeout)
-
-    def _run_inference_with_breaker(self, task_type: str, payload: Any, timeout: float) -> Any:
-        # Simplified synchronous breaker or bridge
-        import time
+        return await self._run_inference_with_breaker(task_type, payload, timeout)
+
+    async def _run_inference_with_breaker(self, task_type: str, payload: Any, timeout: float) -> Any:
         start_time = time.time()
         try:
-            res = self._run_inference_internal(task_type, payload, timeout)
+            res = await self._run_inference_internal(task_type, payload, timeout)
             duration = time.time() - start_time
             if duration > 0.5: # trip if > 500ms for ML (generous)
                 logger.warning(f"ML Inference {task_type} slow: {duration:.2f}s")
@@ -147,49 +297,34 @@ class InferenceProxy:
             logger.error(f"ML Inference {task_type} failed: {e}")
             raise e
 
-    def _run_inference_internal(self, task_type: str, payload: Any, timeout: float) -> Any:
+    async def _run_inference_internal(self, task_type: str, payload: Any, timeout: float) -> Any:
+        r = self._client()
         request_id = str(uuid.uuid4())
-        reply_to = f"ml_reply:{request_id}"
-        
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
         message = {
             "id": request_id,
             "type": task_type,
             "payload": payload,
-            "reply_to": reply_to
+            "reply_to": self.reply_queue,
+            # Lets the server skip work nobody is waiting for any more
+            "deadline": time.time() + timeout,
         }
-        
-        # Subscribe to completion event first
-        pubsub = self.r.pubsub()
-        pubsub.subscribe(f"done:{reply_to}")
-        
-        # Push to request queue
-        self.r.rpush("ml_inference_requests", json.dumps(message))
-        
-        # Wait for notification
+
         try:
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                msg = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-                if msg:
-                    # Result is ready in Redis key
-                    resp_data = self.r.get(reply_to)
-                    if resp_data:
-                        resp = json.loads(resp_data)
-                        if "error" in resp:
-                            raise RuntimeError(f"ML Inference Error: {resp['error']}")
-                        return resp.get("result")
-                    break
+            await r.rpush(REQUEST_QUEUE, json.dumps(message))
+            self._ensure_listener()
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"ML Inference request timed out after {timeout}s")
         finally:
-            pubsub.unsubscribe()
-            self.r.delete(reply_to)
-            
-        raise TimeoutError(f"ML Inference request timed out after {timeout}s")
+            self._pending.pop(request_id, None)
 
 
-# Thread-safe global proxy
+# Process-wide proxy (one reply queue and listener per process)
 inference_proxy = InferenceProxy()
 
 if __name__ == "__main__":
     # If run directly, starts the ML server
     run_ml_server()
-
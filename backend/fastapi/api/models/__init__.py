@@ -5,12 +5,14 @@ Core models have been refactored elsewhere.
 """
 
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, Text, create_engine, event, Index, text, DateTime, CheckConstraint, Enum as SQLEnum, JSON
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, Text, create_engine, event, Index, text, DateTime, CheckConstraint, Enum as SQLEnum, JSON, LargeBinary, BigInteger
 from sqlalchemy.orm import relationship, declarative_base, Session
 from sqlalchemy.engine import Engine, Connection
 from typing import List, Optional, Any, Dict, Tuple, Union
 from datetime import datetime, timedelta, timezone
 import logging
+import os
+import uuid
 
 # Python 3.10 compatibility
 UTC = timezone.utc
@@ -21,6 +23,34 @@ try:
 except (ImportError, ValueError):
     EncryptedString = Text
 
+try:
+    from pgvector.sqlalchemy import Vector
+except ImportError:
+    from sqlalchemy.types import TypeDecorator
+
+    class Vector(TypeDecorator):
+        """Text fallback for pgvector's column type, stored as the same '[x,y,...]' literal."""
+        impl = Text
+        cache_ok = True
+
+        def __init__(self, dim):
+            self.dim = dim
+            super().__init__()
+
+        def process_bind_param(self, value, dialect):
+            if value is None or isinstance(value, str):
+                return value
+            return "[" + ",".join(str(float(x)) for x in value) + "]"
+
+        def process_result_value(self, value, dialect):
+            if value is None:
+                return None
+            return [float(x) for x in value.strip("[]").split(",") if x]
+
+# Width of journal_entries.embedding; the embedding service must produce vectors of
+# exactly this size (it requests it from OpenAI and refuses other providers at startup)
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "384"))
+
 # Define Base
 Base = declarative_base()
 
@@ -431,8 +461,30 @@ class AnalyticsEvent(Base):
     event_data = Column(Text, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     ip_address = Column(String, nullable=True)
+    environment = Column(String, nullable=True, index=True)
     user = relationship("User", back_populates="analytics_events")
 
+class AnalyticsDailyEventCount(Base):
+    """Per-day, per-environment event counters, maintained as events are logged."""
+    __tablename__ = 'analytics_daily_event_counts'
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD (UTC)
+    environment = Column(String, primary_key=True)
+    event_name = Column(String, primary_key=True)
+    event_type = Column(String, nullable=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class AnalyticsDailyActiveUsers(Base):
+    """
+    Distinct active user_ids per day and environment. ``sketch`` holds an
+    exact sorted id set for small cohorts and a HyperLogLog once it grows
+    past the configured size (see services/activity_rollups.py).
+    """
+    __tablename__ = 'analytics_daily_active_users'
+    day = Column(String(10), primary_key=True)
+    environment = Column(String, primary_key=True)
+    user_count = Column(Integer, nullable=False, default=0)
+    sketch = Column(LargeBinary, nullable=False)
+
 # ==========================================
 # CQRS READ MODELS (ISSUE-1124)
 # Pre-computed materializations for fast /analytics/* queries
@@ -483,6 +535,26 @@ class CQRSTrendAnalytics(Base):
     assessment_count = Column(Integer, default=0)
     last_updated = Column(DateTime, default=datetime.utcnow)
 
+class CQRSScoreHistogram(Base):
+    """
+    Mergeable score sketch: one fixed bin per integer score and projection
+    bucket ('global', 'age:<group>', 'month:<YYYY-MM>'). Counts and sums only
+    ever receive deltas, so exact percentiles and averages can be derived
+    per bucket without rescanning ``scores``.
+    """
+    __tablename__ = 'cqrs_score_histogram'
+    bucket = Column(String, primary_key=True)
+    score = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_count = Column(Integer, nullable=False, default=0)
+
+class CQRSScoreUser(Base):
+    """Assessments per username, backing the incremental unique_users count."""
+    __tablename__ = 'cqrs_score_users'
+    username = Column(String, primary_key=True)
+    assessment_count = Column(Integer, nullable=False, default=0)
+
 class OTP(Base):
     """One-Time Passwords for Password Reset and 2FA challenges."""
     __tablename__ = 'otp_codes'
@@ -710,6 +782,24 @@ class Score(Base):
         Index('idx_score_agegroup_score', 'detailed_age_group', 'total_score'),
     )
 
+class UserScoreSummary(Base):
+    """
+    Per-user exam score aggregates behind the dashboard, folded in as scores
+    are saved (see services/score_summary.py).
+    """
+    __tablename__ = 'user_score_summaries'
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    exam_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    score_sum_sq = Column(BigInteger, nullable=False, default=0)
+    best_score = Column(Integer, nullable=True)
+    latest_score = Column(Integer, nullable=True)
+    latest_score_id = Column(Integer, nullable=True)
+    recent_scores = Column(String, nullable=False, default="")  # last five, oldest first, comma-separated
+    streak_days = Column(Integer, nullable=False, default=0)
+    last_exam_day = Column(String(10), nullable=True)  # YYYY-MM-DD (UTC)
+    updated_at = Column(DateTime, default=utc_now, onupdate=utc_now)
+
 class Response(Base):
     __tablename__ = 'responses'
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -794,6 +884,11 @@ class JournalEntry(Base):
     deleted_at = Column(DateTime(timezone=True), nullable=True)
     privacy_level = Column(String, default="private", index=True)
     word_count = Column(Integer, default=0)
+
+    # Semantic search (filled by the embedding pipeline)
+    embedding = Column(Vector(EMBEDDING_DIMENSION), nullable=True)
+    embedding_model = Column(String, nullable=True)
+    last_indexed_at = Column(DateTime, nullable=True)
     
     __table_args__ = (
         Index('idx_journal_user_timestamp', 'user_id', 'timestamp'),
@@ -801,6 +896,61 @@ class JournalEntry(Base):
     )
     user = relationship("User", back_populates="journal_entries")
 
+class JournalEntryTag(Base):
+    """Normalized (lower-cased) journal tags, one row per entry/tag, for indexed tag search."""
+    __tablename__ = 'journal_entry_tags'
+    entry_id = Column(Integer, ForeignKey('journal_entries.id', ondelete='CASCADE'), primary_key=True)
+    tag = Column(String(200), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+
+    __table_args__ = (
+        Index('idx_journal_entry_tags_user_tag', 'user_id', 'tag', 'entry_id'),
+    )
+
+class JournalEntryEmotion(Base):
+    """Detected emotional patterns, one row per entry/emotion, for indexed emotion filtering."""
+    __tablename__ = 'journal_entry_emotions'
+    entry_id = Column(Integer, ForeignKey('journal_entries.id', ondelete='CASCADE'), primary_key=True)
+    emotion = Column(String(50), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+
+    __table_args__ = (
+        Index('idx_journal_entry_emotions_user_emotion', 'user_id', 'emotion', 'entry_id'),
+    )
+
+class JournalUserStats(Base):
+    """Running per-user journal totals, maintained incrementally on every entry write."""
+    __tablename__ = 'journal_user_stats'
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    entry_count = Column(Integer, nullable=False, default=0)
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_count = Column(Integer, nullable=False, default=0)
+    stress_sum = Column(Integer, nullable=False, default=0)
+    stress_count = Column(Integer, nullable=False, default=0)
+    sleep_quality_sum = Column(Integer, nullable=False, default=0)
+    sleep_quality_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+
+class JournalUserDailyStats(Base):
+    """Per-user, per-day entry counts and sentiment sums backing the weekly/monthly analytics windows."""
+    __tablename__ = 'journal_user_daily_stats'
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD prefix of entry_date
+    entry_count = Column(Integer, nullable=False, default=0)
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_count = Column(Integer, nullable=False, default=0)
+
+class JournalUserTagStats(Base):
+    """Per-user tag frequencies for the most-common-tags analytic."""
+    __tablename__ = 'journal_user_tag_stats'
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    tag = Column(String(200), primary_key=True)
+    entry_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('idx_journal_user_tag_stats_count', 'user_id', 'entry_count'),
+    )
+
 class WeeklySummary(Base):
     """Stores weekly emotional summaries generated from journal entries (Issue #1326)."""
     __tablename__ = 'weekly_summaries'
@@ -998,7 +1148,7 @@ def capture_audit_events(session, flush_context):
             for c in obj.__table__.columns:
                 if not c.primary_key and c.name in obj.__dict__:
                     val = obj.__dict__.get(c.name)
-                    if isinstance(val, (datetime, timedelta)):
+                    if isinstance(val, (datetime, timedelta, uuid.UUID)):
                         val = str(val)
                     payload[c.name] = val
                     
@@ -1015,7 +1165,7 @@ def capture_audit_events(session, flush_context):
             for c in obj.__table__.columns:
                 if not c.primary_key and c.name in obj.__dict__:
                     val = obj.__dict__.get(c.name)
-                    if isinstance(val, (datetime, timedelta)):
+                    if isinstance(val, (datetime, timedelta, uuid.UUID)):
                         val = str(val)
                     payload[c.name] = val
 
@@ -1356,6 +1506,20 @@ class UserXP(Base):
     
     user = relationship("User", back_populates="xp_stats")
 
+class UserActivityCounter(Base):
+    """
+    Rolling per-user count of one activity event (journal, assessment) behind
+    the achievement rules, updated as events happen (see services/achievement_engine.py).
+    """
+    __tablename__ = 'user_activity_counters'
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    event = Column(String(50), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    last_day = Column(String(10), nullable=True)  # YYYY-MM-DD (UTC) of the newest bucket
+    day_buckets = Column(String, nullable=False, default="")  # per-day counts, a ring indexed by day ordinal, comma-separated
+    unlocked = Column(String, nullable=False, default="")  # achievement ids of this event's rules already unlocked, comma-separated
+    updated_at = Column(DateTime, default=utc_now, onupdate=utc_now)
+
 class Challenge(Base):
     """Weekly or Monthly Challenges for users to participate in."""
     __tablename__ = 'challenges'
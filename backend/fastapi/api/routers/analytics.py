@@ -1,16 +1,11 @@
 """Analytics API router - Aggregated, non-sensitive data only."""
-from fastapi import APIRouter, Depends, Query, Request, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
-from fastapi import APIRouter, Depends, status, Request, Response, BackgroundTasks, Form, HTTPException, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
-from pydantic import BaseModel
 import logging
 from ..services.db_router import get_db
 from ..services.analytics_service import AnalyticsService
 from ..services.user_analytics_service import UserAnalyticsService
-from app.core import AuthorizationError, InternalServerError
 from fastapi_cache.decorator import cache
 from ..schemas import (
     AnalyticsSummary,
@@ -43,46 +38,25 @@ async def track_event(
 ):
     """
     Log a tracking event (signup drop-off, etc).
-    
+
     **Rate Limited**: 30 requests per minute per IP
-    
+
     **Data Privacy**:
     - No PII is logged (enforced by schema).
     - IP address is stored for security auditing.
     """
-    await AnalyticsService.log_event(db, event.dict(), ip_address=request.client.host)
-    return {"status": "ok"}
-
-
-@router.get("/summary", response_model=AnalyticsSummary, dependencies=[Depends(rate_limit_analytics)])
-async def get_analytics_summary(db: AsyncSession = Depends(get_db)):
-    """
-    Get overall analytics summary with aggregated data only.
-    
-    **Rate Limited**: 30 requests per minute per IP
-    
-    **Data Privacy**: This endpoint returns ONLY aggregated statistics.
-    No individual user data or raw sensitive information is exposed.
-    response: Response,
-    db: AsyncSession = Depends(get_db)
-):
-    """Log a tracking event."""
     await AnalyticsService.log_event(db, event.model_dump(), ip_address=get_real_ip(request))
     return {"status": "ok"}
 
 
+# The summary, benchmark, insight, age-group and distribution endpoints read
+# the global CQRS read models (#1124), which are not split by environment.
+
 @router.get("/summary", response_model=AnalyticsSummary, dependencies=[Depends(rate_limit_analytics), Depends(require_admin)])
 @cache(expire=3600)
-async def get_analytics_summary(
-    environment: Optional[str] = Query(None, description="Filter by environment (defaults to current)"),
-    db: AsyncSession = Depends(get_db)
-):
-    """Get overall analytics summary (Admin only).
-    
-    Supports cross-environment queries for admin users to compare data across environments.
-    """
+async def get_analytics_summary(db: AsyncSession = Depends(get_db)):
+    """Get overall analytics summary (Admin only)."""
     summary = await AnalyticsService.get_overall_summary(db)
-    summary = await AnalyticsService.get_overall_summary(db, environment=environment)
     return AnalyticsSummary(**summary)
 
 
@@ -91,83 +65,38 @@ async def get_analytics_summary(
 async def get_trend_analytics(
     period: str = Query('monthly', pattern='^(daily|weekly|monthly)$', description="Time period type"),
     limit: int = Query(12, ge=1, le=24, description="Number of periods to return"),
-    period: str = Query('monthly', pattern='^(daily|weekly|monthly)$'),
-    limit: int = Query(12, ge=1, le=24),
     environment: Optional[str] = Query(None, description="Filter by environment (defaults to current)"),
     db: AsyncSession = Depends(get_db)
 ):
     """Get trend analytics over time (Admin only).
-    
-    Supports cross-environment queries for admin users to compare data across environments.
-    """
-    trends = await AnalyticsService.get_trend_analytics(db, period_type=period, limit=limit)
-    return TrendAnalytics(**trends)
 
-
-@router.get("/benchmarks", response_model=list[BenchmarkComparison], dependencies=[Depends(rate_limit_analytics)])
-async def get_benchmark_comparison(db: AsyncSession = Depends(get_db)):
+    Supports cross-environment queries for admin users to compare data across environments.
     """
-    Get benchmark comparison data with percentiles.
-    
-    **Rate Limited**: 30 requests per minute per IP
-    
-    **Data Privacy**: Returns percentile-based aggregations only.
-    No individual scores or user data exposed.
     trends = await AnalyticsService.get_trend_analytics(db, period_type=period, limit=limit, environment=environment)
     return TrendAnalytics(**trends)
 
 
 @router.get("/benchmarks", response_model=List[BenchmarkComparison], dependencies=[Depends(rate_limit_analytics), Depends(require_admin)])
 @cache(expire=3600)
-async def get_benchmark_comparison(
-    environment: Optional[str] = Query(None, description="Filter by environment (defaults to current)"),
-    db: AsyncSession = Depends(get_db)
-):
-    """Get benchmark comparison data (Admin only).
-    
-    Supports cross-environment queries for admin users to compare data across environments.
-    """
+async def get_benchmark_comparison(db: AsyncSession = Depends(get_db)):
+    """Get benchmark comparison data with percentiles (Admin only)."""
     benchmarks = await AnalyticsService.get_benchmark_comparison(db)
     return [BenchmarkComparison(**b) for b in benchmarks]
 
 
-@router.get("/insights", response_model=PopulationInsights, dependencies=[Depends(rate_limit_analytics)])
-async def get_population_insights(db: AsyncSession = Depends(get_db)):
-    """
-    Get population-level insights.
-    
-    **Rate Limited**: 30 requests per minute per IP
-    
-    **Data Privacy**: Returns population-level aggregations only.
-    No individual user data or sensitive information.
-    benchmarks = await AnalyticsService.get_benchmark_comparison(db, environment=environment)
-    return [BenchmarkComparison(**b) for b in benchmarks]
-
-
 @router.get("/insights", response_model=PopulationInsights, dependencies=[Depends(rate_limit_analytics), Depends(require_admin)])
 @cache(expire=3600)
-async def get_population_insights(
-    environment: Optional[str] = Query(None, description="Filter by environment (defaults to current)"),
-    db: AsyncSession = Depends(get_db)
-):
-    """Get population-level insights (Admin only).
-    
-    Supports cross-environment queries for admin users to compare data across environments.
-    """
+async def get_population_insights(db: AsyncSession = Depends(get_db)):
+    """Get population-level insights (Admin only)."""
     insights = await AnalyticsService.get_population_insights(db)
     return PopulationInsights(**insights)
 
 
-@router.get("/age-groups", dependencies=[Depends(rate_limit_analytics)])
+@router.get("/age-groups", dependencies=[Depends(rate_limit_analytics), Depends(require_admin)])
 async def get_age_group_statistics(db: AsyncSession = Depends(get_db)):
     """
-    Get detailed statistics by age group.
-    
-    **Rate Limited**: 30 requests per minute per IP
-    
-    **Data Privacy**: Returns aggregated statistics per age group.
-    No individual assessment data.
-    
+    Get detailed statistics by age group (Admin only).
+
     Returns for each age group:
     - Total assessments
     - Average score
@@ -178,21 +107,13 @@ async def get_age_group_statistics(db: AsyncSession = Depends(get_db)):
     return {"age_group_statistics": stats}
 
 
-@router.get("/distribution", dependencies=[Depends(rate_limit_analytics)])
+@router.get("/distribution", dependencies=[Depends(rate_limit_analytics), Depends(require_admin)])
 async def get_score_distribution(db: AsyncSession = Depends(get_db)):
     """
-    Get score distribution across ranges.
-    
-    **Rate Limited**: 30 requests per minute per IP
-    
-    **Data Privacy**: Returns distribution counts only.
-    No individual scores or user information.
-    
-    Returns distribution of scores in ranges:
-    - 0-10, 11-20, 21-30, 31-40
-    - Count and percentage for each range
-    """
+    Get score distribution across ranges (Admin only).
 
+    Returns the count and percentage of scores in each range.
+    """
     distribution = await AnalyticsService.get_score_distribution(db)
     return {"score_distribution": distribution}
 
@@ -201,15 +122,6 @@ async def get_score_distribution(db: AsyncSession = Depends(get_db)):
 # User Analytics Endpoints (PR 6.3)
 # ============================================================================
 
-from ..services.user_analytics_service import UserAnalyticsService
-from ..schemas import UserAnalyticsSummary, UserTrendsResponse
-from ..models import User
-from .auth import get_current_user
-
-    insights = await AnalyticsService.get_population_insights(db, environment=environment)
-    return PopulationInsights(**insights)
-
-
 @router.get("/me/summary", response_model=UserAnalyticsSummary)
 async def get_user_analytics_summary(
     current_user: User = Depends(get_current_user),
@@ -217,14 +129,13 @@ async def get_user_analytics_summary(
 ):
     """
     Get personalized analytics summary for the current user.
-    
+
     Returns:
     - Total exams taken
     - Average score
     - Latest & Best scores
     - Trends and consistency analysis
     """
-    """Get personalized analytics summary for the current user."""
     return await UserAnalyticsService.get_dashboard_summary(db, current_user.id)
 
 
@@ -236,18 +147,17 @@ async def get_user_analytics_trends(
 ):
     """
     Get time-series data for user charts.
-    
+
     Params:
     - days: Number of days to look back (default 30, max 365)
-    
+
     Returns:
     - EQ Score history
     - Wellbeing metrics (Sleep, Stress, etc.)
     """
-    """Get time-series data for user charts."""
     eq_scores = await UserAnalyticsService.get_eq_trends(db, current_user.id, days)
     wellbeing = await UserAnalyticsService.get_wellbeing_trends(db, current_user.id, days)
-    
+
     return UserTrendsResponse(
         eq_scores=eq_scores,
         wellbeing=wellbeing
@@ -264,7 +174,7 @@ async def get_dashboard_statistics(
     db: AsyncSession = Depends(get_db)
 ):
     """Get dashboard statistics with historical trends (Admin only).
-    
+
     Supports cross-environment queries for admin users to compare data across environments.
     """
     trends = await AnalyticsService.get_dashboard_statistics(
@@ -273,32 +183,6 @@ async def get_dashboard_statistics(
     return DashboardStatisticsResponse(historical_trends=trends)
 
 
-@router.get("/age-groups", dependencies=[Depends(rate_limit_analytics), Depends(require_admin)])
-async def get_age_group_statistics(
-    environment: Optional[str] = Query(None, description="Filter by environment (defaults to current)"),
-    db: AsyncSession = Depends(get_db)
-):
-    """Get detailed statistics by age group (Admin only).
-    
-    Supports cross-environment queries for admin users to compare data across environments.
-    """
-    stats = await AnalyticsService.get_age_group_statistics(db, environment=environment)
-    return {"age_group_statistics": stats, "environment": environment or get_current_environment()}
-
-
-@router.get("/distribution", dependencies=[Depends(rate_limit_analytics), Depends(require_admin)])
-async def get_score_distribution(
-    environment: Optional[str] = Query(None, description="Filter by environment (defaults to current)"),
-    db: AsyncSession = Depends(get_db)
-):
-    """Get score distribution across ranges (Admin only).
-    
-    Supports cross-environment queries for admin users to compare data across environments.
-    """
-    distribution = await AnalyticsService.get_score_distribution(db, environment=environment)
-    return {"score_distribution": distribution, "environment": environment or get_current_environment()}
-
-
 @router.get("/kpis/conversion-rate", response_model=ConversionRateKPI, dependencies=[Depends(rate_limit_analytics), Depends(require_admin)])
 @cache(expire=3600)
 async def get_conversion_rate_kpi(
@@ -307,7 +191,7 @@ async def get_conversion_rate_kpi(
     db: AsyncSession = Depends(get_db)
 ):
     """Get Conversion Rate KPI (Admin only).
-    
+
     Supports cross-environment queries for admin users to compare data across environments.
     """
     return await AnalyticsService.calculate_conversion_rate(db, period_days, environment=environment)
@@ -321,7 +205,7 @@ async def get_retention_rate_kpi(
     db: AsyncSession = Depends(get_db)
 ):
     """Get Retention Rate KPI (Admin only).
-    
+
     Supports cross-environment queries for admin users to compare data across environments.
     """
     return await AnalyticsService.calculate_retention_rate(db, period_days, environment=environment)
@@ -335,7 +219,7 @@ async def get_arpu_kpi(
     db: AsyncSession = Depends(get_db)
 ):
     """Get ARPU KPI (Admin only).
-    
+
     Supports cross-environment queries for admin users to compare data across environments.
     """
     return await AnalyticsService.calculate_arpu(db, period_days, environment=environment)
@@ -351,7 +235,7 @@ async def get_kpi_summary(
     db: AsyncSession = Depends(get_db)
 ):
     """Get combined KPI summary (Admin only).
-    
+
     Supports cross-environment queries for admin users to compare data across environments.
     """
     kpi_summary = await AnalyticsService.get_kpi_summary(
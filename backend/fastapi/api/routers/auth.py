@@ -19,7 +19,7 @@ async def get_auth_service(db: AsyncSession = Depends(get_db)) -> AuthService:
 from ..services.captcha_service import captcha_service
 from ..utils.network import get_real_ip
 from ..utils.timestamps import normalize_utc_iso
-from ..constants.security_constants import REFRESH_TOKEN_EXPIRE_DAYS
+from ..constants.security_constants import REFRESH_TOKEN_EXPIRE_DAYS, SESSION_ID_CLAIM
 from ..models import User
 from ..utils.limiter import limiter
 from ..utils.device_fingerprinting import DeviceFingerprinting
@@ -351,7 +351,7 @@ async def login(
         "sub": user.username,
         "uid": user.id,
         "tid": str(user.tenant_id) if user.tenant_id else None,
-        "jti": session_id  # Include session ID in JWT for fingerprint validation
+        SESSION_ID_CLAIM: session_id  # Session ID for fingerprint validation and step-up auth
     })
     refresh_token = await auth_service.create_refresh_token(user.id)
     has_multiple_sessions = await auth_service.has_multiple_active_sessions(user.id)
@@ -807,8 +807,8 @@ async def initiate_step_up_auth(
         session_id = None
         
         try:
-            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-            session_id = payload.get("session_id")
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.jwt_algorithm])
+            session_id = payload.get(SESSION_ID_CLAIM)
         except JWTError:
             # Fallback: try to get from current session
             session_id = getattr(req.state, "session_id", None)
@@ -3,21 +3,24 @@ Enhanced Export Router with backward compatibility and new features.
 Migrated to Async SQLAlchemy 2.0.
 """
 
-from fastapi import APIRouter, Depends, Query, Body, BackgroundTasks, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime
-from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone, timedelta
 UTC = timezone.utc
 from typing import Dict, Any, List, Optional
 import logging
 import os
+import uuid
 
 from ..services.storage_service import StorageService
+from ..services.export_service import ExportService as ExportServiceV1
+from ..services.export_service_v2 import ExportServiceV2
+from ..services.background_task_service import BackgroundTaskService, TaskType
+from ..services.db_service import AsyncSessionLocal, get_db
 from ..config import get_settings_instance
-from ..models import User, ExportRecord, BackgroundJob
+from ..models import User, ExportRecord
 from .auth import get_current_user
 from app.core import (
     NotFoundError,
@@ -36,6 +39,7 @@ from ..schemas import (
     ExportRequest,
     ExportV2Request,
     ExportResponse,
+    ExportOptions,
     SupportedFormatsResponse,
     AsyncExportRequest,
     AsyncPDFExportRequest,
@@ -84,8 +88,6 @@ async def generate_export(
 
     try:
         # Generate Export using V1 service
-        filepath, job_id = await ExportServiceV1.generate_export(db, current_user, export_format)
-
         filepath, job_id = await ExportServiceV1.generate_export(db, current_user, request.format)
         filename = os.path.basename(filepath)
 
@@ -141,27 +143,6 @@ async def export_pdf_direct(
         )
 
 
-@router.post("/v2")
-async def create_export_v2(
-    format: str = Body(..., embed=True),
-    options: Optional[Dict[str, Any]] = Body(None, embed=True),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """
-    V2 Endpoint: Create an export with advanced options.
-
-    Request Body:
-    {
-        "format": "json" | "csv" | "xml" | "html" | "pdf",
-        "options": {
-            "date_range": {
-                "start": "2023-01-01T00:00:00",
-                "end": "2024-12-31T23:59:59"
-            },
-            "data_types": ["profile", "journal", "assessments"],
-            "encrypt": false,
-            "password": "optional_password_for_encryption"
 # ============================================================================
 # ASYNC EXPORT ENDPOINTS (Background Task Queue)
 # ============================================================================
@@ -174,7 +155,6 @@ async def _execute_async_export(
 ) -> Dict[str, Any]:
     """Background task function for generating exports asynchronously."""
     async with AsyncSessionLocal() as db:
-        from sqlalchemy import select
         stmt = select(User).filter(User.id == user_id)
         result = await db.execute(stmt)
         user = result.scalar_one_or_none()
@@ -286,7 +266,6 @@ async def create_export_v2(
 
     try:
         filepath, export_id = await ExportServiceV2.generate_export(
-            db, current_user, format_lower, export_options
             db, current_user, request.format, export_options
         )
 
@@ -309,6 +288,61 @@ async def create_export_v2(
         raise InternalServerError(message="Failed to generate export")
 
 
+@router.get("/v2/stream")
+async def stream_export_v2(
+    format: str = Query("json"),
+    data_types: Optional[List[str]] = Query(None),
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream an export straight to the client without writing a file.
+
+    Supports json, csv (a ZIP of CSV files), xml and html. The export reads
+    from its own session because the response body is produced after the
+    request's dependencies have been torn down.
+    """
+    _check_rate_limit(current_user.id)
+
+    format_lower = format.lower()
+    if format_lower not in ExportServiceV2.STREAMABLE_FORMATS:
+        raise ValidationError(
+            message=f"Format '{format}' cannot be streamed. "
+                    f"Streamable: {', '.join(sorted(ExportServiceV2.STREAMABLE_FORMATS))}"
+        )
+    options = {
+        "data_types": data_types or list(ExportServiceV2.DATA_TYPES),
+        "date_range": {"start": start, "end": end},
+    }
+    try:
+        ExportServiceV2._date_bounds(options["date_range"])
+    except ValueError as ve:
+        raise ValidationError(message=str(ve))
+
+    export_id = uuid.uuid4().hex
+    timestamp = datetime.now(UTC)
+
+    async def body():
+        async with AsyncSessionLocal() as db:
+            # Audit trail like the file-based exports; a streamed export leaves no file
+            await ExportServiceV2._record_export(
+                db, current_user, export_id, format_lower, "", options, timestamp, status="streamed"
+            )
+            async for chunk in ExportServiceV2.stream_export(
+                db, current_user, format_lower, options, export_id=export_id, timestamp=timestamp
+            ):
+                yield chunk
+
+    ext = "zip" if format_lower == "csv" else format_lower
+    filename = f"SoulSense_Export_{datetime.now(UTC).strftime('%Y-%m-%d')}.{ext}"
+    return StreamingResponse(
+        body(),
+        media_type=ExportServiceV2.MEDIA_TYPES[format_lower],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/v2")
 async def list_exports_v2(
     limit: int = Query(50, ge=1, le=100),
@@ -334,19 +368,13 @@ async def get_export_status_v2(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """
-    Get the status and details of an export job (V2).
-    """
-    """Get the status and details of an export job."""
-    from sqlalchemy import select
+    """Get the status and details of an export job (V2)."""
     stmt = select(ExportRecord).filter(
         ExportRecord.export_id == export_id,
         ExportRecord.user_id == current_user.id
     )
     result = await db.execute(stmt)
     export = result.scalar_one_or_none()
-    res = await db.execute(stmt)
-    export = res.scalar_one_or_none()
 
     if not export:
         raise NotFoundError(resource="Export", resource_id=export_id)
@@ -358,7 +386,8 @@ async def get_export_status_v2(
             "message": "Export has expired."
         }
 
-    file_exists = os.path.exists(export.file_path)
+    # Streamed exports have no file to lose
+    file_exists = not export.file_path or os.path.exists(export.file_path)
 
     return {
         "export_id": export_id,
@@ -418,25 +447,12 @@ async def get_export_status(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """
-    V1 Endpoint: Get the status of an export job.
-    """
+    """V1 Endpoint: Get the status of an export job."""
     # Check if it's a V2 export (with database record)
-    stmt = select(ExportRecord).filter(
-        ExportRecord.export_id == job_id
-    )
+    stmt = select(ExportRecord).filter(ExportRecord.export_id == job_id)
     result = await db.execute(stmt)
     export = result.scalar_one_or_none()
 
-    if export:
-        if export.user_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Access denied.")
-    """V1 Endpoint: Get the status of an export job."""
-    from sqlalchemy import select
-    stmt = select(ExportRecord).filter(ExportRecord.export_id == job_id)
-    res = await db.execute(stmt)
-    export = res.scalar_one_or_none()
-
     if export:
         if export.user_id != current_user.id:
             raise AuthorizationError(message="Access denied")
@@ -449,7 +465,6 @@ async def get_export_status(
         }
 
     # Fallback for V1 exports (no database record)
-    raise HTTPException(status_code=404, detail="Job not found.")
     raise NotFoundError(resource="Export job", resource_id=job_id)
 
 
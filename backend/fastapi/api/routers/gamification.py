@@ -11,6 +11,7 @@ from ..schemas import (
     UserXPResponse, 
     UserStreakResponse,
     LeaderboardEntry,
+    LeaderboardPosition,
     ChallengeResponse
 )
 from ..services.gamification_service import GamificationService
@@ -58,10 +59,34 @@ async def get_my_xp(
 @router.get("/leaderboard", response_model=List[LeaderboardEntry])
 async def get_leaderboard(
     limit: int = Query(10, ge=1, le=50),
+    board: str = Query("global", pattern="^(global|weekly)$"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get the anonymized global leaderboard."""
-    return await GamificationService.get_leaderboard(db, limit)
+    """Get the anonymized global leaderboard, or this week's."""
+    return await GamificationService.get_leaderboard(db, limit, board)
+
+@router.get("/leaderboard/tenant", response_model=List[LeaderboardEntry])
+async def get_tenant_leaderboard(
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the anonymized leaderboard of the user's organization."""
+    if current_user.tenant_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User does not belong to a tenant")
+    return await GamificationService.get_leaderboard(db, limit, "tenant", current_user.tenant_id)
+
+@router.get("/leaderboard/me", response_model=LeaderboardPosition)
+async def get_my_leaderboard_position(
+    board: str = Query("global", pattern="^(global|weekly|tenant)$"),
+    radius: int = Query(2, ge=0, le=10),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the user's rank on a leaderboard and the entries ranked around them."""
+    if board == "tenant" and current_user.tenant_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User does not belong to a tenant")
+    return await GamificationService.get_leaderboard_position(db, current_user, board, radius)
 
 @router.get("/challenges", response_model=List[ChallengeResponse])
 async def get_challenges(
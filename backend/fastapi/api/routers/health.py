@@ -2,11 +2,12 @@
 Health and Readiness endpoints for orchestration support.
 Migrated to Async SQLAlchemy 2.0.
 """
+import importlib
 import time
 import threading
 import logging
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 from fastapi import APIRouter, Depends, Query, Response, Request, HTTPException
 from fastapi.responses import JSONResponse
@@ -823,3 +824,60 @@ async def pool_health_check() -> Dict[str, Any]:
             detail=f"Pool health check failed: {str(e)}"
         )
 
+
+# --- Component Diagnostics ---
+
+# Per-worker counters of in-process components: name -> (module, path of the
+# stats method from the module). Modules are imported on request, so asking
+# for one component does not load the others.
+COMPONENT_STATS: Dict[str, Tuple[str, str]] = {
+    "embedding-cache": ("..services.embedding_service", "embedding_service.cache.stats"),
+    "analytics-ingest": ("..services.analytics_ingest", "analytics_ingest.stats"),
+    "exam-sessions": ("..services.exam_session_store", "exam_sessions.stats"),
+    "leaderboards": ("..services.leaderboard_service", "leaderboards.stats"),
+    "websockets": ("..services.websocket_manager", "manager.get_stats"),
+    "resource-versions": ("..services.resource_versions", "resource_versions.get_stats"),
+    "question-catalog": ("..services.question_catalog", "question_catalog.get_stats"),
+}
+
+
+def _component_stats(name: str) -> Dict[str, Any]:
+    module, path = COMPONENT_STATS[name]
+    target = importlib.import_module(module, __package__)
+    for attribute in path.split("."):
+        target = getattr(target, attribute)
+    return target()
+
+
+@router.get("/components", tags=["Health"])
+async def component_stats() -> Dict[str, Any]:
+    """
+    Get the counters of every in-process component for this worker.
+
+    A component that cannot report is listed with its error instead.
+    """
+    components = {}
+    for name in COMPONENT_STATS:
+        try:
+            components[name] = _component_stats(name)
+        except Exception as e:
+            logger.error(f"Error getting {name} stats: {e}")
+            components[name] = {"error": str(e)}
+    return {"components": components}
+
+
+@router.get("/components/{name}", tags=["Health"])
+async def single_component_stats(name: str) -> Dict[str, Any]:
+    """
+    Get the counters of one in-process component for this worker.
+
+    Components: embedding-cache, analytics-ingest, exam-sessions,
+    leaderboards, websockets, resource-versions and question-catalog.
+    Counters are per process and reset when the worker restarts.
+    """
+    if name not in COMPONENT_STATS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown component '{name}'. Known: {', '.join(COMPONENT_STATS)}"
+        )
+    return _component_stats(name)
@@ -37,6 +37,7 @@ from ..schemas import (
 from ..services.journal_service import JournalService, get_journal_prompts
 from ..services.smart_prompt_service import SmartPromptService
 from ..services.db_service import get_db
+from ..config import get_settings_instance
 from ..routers.auth import get_current_user
 from ..models import User
 from ..utils.limiter import limiter
@@ -180,7 +181,8 @@ async def search_journals(
         min_sentiment=min_sentiment,
         max_sentiment=max_sentiment,
         skip=skip,
-        limit=limit
+        limit=limit,
+        count_cap=get_settings_instance().journal_search_count_cap or None
     )
     return JournalListResponse(
         total=total,
@@ -7,7 +7,7 @@ from ..services.survey_service import SurveyService
 from ..schemas.surveys import (
     SurveyTemplateCreate, SurveyTemplateResponse,
     SurveySubmissionCreate, SurveySubmissionResponse,
-    SurveyTemplateUpdate
+    SurveyTemplateUpdate, SurveyScoringUpdate, SurveyRescoreResponse
 )
 from .auth import get_current_user, require_admin
 from ..models import User
@@ -61,7 +61,10 @@ async def create_survey_template(
     Create a new survey draft (Admin only).
     Suppports nested sections and questions.
     """
-    return await service.create_template(admin_user.id, template.model_dump())
+    try:
+        return await service.create_template(admin_user.id, template.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{template_id}/publish", response_model=SurveyTemplateResponse)
 async def publish_survey_template(
@@ -93,6 +96,36 @@ async def increment_survey_version(
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@router.put("/{template_id}/scoring", response_model=SurveyRescoreResponse)
+async def update_survey_scoring(
+    template_id: int,
+    scoring: SurveyScoringUpdate,
+    service: Annotated[SurveyService, Depends(get_survey_service)],
+    admin_user: Annotated[User, Depends(require_admin)]
+):
+    """
+    Replace the Scoring DSL rules of a template (Admin only).
+    Existing submissions of the template are rescored with the new rules.
+    """
+    try:
+        rescored = await service.update_scoring_logic(template_id, scoring.scoring_logic)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"survey_id": template_id, "rescored": rescored}
+
+@router.post("/{template_id}/rescore", response_model=SurveyRescoreResponse)
+async def rescore_survey_submissions(
+    template_id: int,
+    service: Annotated[SurveyService, Depends(get_survey_service)],
+    admin_user: Annotated[User, Depends(require_admin)]
+):
+    """Recompute the scores of all submissions of a template with its current rules (Admin only)."""
+    try:
+        rescored = await service.rescore_submissions(template_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"survey_id": template_id, "rescored": rescored}
+
 @router.get("/{template_id}", response_model=SurveyTemplateResponse)
 async def get_survey_detail(
     template_id: int,
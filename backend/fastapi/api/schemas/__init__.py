@@ -1842,8 +1842,16 @@ class LeaderboardEntry(BaseModel):
     username: str
     total_xp: int
     current_level: int
+    score: Optional[int] = None  # XP the board ranks by: total, or earned this week
     avatar_path: Optional[str] = None
 
+class LeaderboardPosition(BaseModel):
+    board: str
+    rank: Optional[int] = None
+    score: Optional[int] = None
+    size: Optional[int] = None
+    neighbours: List[LeaderboardEntry] = []
+
 class ChallengeResponse(BaseModel):
     id: int
     title: str
@@ -2236,3 +2244,10 @@ class AsyncExportResponse(BaseModel):
     status: str = Field(..., description="Export status")
     poll_url: str = Field(..., description="URL to poll for status")
     format: str = Field(..., description="Export format requested")
+
+
+class SupportedFormatsResponse(BaseModel):
+    """Schema for the supported export formats listing."""
+    formats: Dict[str, Dict[str, str]] = Field(..., description="Supported formats and their descriptions")
+    data_types: List[str] = Field(..., description="Data types that can be exported")
+    retention: str = Field(..., description="How long generated exports are kept")
@@ -69,3 +69,11 @@ class SurveySubmissionResponse(BaseModel):
     survey_id: int
     total_scores: Optional[Dict[str, float]] = None
     completed_at: Optional[datetime] = None
+
+# Scoring
+class SurveyScoringUpdate(BaseModel):
+    scoring_logic: List[Dict[str, Any]]
+
+class SurveyRescoreResponse(BaseModel):
+    survey_id: int
+    rescored: int
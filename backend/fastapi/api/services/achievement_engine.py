@@ -0,0 +1,348 @@
+"""
+Event-driven achievement rules over rolling per-user activity counters.
+
+``GamificationService.check_achievements`` used to reload every unlocked id
+and every remaining achievement on each journal entry or assessment, and
+re-count the user's journal entries over 30 days per candidate. Instead:
+
+* each achievement has a rule naming the activity events it listens to, the
+  counter it reads and a threshold over the lifetime total, a trailing
+  window of days, or a run of consecutive active days
+* every event updates one ``user_activity_counters`` row: a lifetime total,
+  a ring of ``COUNTER_RING_DAYS`` per-UTC-day buckets and the achievements
+  of the event's rules that are already unlocked
+* only the still-locked rules subscribed to the incoming event are
+  evaluated, so an unlock check is one locked read and one update of the
+  counter row plus O(rules for that event) arithmetic; user_achievements is
+  read only when a rule passes
+
+Rules come from ``Achievement.requirements`` (JSON: events, counter,
+threshold, window_days, consecutive_days) or, when that is empty, from
+``BUILTIN_RULES``. Achievement definitions are cached per process.
+
+Counters record events as they happen; deleting a journal entry does not
+decrement them. ``rebuild_counters`` recomputes them from the journal and
+assessment tables (see apply_activity_counter_migration.py).
+"""
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Achievement, AssessmentResult, JournalEntry, UserAchievement, UserActivityCounter
+from ..utils.upsert import bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+UTC = timezone.utc
+COUNTER_RING_DAYS = 30
+DEFINITIONS_TTL_SECONDS = 300
+REBUILD_CHUNK_SIZE = 5000
+
+
+def _day(timestamp) -> Optional[date]:
+    if not timestamp:
+        return None
+    if isinstance(timestamp, datetime):
+        return timestamp.date()
+    try:
+        return date.fromisoformat(str(timestamp)[:10])
+    except ValueError:
+        return None
+
+
+@dataclass
+class CounterState:
+    """In-memory form of a UserActivityCounter row."""
+    total: int = 0
+    last_day: Optional[str] = None
+    buckets: List[int] = field(default_factory=lambda: [0] * COUNTER_RING_DAYS)
+    # Achievements of the rules listening to this event that are known to be unlocked
+    unlocked: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def from_row(cls, row: UserActivityCounter) -> "CounterState":
+        buckets = [int(v) for v in row.day_buckets.split(",") if v]
+        if len(buckets) != COUNTER_RING_DAYS:
+            buckets = [0] * COUNTER_RING_DAYS
+        return cls(total=row.total or 0, last_day=row.last_day, buckets=buckets,
+                   unlocked={v for v in (row.unlocked or "").split(",") if v})
+
+    def to_values(self) -> Dict:
+        return {
+            "total": self.total,
+            "last_day": self.last_day,
+            "day_buckets": ",".join(str(v) for v in self.buckets),
+            "unlocked": ",".join(sorted(self.unlocked)),
+        }
+
+    def add(self, day: Optional[date], amount: int = 1) -> None:
+        """Count ``amount`` events on ``day``; buckets of days that fell out of the ring are cleared."""
+        self.total += amount
+        if day is None:
+            return
+        if self.last_day is not None:
+            last = date.fromisoformat(self.last_day)
+            if day <= last:
+                # Same day, or a late event that is still inside the ring
+                if (last - day).days < COUNTER_RING_DAYS:
+                    self.buckets[day.toordinal() % COUNTER_RING_DAYS] += amount
+                return
+            for offset in range(1, min((day - last).days, COUNTER_RING_DAYS) + 1):
+                self.buckets[(last.toordinal() + offset) % COUNTER_RING_DAYS] = 0
+        self.buckets[day.toordinal() % COUNTER_RING_DAYS] += amount
+        self.last_day = day.isoformat()
+
+    def _bucket_days(self, today: date, days: int) -> List[date]:
+        """Days of the trailing window ending today that the ring still holds."""
+        if self.last_day is None:
+            return []
+        last = date.fromisoformat(self.last_day)
+        start = max(today - timedelta(days=days - 1), last - timedelta(days=COUNTER_RING_DAYS - 1))
+        end = min(today, last)
+        return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    def in_window(self, today: date, days: int) -> int:
+        """Events on today and the ``days - 1`` days before it."""
+        return sum(self.buckets[d.toordinal() % COUNTER_RING_DAYS] for d in self._bucket_days(today, days))
+
+    def consecutive_days(self, today: date) -> int:
+        """Length of the run of active days ending today (at most the ring size)."""
+        run = 0
+        for d in reversed(self._bucket_days(today, COUNTER_RING_DAYS)):
+            if d != today - timedelta(days=run) or not self.buckets[d.toordinal() % COUNTER_RING_DAYS]:
+                break
+            run += 1
+        return run
+
+
+@dataclass(frozen=True)
+class AchievementRule:
+    """When an achievement unlocks: a threshold over one counter, checked on the listed events."""
+    achievement_id: str
+    events: Tuple[str, ...]
+    counter: str
+    threshold: int = 1
+    window_days: Optional[int] = None
+    consecutive_days: bool = False
+
+    def __post_init__(self):
+        if self.window_days is not None and not 0 < self.window_days <= COUNTER_RING_DAYS:
+            raise ValueError(f"{self.achievement_id}: window_days must be 1..{COUNTER_RING_DAYS}")
+        if self.consecutive_days and self.threshold > COUNTER_RING_DAYS:
+            raise ValueError(f"{self.achievement_id}: consecutive days are tracked up to {COUNTER_RING_DAYS}")
+
+    @classmethod
+    def from_requirements(cls, achievement_id: str, requirements: str) -> "AchievementRule":
+        spec = json.loads(requirements)
+        events = spec["events"]
+        return cls(
+            achievement_id=achievement_id,
+            events=tuple([events] if isinstance(events, str) else events),
+            counter=spec.get("counter") or (events if isinstance(events, str) else events[0]),
+            threshold=int(spec.get("threshold", 1)),
+            window_days=spec.get("window_days"),
+            consecutive_days=bool(spec.get("consecutive_days", False)),
+        )
+
+    def value(self, counter: CounterState, today: date) -> int:
+        if self.consecutive_days:
+            return counter.consecutive_days(today)
+        if self.window_days is not None:
+            return counter.in_window(today, self.window_days)
+        return counter.total
+
+    def is_met(self, counter: CounterState, today: date) -> bool:
+        return self.value(counter, today) >= self.threshold
+
+
+BUILTIN_RULES: Dict[str, AchievementRule] = {rule.achievement_id: rule for rule in (
+    AchievementRule("FIRST_JOURNAL", events=("journal",), counter="journal"),
+    AchievementRule("EQ_EXPLORER", events=("assessment",), counter="assessment"),
+    AchievementRule("WEEK_WARRIOR", events=("journal",), counter="journal", threshold=7, consecutive_days=True),
+    AchievementRule("MONTHLY_MASTER", events=("journal",), counter="journal", threshold=30, window_days=30),
+)}
+
+# Tables each counter is rebuilt from: (model, timestamp column, extra filters)
+COUNTER_SOURCES = {
+    "journal": (JournalEntry, JournalEntry.timestamp, (JournalEntry.is_deleted == False,)),  # noqa: E712
+    "assessment": (AssessmentResult, AssessmentResult.timestamp, ()),
+}
+
+
+@dataclass(frozen=True)
+class AchievementDefinition:
+    achievement_id: str
+    name: str
+    points_reward: int
+    rule: AchievementRule
+
+
+class AchievementEngine:
+    """Routes activity events to the achievement rules subscribed to them."""
+
+    def __init__(self, builtin_rules: Optional[Dict[str, AchievementRule]] = None):
+        self.builtin_rules = BUILTIN_RULES if builtin_rules is None else builtin_rules
+        self._definitions: Optional[Dict[str, AchievementDefinition]] = None
+        self._by_event: Dict[str, List[AchievementDefinition]] = {}
+        self._loaded_at = 0.0
+        self.stats = {"events": 0, "rules_evaluated": 0, "unlocks": 0}
+
+    def invalidate_definitions(self) -> None:
+        self._definitions = None
+
+    async def _load_definitions(self, db: AsyncSession) -> None:
+        rows = (await db.execute(select(
+            Achievement.achievement_id, Achievement.name, Achievement.points_reward, Achievement.requirements
+        ))).all()
+        definitions: Dict[str, AchievementDefinition] = {}
+        by_event: Dict[str, List[AchievementDefinition]] = {}
+        for achievement_id, name, points_reward, requirements in rows:
+            rule = self.builtin_rules.get(achievement_id)
+            if requirements:
+                try:
+                    rule = AchievementRule.from_requirements(achievement_id, requirements)
+                except (ValueError, KeyError, TypeError, IndexError) as e:
+                    logger.warning(f"Ignoring invalid requirements of achievement {achievement_id}: {e}")
+            if rule is None:
+                continue
+            definition = AchievementDefinition(achievement_id, name, points_reward or 0, rule)
+            definitions[achievement_id] = definition
+            for event in rule.events:
+                by_event.setdefault(event, []).append(definition)
+        self._definitions, self._by_event = definitions, by_event
+        self._loaded_at = time.monotonic()
+
+    async def rules_for(self, db: AsyncSession, event: str) -> List[AchievementDefinition]:
+        if self._definitions is None or time.monotonic() - self._loaded_at > DEFINITIONS_TTL_SECONDS:
+            await self._load_definitions(db)
+        return self._by_event.get(event, [])
+
+    @staticmethod
+    def _key(user_id: int, counter: str):
+        return (UserActivityCounter.user_id == user_id) & (UserActivityCounter.event == counter)
+
+    @staticmethod
+    async def _lock_counter(db: AsyncSession, user_id: int, counter: str) -> CounterState:
+        """Load the user's counter row, creating it if needed, locked until the caller commits."""
+        table = UserActivityCounter.__table__
+        stmt = select(table.c.total, table.c.last_day, table.c.day_buckets, table.c.unlocked).where(
+            AchievementEngine._key(user_id, counter)
+        ).with_for_update()
+        row = (await db.execute(stmt)).first()
+        if row is None:
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(table).values(user_id=user_id, event=counter, **CounterState().to_values()))
+            except IntegrityError:
+                pass  # a concurrent event created it first
+            row = (await db.execute(stmt)).one()
+        return CounterState.from_row(row)
+
+    @staticmethod
+    async def get_counter(db: AsyncSession, user_id: int, counter: str) -> CounterState:
+        row = await db.get(UserActivityCounter, (user_id, counter), populate_existing=True)
+        return CounterState.from_row(row) if row is not None else CounterState()
+
+    async def handle(
+        self, db: AsyncSession, user_id: int, event: str, at: Optional[datetime] = None
+    ) -> List[Tuple[UserAchievement, AchievementDefinition]]:
+        """
+        Record one activity event and unlock the achievements it completes.
+        Flushes but does not commit; returns the new unlocks with their definitions.
+        """
+        at = at or datetime.now(UTC)
+        today = at.date()
+        self.stats["events"] += 1
+        counter = await self._lock_counter(db, user_id, event)
+        counter.add(today)
+
+        counters = {event: counter}
+        met = []
+        for definition in await self.rules_for(db, event):
+            if definition.achievement_id in counter.unlocked:
+                continue
+            name = definition.rule.counter
+            if name not in counters:
+                counters[name] = await self.get_counter(db, user_id, name)
+            self.stats["rules_evaluated"] += 1
+            if definition.rule.is_met(counters[name], today):
+                met.append(definition)
+
+        unlocks = []
+        if met:
+            # Unlocked earlier (or before the counter existed): remember it, don't award again
+            existing = {ua.achievement_id: ua for ua in (await db.execute(
+                select(UserAchievement).where(
+                    UserAchievement.user_id == user_id,
+                    UserAchievement.achievement_id.in_([d.achievement_id for d in met]),
+                )
+            )).scalars()}
+            for definition in met:
+                counter.unlocked.add(definition.achievement_id)
+                ua = existing.get(definition.achievement_id)
+                if ua is not None and ua.unlocked:
+                    continue
+                if ua is None:
+                    ua = UserAchievement(user_id=user_id, achievement_id=definition.achievement_id)
+                    db.add(ua)
+                ua.progress, ua.unlocked, ua.unlocked_at = 100, True, at.replace(tzinfo=None)
+                unlocks.append((ua, definition))
+
+        await db.execute(
+            update(UserActivityCounter.__table__).where(self._key(user_id, event)).values(**counter.to_values())
+        )
+        if unlocks:
+            await db.flush()
+        self.stats["unlocks"] += len(unlocks)
+        return unlocks
+
+    @staticmethod
+    async def compute_counters(
+        db: AsyncSession, user_ids: Optional[Sequence[int]] = None
+    ) -> Dict[Tuple[int, str], CounterState]:
+        """Recompute counters from the journal and assessment tables, oldest event first."""
+        states: Dict[Tuple[int, str], CounterState] = {}
+        for counter, (model, timestamp, filters) in COUNTER_SOURCES.items():
+            stmt = select(model.user_id, timestamp).where(model.user_id.isnot(None), *filters).order_by(model.user_id, timestamp)
+            if user_ids is not None:
+                stmt = stmt.where(model.user_id.in_(list(user_ids)))
+            result = await db.stream(stmt.execution_options(yield_per=REBUILD_CHUNK_SIZE))
+            async for user_id, ts in result:
+                state = states.get((user_id, counter))
+                if state is None:
+                    state = states[(user_id, counter)] = CounterState()
+                state.add(_day(ts))
+        return states
+
+    @staticmethod
+    async def rebuild_counters(db: AsyncSession, user_ids: Optional[Sequence[int]] = None) -> int:
+        """Replace the counters of ``user_ids`` (all users by default) with recomputed ones; commits."""
+        states = await AchievementEngine.compute_counters(db, user_ids)
+        stmt = delete(UserActivityCounter)
+        if user_ids is not None:
+            stmt = stmt.where(UserActivityCounter.user_id.in_(list(user_ids)))
+        await db.execute(stmt)
+        await bulk_upsert(db, UserActivityCounter, ["user_id", "event"], [
+            {"user_id": user_id, "event": counter, **state.to_values()}
+            for (user_id, counter), state in states.items()
+        ])
+        await db.commit()
+        logger.info(f"Rebuilt {len(states)} activity counters")
+        return len(states)
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "definitions": len(self._definitions or {}),
+            "events": sorted(self._by_event),
+            **self.stats,
+        }
+
+
+achievement_engine = AchievementEngine()
@@ -0,0 +1,335 @@
+"""
+Daily activity rollups behind the retention, conversion and ARPU KPIs.
+
+The KPI queries used to scan ``analytics_events`` with ``date(timestamp)``
+predicates (which no index serves) and build distinct-user sets per request.
+Instead, every logged event updates two small per-day, per-environment tables:
+
+* ``analytics_daily_event_counts``  — event counters by event_name
+* ``analytics_daily_active_users``  — the distinct user_ids active that day
+
+Active-user sets are stored exactly (a sorted id array) while small and as a
+HyperLogLog (2^14 one-byte registers, ~0.8% standard error) once they pass
+``analytics_rollup_exact_max_users``. Both forms merge: ARPU unions the daily
+sets of its window, retention intersects two days (exactly for exact sets, by
+inclusion-exclusion otherwise). KPI reads therefore touch at most one row per
+day in the window regardless of event volume.
+
+``ActivityRollupService.backfill`` rebuilds the rollups for historical events
+(see backfill_activity_rollups.py).
+"""
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import String, and_, cast, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings_instance
+from ..models import AnalyticsDailyActiveUsers, AnalyticsDailyEventCount, AnalyticsEvent
+from ..utils.upsert import bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+UTC = timezone.utc
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+_EXACT = b"E"
+_HLL = b"H"
+_UINT64 = np.uint64
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: well-distributed 64-bit hashes of integer ids."""
+    z = values.astype(_UINT64) + _UINT64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> _UINT64(30))) * _UINT64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> _UINT64(27))) * _UINT64(0x94D049BB133111EB)
+    return z ^ (z >> _UINT64(31))
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    x = values.copy()
+    length = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= (_UINT64(1) << _UINT64(shift))
+        length[high] += shift
+        x = np.where(high, x >> _UINT64(shift), x)
+    return length + (x > 0)
+
+
+def _hll_registers(ids: np.ndarray) -> np.ndarray:
+    registers = np.zeros(HLL_REGISTERS, dtype=np.uint8)
+    if len(ids):
+        hashes = _mix64(ids)
+        index = (hashes >> _UINT64(64 - HLL_PRECISION)).astype(np.int64)
+        rest = hashes & _UINT64((1 << (64 - HLL_PRECISION)) - 1)
+        rank = (64 - HLL_PRECISION + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(registers, index, rank)
+    return registers
+
+
+class ActiveUserSketch:
+    """A set of user ids: exact (sorted int64 array) or a HyperLogLog register array."""
+
+    __slots__ = ("ids", "registers")
+
+    def __init__(self, ids: Optional[np.ndarray] = None, registers: Optional[np.ndarray] = None):
+        self.ids = np.zeros(0, dtype=np.int64) if ids is None and registers is None else ids
+        self.registers = registers
+
+    @property
+    def is_exact(self) -> bool:
+        return self.registers is None
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int], exact_max: Optional[int] = None) -> "ActiveUserSketch":
+        sketch = cls()
+        sketch.add(ids, exact_max)
+        return sketch
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "ActiveUserSketch":
+        kind, body = blob[:1], blob[1:]
+        if kind == _HLL:
+            return cls(registers=np.frombuffer(body, dtype=np.uint8).copy())
+        return cls(ids=np.frombuffer(body, dtype="<i8").astype(np.int64))
+
+    def to_bytes(self) -> bytes:
+        if self.is_exact:
+            return _EXACT + self.ids.astype("<i8").tobytes()
+        return _HLL + self.registers.tobytes()
+
+    def _as_registers(self) -> np.ndarray:
+        return _hll_registers(self.ids) if self.is_exact else self.registers
+
+    def add(self, ids: Iterable[int], exact_max: Optional[int] = None) -> bool:
+        """Add ids in place; returns whether the stored sketch changed."""
+        new = np.unique(np.fromiter(ids, dtype=np.int64))
+        if not len(new):
+            return False
+        if self.is_exact:
+            merged = np.union1d(self.ids, new)
+            if len(merged) == len(self.ids):
+                return False
+            if exact_max is not None and len(merged) > exact_max:
+                self.ids, self.registers = None, _hll_registers(merged)
+            else:
+                self.ids = merged
+            return True
+        updated = np.maximum(self.registers, _hll_registers(new))
+        changed = bool((updated != self.registers).any())
+        self.registers = updated
+        return changed
+
+    def union(self, other: "ActiveUserSketch") -> "ActiveUserSketch":
+        if self.is_exact and other.is_exact:
+            return ActiveUserSketch(ids=np.union1d(self.ids, other.ids))
+        return ActiveUserSketch(registers=np.maximum(self._as_registers(), other._as_registers()))
+
+    def count(self) -> int:
+        if self.is_exact:
+            return int(len(self.ids))
+        m = float(HLL_REGISTERS)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.exp2(-self.registers.astype(np.float64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def intersection_count(self, other: "ActiveUserSketch") -> int:
+        if self.is_exact and other.is_exact:
+            return int(len(np.intersect1d(self.ids, other.ids, assume_unique=True)))
+        a, b = self.count(), other.count()
+        return max(0, min(a, b, a + b - self.union(other).count()))
+
+
+def _day(timestamp: Optional[datetime]) -> str:
+    if timestamp is None:
+        timestamp = datetime.now(UTC)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(UTC)
+    return timestamp.date().isoformat()
+
+
+def _environment(environment: Optional[str]) -> str:
+    return environment or ""
+
+
+class ActivityRollupService:
+    """Maintains and reads the daily activity rollups."""
+
+    @staticmethod
+    async def record_events(db: AsyncSession, events: Sequence[AnalyticsEvent], exact_max: Optional[int] = None) -> None:
+        """Fold logged events into the rollups inside the caller's transaction."""
+        if not events:
+            return
+        if exact_max is None:
+            exact_max = get_settings_instance().analytics_rollup_exact_max_users
+
+        counts: Counter = Counter()
+        event_types: Dict[Tuple[str, str, str], Optional[str]] = {}
+        users: Dict[Tuple[str, str], set] = defaultdict(set)
+        for event in events:
+            day, environment = _day(event.timestamp), _environment(event.environment)
+            key = (day, environment, event.event_name)
+            counts[key] += 1
+            event_types[key] = event.event_type
+            if event.user_id is not None:
+                users[(day, environment)].add(int(event.user_id))
+
+        await bulk_upsert(db, AnalyticsDailyEventCount, ["day", "environment", "event_name"], [
+            {"day": day, "environment": env, "event_name": name, "event_type": event_types[(day, env, name)], "count": n}
+            for (day, env, name), n in counts.items()
+        ], increment=("count",))
+
+        for (day, environment), ids in users.items():
+            await ActivityRollupService._add_active_users(db, day, environment, ids, exact_max)
+
+    @staticmethod
+    async def _add_active_users(db: AsyncSession, day: str, environment: str, ids: set, exact_max: int) -> None:
+        key = and_(AnalyticsDailyActiveUsers.day == day, AnalyticsDailyActiveUsers.environment == environment)
+        stmt = select(AnalyticsDailyActiveUsers.sketch).where(key)
+
+        # Most events come from users already counted today: check without a lock first
+        blob = (await db.execute(stmt)).scalar_one_or_none()
+        if blob is not None and not ActiveUserSketch.from_bytes(blob).add(ids, exact_max):
+            return
+
+        for _ in range(2):
+            blob = (await db.execute(stmt.with_for_update())).scalar_one_or_none()
+            if blob is not None:
+                sketch = ActiveUserSketch.from_bytes(blob)
+                if sketch.add(ids, exact_max):
+                    await db.execute(update(AnalyticsDailyActiveUsers).where(key).values(
+                        sketch=sketch.to_bytes(), user_count=sketch.count()
+                    ))
+                return
+            sketch = ActiveUserSketch.from_ids(ids, exact_max)
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(AnalyticsDailyActiveUsers).values(
+                        day=day, environment=environment, sketch=sketch.to_bytes(), user_count=sketch.count()
+                    ))
+                return
+            except IntegrityError:
+                # A concurrent writer created the row first; merge into it
+                continue
+
+    @staticmethod
+    async def _load_sketches(db: AsyncSession, environment: str, days: Sequence[str]) -> Dict[str, ActiveUserSketch]:
+        res = await db.execute(
+            select(AnalyticsDailyActiveUsers.day, AnalyticsDailyActiveUsers.sketch).where(
+                AnalyticsDailyActiveUsers.environment == _environment(environment),
+                AnalyticsDailyActiveUsers.day.in_(list(days)),
+            )
+        )
+        return {day: ActiveUserSketch.from_bytes(blob) for day, blob in res.all()}
+
+    @staticmethod
+    async def event_counts(db: AsyncSession, environment: str, event_names: Sequence[str], since: date) -> Dict[str, int]:
+        """Events per name from ``since`` (whole UTC days) through today."""
+        res = await db.execute(
+            select(AnalyticsDailyEventCount.event_name, func.sum(AnalyticsDailyEventCount.count))
+            .where(
+                AnalyticsDailyEventCount.environment == _environment(environment),
+                AnalyticsDailyEventCount.event_name.in_(list(event_names)),
+                AnalyticsDailyEventCount.day >= since.isoformat(),
+            )
+            .group_by(AnalyticsDailyEventCount.event_name)
+        )
+        counts = {name: 0 for name in event_names}
+        counts.update({name: int(total or 0) for name, total in res.all()})
+        return counts
+
+    @staticmethod
+    async def active_users(db: AsyncSession, environment: str, since: date, until: date) -> int:
+        """Distinct active users over the inclusive day range (union of the daily sets)."""
+        days = [(since + timedelta(days=i)).isoformat() for i in range((until - since).days + 1)]
+        merged = ActiveUserSketch()
+        for sketch in (await ActivityRollupService._load_sketches(db, environment, days)).values():
+            merged = merged.union(sketch)
+        return merged.count()
+
+    @staticmethod
+    async def retained_users(db: AsyncSession, environment: str, day_0: date, day_n: date) -> Tuple[int, int]:
+        """(users active on day_0, of those also active on day_n)."""
+        sketches = await ActivityRollupService._load_sketches(
+            db, environment, [day_0.isoformat(), day_n.isoformat()]
+        )
+        cohort = sketches.get(day_0.isoformat())
+        if cohort is None:
+            return 0, 0
+        returning = sketches.get(day_n.isoformat())
+        return cohort.count(), cohort.intersection_count(returning) if returning is not None else 0
+
+    @staticmethod
+    async def backfill(
+        db: AsyncSession,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        exact_max: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Rebuild the rollups for ``[since, until]`` (all history by default) from
+        ``analytics_events``. Idempotent; commits when done.
+        """
+        if exact_max is None:
+            exact_max = get_settings_instance().analytics_rollup_exact_max_users
+
+        event_filters = []
+        if since is not None:
+            event_filters.append(AnalyticsEvent.timestamp >= datetime.combine(since, time.min))
+        if until is not None:
+            event_filters.append(AnalyticsEvent.timestamp < datetime.combine(until + timedelta(days=1), time.min))
+        for model in (AnalyticsDailyEventCount, AnalyticsDailyActiveUsers):
+            conditions = []
+            if since is not None:
+                conditions.append(model.day >= since.isoformat())
+            if until is not None:
+                conditions.append(model.day <= until.isoformat())
+            await db.execute(delete(model).where(*conditions))
+
+        day = cast(func.date(AnalyticsEvent.timestamp), String)
+        environment = func.coalesce(AnalyticsEvent.environment, "")
+        await db.execute(insert(AnalyticsDailyEventCount).from_select(
+            ["day", "environment", "event_name", "event_type", "count"],
+            select(day, environment, AnalyticsEvent.event_name, func.max(AnalyticsEvent.event_type),
+                   func.count(AnalyticsEvent.id))
+            .where(*event_filters)
+            .group_by(day, environment, AnalyticsEvent.event_name),
+        ))
+
+        # Active users one day at a time, each a range scan on the timestamp index
+        stats = {"days": 0, "exact_days": 0}
+        first, last = (await db.execute(
+            select(func.min(AnalyticsEvent.timestamp), func.max(AnalyticsEvent.timestamp)).where(*event_filters)
+        )).one()
+        current = first.date() if first is not None else None
+        while current is not None and current <= last.date():
+            start = datetime.combine(current, time.min)
+            res = await db.execute(
+                select(environment, AnalyticsEvent.user_id).distinct().where(
+                    AnalyticsEvent.timestamp >= start,
+                    AnalyticsEvent.timestamp < start + timedelta(days=1),
+                    AnalyticsEvent.user_id.isnot(None),
+                )
+            )
+            per_environment = defaultdict(list)
+            for env, user_id in res.all():
+                per_environment[env].append(user_id)
+            for env, ids in per_environment.items():
+                sketch = ActiveUserSketch.from_ids(ids, exact_max)
+                await db.execute(insert(AnalyticsDailyActiveUsers).values(
+                    day=current.isoformat(), environment=env, sketch=sketch.to_bytes(), user_count=sketch.count()
+                ))
+                stats["days"] += 1
+                stats["exact_days"] += sketch.is_exact
+            current += timedelta(days=1)
+
+        await db.commit()
+        logger.info(f"Backfilled activity rollups: {stats['days']} day/environment user sets")
+        return stats
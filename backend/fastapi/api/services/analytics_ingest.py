@@ -0,0 +1,365 @@
+"""
+Buffered ingestion for analytics events.
+
+``POST /analytics/events`` is a high-volume endpoint, and each call used to
+insert one ``AnalyticsEvent`` row and commit. With the buffer running,
+``AnalyticsService.log_event`` only enqueues the row. A background task then
+writes accumulated rows with one multi-row INSERT per batch and one commit,
+updating the daily activity rollups in the same transaction. A batch is
+flushed when ``batch_size`` rows are waiting or ``flush_interval_ms`` has
+passed.
+
+Backpressure: when the in-process queue is full, a request waits up to
+``enqueue_timeout_ms`` for room. If there is still none, the event is spilled
+to a Redis Stream when one is configured, otherwise it is rejected and
+counted as dropped (the endpoint answers 503 so clients retry later).
+
+Redis Stream (optional, for multi-worker deployments): rows that overflow a
+worker's queue, or whose flush failed, are XADDed to the stream. Every
+worker's flusher also reads the stream through one consumer group, so
+whichever worker has capacity persists them. Entries are acknowledged only
+after commit, and entries left pending by a dead worker are reclaimed after
+``STREAM_CLAIM_IDLE_MS``.
+
+Rejected rows: when the database rejects a batch (as opposed to being
+unreachable), the batch is bisected so the other rows are written, and a row
+rejected on its own is logged and dead-lettered instead of being retried, so
+one bad row cannot stall ingestion.
+
+Metrics (``stats()``, served at ``/health/components/analytics-ingest``):
+queue depth, enqueued / flushed / spilled / dropped / dead-lettered counts,
+and flush latency.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from collections import deque
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings_instance
+from ..models import AnalyticsEvent
+from ..utils.upsert import chunks
+from .activity_rollups import ActivityRollupService
+
+logger = logging.getLogger(__name__)
+
+STREAM_GROUP = "analytics_ingest"
+STREAM_CLAIM_IDLE_MS = 60_000
+# Pause after a failed flush so an unavailable database is not hammered
+FLUSH_RETRY_DELAY_SECONDS = 1.0
+
+
+def _encode(row: Dict[str, Any]) -> str:
+    return json.dumps({**row, "timestamp": row["timestamp"].isoformat()})
+
+
+def _decode(payload: str) -> Dict[str, Any]:
+    row = json.loads(payload)
+    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+def _database_unavailable(exc: BaseException) -> bool:
+    """True when a flush failed for lack of a database rather than because of its rows."""
+    if isinstance(exc, DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(exc, (OperationalError, InterfaceError, OSError))
+
+
+class AnalyticsIngestBuffer:
+    """In-process queue of pending analytics rows with a batching flusher."""
+
+    def __init__(
+        self,
+        max_queue: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[float] = None,
+        enqueue_timeout_ms: Optional[float] = None,
+        redis_stream: Optional[str] = None,
+        redis_url: Optional[str] = None,
+    ):
+        settings = get_settings_instance()
+        self.max_queue = settings.analytics_ingest_max_queue if max_queue is None else max_queue
+        self.batch_size = settings.analytics_ingest_batch_size if batch_size is None else batch_size
+        self.flush_interval = (
+            settings.analytics_ingest_flush_interval_ms if flush_interval_ms is None else flush_interval_ms
+        ) / 1000
+        self.enqueue_timeout = (
+            settings.analytics_ingest_enqueue_timeout_ms if enqueue_timeout_ms is None else enqueue_timeout_ms
+        ) / 1000
+        self.redis_stream = settings.analytics_ingest_redis_stream if redis_stream is None else redis_stream
+        self.redis_url = redis_url or settings.redis_url
+        self.consumer_name = f"{socket.gethostname()}:{os.getpid()}"
+        self.running = False
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop = None
+        self._redis = None
+        self._group_ready = False
+        # Rows of a failed flush, retried first (bounded by max_queue)
+        self._retry: List[Dict[str, Any]] = []
+        # Batch being collected or flushed, so a cancel mid-way loses nothing
+        self._collecting: List[Dict[str, Any]] = []
+        self._flush_ms: deque = deque(maxlen=512)
+        self._counters = {
+            "enqueued": 0, "flushed": 0, "batches": 0, "dropped": 0,
+            "spilled": 0, "stream_flushed": 0, "flush_errors": 0, "dead_lettered": 0,
+            "backpressure_waits": 0,
+        }
+
+    def _get_queue(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._loop = loop
+            self._redis = None
+            self._group_ready = False
+        return self._queue
+
+    async def _stream_client(self):
+        if not self.redis_stream:
+            return None
+        if self._redis is None:
+            self._redis = redis.from_url(self.redis_url, decode_responses=True, socket_timeout=2.0)
+        if not self._group_ready:
+            try:
+                await self._redis.xgroup_create(self.redis_stream, STREAM_GROUP, id="0", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            self._group_ready = True
+        return self._redis
+
+    async def submit(self, row: Dict[str, Any]) -> bool:
+        """
+        Queue one ``analytics_events`` row. Waits up to the enqueue timeout when
+        the queue is full; returns False if the event had to be dropped.
+        """
+        queue = self._get_queue()
+        try:
+            queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self._counters["backpressure_waits"] += 1
+            try:
+                async with asyncio.timeout(self.enqueue_timeout):
+                    await queue.put(row)
+            except TimeoutError:
+                if await self._spill([row]):
+                    return True
+                self._counters["dropped"] += 1
+                return False
+        self._counters["enqueued"] += 1
+        return True
+
+    async def _spill(self, rows: List[Dict[str, Any]]) -> bool:
+        """Hand rows to the Redis Stream; False when no stream is configured or reachable."""
+        try:
+            client = await self._stream_client()
+            if client is None:
+                return False
+            async with client.pipeline(transaction=False) as pipe:
+                for row in rows:
+                    pipe.xadd(self.redis_stream, {"e": _encode(row)})
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Analytics ingest stream unavailable: {e}")
+            self._redis = None
+            self._group_ready = False
+            return False
+        self._counters["spilled"] += len(rows)
+        return True
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        """Up to batch_size rows, waiting at most flush_interval for the batch to fill."""
+        batch, self._retry = self._retry[:self.batch_size], self._retry[self.batch_size:]
+        self._collecting = batch
+        queue = self._get_queue()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            # asyncio.timeout rather than wait_for: on 3.11 wait_for can swallow
+            # a cancel that races with get(), and shutdown would then hang
+            try:
+                async with asyncio.timeout(remaining):
+                    batch.append(await queue.get())
+            except TimeoutError:
+                break
+        return batch
+
+    async def flush(self, db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+        """Insert ``rows`` with multi-row INSERTs and update the rollups, in one transaction."""
+        if not rows:
+            return 0
+        start = time.perf_counter()
+        try:
+            for chunk in chunks(rows):
+                await db.execute(insert(AnalyticsEvent).values(chunk))
+            await ActivityRollupService.record_events(db, [SimpleNamespace(**{"user_id": None, **row}) for row in rows])
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        self._flush_ms.append((time.perf_counter() - start) * 1000)
+        self._counters["flushed"] += len(rows)
+        self._counters["batches"] += 1
+        return len(rows)
+
+    async def _flush_isolating(self, session_factory, rows: List[Dict[str, Any]], track: bool = False) -> List[int]:
+        """
+        Flush ``rows``, bisecting a batch the database rejects so the rest is
+        written and only rows rejected on their own are dead-lettered.
+
+        Returns the positions of rows left unwritten because the database was
+        unavailable; they are retried whole. With ``track``, ``_collecting``
+        follows the rows not yet written or dead-lettered.
+        """
+        outstanding = set(range(len(rows)))
+        parts = [list(outstanding)]
+        while parts:
+            part = parts.pop()
+            try:
+                async with session_factory() as db:
+                    await self.flush(db, [rows[i] for i in part])
+            except Exception as e:
+                self._counters["flush_errors"] += 1
+                logger.error(f"Analytics ingest flush of {len(part)} events failed: {e}")
+                if _database_unavailable(e):
+                    return sorted(outstanding)
+                if len(part) > 1:
+                    middle = len(part) // 2
+                    parts += [part[middle:], part[:middle]]
+                    continue
+                self._counters["dead_lettered"] += 1
+                logger.error(f"Dead-lettering analytics event rejected by the database: {rows[part[0]]!r}")
+            outstanding.difference_update(part)
+            if track:
+                self._collecting = [rows[i] for i in sorted(outstanding)]
+        return []
+
+    async def _flush_batch(self, session_factory, rows: List[Dict[str, Any]]) -> None:
+        try:
+            unwritten = await self._flush_isolating(session_factory, rows, track=True)
+        finally:
+            self._collecting = []
+        if not unwritten:
+            return
+        rows = [rows[i] for i in unwritten]
+        if await self._spill(rows):
+            return
+        room = max(self.max_queue - len(self._retry), 0)
+        self._retry.extend(rows[:room])
+        self._counters["dropped"] += len(rows) - min(room, len(rows))
+        await asyncio.sleep(FLUSH_RETRY_DELAY_SECONDS)
+
+    async def _drain_stream(self, session_factory) -> int:
+        """Persist one batch of stream entries (new or abandoned by a dead worker)."""
+        try:
+            client = await self._stream_client()
+            if client is None:
+                return 0
+            _, entries, *_ = await client.xautoclaim(
+                self.redis_stream, STREAM_GROUP, self.consumer_name,
+                min_idle_time=STREAM_CLAIM_IDLE_MS, start_id="0-0", count=self.batch_size,
+            )
+            if not entries:
+                response = await client.xreadgroup(
+                    STREAM_GROUP, self.consumer_name, {self.redis_stream: ">"}, count=self.batch_size
+                )
+                entries = response[0][1] if response else []
+        except Exception as e:
+            logger.warning(f"Analytics ingest stream read failed: {e}")
+            self._redis = None
+            self._group_ready = False
+            return 0
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+        if not entries:
+            return 0
+
+        rows, readable, unreadable = [], [], []
+        for entry_id, fields in entries:
+            try:
+                rows.append(_decode(fields["e"]))
+                readable.append(entry_id)
+            except (KeyError, TypeError, ValueError) as e:
+                self._counters["dead_lettered"] += 1
+                logger.error(f"Dead-lettering unreadable analytics stream entry {entry_id}: {e}")
+                unreadable.append(entry_id)
+
+        dead_lettered = self._counters["dead_lettered"]
+        unwritten = set(await self._flush_isolating(session_factory, rows))
+        # Unwritten entries stay pending and are reclaimed once idle for STREAM_CLAIM_IDLE_MS
+        done = [entry_id for i, entry_id in enumerate(readable) if i not in unwritten]
+        ids = unreadable + done
+        if not ids:
+            return 0
+        await client.xack(self.redis_stream, STREAM_GROUP, *ids)
+        await client.xdel(self.redis_stream, *ids)
+        self._counters["stream_flushed"] += len(done) - (self._counters["dead_lettered"] - dead_lettered)
+        return len(ids)
+
+    async def run(self, session_factory) -> None:
+        """Background flusher; drains the queue once more when cancelled."""
+        self._get_queue()
+        self.running = True
+        try:
+            while True:
+                batch = await self._next_batch()
+                if batch:
+                    await self._flush_batch(session_factory, batch)
+                if self.redis_stream:
+                    while await self._drain_stream(session_factory) >= self.batch_size:
+                        pass
+        except asyncio.CancelledError:
+            self.running = False
+            remaining = self._collecting + self._retry
+            self._collecting, self._retry = [], []
+            while not self._queue.empty():
+                remaining.append(self._queue.get_nowait())
+            for batch in chunks(remaining, self.batch_size):
+                try:
+                    async with session_factory() as db:
+                        await self.flush(db, batch)
+                except Exception as e:
+                    logger.error(f"Final analytics ingest flush failed: {e}")
+                    if not await self._spill(batch):
+                        self._counters["dropped"] += len(batch)
+            raise
+        finally:
+            self.running = False
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._flush_ms)
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "retry_depth": len(self._retry),
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "redis_stream": self.redis_stream or None,
+            **self._counters,
+            "flush_ms_p50": round(latencies[len(latencies) // 2], 2) if latencies else None,
+            "flush_ms_p99": round(latencies[int(len(latencies) * 0.99) - 1], 2) if latencies else None,
+            "flush_ms_max": round(latencies[-1], 2) if latencies else None,
+        }
+
+
+# Process-wide instance
+analytics_ingest = AnalyticsIngestBuffer()
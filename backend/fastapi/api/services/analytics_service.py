@@ -2,17 +2,18 @@
 from sqlalchemy import func, case, distinct, select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
 from typing import List, Dict, Tuple, Optional, Any
 from datetime import datetime, timedelta, timezone
 UTC = timezone.utc
 
-from ..models import Score, User, AnalyticsEvent
+from ..models import Score, AnalyticsEvent, UserConsent, ConsentEvent
 from ..utils.telemetry import get_telemetry_exporter
+from ..utils.environment_context import get_current_environment
+from .activity_rollups import ActivityRollupService
+from .analytics_ingest import analytics_ingest
 
 
-from sqlalchemy import select, func, case, distinct, desc
-from sqlalchemy.ext.asyncio import AsyncSession
-
 class AnalyticsService:
     """Service for generating aggregated analytics data.
     
@@ -26,26 +27,39 @@ class AnalyticsService:
     
     @staticmethod
     async def log_event(db: AsyncSession, event_data: dict, ip_address: Optional[str] = None) -> AnalyticsEvent:
-        """Log event (Async)."""
         """Log a user behavior event with environment tracking."""
         import json
         
         data_payload = json.dumps(event_data.get('event_data', {}))
         environment = get_current_environment()
         
-        event = AnalyticsEvent(
-            anonymous_id=event_data['anonymous_id'],
-            event_type=event_data.get('event_type', 'unknown'),
-            event_name=event_data['event_name'],
-            event_data=data_payload,
-            ip_address=ip_address,
-            timestamp=datetime.now(UTC),
-            environment=environment
-        )
-        
-        db.add(event)
-        await db.commit()
-        await db.refresh(event)
+        row = {
+            'user_id': event_data.get('user_id'),
+            'anonymous_id': event_data['anonymous_id'],
+            'event_type': event_data.get('event_type', 'unknown'),
+            'event_name': event_data['event_name'],
+            'event_data': data_payload,
+            'ip_address': ip_address,
+            'timestamp': datetime.now(UTC),
+            'environment': environment,
+        }
+
+        if analytics_ingest.running:
+            # Written later by the ingest flusher in a multi-row INSERT
+            if not await analytics_ingest.submit(row):
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Analytics ingestion is overloaded, retry later",
+                    headers={"Retry-After": "1"},
+                )
+            event = AnalyticsEvent(**row)
+        else:
+            event = AnalyticsEvent(**row)
+            db.add(event)
+            # Daily KPI rollups are updated in the same transaction as the event
+            await ActivityRollupService.record_events(db, [event])
+            await db.commit()
+            await db.refresh(event)
 
         # Emit telemetry event via the reliable exporter (Issue #1193)
         exporter = get_telemetry_exporter()
@@ -94,8 +108,6 @@ class AnalyticsService:
     
     @staticmethod
     async def get_score_distribution(db: AsyncSession) -> List[Dict]:
-        """Score distribution (Async)."""
-        total_count = (await db.execute(select(func.count(Score.id)))).scalar() or 0
         """Get score distribution across ranges using CQRS (#1124)."""
         from ..models import CQRSDistributionStats
         
@@ -115,57 +127,6 @@ class AnalyticsService:
             }
             for s in stats
         ]
-        
-        distribution = []
-        for name, min_s, max_s in ranges:
-            cnt = (await db.execute(select(func.count(Score.id)).filter(
-                Score.total_score >= min_s,
-                Score.total_score <= max_s
-            ))).scalar() or 0
-            
-            percentage = (cnt / total_count * 100) if total_count > 0 else 0
-            
-            distribution.append({
-                'score_range': name,
-                'count': cnt,
-                'percentage': round(percentage, 2)
-            })
-        
-        return distribution
-    
-    @staticmethod
-    async def get_overall_summary(db: AsyncSession) -> Dict:
-        """Dashboard summary (Async)."""
-        # Overall statistics
-        overall = (await db.execute(select(
-            func.count(Score.id).label('total'),
-            func.count(distinct(Score.username)).label('unique_users'),
-            func.avg(Score.total_score).label('avg_score'),
-            func.avg(Score.sentiment_score).label('avg_sentiment')
-        ))).first()
-        
-        # Quality metrics (aggregated counts)
-        quality = (await db.execute(select(
-            func.sum(case((Score.is_rushed == True, 1), else_=0)).label('rushed'),
-            func.sum(case((Score.is_inconsistent == True, 1), else_=0)).label('inconsistent')
-        ))).first()
-        
-        # Age group stats
-        age_stats = await AnalyticsService.get_age_group_statistics(db)
-        
-        # Score distribution
-        score_dist = await AnalyticsService.get_score_distribution(db)
-        
-        return {
-            'total_assessments': overall.total or 0,
-            'unique_users': overall.unique_users or 0,
-            'global_average_score': round(overall.avg_score or 0, 2),
-            'global_average_sentiment': round(overall.avg_sentiment or 0, 3),
-            'age_group_stats': age_stats,
-            'score_distribution': score_dist,
-            'assessment_quality_metrics': {
-                'rushed_assessments': quality.rushed or 0,
-                'inconsistent_assessments': quality.inconsistent or 0
     
     @staticmethod
     async def get_overall_summary(db: AsyncSession) -> Dict:
@@ -264,13 +225,6 @@ class AnalyticsService:
     
     @staticmethod
     async def get_benchmark_comparison(db: AsyncSession) -> List[Dict]:
-        """Benchmarks (Async)."""
-        # Get all scores for percentile calculation
-        stmt = select(Score.total_score).filter(
-            Score.total_score.isnot(None)
-        ).order_by(Score.total_score)
-        result = await db.execute(stmt)
-        scores = result.scalars().all()
         """Get benchmark comparison using CQRS (#1124)."""
         from ..models import CQRSGlobalStats
         
@@ -302,8 +256,6 @@ class AnalyticsService:
         """Get population-level insights using CQRS (#1124)."""
         from ..models import CQRSGlobalStats, CQRSAgeGroupStats
         
-        score_list = list(scores)
-        n = len(score_list)
         # 1. Most common age group
         common_stmt = select(CQRSAgeGroupStats).order_by(desc(CQRSAgeGroupStats.total_assessments)).limit(1)
         common_res = await db.execute(common_stmt)
@@ -335,35 +287,6 @@ class AnalyticsService:
         }
     
     @staticmethod
-    async def get_population_insights(db: AsyncSession) -> Dict:
-        """Population insights (Async)."""
-        # Most common age group
-        most_common = (await db.execute(select(
-            Score.detailed_age_group,
-            func.count(Score.id).label('count')
-        ).filter(
-            Score.detailed_age_group.isnot(None)
-        ).group_by(
-            Score.detailed_age_group
-        ).order_by(
-            desc('count')
-        ))).first()
-        
-        # Highest performing age group
-        highest_perf = (await db.execute(select(
-            Score.detailed_age_group,
-            func.avg(Score.total_score).label('avg')
-        ).filter(
-            Score.detailed_age_group.isnot(None)
-        ).group_by(
-            Score.detailed_age_group
-        ).order_by(
-            desc('avg')
-        ))).first()
-        
-        # Total population
-        total_users = (await db.execute(select(func.count(distinct(Score.username))))).scalar() or 0
-        total_assessments = (await db.execute(select(func.count(Score.id)))).scalar() or 0
     async def get_dashboard_statistics(
         db: AsyncSession,
         timeframe: str = '30d',
@@ -442,23 +365,13 @@ class AnalyticsService:
         if environment is None:
             environment = get_current_environment()
             
-        cutoff_date = datetime.now(UTC) - timedelta(days=period_days)
-
-        started_stmt = select(func.count(AnalyticsEvent.id)).filter(
-            AnalyticsEvent.event_name == 'signup_start',
-            AnalyticsEvent.timestamp >= cutoff_date,
-            AnalyticsEvent.environment == environment
-        )
-        started_res = await db.execute(started_stmt)
-        signup_started = started_res.scalar() or 0
-
-        completed_stmt = select(func.count(AnalyticsEvent.id)).filter(
-            AnalyticsEvent.event_name == 'signup_success',
-            AnalyticsEvent.timestamp >= cutoff_date,
-            AnalyticsEvent.environment == environment
+        # Whole UTC days from the cutoff day through today, read from the daily counters
+        cutoff_day = (datetime.now(UTC) - timedelta(days=period_days)).date()
+        counts = await ActivityRollupService.event_counts(
+            db, environment, ['signup_start', 'signup_success'], since=cutoff_day
         )
-        completed_res = await db.execute(completed_stmt)
-        signup_completed = completed_res.scalar() or 0
+        signup_started = counts['signup_start']
+        signup_completed = counts['signup_success']
 
         conversion_rate = (signup_completed / signup_started * 100) if signup_started > 0 else 0
 
@@ -490,27 +403,10 @@ class AnalyticsService:
         day_0 = today - timedelta(days=period_days)
         day_n = today
 
-        day0_stmt = select(func.count(func.distinct(AnalyticsEvent.user_id))).filter(
-            AnalyticsEvent.user_id.isnot(None),
-            func.date(AnalyticsEvent.timestamp) == day_0,
-            AnalyticsEvent.environment == environment
+        # Intersection of the two days' active-user sets from the rollups
+        day_0_users, day_n_active_users = await ActivityRollupService.retained_users(
+            db, environment, day_0, day_n
         )
-        day0_res = await db.execute(day0_stmt)
-        day_0_users = day0_res.scalar() or 0
-
-        dayn_subq = select(func.distinct(AnalyticsEvent.user_id)).filter(
-            func.date(AnalyticsEvent.timestamp) == day_n,
-            AnalyticsEvent.environment == environment
-        ).subquery()
-        
-        dayn_stmt = select(func.count(func.distinct(AnalyticsEvent.user_id))).filter(
-            AnalyticsEvent.user_id.isnot(None),
-            func.date(AnalyticsEvent.timestamp) == day_0,
-            AnalyticsEvent.user_id.in_(select(dayn_subq)),
-            AnalyticsEvent.environment == environment
-        )
-        dayn_res = await db.execute(dayn_stmt)
-        day_n_active_users = dayn_res.scalar() or 0
 
         retention_rate = (day_n_active_users / day_0_users * 100) if day_0_users > 0 else 0
 
@@ -539,15 +435,11 @@ class AnalyticsService:
         if environment is None:
             environment = get_current_environment()
             
-        cutoff_date = datetime.now(UTC) - timedelta(days=period_days)
-
-        active_stmt = select(func.count(func.distinct(AnalyticsEvent.user_id))).filter(
-            AnalyticsEvent.user_id.isnot(None),
-            AnalyticsEvent.timestamp >= cutoff_date,
-            AnalyticsEvent.environment == environment
+        # Union of the daily active-user sets in the window
+        today = datetime.now(UTC).date()
+        total_active_users = await ActivityRollupService.active_users(
+            db, environment, since=today - timedelta(days=period_days), until=today
         )
-        active_res = await db.execute(active_stmt)
-        total_active_users = active_res.scalar() or 0
 
         total_revenue = 0.0
         arpu = (total_revenue / total_active_users) if total_active_users > 0 else 0
@@ -737,10 +629,6 @@ class AnalyticsService:
             }
 
         return {
-            'most_common_age_group': most_common.detailed_age_group if most_common else 'Unknown',
-            'highest_performing_age_group': highest_perf.detailed_age_group if highest_perf else 'Unknown',
-            'total_population_size': total_users,
-            'assessment_completion_rate': completion_rate
             'analytics_consent_given': False,
             'consent_version': None,
             'last_updated': None
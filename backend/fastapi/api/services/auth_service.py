@@ -1341,8 +1341,11 @@ class AuthService:
             logger.warning(f"Invalid or used step-up token attempted: {step_up_token[:8]}...")
             raise ValueError("Invalid step-up token")
             
-        # Check expiration
-        if datetime.now(UTC) > token_record.expires_at:
+        # Check expiration (naive when read back from a timezone-less column)
+        expires_at = token_record.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=UTC)
+        if datetime.now(UTC) > expires_at:
             logger.warning(f"Expired step-up token attempted for user {token_record.user_id}")
             raise ValueError("Step-up token has expired")
             
@@ -1,16 +1,136 @@
 from ..config import get_settings_instance
 import json
 import logging
-from typing import Any, Optional
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
 import redis.asyncio as redis
 import weakref
 import gc
 from collections import defaultdict
+from cachetools import TTLCache
 
 from api.config import get_settings_instance
 
 logger = logging.getLogger(__name__)
 
+CACHE_INVALIDATION_CHANNEL = "soulsense_cache_invalidation"
+
+# Marks a key known to be absent in Redis so misses are served locally too.
+_ABSENT = object()
+
+
+class _EvictionCountingTTLCache(TTLCache):
+    """TTLCache that reports LRU evictions (not expirations) to a callback."""
+
+    def __init__(self, maxsize, ttl, timer, on_evict: Callable[[str], None]):
+        super().__init__(maxsize=maxsize, ttl=ttl, timer=timer)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_evict(key)
+        return key, value
+
+
+class LocalCacheTier:
+    """
+    Bounded in-process L1 cache sitting in front of Redis (#1123).
+
+    Entries are capped by count (LRU eviction) and by age (``ttl_seconds``),
+    and never outlive the Redis TTL they were written with. Raw Redis payloads
+    are stored so every hit decodes into a fresh object that callers can
+    mutate freely. Hits, misses, evictions and invalidations are counted per
+    key prefix (the segment before the first ``:``).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, timer: Callable[[], float] = time.monotonic):
+        self.enabled = max_entries > 0
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._entries = _EvictionCountingTTLCache(
+            maxsize=max(max_entries, 1), ttl=ttl_seconds, timer=timer, on_evict=self._record_eviction
+        )
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        )
+        # Bumped on every invalidation so a Redis read that raced with one
+        # does not repopulate the tier with the value it just dropped.
+        self.generation = 0
+
+    @staticmethod
+    def prefix_of(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def _record_eviction(self, key: str):
+        self._stats[self.prefix_of(key)]["evictions"] += 1
+
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        """Return ``(found, raw)``; ``raw`` is ``_ABSENT`` for a cached miss."""
+        if not self.enabled:
+            return False, None
+        with self._lock:
+            entry = self._entries.get(key)
+            stats = self._stats[self.prefix_of(key)]
+            if entry is not None:
+                expires_at, raw = entry
+                if expires_at > self._timer():
+                    stats["hits"] += 1
+                    return True, raw
+                del self._entries[key]
+            stats["misses"] += 1
+            return False, None
+
+    def store(self, key: str, raw: Any, ttl_seconds: Optional[float] = None, generation: Optional[int] = None):
+        if not self.enabled:
+            return
+        if ttl_seconds is not None and ttl_seconds <= 0:
+            return
+        lifetime = self.ttl_seconds if ttl_seconds is None else min(self.ttl_seconds, ttl_seconds)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (self._timer() + lifetime, raw)
+
+    def discard(self, key: str):
+        with self._lock:
+            self.generation += 1
+            if self._entries.pop(key, None) is not None:
+                self._stats[self.prefix_of(key)]["invalidations"] += 1
+
+    def discard_prefix(self, prefix: str):
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self._entries.keys() if k.startswith(prefix)]:
+                del self._entries[key]
+                self._stats[self.prefix_of(key)]["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            prefixes = {}
+            for prefix, counters in self._stats.items():
+                lookups = counters["hits"] + counters["misses"]
+                prefixes[prefix] = dict(counters, hit_ratio=round(counters["hits"] / lookups, 4) if lookups else 0.0)
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "prefixes": prefixes,
+            }
+
+
 class CacheService:
     def __init__(self):
         self.settings = get_settings_instance()
@@ -19,6 +139,13 @@ class CacheService:
         self._local_cache: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
         self._cache_cleanup_callbacks: weakref.WeakSet = weakref.WeakSet()
         self._pubsub_connection: Optional[redis.Redis] = None
+        # Two-tier read path: per-worker L1 in front of Redis, kept coherent
+        # through the invalidation channel (#1123)
+        self.l1 = LocalCacheTier(
+            max_entries=getattr(self.settings, "cache_l1_max_entries", 4096),
+            ttl_seconds=getattr(self.settings, "cache_l1_ttl_seconds", 30),
+        )
+        self._instance_id = uuid.uuid4().hex
 
     async def connect(self):
         if not self.redis:
@@ -60,8 +187,9 @@ class CacheService:
         """Explicit cleanup of resources to prevent memory leaks."""
         logger.info("Starting cache service cleanup...")
 
-        # Clear weak references
+        # Clear weak references and the L1 tier
         self.clear_weak_cache()
+        self.l1.clear()
 
         # Close Redis connections
         if self.redis:
@@ -80,10 +208,39 @@ class CacheService:
 
         logger.info("Cache service cleanup completed")
 
-    async def get(self, key: str) -> Optional[Any]:
+    def get_local_stats(self) -> Dict[str, Any]:
+        """Per-prefix hit/miss/eviction counters for the in-process tier."""
+        return self.l1.stats()
+
+    async def _read_through(self, key: str) -> Optional[str]:
+        """Return the raw Redis payload for ``key``, consulting L1 first."""
+        found, raw = self.l1.lookup(key)
+        if found:
+            return None if raw is _ABSENT else raw
+
         await self.connect()
+        generation = self.l1.generation
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            val, pttl_ms = await pipe.execute()
+        # A missing key is cached as well: the usual state of flags such as
+        # the maintenance switch is "not set". Keys with a Redis TTL are never
+        # held locally past their expiry.
+        ttl_seconds = pttl_ms / 1000 if pttl_ms and pttl_ms > 0 else None
+        self.l1.store(key, _ABSENT if val is None else val, ttl_seconds=ttl_seconds, generation=generation)
+        return val
+
+    def _invalidation_message(self, target: str, is_prefix: bool) -> str:
+        return json.dumps({
+            "type": "invalidate_prefix" if is_prefix else "invalidate_key",
+            "target": target,
+            "origin": self._instance_id,
+        })
+
+    async def get(self, key: str) -> Optional[Any]:
         try:
-            val = await self.redis.get(key)
+            val = await self._read_through(key)
             if val:
                 return json.loads(val)
             return None
@@ -93,20 +250,32 @@ class CacheService:
 
     async def set(self, key: str, value: Any, ttl_seconds: int = 3600):
         await self.connect()
+        payload = json.dumps(value)
+        self.l1.discard(key)
+        generation = self.l1.generation
         try:
-            await self.redis.setex(key, ttl_seconds, json.dumps(value))
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.setex(key, ttl_seconds, payload)
+                pipe.publish(CACHE_INVALIDATION_CHANNEL, self._invalidation_message(key, False))
+                await pipe.execute()
+            self.l1.store(key, payload, ttl_seconds=ttl_seconds, generation=generation)
         except Exception as e:
             logger.error(f"Redis set error for {key}: {e}")
 
     async def delete(self, key: str):
         await self.connect()
+        self.l1.discard(key)
         try:
-            await self.redis.delete(key)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.delete(key)
+                pipe.publish(CACHE_INVALIDATION_CHANNEL, self._invalidation_message(key, False))
+                await pipe.execute()
         except Exception as e:
             logger.error(f"Redis delete error for {key}: {e}")
 
     async def invalidate_prefix(self, prefix: str):
         await self.connect()
+        self.l1.discard_prefix(prefix)
         try:
             # Note: keys is not recommended for very huge datasets but since this is targeted caches, it's fine. 
             # Better approach is SCAN
@@ -115,18 +284,22 @@ class CacheService:
                 cursor, keys = await self.redis.scan(cursor=cursor, match=f"{prefix}*", count=100)
                 if keys:
                     await self.redis.delete(*keys)
+            await self.redis.publish(CACHE_INVALIDATION_CHANNEL, self._invalidation_message(prefix, True))
         except Exception as e:
             logger.error(f"Redis invalidate_prefix error for {prefix}: {e}")
 
     def sync_invalidate(self, key: str):
+        self.l1.discard(key)
         try:
             import redis
             r = redis.from_url(self.settings.redis_url)
             r.delete(key)
+            r.publish(CACHE_INVALIDATION_CHANNEL, self._invalidation_message(key, False))
         except Exception as e:
             logger.error(f"Redis sync delete error for {key}: {e}")
             
     def sync_invalidate_prefix(self, prefix: str):
+        self.l1.discard_prefix(prefix)
         try:
             import redis
             r = redis.from_url(self.settings.redis_url)
@@ -135,6 +308,7 @@ class CacheService:
                 cursor, keys = r.scan(cursor=cursor, match=f"{prefix}*", count=100)
                 if keys:
                     r.delete(*keys)
+            r.publish(CACHE_INVALIDATION_CHANNEL, self._invalidation_message(prefix, True))
         except Exception as e:
             logger.error(f"Redis sync invalidate_prefix error for {prefix}: {e}")
 
@@ -149,16 +323,26 @@ class CacheService:
         across multiple uncoordinated uvicorn workers.
         """
         await self.connect()
+        # Peers drop their copies when the message arrives; drop ours now.
+        self._apply_local_invalidation("invalidate_prefix" if is_prefix else "invalidate_key", key_or_prefix)
         try:
-            message = json.dumps({
-                "type": "invalidate_prefix" if is_prefix else "invalidate_key",
-                "target": key_or_prefix
-            })
-            await self.redis.publish("soulsense_cache_invalidation", message)
+            message = self._invalidation_message(key_or_prefix, is_prefix)
+            await self.redis.publish(CACHE_INVALIDATION_CHANNEL, message)
             logger.info(f"Broadcasted cache invalidation -> {message}")
         except Exception as e:
             logger.error(f"Failed to broadcast cache invalidation: {e}")
 
+    def _apply_local_invalidation(self, action: str, target: str):
+        """Drop ``target`` from both in-process caches."""
+        if action == "invalidate_key":
+            self.l1.discard(target)
+            self._local_cache.pop(target, None)
+        elif action == "invalidate_prefix":
+            self.l1.discard_prefix(target)
+            keys_to_remove = [k for k in self._local_cache.keys() if k.startswith(target)]
+            for key in keys_to_remove:
+                self._local_cache.pop(key, None)
+
     async def start_invalidation_listener(self):
         """
         Background task that subscribes to the Redis Pub/Sub channel.
@@ -174,7 +358,10 @@ class CacheService:
         processed_messages = weakref.WeakSet()
 
         try:
-            await pubsub.subscribe("soulsense_cache_invalidation")
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            # Anything cached before the subscription may have missed its
+            # invalidation message.
+            self.l1.clear()
             logger.info("Subscribed to distributed cache invalidation channel")
 
             async for message in pubsub.listen():
@@ -194,16 +381,14 @@ class CacheService:
                         if not action or not target:
                             continue
 
-                        logger.info(f"Received cache invalidation event: {action} -> {target}")
+                        # Our own writes already updated the local tier
+                        if data.get('origin') == self._instance_id:
+                            continue
 
-                        # 1. Clear from our custom CacheService weak reference cache
-                        if action == "invalidate_key":
-                            self._local_cache.pop(target, None)
-                        elif action == "invalidate_prefix":
-                            # Remove all keys matching prefix
-                            keys_to_remove = [k for k in self._local_cache.keys() if k.startswith(target)]
-                            for key in keys_to_remove:
-                                self._local_cache.pop(key, None)
+                        logger.debug(f"Received cache invalidation event: {action} -> {target}")
+
+                        # 1. Clear from the L1 tier and the weak reference cache
+                        self._apply_local_invalidation(action, target)
 
                         # 2. Clear from FastAPICache (which might be using MemoryBackend locally)
                         from fastapi_cache import FastAPICache
@@ -235,8 +420,10 @@ class CacheService:
             logger.error(f"Cache invalidation listener crashed: {e}")
         finally:
             # Explicit cleanup
+            # Without the listener, L1 entries can no longer be invalidated
+            self.l1.clear()
             try:
-                await pubsub.unsubscribe("soulsense_cache_invalidation")
+                await pubsub.unsubscribe(CACHE_INVALIDATION_CHANNEL)
                 await pubsub.close()
                 if self._pubsub_connection:
                     await self._pubsub_connection.close()
@@ -257,17 +444,22 @@ class CacheService:
         await self.connect()
         try:
             key = f"version:{entity_type}:{entity_id}"
-            await self.redis.set(key, version) # No TTL, this is the persistent truth
+            self.l1.discard(key)
+            generation = self.l1.generation
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, version) # No TTL, this is the persistent truth
+                pipe.publish(CACHE_INVALIDATION_CHANNEL, self._invalidation_message(key, False))
+                await pipe.execute()
+            self.l1.store(key, str(version), generation=generation)
             logger.debug(f"[GenVersion] Updated {key} -> {version}")
         except Exception as e:
             logger.error(f"[GenVersion] Update failed for {entity_type}:{entity_id}: {e}")
 
     async def get_latest_version(self, entity_type: str, entity_id: Any) -> int:
         """Get the authoritative version for an entity from Redis."""
-        await self.connect()
         try:
             key = f"version:{entity_type}:{entity_id}"
-            val = await self.redis.get(key)
+            val = await self._read_through(key)
             return int(val) if val else 0
         except Exception as e:
             logger.error(f"[GenVersion] Get failed for {entity_type}:{entity_id}: {e}")
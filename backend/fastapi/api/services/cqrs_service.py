@@ -1,163 +1,341 @@
 """
 CQRS Service for Read Model Materialization (#1124)
 Handles the incremental updates of analytics read models.
+
+Score events are folded into ``cqrs_score_histogram``: one fixed bin per
+integer score for each projection bucket ('global', 'age:<group>',
+'month:<YYYY-MM>'), holding a count and sentiment sum. Bins only receive
+deltas, so a batch of events costs one bulk upsert, and the read models of the
+touched buckets (averages, min/max, exact percentiles, distribution ranges)
+are re-derived from their few dozen bins rather than from the ``scores``
+table. ``rebuild_score_projections`` recomputes everything from ``scores``
+and is only needed as a repair tool (initial backfill, deletions, drift).
 """
 import logging
+from collections import Counter, defaultdict
 from datetime import datetime, timezone
 UTC = timezone.utc
-from sqlalchemy import select, update, func, desc, case
+from typing import Dict, Iterable, List, Sequence
+from sqlalchemy import select, update, delete, insert, func, case, literal
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import (
-    CQRSGlobalStats, 
-    CQRSAgeGroupStats, 
-    CQRSDistributionStats, 
+    CQRSGlobalStats,
+    CQRSAgeGroupStats,
+    CQRSDistributionStats,
     CQRSTrendAnalytics,
+    CQRSScoreHistogram,
+    CQRSScoreUser,
     Score,
     User
 )
+from ..utils.upsert import bulk_upsert, chunks
 
 logger = logging.getLogger(__name__)
 
+GLOBAL_BUCKET = "global"
+AGE_PREFIX = "age:"
+MONTH_PREFIX = "month:"
+# The read side expects a single global stats row
+GLOBAL_ROW_ID = 1
+SCORE_RANGES = [
+    ('0-10', 0, 10), ('11-20', 11, 20),
+    ('21-30', 21, 30), ('31-40', 31, 40)
+]
+
+
+def _score_snapshot(score: Score) -> Dict:
+    return {
+        "id": score.id,
+        "username": score.username,
+        "total_score": score.total_score,
+        "sentiment_score": score.sentiment_score,
+        "detailed_age_group": score.detailed_age_group,
+        "is_rushed": score.is_rushed,
+        "is_inconsistent": score.is_inconsistent,
+        "timestamp": score.timestamp,
+    }
+
+
+def _buckets(score: Dict) -> List[str]:
+    buckets = [GLOBAL_BUCKET]
+    if score.get("detailed_age_group"):
+        buckets.append(AGE_PREFIX + score["detailed_age_group"])
+    if score.get("timestamp"):
+        buckets.append(MONTH_PREFIX + str(score["timestamp"])[:7])
+    return buckets
+
+
+def _percentile(bins: Sequence, total: int, p: float) -> float:
+    """Linear-interpolated percentile over sorted (score, count) bins, matching a sorted-list lookup."""
+    if total == 0:
+        return 0.0
+    idx = (total - 1) * p / 100
+    lower = int(idx)
+    upper = min(lower + 1, total - 1)
+    lo_value = hi_value = None
+    seen = 0
+    for score, count in bins:
+        seen += count
+        if lo_value is None and lower < seen:
+            lo_value = score
+        if upper < seen:
+            hi_value = score
+            break
+    return float(lo_value + (idx - lower) * (hi_value - lo_value))
+
+
+def _summarize(bins: List) -> Dict:
+    """Aggregates of one bucket from its sorted histogram rows."""
+    total = sum(b.count for b in bins)
+    sentiment_count = sum(b.sentiment_count for b in bins)
+    counts = [(b.score, b.count) for b in bins]
+    return {
+        "total": total,
+        "average_score": sum(b.score * b.count for b in bins) / total if total else 0.0,
+        "min_score": float(bins[0].score) if bins else 0.0,
+        "max_score": float(bins[-1].score) if bins else 0.0,
+        "average_sentiment": sum(b.sentiment_sum for b in bins) / sentiment_count if sentiment_count else 0.0,
+        "percentiles": {p: _percentile(counts, total, p) for p in (25, 50, 75, 90)},
+        "counts": counts,
+    }
+
+
 class CQRSService:
     @staticmethod
-    async def update_score_projections(db: AsyncSession):
+    async def apply_scores(db: AsyncSession, scores: List[Dict], sign: int = 1) -> int:
+        """
+        Fold a batch of score snapshots into the projections inside the caller's
+        transaction. ``sign=-1`` retracts scores that were applied before.
+        Returns the number of scores applied (rows without a total_score are skipped).
+        """
+        scores = [s for s in scores if s.get("total_score") is not None]
+        if not scores:
+            return 0
+
+        bins = defaultdict(lambda: [0, 0.0, 0])
+        users = Counter()
+        rushed = inconsistent = 0
+        for s in scores:
+            score = int(s["total_score"])
+            sentiment = s.get("sentiment_score")
+            for bucket in _buckets(s):
+                b = bins[(bucket, score)]
+                b[0] += sign
+                if sentiment is not None:
+                    b[1] += sign * float(sentiment)
+                    b[2] += sign
+            rushed += sign * bool(s.get("is_rushed"))
+            inconsistent += sign * bool(s.get("is_inconsistent"))
+            if s.get("username"):
+                users[s["username"]] += sign
+
+        # Every batch touches the global row first, so its row lock serializes
+        # concurrent writers before they read back the rows they share
+        await bulk_upsert(db, CQRSGlobalStats, ["id"], [{
+            "id": GLOBAL_ROW_ID,
+            "rushed_assessments": rushed,
+            "inconsistent_assessments": inconsistent,
+        }], increment=("rushed_assessments", "inconsistent_assessments"))
+
+        # A username counts towards unique_users while it has assessments
+        known = {}
+        names = list(users)
+        for chunk in chunks(names):
+            res = await db.execute(
+                select(CQRSScoreUser.username, CQRSScoreUser.assessment_count)
+                .where(CQRSScoreUser.username.in_(chunk))
+            )
+            known.update(res.all())
+        unique_delta = sum(
+            (known.get(name, 0) + delta > 0) - (known.get(name, 0) > 0) for name, delta in users.items()
+        )
+        if unique_delta:
+            await db.execute(update(CQRSGlobalStats).where(CQRSGlobalStats.id == GLOBAL_ROW_ID).values(
+                unique_users=func.coalesce(CQRSGlobalStats.unique_users, 0) + unique_delta
+            ))
+
+        await bulk_upsert(db, CQRSScoreHistogram, ["bucket", "score"], [
+            {"bucket": bucket, "score": score, "count": c, "sentiment_sum": s_sum, "sentiment_count": s_count}
+            for (bucket, score), (c, s_sum, s_count) in bins.items()
+        ], increment=("count", "sentiment_sum", "sentiment_count"))
+        await bulk_upsert(db, CQRSScoreUser, ["username"], [
+            {"username": name, "assessment_count": delta} for name, delta in users.items()
+        ], increment=("assessment_count",))
+        if sign < 0:
+            for chunk in chunks(names):
+                await db.execute(delete(CQRSScoreUser).where(
+                    CQRSScoreUser.username.in_(chunk), CQRSScoreUser.assessment_count <= 0
+                ))
+            await db.execute(delete(CQRSScoreHistogram).where(CQRSScoreHistogram.count <= 0))
+
+        await CQRSService._refresh_buckets(db, {bucket for bucket, _ in bins})
+        return len(scores)
+
+    @staticmethod
+    async def _refresh_buckets(db: AsyncSession, buckets: Iterable[str]) -> None:
+        """Re-derive the read models of ``buckets`` from their histogram bins."""
+        buckets = sorted(buckets)
+        grouped = {bucket: [] for bucket in buckets}
+        for chunk in chunks(buckets):
+            # Plain rows rather than entities: the session's identity map would
+            # hand back bins as they were before this batch's upserts
+            res = await db.execute(
+                select(
+                    CQRSScoreHistogram.bucket, CQRSScoreHistogram.score, CQRSScoreHistogram.count,
+                    CQRSScoreHistogram.sentiment_sum, CQRSScoreHistogram.sentiment_count,
+                )
+                .where(CQRSScoreHistogram.bucket.in_(chunk), CQRSScoreHistogram.count > 0)
+                .order_by(CQRSScoreHistogram.bucket, CQRSScoreHistogram.score)
+            )
+            for row in res.all():
+                grouped[row.bucket].append(row)
+
+        now = datetime.now(UTC)
+        age_rows, trend_rows, emptied_ages, emptied_periods = [], [], [], []
+        for bucket, rows in grouped.items():
+            summary = _summarize(rows)
+            if bucket == GLOBAL_BUCKET:
+                pct = summary["percentiles"]
+                await db.execute(update(CQRSGlobalStats).where(CQRSGlobalStats.id == GLOBAL_ROW_ID).values(
+                    total_assessments=summary["total"],
+                    global_average_score=summary["average_score"],
+                    global_average_sentiment=summary["average_sentiment"],
+                    p25_score=pct[25], p50_score=pct[50], p75_score=pct[75], p90_score=pct[90],
+                    last_updated=now,
+                ))
+                await bulk_upsert(db, CQRSDistributionStats, ["score_range"], [
+                    {
+                        "score_range": name,
+                        "count": sum(c for score, c in summary["counts"] if start <= score <= end),
+                        "last_updated": now,
+                    }
+                    for name, start, end in SCORE_RANGES
+                ])
+            elif bucket.startswith(AGE_PREFIX):
+                age_group = bucket[len(AGE_PREFIX):]
+                if not summary["total"]:
+                    emptied_ages.append(age_group)
+                    continue
+                age_rows.append({
+                    "age_group": age_group,
+                    "total_assessments": summary["total"],
+                    "average_score": summary["average_score"],
+                    "min_score": summary["min_score"],
+                    "max_score": summary["max_score"],
+                    "average_sentiment": summary["average_sentiment"],
+                    "last_updated": now,
+                })
+            elif bucket.startswith(MONTH_PREFIX):
+                period = bucket[len(MONTH_PREFIX):]
+                if not summary["total"]:
+                    emptied_periods.append(period)
+                    continue
+                trend_rows.append({
+                    "period": period,
+                    "average_score": summary["average_score"],
+                    "assessment_count": summary["total"],
+                    "last_updated": now,
+                })
+
+        await bulk_upsert(db, CQRSAgeGroupStats, ["age_group"], age_rows)
+        await bulk_upsert(db, CQRSTrendAnalytics, ["period"], trend_rows)
+        if emptied_ages:
+            await db.execute(delete(CQRSAgeGroupStats).where(CQRSAgeGroupStats.age_group.in_(emptied_ages)))
+        if emptied_periods:
+            await db.execute(delete(CQRSTrendAnalytics).where(CQRSTrendAnalytics.period.in_(emptied_periods)))
+
+    @staticmethod
+    async def rebuild_score_projections(db: AsyncSession) -> None:
         """
-        Re-calculates the materializations from the Score table.
-        In a high-scale environment, this could be triggered by Kafka events incrementally,
-        but for this implementation, we will use an efficient 'refresh' pattern.
+        Repair tool: recompute the histograms and every read model from the
+        Score table. The aggregation runs in SQL (INSERT ... SELECT ... GROUP BY),
+        so scores are never loaded into Python.
         """
         try:
-            # 1. Update Global Stats
-            overall_stmt = select(
-                func.count(Score.id).label('total'),
-                func.count(func.distinct(Score.username)).label('unique_users'),
-                func.avg(Score.total_score).label('avg_score'),
-                func.avg(Score.sentiment_score).label('avg_sentiment'),
-                func.sum(case((Score.is_rushed == True, 1), else_=0)).label('rushed_count'),
-                func.sum(case((Score.is_inconsistent == True, 1), else_=0)).label('inconsistent_count')
+            for model in (CQRSScoreHistogram, CQRSScoreUser, CQRSGlobalStats,
+                          CQRSAgeGroupStats, CQRSDistributionStats, CQRSTrendAnalytics):
+                await db.execute(delete(model))
+
+            valid = Score.total_score.isnot(None)
+            bin_columns = (
+                Score.total_score,
+                func.count(Score.id),
+                func.coalesce(func.sum(Score.sentiment_score), 0.0),
+                func.count(Score.sentiment_score),
             )
-            res = await db.execute(overall_stmt)
-            overall = res.first()
-
-            if overall and overall.total > 0:
-                # Update or Insert Global Stats
-                global_stats_stmt = select(CQRSGlobalStats).limit(1)
-                gs_res = await db.execute(global_stats_stmt)
-                gs = gs_res.scalar_one_or_none()
-                
-                if not gs:
-                    gs = CQRSGlobalStats()
-                    db.add(gs)
-                
-                gs.total_assessments = overall.total
-                gs.unique_users = overall.unique_users
-                gs.global_average_score = float(overall.avg_score or 0)
-                gs.global_average_sentiment = float(overall.avg_sentiment or 0)
-                gs.rushed_assessments = int(overall.rushed_count or 0)
-                gs.inconsistent_assessments = int(overall.inconsistent_count or 0)
-                
-                # Percentiles (Calculated from a sorted list of scores)
-                scores_stmt = select(Score.total_score).order_by(Score.total_score)
-                s_res = await db.execute(scores_stmt)
-                all_scores = s_res.scalars().all()
-                n = len(all_scores)
-                
-                def get_p(p):
-                    if n == 0: return 0.0
-                    idx = (n - 1) * p / 100
-                    f = int(idx)
-                    c = min(f + 1, n - 1)
-                    if f == c: return float(all_scores[f])
-                    return float(all_scores[f] + (idx - f) * (all_scores[c] - all_scores[f]))
-
-                gs.p25_score = get_p(25)
-                gs.p50_score = get_p(50)
-                gs.p75_score = get_p(75)
-                gs.p90_score = get_p(90)
-                
-                gs.last_updated = datetime.now(UTC)
-
-            # 2. Update Age Group Stats
-            age_stmt = select(
-                Score.detailed_age_group,
-                func.count(Score.id).label('total'),
-                func.avg(Score.total_score).label('avg_score'),
-                func.min(Score.total_score).label('min_score'),
-                func.max(Score.total_score).label('max_score'),
-                func.avg(Score.sentiment_score).label('avg_sentiment')
-            ).filter(Score.detailed_age_group.isnot(None)).group_by(Score.detailed_age_group)
-            
-            age_res = await db.execute(age_stmt)
-            for row in age_res.all():
-                stmt = select(CQRSAgeGroupStats).filter(CQRSAgeGroupStats.age_group == row.detailed_age_group)
-                existing_res = await db.execute(stmt)
-                existing = existing_res.scalar_one_or_none()
-                
-                if not existing:
-                    existing = CQRSAgeGroupStats(age_group=row.detailed_age_group)
-                    db.add(existing)
-                
-                existing.total_assessments = row.total
-                existing.average_score = float(row.avg_score or 0)
-                existing.min_score = float(row.min_score or 0)
-                existing.max_score = float(row.max_score or 0)
-                existing.average_sentiment = float(row.avg_sentiment or 0)
-                existing.last_updated = datetime.now(UTC)
-
-            # 3. Update Distribution
-            # (Simplification for demo: just re-calculate)
-            ranges = [
-                ('0-10', 0, 10), ('11-20', 11, 20),
-                ('21-30', 21, 30), ('31-40', 31, 40)
-            ]
-            for name, start, end in ranges:
-                cnt_stmt = select(func.count(Score.id)).filter(Score.total_score.between(start, end))
-                cnt = (await db.execute(cnt_stmt)).scalar() or 0
-                
-                dist_stmt = select(CQRSDistributionStats).filter(CQRSDistributionStats.score_range == name)
-                dist = (await db.execute(dist_stmt)).scalar_one_or_none()
-                
-                if not dist:
-                    dist = CQRSDistributionStats(score_range=name)
-                    db.add(dist)
-                dist.count = cnt
-                dist.last_updated = datetime.now(UTC)
-
-            # 4. Update Trend Analytics (Monthly Breakdown)
-            # Since SQLite substr(timestamp, 1, 7) might vary, we'll do a simple month-string extraction
-            trend_stmt = select(
-                func.strftime('%Y-%m', Score.timestamp).label('period'),
-                func.avg(Score.total_score).label('avg_score'),
-                func.count(Score.id).label('count')
-            ).group_by('period')
-            
-            trend_res = await db.execute(trend_stmt)
-            for row in trend_res.all():
-                t_stmt = select(CQRSTrendAnalytics).filter(CQRSTrendAnalytics.period == row.period)
-                trend = (await db.execute(t_stmt)).scalar_one_or_none()
-                
-                if not trend:
-                    trend = CQRSTrendAnalytics(period=row.period)
-                    db.add(trend)
-                trend.average_score = float(row.avg_score or 0)
-                trend.assessment_count = row.count
-                trend.last_updated = datetime.now(UTC)
+            month = func.substr(Score.timestamp, 1, 7)
+            targets = ["bucket", "score", "count", "sentiment_sum", "sentiment_count"]
+            for bucket, where, group in (
+                (literal(GLOBAL_BUCKET), (), ()),
+                (literal(AGE_PREFIX) + Score.detailed_age_group,
+                 (Score.detailed_age_group.isnot(None),), (Score.detailed_age_group,)),
+                (literal(MONTH_PREFIX) + month, (Score.timestamp.isnot(None),), (month,)),
+            ):
+                await db.execute(insert(CQRSScoreHistogram).from_select(
+                    targets,
+                    select(bucket, *bin_columns).where(valid, *where).group_by(*group, Score.total_score),
+                ))
 
+            await db.execute(insert(CQRSScoreUser).from_select(
+                ["username", "assessment_count"],
+                select(Score.username, func.count(Score.id))
+                .where(valid, Score.username.isnot(None)).group_by(Score.username),
+            ))
+            flags = (await db.execute(select(
+                func.sum(case((Score.is_rushed == True, 1), else_=0)),
+                func.sum(case((Score.is_inconsistent == True, 1), else_=0)),
+            ).where(valid))).first()
+            unique_users = (await db.execute(select(func.count()).select_from(CQRSScoreUser))).scalar() or 0
+            await db.execute(insert(CQRSGlobalStats).values(
+                id=GLOBAL_ROW_ID,
+                unique_users=unique_users,
+                rushed_assessments=int(flags[0] or 0),
+                inconsistent_assessments=int(flags[1] or 0),
+            ))
+
+            buckets = (await db.execute(select(CQRSScoreHistogram.bucket).distinct())).scalars().all()
+            await CQRSService._refresh_buckets(db, set(buckets) | {GLOBAL_BUCKET})
             await db.commit()
-            logger.info("CQRS Read Models refreshed successfully")
+            logger.info("CQRS Read Models rebuilt from scores")
 
         except Exception as e:
             await db.rollback()
-            logger.error(f"Failed to refresh CQRS projections: {e}", exc_info=True)
+            logger.error(f"Failed to rebuild CQRS projections: {e}", exc_info=True)
+
+    @staticmethod
+    async def process_events(db: AsyncSession, events: List[Dict]) -> int:
+        """
+        Incrementally updates read models from a batch of audit events in one
+        transaction. Optimized for real-time Kafka consumption.
+        """
+        created = [e.get('payload') or {} for e in events
+                   if e.get('entity') == 'Score' and e.get('type') == 'CREATED']
+        skipped = sum(1 for e in events if e.get('entity') == 'Score' and e.get('type') != 'CREATED')
+        if skipped:
+            # UPDATED / DELETED payloads carry no prior state to retract
+            logger.debug(f"[CQRS] {skipped} Score update/delete events need rebuild_score_projections")
+        if not created:
+            return 0
+
+        try:
+            # Payloads without the score fields are resolved from the Score table
+            scores = [p for p in created if 'total_score' in p]
+            missing = [p['id'] for p in created if 'total_score' not in p and p.get('id') is not None]
+            for chunk in chunks(missing):
+                res = await db.execute(select(Score).where(Score.id.in_(chunk)))
+                scores.extend(_score_snapshot(s) for s in res.scalars().all())
+
+            applied = await CQRSService.apply_scores(db, scores)
+            await db.commit()
+            return applied
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to update CQRS projections: {e}", exc_info=True)
+            return 0
 
     @staticmethod
     async def process_event(db: AsyncSession, event_type: str, entity: str, payload: dict):
         """
         Incrementally updates read models based on a single incoming event.
-        Optimized for real-time Kafka consumption.
         """
-        if entity == 'Score' and event_type == 'CREATED':
-            # Logic to incrementally update CQRSGlobalStats, etc.
-            # For simplicity in this implementation, we will trigger a partial refresh 
-            # or rely on the background worker to pool updates.
-            await CQRSService.update_score_projections(db)
+        return await CQRSService.process_events(db, [{"type": event_type, "entity": entity, "payload": payload}])
@@ -14,6 +14,9 @@ from .cqrs_service import CQRSService
 
 logger = logging.getLogger(__name__)
 
+# Events folded into one projection transaction
+CQRS_BATCH_SIZE = 500
+
 async def run_cqrs_worker():
     """Consumes Kafka events to build pre-computed Read Models."""
     settings = get_settings_instance()
@@ -44,26 +47,24 @@ async def run_cqrs_worker():
 
     while True:
         try:
-            event_data = None
+            events = []
             if consumer:
-                msg = await consumer.getone()
-                event_data = msg.value
+                batches = await consumer.getmany(timeout_ms=1000, max_records=CQRS_BATCH_SIZE)
+                events = [msg.value for messages in batches.values() for msg in messages]
             elif q:
-                event_data = await q.get()
-            
-            if not event_data:
-                continue
+                events.append(await q.get())
+                # Drain whatever else is already queued into the same batch
+                while len(events) < CQRS_BATCH_SIZE and not q.empty():
+                    events.append(q.get_nowait())
 
-            # Process the event to update read models
+            # Process the events to update read models
             # We filter for 'Score' entity as it's the primary driver of analytics
-            entity = event_data.get('entity')
-            event_type = event_data.get('type')
-            
-            if entity == 'Score':
+            score_events = [e for e in events if e and e.get('entity') == 'Score']
+            if score_events:
                 async with PrimarySessionLocal() as db:
-                    await CQRSService.process_event(db, event_type, entity, event_data.get('payload', {}))
-                    # logger.info(f"[CQRS] Updated projections for {entity} {event_type}")
-            
+                    await CQRSService.process_events(db, score_events)
+                    # logger.info(f"[CQRS] Updated projections for {len(score_events)} Score events")
+
             # Yield control to prevent CPU starvation during high-frequency events
             await asyncio.sleep(0)
 
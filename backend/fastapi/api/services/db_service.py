@@ -14,6 +14,7 @@ from functools import wraps
 from ..models import Base, Score, Response, Question, QuestionCategory
 from ..config import get_settings
 from ..utils.cache import cache_manager
+from .question_catalog import question_catalog
 
 settings = get_settings()
 logger = logging.getLogger("api.db")
@@ -324,6 +325,10 @@ class QuestionService:
         active_only: bool = True
     ) -> Tuple[List[Question], int]:
         """Get questions with pagination and filters (Async)."""
+        if active_only and settings.question_catalog_enabled:
+            index = await question_catalog.get()
+            return index.page(skip, limit, category_id=category_id, min_age=min_age, max_age=max_age)
+
         stmt = select(Question)
 
         if active_only:
@@ -363,6 +368,10 @@ class QuestionService:
         """
         Get questions appropriate for a specific age.
         """
+        if settings.question_catalog_enabled:
+            questions = (await question_catalog.get()).for_age(age)
+            return list(questions[:limit] if limit else questions)
+
         stmt = select(Question).filter(
             Question.is_active == 1,
             Question.min_age <= age,
@@ -384,6 +393,9 @@ class QuestionService:
         """
         Get random questions appropriate for age.
         """
+        if settings.question_catalog_enabled:
+            return (await question_catalog.get()).sample(age, count)
+
         stmt = select(Question).filter(
             Question.is_active == 1,
             Question.min_age <= age,
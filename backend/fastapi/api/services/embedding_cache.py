@@ -0,0 +1,154 @@
+"""
+Content-addressed cache for text embeddings.
+
+Vectors are keyed by ``sha256(model name + normalized text)``, where the
+embedding service's model name includes the vector size, so an entry can
+never go stale: editing a journal changes its key, and switching models or
+EMBEDDING_DIMENSION changes every key. Two tiers are consulted in order:
+
+* an in-process LRU (per worker, bounded by entry count)
+* Redis, shared by API and Celery workers, with a long TTL
+
+Vectors are stored as base64-encoded float32 so a 384-d embedding costs about
+2 KB in Redis instead of ~8 KB of JSON.
+"""
+import base64
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from cachetools import LRUCache
+
+from api.config import get_settings_instance
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "embedding:"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, trimmed, internal whitespace collapsed."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(model_name: str, text: str) -> str:
+    digest = hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+    return f"{REDIS_KEY_PREFIX}{digest}"
+
+
+def encode_vector(vector: Sequence[float]) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(payload: str) -> List[float]:
+    return np.frombuffer(base64.b64decode(payload), dtype=np.float32).tolist()
+
+
+class EmbeddingCache:
+    """Two-tier (in-process LRU + Redis) embedding cache with hit-rate counters."""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        redis_enabled: Optional[bool] = None,
+    ):
+        settings = get_settings_instance()
+        self.max_entries = settings.embedding_cache_max_entries if max_entries is None else max_entries
+        self.ttl_seconds = settings.embedding_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.redis_enabled = settings.embedding_cache_redis_enabled if redis_enabled is None else redis_enabled
+        self._lock = threading.Lock()
+        self._local: LRUCache = LRUCache(maxsize=max(self.max_entries, 1))
+        self._counters = {"local_hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "redis_errors": 0}
+
+    async def _redis(self):
+        from api.services.cache_service import cache_service
+        await cache_service.connect()
+        return cache_service.redis
+
+    def _local_get(self, key: str) -> Optional[List[float]]:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            payload = self._local.get(key)
+        return decode_vector(payload) if payload is not None else None
+
+    def _local_put(self, key: str, payload: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._local[key] = payload
+
+    async def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vectors for ``texts`` (``None`` where absent); Redis hits are promoted to the LRU."""
+        keys = [cache_key(model_name, text) for text in texts]
+        results: List[Optional[List[float]]] = [self._local_get(key) for key in keys]
+        local_hits = sum(1 for r in results if r is not None)
+
+        redis_hits = 0
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing and self.redis_enabled:
+            try:
+                client = await self._redis()
+                payloads = await client.mget([keys[i] for i in missing])
+                for i, payload in zip(missing, payloads):
+                    if payload:
+                        results[i] = decode_vector(payload)
+                        self._local_put(keys[i], payload)
+                        redis_hits += 1
+            except Exception as e:
+                self._counters["redis_errors"] += 1
+                logger.warning(f"Embedding cache Redis lookup failed: {e}")
+
+        with self._lock:
+            self._counters["local_hits"] += local_hits
+            self._counters["redis_hits"] += redis_hits
+            self._counters["misses"] += len(keys) - local_hits - redis_hits
+        return results
+
+    async def put_many(self, model_name: str, items: Sequence[Tuple[str, Sequence[float]]]) -> None:
+        """Store freshly computed vectors in both tiers; empty vectors are not cached."""
+        entries = [(cache_key(model_name, text), encode_vector(vector)) for text, vector in items if vector]
+        if not entries:
+            return
+        for key, payload in entries:
+            self._local_put(key, payload)
+        with self._lock:
+            self._counters["stores"] += len(entries)
+
+        if self.redis_enabled:
+            try:
+                client = await self._redis()
+                async with client.pipeline(transaction=False) as pipe:
+                    for key, payload in entries:
+                        pipe.setex(key, self.ttl_seconds, payload)
+                    await pipe.execute()
+            except Exception as e:
+                self._counters["redis_errors"] += 1
+                logger.warning(f"Embedding cache Redis write failed: {e}")
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this worker since start-up."""
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._local)
+        lookups = counters["local_hits"] + counters["redis_hits"] + counters["misses"]
+        hits = counters["local_hits"] + counters["redis_hits"]
+        return dict(
+            counters,
+            lookups=lookups,
+            hit_ratio=round(hits / lookups, 4) if lookups else 0.0,
+            local_size=size,
+            local_max_entries=self.max_entries,
+            redis_enabled=self.redis_enabled,
+        )
@@ -3,8 +3,19 @@ import logging
 from typing import List, Optional, Union
 import numpy as np
 
+from .embedding_cache import EmbeddingCache
+from ..models import EMBEDDING_DIMENSION
+
 logger = logging.getLogger(__name__)
 
+# Native output size of the OpenAI embedding models; text-embedding-3 models can be
+# asked for a shorter vector via the `dimensions` parameter, ada-002 cannot
+OPENAI_EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
 class EmbeddingService:
     _instance = None
     _model = None
@@ -14,6 +25,10 @@ class EmbeddingService:
         self.use_openai = os.getenv("USE_OPENAI_EMBEDDINGS", "false").lower() == "true"
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.openai_model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+        self.batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self.dimension = EMBEDDING_DIMENSION
+        self._openai_client = None
+        self.cache = EmbeddingCache()
 
     @classmethod
     def get_instance(cls):
@@ -38,38 +53,99 @@ class EmbeddingService:
         """Generate vector embedding for a given text."""
         if not text:
             return []
+        embeddings = await self.generate_embeddings([text])
+        return embeddings[0]
 
-        if self.use_openai:
-            return await self._generate_openai_embedding(text)
-        else:
-            return await self._generate_local_embedding_via_proxy(text)
+    async def generate_embeddings(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """
+        Generate embeddings for many texts, in input order.
+        Texts already embedded by the active model are served from the embedding
+        cache; the rest are sent in micro-batches of `batch_size` (one model call or
+        API request per batch). Empty texts map to an empty list.
+        """
+        results: List[List[float]] = [[] for _ in texts]
+        pending = [(i, text) for i, text in enumerate(texts) if text]
+        if not pending:
+            return results
+
+        # Content-hash cache: only texts never embedded by this model at this
+        # dimension reach the model
+        model_name = self.cache_namespace
+        cached = await self.cache.get_many(model_name, [text for _, text in pending])
+        misses = {}
+        for (i, text), vector in zip(pending, cached):
+            if vector is not None:
+                results[i] = vector
+            else:
+                misses.setdefault(text, []).append(i)
+        if not misses:
+            return results
+
+        computed = await self._embed_uncached(list(misses), batch_size or self.batch_size)
+        await self.cache.put_many(model_name, list(zip(misses, computed)))
+        for (text, positions), vector in zip(misses.items(), computed):
+            for i in positions:
+                results[i] = vector
+        return results
+
+    @property
+    def active_model_name(self) -> str:
+        """Model that actually produces the vectors (recorded as ``embedding_model``)."""
+        return f"openai:{self.openai_model}" if self.use_openai else self.model_name
 
-    async def _generate_local_embedding_via_proxy(self, text: str) -> List[float]:
-        """ Delegates embedding generation to the isolated ML process. """
+    @property
+    def cache_namespace(self) -> str:
+        """Model and vector size, the model part of the embedding cache key."""
+        return f"{self.active_model_name}:{self.dimension}d"
+
+    async def _embed_uncached(self, texts: List[str], batch_size: int) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            if self.use_openai:
+                vectors.extend(await self._generate_openai_embeddings(batch))
+            else:
+                vectors.extend(await self._generate_local_embeddings_via_proxy(batch))
+        for vector in vectors:
+            if len(vector) != self.dimension:
+                raise ValueError(
+                    f"Embedding model {self.active_model_name} produced {len(vector)}-d vectors; "
+                    f"journal_entries.embedding holds {self.dimension}"
+                )
+        return vectors
+
+    async def _generate_local_embeddings_via_proxy(self, texts: List[str]) -> List[List[float]]:
+        """ Delegates batched embedding generation to the isolated ML process. """
         from ..ml.inference_server import inference_proxy
         try:
-            embedding = inference_proxy.run_inference(
-                "generate_embedding", 
-                {"text": text, "model_name": self.model_name}
+            return await inference_proxy.run_inference(
+                "generate_embeddings",
+                {"texts": texts, "model_name": self.model_name, "batch_size": len(texts)}
             )
-            return embedding
         except Exception as e:
-            logger.error(f"Inference proxy failed for embedding: {e}. Falling back to local load.")
+            logger.error(f"Inference proxy failed for embeddings: {e}. Falling back to local load.")
             # Fallback to loading it in the current process if proxy fails for some reason
             self._load_local_model()
-            embedding = self._model.encode(text)
-            return embedding.tolist()
+            embeddings = self._model.encode(texts, batch_size=len(texts))
+            return embeddings.tolist()
 
+    def _get_openai_client(self):
+        # One client (and its connection pool) per process instead of per request
+        if self._openai_client is None:
+            from openai import AsyncOpenAI
+            self._openai_client = AsyncOpenAI(api_key=self.openai_api_key)
+        return self._openai_client
 
-    async def _generate_openai_embedding(self, text: str) -> List[float]:
+    async def _generate_openai_embeddings(self, texts: List[str]) -> List[List[float]]:
         try:
-            from openai import AsyncOpenAI
-            client = AsyncOpenAI(api_key=self.openai_api_key)
+            client = self._get_openai_client()
+            kwargs = {"dimensions": self.dimension} if self._openai_can_shorten() else {}
             response = await client.embeddings.create(
-                input=[text],
-                model=self.openai_model
+                input=texts,
+                model=self.openai_model,
+                **kwargs
             )
-            return response.data[0].embedding
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
         except ImportError:
             logger.error("openai not installed. Run: pip install openai")
             raise
@@ -77,15 +153,34 @@ class EmbeddingService:
             logger.error(f"OpenAI embedding generation failed: {e}")
             raise
 
+    def _openai_can_shorten(self) -> bool:
+        return self.openai_model.startswith("text-embedding-3")
+
     def get_dimension(self) -> int:
         """Returns the dimension of the embeddings produced by the current model."""
         if self.use_openai:
-            # text-embedding-3-small default is 1536
-            # text-embedding-ada-002 is 1536
-            return 1536 
+            if self._openai_can_shorten():
+                return self.dimension
+            return OPENAI_EMBEDDING_DIMENSIONS.get(self.openai_model, 1536)
         else:
             self._load_local_model()
             # Most sentence-transformers models are 384 or 768
             return self._model.get_sentence_embedding_dimension()
 
+    def validate_dimension(self) -> None:
+        """
+        Refuse an OpenAI model whose vectors cannot fit journal_entries.embedding.
+        Called at startup; local models run in the inference process, so their output
+        size is checked on every batch instead of loading the model here.
+        """
+        if not self.use_openai:
+            return
+        dimension = self.get_dimension()
+        if dimension != self.dimension:
+            raise ValueError(
+                f"OPENAI_EMBEDDING_MODEL={self.openai_model} produces {dimension}-d vectors but "
+                f"journal_entries.embedding is {self.dimension}-d; set EMBEDDING_DIMENSION={dimension} "
+                f"(and migrate the column) or use a text-embedding-3 model"
+            )
+
 embedding_service = EmbeddingService.get_instance()
@@ -1,6 +1,6 @@
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from ..config import get_settings_instance
 
@@ -99,6 +99,38 @@ class ElasticSearchService:
         except Exception as e:
             logger.error(f"ES Delete Error [{entity}:{doc_id}]: {e}")
 
+    async def bulk(self, operations: List[Tuple[str, str, Any, Optional[Dict[str, Any]]]]) -> Dict[str, str]:
+        """
+        Send index/delete operations in a single ``_bulk`` request.
+
+        ``operations`` are ``(action, entity, doc_id, data)`` with action
+        ``"index"`` or ``"delete"``. Returns ``{es_doc_id: error}`` for the
+        items that failed; deleting a missing document is not a failure.
+        Transport errors are raised so the caller can retry the batch.
+        """
+        if not operations:
+            return {}
+        body: List[Dict[str, Any]] = []
+        for action, entity, doc_id, data in operations:
+            es_id = f"{entity}_{doc_id}"
+            body.append({action: {"_index": self.index_name, "_id": es_id}})
+            if action == "index":
+                body.append({"id": str(doc_id), "entity": entity, **(data or {})})
+
+        client = await self.get_client()
+        response = await client.bulk(body=body)
+        if not response.get("errors"):
+            return {}
+
+        failures = {}
+        for item in response.get("items", []):
+            (action, result), = item.items()
+            if action == "delete" and result.get("status") == 404:
+                continue
+            if result.get("error") or result.get("status", 200) >= 300:
+                failures[result.get("_id")] = str(result.get("error") or result.get("status"))
+        return failures
+
     async def search(
         self, 
         q: str, 
@@ -13,6 +13,10 @@ from ..models import User, Score, Response, UserSession, ExamSession
 from ..exceptions import APIException
 from ..constants.errors import ErrorCode
 from .gamification_service import GamificationService
+from .score_summary import ScoreSummaryService
+from . import exam_session_store
+from .exam_session_store import exam_sessions
+from ..config import get_settings_instance
 from ..utils.db_transaction import transactional, retry_on_transient
 from ..utils.race_condition_protection import with_row_lock
 
@@ -60,6 +64,8 @@ class ExamService:
                  "user_id": user.id,
                  "session_id": active_session.session_id
              })
+             if ExamService._buffered():
+                 await exam_sessions.open(active_session.session_id, user.id, user.username, active_session.expires_at)
              return active_session.session_id
 
         session_id = str(uuid.uuid4())
@@ -76,9 +82,15 @@ class ExamService:
         
         db.add(new_session)
         await db.commit()
+        if ExamService._buffered():
+            await exam_sessions.open(session_id, user.id, user.username, expires_at)
         logger.info(f"New exam session created: {session_id} for user {user.id}")
         return session_id
 
+    @staticmethod
+    def _buffered() -> bool:
+        return get_settings_instance().exam_session_buffer_enabled
+
     @staticmethod
     async def _get_valid_session(db: AsyncSession, user_id: int, session_id: str, allowed_statuses: List[str]) -> ExamSession:
         """Helper to fetch and validate an exam session."""
@@ -105,7 +117,45 @@ class ExamService:
 
     @staticmethod
     async def save_response(db: AsyncSession, user: User, session_id: str, data: ExamResponseCreate):
-        """Saves a single question response with session state validation."""
+        """
+        Saves a single question response with session state validation.
+
+        With the session buffer enabled the answer is validated and
+        de-duplicated in the live session state and reaches ``responses``
+        when the score is saved (see services/exam_session_store.py).
+        """
+        if not ExamService._buffered():
+            return await ExamService._save_response_direct(db, user, session_id, data)
+
+        outcome = await exam_sessions.record_answer(session_id, user.id, data.question_id, data.value, data.age_group)
+        if outcome == exam_session_store.MISSING:
+            # Not tracked yet (started before the buffer, or the store was reset)
+            session = await ExamService._get_valid_session(db, user.id, session_id, ['STARTED', 'IN_PROGRESS'])
+            await exam_sessions.open(session_id, user.id, user.username, session.expires_at)
+            outcome = await exam_sessions.record_answer(session_id, user.id, data.question_id, data.value, data.age_group)
+
+        if outcome == exam_session_store.FORBIDDEN:
+            raise APIException(ErrorCode.INTERNAL_SERVER_ERROR, "Access denied", status_code=403)
+        if outcome == exam_session_store.EXPIRED:
+            raise APIException(ErrorCode.INTERNAL_SERVER_ERROR, "Session expired", status_code=400)
+        if outcome.startswith(exam_session_store.INVALID_STATE):
+            state = outcome[len(exam_session_store.INVALID_STATE):]
+            raise APIException(ErrorCode.INTERNAL_SERVER_ERROR, f"Invalid state: {state}", status_code=400)
+        return True
+
+    @staticmethod
+    async def mark_as_submitted(db: AsyncSession, user_id: int, session_id: str) -> None:
+        """Closes a session to further answers once the full exam is submitted."""
+        session = await ExamService._get_valid_session(db, user_id, session_id, ['STARTED', 'IN_PROGRESS'])
+        session.status = 'SUBMITTED'
+        session.submitted_at = datetime.now(UTC)
+        await db.commit()
+        if ExamService._buffered():
+            await exam_sessions.set_status(session_id, 'SUBMITTED')
+
+    @staticmethod
+    async def _save_response_direct(db: AsyncSession, user: User, session_id: str, data: ExamResponseCreate):
+        """Writes one response straight to the database (session buffer disabled)."""
         session = await ExamService._get_valid_session(db, user.id, session_id, ['STARTED', 'IN_PROGRESS'])
 
         if session.status == 'STARTED':
@@ -141,8 +191,16 @@ class ExamService:
         """Saves the final exam score and updates session state."""
         session = await ExamService._get_valid_session(db, user.id, session_id, ['SUBMITTED', 'IN_PROGRESS', 'STARTED'])
 
-        # Atomic transaction for score + gamification
+        # Stop accepting answers and take the buffered ones for this transaction
+        buffered = await exam_sessions.freeze(session_id) if ExamService._buffered() else None
+        if buffered is not None and buffered.status == exam_session_store.FROZEN:
+            raise ConflictError("Exam score submission already in progress")
+
+        # Atomic transaction for buffered answers + score + gamification
         try:
+            if buffered is not None:
+                await exam_sessions.flush_answers(db, buffered)
+
             reflection = data.reflection_text
             if CRYPTO_AVAILABLE and reflection:
                 reflection = EncryptionManager.encrypt(reflection)
@@ -167,16 +225,24 @@ class ExamService:
 
             await db.flush()
 
+            # Dashboard aggregates, committed with the score
+            await ScoreSummaryService.record_score(db, new_score)
+
             # Award XP
             await GamificationService.award_xp(db, user.id, 100, "Exam Completion")
             
             await db.commit()
-            return new_score
         except Exception as e:
             await db.rollback()
+            if buffered is not None:
+                await exam_sessions.thaw(buffered)
             logger.error(f"Score submission failed: {e}")
             raise e
 
+        if buffered is not None:
+            await exam_sessions.discard(session_id)
+        return new_score
+
     @staticmethod
     async def get_history(db: AsyncSession, user: User, skip: int = 0, limit: int = 10):
         """Retrieves paginated history."""
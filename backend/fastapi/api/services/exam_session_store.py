@@ -0,0 +1,472 @@
+"""
+Write-behind state for live exam sessions.
+
+Every answer posted through ``ExamService.save_response`` used to re-read the
+``ExamSession`` row, SELECT for an existing ``Response``, insert one row and
+commit. While an exam is live its state now lives in a Redis hash, with an
+in-process store taking over when Redis is not reachable:
+
+    exam_session:<session_id>
+        user_id, username, status, expires_at (epoch seconds)
+        a:<question_id> -> [value, age_group, answered_at]
+
+* An answer is validated against the hash and stored with HSETNX by one Lua
+  script, so a replayed answer is de-duplicated without touching the database.
+* ``save_score`` freezes the session, writes all of its answers with one
+  multi-row INSERT in the score's transaction and discards the state after
+  commit.
+* Sessions are indexed by expiry in ``exam_session:expiring``. The sweeper
+  (``run_sweeper``) flushes the answers of sessions whose exam has expired,
+  marks them ABANDONED and drops them. That also recovers sessions frozen by
+  a worker that crashed before committing their score.
+
+Answers already present in ``responses`` for the session are skipped when
+flushing, so overlapping flushes never duplicate rows. Hashes outlive their
+exam by ``exam_session_retention_seconds``, giving the sweeper time to run.
+"""
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings_instance
+from ..models import ExamSession, Response
+
+UTC = timezone.utc
+logger = logging.getLogger(__name__)
+
+LIVE_STATUSES = ('STARTED', 'IN_PROGRESS')
+# Statuses a flushed session may still have in the database
+OPEN_STATUSES = ('STARTED', 'IN_PROGRESS', 'SUBMITTED')
+FROZEN = 'COMPLETING'
+# Expired sessions are swept only after this long, so a score submitted just
+# before expiry finishes its own flush first
+SWEEP_GRACE_SECONDS = 300
+ANSWER_PREFIX = 'a:'
+
+# record_answer outcomes
+SAVED = 'saved'
+DUPLICATE = 'duplicate'
+MISSING = 'missing'
+FORBIDDEN = 'forbidden'
+EXPIRED = 'expired'
+INVALID_STATE = 'state:'  # followed by the session status
+
+# Validate and store one answer.
+# KEYS[1]: session hash
+# ARGV[1]: user id
+# ARGV[2]: answer field
+# ARGV[3]: answer payload
+# ARGV[4]: now (epoch seconds)
+RECORD_ANSWER_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'user_id', 'status', 'expires_at')
+if not state[1] then
+    return 'missing'
+end
+if state[1] ~= ARGV[1] then
+    return 'forbidden'
+end
+if state[2] ~= 'STARTED' and state[2] ~= 'IN_PROGRESS' then
+    return 'state:' .. state[2]
+end
+if tonumber(state[3]) < tonumber(ARGV[4]) then
+    return 'expired'
+end
+if state[2] == 'STARTED' then
+    redis.call('HSET', KEYS[1], 'status', 'IN_PROGRESS')
+end
+if redis.call('HSETNX', KEYS[1], ARGV[2], ARGV[3]) == 0 then
+    return 'duplicate'
+end
+return 'saved'
+"""
+
+# Set the status of an existing session and return its previous state.
+# KEYS[1]: session hash
+# ARGV[1]: new status
+SET_STATUS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {}
+end
+local state = redis.call('HGETALL', KEYS[1])
+redis.call('HSET', KEYS[1], 'status', ARGV[1])
+return state
+"""
+
+
+@dataclass
+class SessionState:
+    """Buffered state of one exam session."""
+    session_id: str
+    user_id: int
+    username: Optional[str]
+    status: str
+    expires_at: float
+    # question_id -> (value, age_group, answered_at)
+    answers: Dict[int, Tuple[int, Optional[str], str]] = field(default_factory=dict)
+
+    def to_fields(self) -> Dict[str, str]:
+        fields = {
+            'user_id': str(self.user_id),
+            'username': self.username or '',
+            'status': self.status,
+            'expires_at': repr(self.expires_at),
+        }
+        for question_id, answer in self.answers.items():
+            fields[f'{ANSWER_PREFIX}{question_id}'] = json.dumps(answer)
+        return fields
+
+    @classmethod
+    def from_fields(cls, session_id: str, fields: Dict[str, str]) -> "SessionState":
+        answers = {
+            int(key[len(ANSWER_PREFIX):]): tuple(json.loads(value))
+            for key, value in fields.items() if key.startswith(ANSWER_PREFIX)
+        }
+        return cls(
+            session_id=session_id,
+            user_id=int(fields['user_id']),
+            username=fields.get('username') or None,
+            status=fields['status'],
+            expires_at=float(fields['expires_at']),
+            answers=answers,
+        )
+
+    def response_rows(self) -> List[Dict]:
+        return [
+            {
+                'username': self.username,
+                'user_id': self.user_id,
+                'question_id': question_id,
+                'response_value': value,
+                'detailed_age_group': age_group,
+                'session_id': self.session_id,
+                'timestamp': answered_at,
+            }
+            for question_id, (value, age_group, answered_at) in sorted(self.answers.items())
+        ]
+
+
+def _epoch(value: datetime) -> float:
+    return (value if value.tzinfo else value.replace(tzinfo=UTC)).timestamp()
+
+
+class ExamSessionStore:
+    """
+    Live exam session state in Redis with an in-process stand-in.
+
+    Operations that find Redis unreachable fall back to the in-process store;
+    freezing and sweeping consult both, so state written during an outage is
+    still flushed once Redis is back.
+    """
+
+    # Seconds to wait before retrying Redis after a failed connection
+    REDIS_RETRY_SECONDS = 30.0
+
+    def __init__(self, key_prefix: str = "exam_session", retention_seconds: Optional[int] = None):
+        self.settings = get_settings_instance()
+        self.key_prefix = key_prefix
+        self.retention_seconds = (
+            self.settings.exam_session_retention_seconds if retention_seconds is None else retention_seconds
+        )
+        self._redis = None
+        self._scripts = {}
+        self._redis_retry_at = 0.0
+        self._local: Dict[str, SessionState] = {}
+        self._counters = {
+            "answers_buffered": 0, "duplicates": 0, "sessions_flushed": 0,
+            "answers_flushed": 0, "sessions_swept": 0, "flush_errors": 0,
+        }
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}:{session_id}"
+
+    @property
+    def _expiry_key(self) -> str:
+        return f"{self.key_prefix}:expiring"
+
+    async def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            client = redis.from_url(
+                self.settings.redis_url,
+                decode_responses=True,
+                socket_timeout=1.0,
+                socket_connect_timeout=1.0,
+                retry_on_timeout=False,
+            )
+            await client.ping()
+            self._scripts = {
+                'record': client.register_script(RECORD_ANSWER_SCRIPT),
+                'set_status': client.register_script(SET_STATUS_SCRIPT),
+            }
+            self._redis = client
+        except Exception as e:
+            logger.warning(f"Redis unavailable for exam sessions, using in-process store: {e}")
+            self._reset_redis()
+        return self._redis
+
+    def _reset_redis(self) -> None:
+        self._redis = None
+        self._scripts = {}
+        self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_SECONDS
+
+    async def open(self, session_id: str, user_id: int, username: Optional[str], expires_at: datetime) -> None:
+        """Start tracking a session; existing state (answers, status) is left as is."""
+        state = SessionState(session_id, user_id, username, 'STARTED', _epoch(expires_at))
+        red = await self._get_redis()
+        if red:
+            key = self._key(session_id)
+            try:
+                async with red.pipeline(transaction=True) as pipe:
+                    for name, value in state.to_fields().items():
+                        pipe.hsetnx(key, name, value)
+                    pipe.expireat(key, int(state.expires_at + self.retention_seconds))
+                    pipe.zadd(self._expiry_key, {session_id: state.expires_at})
+                    await pipe.execute()
+                return
+            except (redis.TimeoutError, redis.ConnectionError) as e:
+                logger.warning(f"Redis exam session open failed for {session_id}: {e}")
+                self._reset_redis()
+        self._local.setdefault(session_id, state)
+
+    async def record_answer(
+        self,
+        session_id: str,
+        user_id: int,
+        question_id: int,
+        value: int,
+        age_group: Optional[str],
+        now: Optional[datetime] = None,
+    ) -> str:
+        """
+        Validate the session and buffer one answer. Returns SAVED, DUPLICATE,
+        MISSING (no state: load the session and retry), FORBIDDEN, EXPIRED or
+        INVALID_STATE followed by the session status.
+        """
+        now = now or datetime.now(UTC)
+        answer = (value, age_group, now.isoformat())
+        red = await self._get_redis()
+        if red:
+            try:
+                outcome = await self._scripts['record'](
+                    keys=[self._key(session_id)],
+                    args=[str(user_id), f'{ANSWER_PREFIX}{question_id}', json.dumps(answer), now.timestamp()],
+                )
+                if outcome != MISSING or session_id not in self._local:
+                    return self._count(outcome)
+            except asyncio.CancelledError:
+                raise
+            except (redis.TimeoutError, redis.ConnectionError) as e:
+                logger.warning(f"Redis exam session issue for {session_id}: {type(e).__name__}: {e}")
+                self._reset_redis()
+
+        state = self._local.get(session_id)
+        if state is None:
+            return MISSING
+        if state.user_id != user_id:
+            return FORBIDDEN
+        if state.status not in LIVE_STATUSES:
+            return INVALID_STATE + state.status
+        if state.expires_at < now.timestamp():
+            return EXPIRED
+        state.status = 'IN_PROGRESS'
+        if question_id in state.answers:
+            return self._count(DUPLICATE)
+        state.answers[question_id] = answer
+        return self._count(SAVED)
+
+    def _count(self, outcome: str) -> str:
+        if outcome == SAVED:
+            self._counters["answers_buffered"] += 1
+        elif outcome == DUPLICATE:
+            self._counters["duplicates"] += 1
+        return outcome
+
+    async def set_status(self, session_id: str, status: str) -> Optional[SessionState]:
+        """Set the status of a tracked session; returns its state from before the change."""
+        previous = None
+        red = await self._get_redis()
+        if red:
+            try:
+                fields = await self._scripts['set_status'](keys=[self._key(session_id)], args=[status])
+                if fields:
+                    previous = SessionState.from_fields(session_id, dict(zip(fields[::2], fields[1::2])))
+            except (redis.TimeoutError, redis.ConnectionError) as e:
+                logger.warning(f"Redis exam session status update failed for {session_id}: {e}")
+                self._reset_redis()
+
+        local = self._local.get(session_id)
+        if local is not None:
+            if previous is None:
+                previous = SessionState(**{**local.__dict__, 'answers': dict(local.answers)})
+            else:
+                previous.answers = {**local.answers, **previous.answers}
+            local.status = status
+        return previous
+
+    async def freeze(self, session_id: str) -> Optional[SessionState]:
+        """
+        Stop accepting answers and return the buffered state for flushing.
+        The state stays stored (and sweepable) until ``discard``.
+        """
+        return await self.set_status(session_id, FROZEN)
+
+    async def thaw(self, state: SessionState) -> None:
+        """Undo ``freeze`` after a failed flush."""
+        await self.set_status(state.session_id, state.status)
+
+    async def discard(self, session_id: str) -> None:
+        """Drop a session's state once its answers are committed."""
+        self._local.pop(session_id, None)
+        red = await self._get_redis()
+        if red:
+            try:
+                async with red.pipeline(transaction=True) as pipe:
+                    pipe.delete(self._key(session_id))
+                    pipe.zrem(self._expiry_key, session_id)
+                    await pipe.execute()
+            except (redis.TimeoutError, redis.ConnectionError) as e:
+                logger.warning(f"Redis exam session discard failed for {session_id}: {e}")
+                self._reset_redis()
+
+    async def expired_sessions(self, now: Optional[datetime] = None, limit: int = 500) -> List[str]:
+        """Ids of tracked sessions whose exam has expired."""
+        cutoff = (now or datetime.now(UTC)).timestamp()
+        expired = [sid for sid, state in self._local.items() if state.expires_at < cutoff]
+        red = await self._get_redis()
+        if red:
+            try:
+                expired += await red.zrangebyscore(self._expiry_key, '-inf', cutoff, start=0, num=limit)
+            except (redis.TimeoutError, redis.ConnectionError) as e:
+                logger.warning(f"Redis exam session sweep query failed: {e}")
+                self._reset_redis()
+        return list(dict.fromkeys(expired))[:limit]
+
+    async def flush_answers(self, db: AsyncSession, state: SessionState) -> int:
+        """
+        Insert the buffered answers of ``state`` with one multi-row INSERT in
+        the caller's transaction, skipping questions already stored for the
+        session. Returns the number of rows written.
+        """
+        if not state.answers:
+            return 0
+        stored = set((await db.execute(
+            select(Response.question_id).where(Response.session_id == state.session_id)
+        )).scalars())
+        rows = [row for row in state.response_rows() if row['question_id'] not in stored]
+        if rows:
+            await db.execute(insert(Response).values(rows))
+        self._counters["sessions_flushed"] += 1
+        self._counters["answers_flushed"] += len(rows)
+        return len(rows)
+
+    async def _claim(self, session_id: str) -> bool:
+        """Take an expired session off the expiry index; only one sweeper wins it."""
+        if session_id in self._local:
+            return True
+        red = await self._get_redis()
+        if red is None:
+            return False
+        try:
+            return await red.zrem(self._expiry_key, session_id) == 1
+        except (redis.TimeoutError, redis.ConnectionError) as e:
+            logger.warning(f"Redis exam session claim failed for {session_id}: {e}")
+            self._reset_redis()
+            return False
+
+    async def _release(self, state: SessionState) -> None:
+        """Return a claimed session to the index after a failed flush."""
+        await self.thaw(state)
+        red = await self._get_redis()
+        if red and state.session_id not in self._local:
+            try:
+                await red.zadd(self._expiry_key, {state.session_id: state.expires_at})
+            except (redis.TimeoutError, redis.ConnectionError) as e:
+                logger.warning(f"Redis exam session release failed for {state.session_id}: {e}")
+                self._reset_redis()
+
+    async def sweep(self, session_factory, now: Optional[datetime] = None) -> int:
+        """
+        Flush and drop sessions that expired more than SWEEP_GRACE_SECONDS
+        ago, marking their rows ABANDONED unless they were completed.
+        Returns the number of sessions swept.
+        """
+        cutoff = datetime.fromtimestamp((now or datetime.now(UTC)).timestamp() - SWEEP_GRACE_SECONDS, UTC)
+        swept = 0
+        for session_id in await self.expired_sessions(cutoff):
+            if not await self._claim(session_id):
+                continue
+            state = await self.set_status(session_id, FROZEN)
+            if state is None:
+                await self.discard(session_id)
+                continue
+            try:
+                async with session_factory() as db:
+                    await self.flush_answers(db, state)
+                    await db.execute(
+                        update(ExamSession)
+                        .where(ExamSession.session_id == session_id, ExamSession.status.in_(OPEN_STATUSES))
+                        .values(status='ABANDONED')
+                    )
+                    await db.commit()
+            except Exception as e:
+                self._counters["flush_errors"] += 1
+                logger.error(f"Failed to flush abandoned exam session {session_id}: {e}")
+                await self._release(state)
+                continue
+            await self.discard(session_id)
+            swept += 1
+        if swept:
+            self._counters["sessions_swept"] += swept
+            logger.info(f"Flushed {swept} abandoned exam sessions")
+        return swept
+
+    async def flush_local(self, session_factory) -> int:
+        """Persist the answers held in-process (on shutdown, before they are lost)."""
+        flushed = 0
+        for session_id, state in list(self._local.items()):
+            if not state.answers:
+                continue
+            async with session_factory() as db:
+                flushed += await self.flush_answers(db, state)
+                await db.commit()
+            state.answers.clear()
+        return flushed
+
+    async def run_sweeper(self, session_factory, interval_seconds: Optional[float] = None) -> None:
+        """Background sweep loop; persists in-process answers when cancelled."""
+        interval = interval_seconds or self.settings.exam_session_sweep_interval_seconds
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.sweep(session_factory)
+                except Exception as e:
+                    logger.error(f"Exam session sweep failed: {e}", exc_info=True)
+        except asyncio.CancelledError:
+            try:
+                await self.flush_local(session_factory)
+            except Exception as e:
+                logger.error(f"Final exam session flush failed: {e}")
+            raise
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "redis" if self._redis is not None else "local",
+            "local_sessions": len(self._local),
+            **self._counters,
+        }
+
+
+# Process-wide instance
+exam_sessions = ExamSessionStore()
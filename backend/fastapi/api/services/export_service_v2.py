@@ -1,20 +1,26 @@
 """
 Enhanced Export Service with advanced data portability features.
 Migrated to Async SQLAlchemy 2.0.
+
+JSON, CSV, XML and HTML exports are streamed: rows come from server-side
+cursors in batches and go straight into incremental writers, so an export's
+memory use stays flat however long the user's history is. The same chunk
+stream is written to disk, encrypted chunk by chunk, or sent as an HTTP
+response (``GET /export/v2/stream``).
 """
 
 import os
+import html
 import json
 import csv
 import uuid
 import logging
 import zipfile
 import io
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from xml.sax.saxutils import escape as xml_escape
 from datetime import datetime, timedelta, timezone
 UTC = timezone.utc
-from typing import List, Optional, Tuple, Dict, Any, Set
+from typing import List, Optional, Tuple, Dict, Any, Set, AsyncIterator, Callable, Iterable, Iterator
 from pathlib import Path
 from sqlalchemy import select, func, case, distinct, desc
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -35,6 +41,31 @@ from ..utils.distributed_lock import require_lock
 logger = logging.getLogger(__name__)
 
 
+class _ChunkSink:
+    """Write-only file object for zipfile; the caller drains what was written."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._size = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def __len__(self) -> int:
+        return self._size
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        return data
+
+
 class ExportServiceV2:
     """
     Enhanced export service with comprehensive data portability features.
@@ -47,6 +78,21 @@ class ExportServiceV2:
         'satisfaction', 'settings', 'medical', 'strengths',
         'emotional_patterns', 'responses'
     }
+    STREAMABLE_FORMATS = {'json', 'csv', 'xml', 'html'}
+    MEDIA_TYPES = {
+        'json': 'application/json',
+        'csv': 'application/zip',
+        'xml': 'application/xml',
+        'html': 'text/html',
+        'pdf': 'application/pdf',
+    }
+
+    # Streaming: rows per cursor batch, bytes per emitted chunk, and the rows
+    # kept for the HTML and PDF previews of each section
+    STREAM_BATCH_ROWS = 500
+    STREAM_CHUNK_BYTES = 64 * 1024
+    HTML_PREVIEW_ROWS = 100
+    PDF_PREVIEW_ROWS = 50
 
     @classmethod
     def ensure_export_dir(cls):
@@ -92,8 +138,11 @@ class ExportServiceV2:
     ) -> Tuple[str, str]:
         """
         Generate an export file with advanced options (Async).
+
+        JSON, CSV, XML and HTML are streamed to disk (see stream_export) and
+        encrypted on the way when a password is given; PDF reports render a
+        preview of each section.
         """
-        """Generate an export file with advanced options."""
         options = options or {}
 
         if format.lower() not in cls.SUPPORTED_FORMATS:
@@ -104,31 +153,23 @@ class ExportServiceV2:
         export_id = uuid.uuid4().hex
         timestamp = datetime.now(UTC)
 
-        # Fetch data based on options
-        data = await cls._fetch_export_data(db, user, options)
-
-        metadata = cls._build_metadata(user, export_id, format, options, timestamp)
-        data['_export_metadata'] = metadata
-
         ext = format.lower()
-        filepath = cls._get_safe_filepath(user.username, ext)
+        base_path = filepath = cls._get_safe_filepath(user.username, ext)
+        password = options.get('password') if options.get('encrypt', False) else None
 
         try:
-            if ext == 'json':
-                cls._write_json(filepath, data)
-            elif ext == 'csv':
-                cls._write_csv(filepath, data)
-            elif ext == 'xml':
-                cls._write_xml(filepath, data)
-            elif ext == 'html':
-                cls._write_html(filepath, data)
-            elif ext == 'pdf':
+            if ext == 'pdf':
+                data = await cls._fetch_export_data(db, user, options, row_limit=cls.PDF_PREVIEW_ROWS)
+                data['_export_metadata'] = cls._build_metadata(user, export_id, format, options, timestamp)
                 cls._write_pdf(filepath, data, user)
-
-            if options.get('encrypt', False):
-                password = options.get('password')
                 if password:
                     filepath = cls._encrypt_export(filepath, password)
+            else:
+                chunks = cls.stream_export(db, user, ext, options, export_id=export_id, timestamp=timestamp)
+                if password:
+                    chunks = cls._encrypt_chunks(chunks, cls._new_export_key(base_path))
+                    filepath = base_path + '.encrypted'
+                await cls._write_chunks(filepath, chunks)
 
             # Record export in database
             await cls._record_export(db, user, export_id, format, filepath, options, timestamp)
@@ -138,67 +179,121 @@ class ExportServiceV2:
 
         except Exception as e:
             logger.error(f"Failed to generate export for {user.username}: {e}")
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except:
-                    pass
+            for path in (base_path, base_path + '.encrypted', base_path + '.key'):
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
             raise e
 
     @classmethod
-    async def _fetch_export_data(
+    async def stream_export(
         cls,
         db: AsyncSession,
         user: User,
-        options: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """
-        Fetch user data based on export options (Async).
+        format: str,
+        options: Optional[Dict[str, Any]] = None,
+        export_id: Optional[str] = None,
+        timestamp: Optional[datetime] = None
+    ) -> AsyncIterator[bytes]:
         """
-        """Fetch user data based on export options."""
-        data = {}
-        data_types = set(options.get('data_types', list(cls.DATA_TYPES)))
-        date_range = options.get('date_range', {})
-
-        start_date = None
-        end_date = None
-        if date_range.get('start'):
-            start_date = datetime.fromisoformat(date_range['start'])
-        if date_range.get('end'):
-            end_date = datetime.fromisoformat(date_range['end'])
-
-        # 1. Profile Data
-        if 'profile' in data_types:
-            data['profile'] = await cls._fetch_profile_data(db, user)
-
-        if 'medical' in data_types:
-            data['medical'] = await cls._fetch_medical_data(db, user)
-
-        if 'strengths' in data_types:
-            data['strengths'] = await cls._fetch_strengths_data(db, user)
+        Serialize an export incrementally (JSON, CSV, XML or HTML).
 
-        if 'emotional_patterns' in data_types:
-            data['emotional_patterns'] = await cls._fetch_emotional_patterns_data(db, user)
-
-        if 'settings' in data_types:
-            data['settings'] = await cls._fetch_settings_data(db, user)
+        Row-based sections are read through server-side cursors in batches of
+        STREAM_BATCH_ROWS and serialized as they arrive, so memory use does
+        not grow with the user's history. Yields byte chunks of roughly
+        STREAM_CHUNK_BYTES for a file or a StreamingResponse.
+        """
+        options = options or {}
+        ext = format.lower()
+        if ext not in cls.STREAMABLE_FORMATS:
+            raise ValueError(
+                f"Format '{format}' cannot be streamed. Streamable: {', '.join(sorted(cls.STREAMABLE_FORMATS))}"
+            )
 
-        if 'journal' in data_types:
-            data['journal'] = await cls._fetch_journal_data(db, user, start_date, end_date)
+        metadata = cls._build_metadata(
+            user, export_id or uuid.uuid4().hex, format, options, timestamp or datetime.now(UTC)
+        )
+        serializers = {
+            'json': cls._json_chunks,
+            'csv': cls._csv_chunks,
+            'xml': cls._xml_chunks,
+            'html': cls._html_chunks,
+        }
 
-        if 'scores' in data_types:
-            data['scores'] = await cls._fetch_scores_data(db, user, start_date, end_date)
+        buffer = bytearray()
+        async for piece in serializers[ext](metadata, cls._iter_sections(db, user, options)):
+            buffer += piece.encode('utf-8') if isinstance(piece, str) else piece
+            if len(buffer) >= cls.STREAM_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
 
-        if 'assessments' in data_types:
-            data['assessments'] = await cls._fetch_assessments_data(db, user, start_date, end_date)
+    @classmethod
+    async def _fetch_export_data(
+        cls,
+        db: AsyncSession,
+        user: User,
+        options: Dict[str, Any],
+        row_limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Fetch user data based on export options (Async).
 
-        if 'satisfaction' in data_types:
-            data['satisfaction'] = await cls._fetch_satisfaction_data(db, user, start_date, end_date)
+        Materializes every section (at most ``row_limit`` rows each); used by
+        the PDF report and the archive service.
+        """
+        data = {}
+        async for name, value in cls._iter_sections(db, user, options, row_limit):
+            data[name] = value if isinstance(value, dict) else [row async for row in value]
+        return data
 
-        if 'responses' in data_types:
-            data['responses'] = await cls._fetch_responses_data(db, user, start_date, end_date)
+    @classmethod
+    async def _iter_sections(
+        cls,
+        db: AsyncSession,
+        user: User,
+        options: Dict[str, Any],
+        row_limit: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Yield ``(data_type, value)`` for the requested data types, in export
+        order: a dict for single-record types, an async iterator of row dicts
+        for the rest. Consume each row iterator before advancing.
+        """
+        data_types = set(options.get('data_types', list(cls.DATA_TYPES)))
+        start, end = cls._date_bounds(options.get('date_range', {}))
+
+        records = (
+            ('profile', cls._fetch_profile_data),
+            ('medical', cls._fetch_medical_data),
+            ('strengths', cls._fetch_strengths_data),
+            ('emotional_patterns', cls._fetch_emotional_patterns_data),
+            ('settings', cls._fetch_settings_data),
+        )
+        for name, fetch in records:
+            if name in data_types:
+                yield name, await fetch(db, user)
+
+        row_sections = (
+            ('journal', cls._iter_journal_rows),
+            ('scores', cls._iter_scores_rows),
+            ('assessments', cls._iter_assessments_rows),
+            ('satisfaction', cls._iter_satisfaction_rows),
+            ('responses', cls._iter_responses_rows),
+        )
+        for name, iterate in row_sections:
+            if name in data_types:
+                yield name, iterate(db, user, start, end, row_limit)
 
-        return data
+    @staticmethod
+    def _date_bounds(date_range: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        """Validate the optional date range; timestamps are stored as ISO strings."""
+        start = datetime.fromisoformat(date_range['start']).isoformat() if date_range.get('start') else None
+        end = datetime.fromisoformat(date_range['end']).isoformat() if date_range.get('end') else None
+        return start, end
 
     @classmethod
     async def _fetch_profile_data(cls, db: AsyncSession, user: User) -> Dict[str, Any]:
@@ -307,34 +402,52 @@ class ExportServiceV2:
             'language': settings.language,
         }
 
+    @staticmethod
+    def _iso(value: Any) -> Any:
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    @classmethod
+    async def _stream_rows(
+        cls,
+        db: AsyncSession,
+        stmt,
+        to_row: Callable[[Any], Dict[str, Any]],
+        row_limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run ``stmt`` through a server-side cursor, mapping each entity with ``to_row``."""
+        if row_limit is not None:
+            stmt = stmt.limit(row_limit)
+        result = await db.stream_scalars(stmt.execution_options(yield_per=cls.STREAM_BATCH_ROWS))
+        try:
+            async for batch in result.partitions():
+                for obj in batch:
+                    yield to_row(obj)
+        finally:
+            await result.close()
+
     @classmethod
-    async def _fetch_journal_data(
+    def _iter_journal_rows(
         cls,
         db: AsyncSession,
         user: User,
-        start_date: Optional[datetime],
-        end_date: Optional[datetime]
-    ) -> List[Dict[str, Any]]:
-        """Fetch journal entries with date filtering (Async)."""
-        """Fetch journal entries with date filtering."""
+        start: Optional[str],
+        end: Optional[str],
+        row_limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Journal entries in the date range, newest first."""
         stmt = select(JournalEntry).filter(
             JournalEntry.user_id == user.id,
             JournalEntry.is_deleted == False
         )
+        if start:
+            stmt = stmt.filter(JournalEntry.entry_date >= start)
+        if end:
+            stmt = stmt.filter(JournalEntry.entry_date <= end)
+        stmt = stmt.order_by(JournalEntry.entry_date.desc(), JournalEntry.id.desc())
 
-        if start_date:
-            stmt = stmt.filter(JournalEntry.entry_date >= start_date)
-        if end_date:
-            stmt = stmt.filter(JournalEntry.entry_date <= end_date)
-
-        result = await db.execute(stmt.order_by(JournalEntry.entry_date.desc()))
-        stmt = stmt.order_by(JournalEntry.entry_date.desc())
-        result = await db.execute(stmt)
-        entries = result.scalars().all()
-
-        return [{
+        return cls._stream_rows(db, stmt, lambda e: {
             'id': e.id,
-            'date': e.entry_date.isoformat() if isinstance(e.entry_date, datetime) else e.entry_date,
+            'date': cls._iso(e.entry_date),
             'content': e.content,
             'sentiment_score': e.sentiment_score,
             'emotional_patterns': e.emotional_patterns,
@@ -342,134 +455,106 @@ class ExportServiceV2:
             'sleep_hours': e.sleep_hours,
             'stress_level': e.stress_level,
             'energy_level': e.energy_level,
-        } for e in entries]
+        }, row_limit)
 
     @classmethod
-    async def _fetch_scores_data(
+    def _iter_scores_rows(
         cls,
         db: AsyncSession,
         user: User,
-        start_date: Optional[datetime],
-        end_date: Optional[datetime]
-    ) -> List[Dict[str, Any]]:
-        """Fetch assessment scores (Async)."""
+        start: Optional[str],
+        end: Optional[str],
+        row_limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Assessment scores in the date range, newest first."""
         stmt = select(Score).filter(Score.user_id == user.id)
-        """Fetch assessment scores."""
-        stmt = select(Score).join(UserSession, Score.session_id == UserSession.session_id).filter(UserSession.user_id == user.id)
-
-        if start_date:
-            stmt = stmt.filter(Score.timestamp >= start_date)
-        if end_date:
-            stmt = stmt.filter(Score.timestamp <= end_date)
-
-        result = await db.execute(stmt.order_by(Score.timestamp.desc()))
-        stmt = stmt.order_by(Score.timestamp.desc())
-        result = await db.execute(stmt)
-        scores = result.scalars().all()
-
-        return [{
-            'timestamp': s.timestamp.isoformat() if isinstance(s.timestamp, datetime) else s.timestamp,
+        if start:
+            stmt = stmt.filter(Score.timestamp >= start)
+        if end:
+            stmt = stmt.filter(Score.timestamp <= end)
+        stmt = stmt.order_by(Score.timestamp.desc(), Score.id.desc())
+
+        return cls._stream_rows(db, stmt, lambda s: {
+            'timestamp': cls._iso(s.timestamp),
             'total_score': s.total_score,
             'sentiment_score': s.sentiment_score,
             'reflection_text': s.reflection_text,
             'is_rushed': s.is_rushed,
             'is_inconsistent': s.is_inconsistent,
             'age_group': s.detailed_age_group,
-        } for s in scores]
+        }, row_limit)
 
     @classmethod
-    async def _fetch_assessments_data(
+    def _iter_assessments_rows(
         cls,
         db: AsyncSession,
         user: User,
-        start_date: Optional[datetime],
-        end_date: Optional[datetime]
-    ) -> List[Dict[str, Any]]:
-        """Fetch assessment results (Async)."""
+        start: Optional[str],
+        end: Optional[str],
+        row_limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Assessment results in the date range, newest first."""
         stmt = select(AssessmentResult).filter(AssessmentResult.user_id == user.id)
-        """Fetch assessment results."""
-        stmt = select(AssessmentResult).filter(
-            AssessmentResult.user_id == user.id,
-            AssessmentResult.is_deleted == False
-        )
-
-        if start_date:
-            stmt = stmt.filter(AssessmentResult.timestamp >= start_date)
-        if end_date:
-            stmt = stmt.filter(AssessmentResult.timestamp <= end_date)
+        if start:
+            stmt = stmt.filter(AssessmentResult.timestamp >= start)
+        if end:
+            stmt = stmt.filter(AssessmentResult.timestamp <= end)
+        stmt = stmt.order_by(AssessmentResult.timestamp.desc(), AssessmentResult.id.desc())
 
-        result = await db.execute(stmt.order_by(AssessmentResult.timestamp.desc()))
-        stmt = stmt.order_by(AssessmentResult.timestamp.desc())
-        result = await db.execute(stmt)
-        assessments = result.scalars().all()
-
-        return [{
+        return cls._stream_rows(db, stmt, lambda a: {
             'type': a.assessment_type,
-            'timestamp': a.timestamp.isoformat() if isinstance(a.timestamp, datetime) else a.timestamp,
-            'total_score': a.total_score,
+            'timestamp': cls._iso(a.timestamp),
+            'total_score': a.overall_score,
             'details': a.details,
-        } for a in assessments]
+        }, row_limit)
 
     @classmethod
-    async def _fetch_satisfaction_data(
+    def _iter_satisfaction_rows(
         cls,
         db: AsyncSession,
         user: User,
-        start_date: Optional[datetime],
-        end_date: Optional[datetime]
-    ) -> List[Dict[str, Any]]:
-        """Fetch satisfaction records (Async)."""
-        """Fetch satisfaction records."""
+        start: Optional[str],
+        end: Optional[str],
+        row_limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Satisfaction records in the date range, newest first."""
         stmt = select(SatisfactionRecord).filter(SatisfactionRecord.user_id == user.id)
-
-        if start_date:
-            stmt = stmt.filter(SatisfactionRecord.timestamp >= start_date)
-        if end_date:
-            stmt = stmt.filter(SatisfactionRecord.timestamp <= end_date)
-
-        result = await db.execute(stmt.order_by(SatisfactionRecord.timestamp.desc()))
-        stmt = stmt.order_by(SatisfactionRecord.timestamp.desc())
-        result = await db.execute(stmt)
-        records = result.scalars().all()
-
-        return [{
-            'timestamp': r.timestamp.isoformat() if isinstance(r.timestamp, datetime) else r.timestamp,
+        if start:
+            stmt = stmt.filter(SatisfactionRecord.timestamp >= start)
+        if end:
+            stmt = stmt.filter(SatisfactionRecord.timestamp <= end)
+        stmt = stmt.order_by(SatisfactionRecord.timestamp.desc(), SatisfactionRecord.id.desc())
+
+        return cls._stream_rows(db, stmt, lambda r: {
+            'timestamp': cls._iso(r.timestamp),
             'category': r.satisfaction_category,
             'score': r.satisfaction_score,
-            'positives': r.positive_factors,
-            'negatives': r.negative_factors,
-            'suggestions': r.improvement_suggestions,
-        } for r in records]
+            'context': r.context,
+        }, row_limit)
 
     @classmethod
-    async def _fetch_responses_data(
+    def _iter_responses_rows(
         cls,
         db: AsyncSession,
         user: User,
-        start_date: Optional[datetime],
-        end_date: Optional[datetime]
-    ) -> List[Dict[str, Any]]:
-        """Fetch question responses (Async)."""
+        start: Optional[str],
+        end: Optional[str],
+        row_limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Question responses in the date range, newest first."""
         stmt = select(Response).filter(Response.user_id == user.id)
-        """Fetch question responses."""
-        stmt = select(Response).join(UserSession, Response.session_id == UserSession.session_id).filter(UserSession.user_id == user.id)
+        if start:
+            stmt = stmt.filter(Response.timestamp >= start)
+        if end:
+            stmt = stmt.filter(Response.timestamp <= end)
+        stmt = stmt.order_by(Response.timestamp.desc(), Response.id.desc())
 
-        if start_date:
-            stmt = stmt.filter(Response.timestamp >= start_date)
-        if end_date:
-            stmt = stmt.filter(Response.timestamp <= end_date)
-
-        result = await db.execute(stmt.order_by(Response.timestamp.desc()))
-        stmt = stmt.order_by(Response.timestamp.desc())
-        result = await db.execute(stmt)
-        responses = result.scalars().all()
-
-        return [{
+        return cls._stream_rows(db, stmt, lambda r: {
             'question_id': r.question_id,
             'response_value': r.response_value,
-            'timestamp': r.timestamp.isoformat() if isinstance(r.timestamp, datetime) else r.timestamp,
-            'age_group': r.age_group,
-        } for r in responses]
+            'timestamp': cls._iso(r.timestamp),
+            'age_group': r.detailed_age_group,
+        }, row_limit)
 
     @classmethod
     def _build_metadata(
@@ -500,97 +585,7 @@ class ExportServiceV2:
             }
         }
 
-    @classmethod
-    def _write_json(cls, filepath: str, data: Dict[str, Any]):
-        """Write data to JSON file."""
-        with atomic_write(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False, default=str)
-
-    @classmethod
-    def _write_csv(cls, filepath: str, data: Dict[str, Any]):
-        """Write data to CSV files (zipped)."""
-        zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-
-            def write_csv(filename: str, rows: List[Dict[str, Any]]):
-                if not rows:
-                    return
-                buffer = io.StringIO()
-                fieldnames = set()
-                for row in rows:
-                    fieldnames.update(row.keys())
-
-                writer = csv.DictWriter(buffer, fieldnames=sorted(list(fieldnames)))
-                writer.writeheader()
-                for row in rows:
-                    safe = {k: cls._sanitize_csv_field(v) for k, v in row.items()}
-                    writer.writerow(safe)
-                zip_file.writestr(filename, buffer.getvalue().encode('utf-8-sig'))
-
-            if '_export_metadata' in data:
-                meta_buffer = io.StringIO()
-                json.dump(data['_export_metadata'], meta_buffer, indent=2, default=str)
-                zip_file.writestr('metadata.json', meta_buffer.getvalue().encode('utf-8'))
-
-            for key, value in data.items():
-                if key == '_export_metadata':
-                    continue
-                if isinstance(value, list):
-                    write_csv(f'{key}.csv', value)
-                elif isinstance(value, dict):
-                    write_csv(f'{key}.csv', [value])
-
-        with open(filepath, 'wb') as f:
-            f.write(zip_buffer.getvalue())
-
-    @classmethod
-    def _write_xml(cls, filepath: str, data: Dict[str, Any]):
-        """Write data to XML file."""
-        root = ET.Element('SoulSenseExport')
-
-        if '_export_metadata' in data:
-            meta_elem = ET.SubElement(root, 'ExportMetadata')
-            for key, value in data['_export_metadata'].items():
-                child = ET.SubElement(meta_elem, key)
-                if isinstance(value, (dict, list)):
-                    child.text = json.dumps(value)
-                else:
-                    child.text = str(value)
-
-        for key, value in data.items():
-            if key == '_export_metadata':
-                continue
-
-            section = ET.SubElement(root, key)
-
-            if isinstance(value, list):
-                for item in value:
-                    item_elem = ET.SubElement(section, 'Item')
-                    for item_key, item_value in item.items():
-                        field = ET.SubElement(item_elem, item_key)
-                        if isinstance(item_value, (dict, list)):
-                            field.text = json.dumps(item_value)
-                        else:
-                            field.text = str(item_value)
-            elif isinstance(value, dict):
-                for item_key, item_value in value.items():
-                    field = ET.SubElement(section, item_key)
-                    if isinstance(item_value, (dict, list)):
-                        field.text = json.dumps(item_value)
-                    else:
-                        field.text = str(item_value)
-
-        xml_str = minidom.parseString(ET.tostring(root)).toprettyxml(indent="  ")
-
-        with atomic_write(filepath, "w", encoding="utf-8") as f:
-            f.write(xml_str)
-
-    @classmethod
-    def _write_html(cls, filepath: str, data: Dict[str, Any]):
-        """Write data to self-contained HTML file."""
-        html_parts = []
-        html_parts.append("""<!DOCTYPE html>
+    _HTML_HEAD = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -662,48 +657,141 @@ class ExportServiceV2:
         <h1>Soul Sense Data Export</h1>
         <p>Comprehensive export of your emotional intelligence data</p>
     </div>
-""")
+"""
 
-        if '_export_metadata' in data:
-            html_parts.append('<div class="section"><h2>Export Metadata</h2><div class="metadata">')
-            for key, value in data['_export_metadata'].items():
-                html_parts.append(f'<p><strong>{key}:</strong> {value}</p>')
-            html_parts.append('</div></div>')
+    @staticmethod
+    async def _as_rows(value: Any) -> AsyncIterator[Dict[str, Any]]:
+        """Rows of a section: a single record is one row, or none when empty."""
+        if isinstance(value, dict):
+            if value:
+                yield value
+            return
+        async for row in value:
+            yield row
 
-        for key, value in data.items():
-            if key == '_export_metadata':
+    @staticmethod
+    def _json_value(value: Any, level: int) -> str:
+        """Indented JSON for a value nested ``level`` deep in the export document."""
+        text = json.dumps(value, indent=2, ensure_ascii=False, default=str)
+        return text.replace('\n', '\n' + '  ' * level)
+
+    @classmethod
+    async def _json_chunks(cls, metadata: Dict[str, Any], sections) -> AsyncIterator[str]:
+        """Write the export as one JSON object, a section at a time."""
+        yield '{\n  "_export_metadata": ' + cls._json_value(metadata, 1)
+        async for name, value in sections:
+            yield f',\n  {json.dumps(name)}: '
+            if isinstance(value, dict):
+                yield cls._json_value(value, 1)
                 continue
+            # One compact row per line: the C encoder only handles unindented output
+            empty = True
+            async for row in value:
+                yield ('[\n    ' if empty else ',\n    ') + json.dumps(row, ensure_ascii=False, default=str)
+                empty = False
+            yield '[]' if empty else '\n  ]'
+        yield '\n}\n'
+
+    @classmethod
+    async def _csv_chunks(cls, metadata: Dict[str, Any], sections) -> AsyncIterator[bytes]:
+        """Write the export as a ZIP of CSV files, one per non-empty section."""
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr('metadata.json', json.dumps(metadata, indent=2, default=str).encode('utf-8'))
+
+            async for name, value in sections:
+                rows = cls._as_rows(value)
+                first = await anext(rows, None)
+                if first is None:
+                    continue
 
-            html_parts.append(f'<div class="section"><h2>{key.replace("_", " ").title()}</h2>')
+                with io.TextIOWrapper(zip_file.open(f'{name}.csv', 'w'), encoding='utf-8-sig', newline='') as entry:
+                    writer = csv.DictWriter(entry, fieldnames=sorted(first))
+                    writer.writeheader()
+                    writer.writerow({k: cls._sanitize_csv_field(v) for k, v in first.items()})
+                    async for row in rows:
+                        writer.writerow({k: cls._sanitize_csv_field(v) for k, v in row.items()})
+                        if len(sink) >= cls.STREAM_CHUNK_BYTES:
+                            yield sink.drain()
+                yield sink.drain()
 
-            if isinstance(value, list) and value:
-                html_parts.append('<table><thead><tr>')
-                for header in value[0].keys():
-                    html_parts.append(f'<th>{header.replace("_", " ").title()}</th>')
-                html_parts.append('</tr></thead><tbody>')
+        yield sink.drain()
 
-                for item in value[:100]:
-                    html_parts.append('<tr>')
-                    for val in item.values():
-                        html_parts.append(f'<td>{val if val else "-"}</td>')
-                    html_parts.append('</tr>')
+    @staticmethod
+    def _xml_element(tag: str, fields: Dict[str, Any], level: int) -> str:
+        """Serialize one element with a child per field, indented ``level`` deep."""
+        indent = '  ' * level
+        children = ''.join(
+            f'{indent}  <{key}>{xml_escape(json.dumps(value) if isinstance(value, (dict, list)) else str(value))}</{key}>\n'
+            for key, value in fields.items()
+        )
+        return f'{indent}<{tag}>\n{children}{indent}</{tag}>\n' if children else f'{indent}<{tag}/>\n'
 
-                html_parts.append('</tbody></table>')
-                if len(value) > 100:
-                    html_parts.append(f'<p><em>...and {len(value) - 100} more entries</em></p>')
+    @classmethod
+    async def _xml_chunks(cls, metadata: Dict[str, Any], sections) -> AsyncIterator[str]:
+        """Write the export as an XML document, an element at a time."""
+        yield '<?xml version="1.0" ?>\n<SoulSenseExport>\n'
+        yield cls._xml_element('ExportMetadata', metadata, 1)
+        async for name, value in sections:
+            if isinstance(value, dict):
+                yield cls._xml_element(name, value, 1)
+                continue
+            yield f'  <{name}>\n'
+            async for row in value:
+                yield cls._xml_element('Item', row, 2)
+            yield f'  </{name}>\n'
+        yield '</SoulSenseExport>\n'
 
-            elif isinstance(value, dict):
-                html_parts.append('<table>')
-                for k, v in value.items():
-                    html_parts.append(f'<tr><td><strong>{k.replace("_", " ").title()}</strong></td><td>{v if v else "-"}</td></tr>')
-                html_parts.append('</table>')
+    @staticmethod
+    def _html_cell(value: Any) -> str:
+        return html.escape(str(value)) if value else '-'
 
-            html_parts.append('</div>')
+    @classmethod
+    async def _html_chunks(cls, metadata: Dict[str, Any], sections) -> AsyncIterator[str]:
+        """Write a self-contained HTML report showing the first HTML_PREVIEW_ROWS rows of each section."""
+        yield cls._HTML_HEAD
 
-        html_parts.append("</body></html>")
+        yield '<div class="section"><h2>Export Metadata</h2><div class="metadata">'
+        for key, value in metadata.items():
+            yield f'<p><strong>{key}:</strong> {html.escape(str(value))}</p>'
+        yield '</div></div>'
 
-        with atomic_write(filepath, "w", encoding="utf-8") as f:
-            f.write(''.join(html_parts))
+        async for name, value in sections:
+            yield f'<div class="section"><h2>{name.replace("_", " ").title()}</h2>'
+
+            if isinstance(value, dict):
+                yield '<table>'
+                for k, v in value.items():
+                    yield f'<tr><td><strong>{k.replace("_", " ").title()}</strong></td><td>{cls._html_cell(v)}</td></tr>'
+                yield '</table>'
+            else:
+                shown = hidden = 0
+                async for row in value:
+                    if shown >= cls.HTML_PREVIEW_ROWS:
+                        hidden += 1
+                        continue
+                    if not shown:
+                        yield '<table><thead><tr>'
+                        for header in row:
+                            yield f'<th>{header.replace("_", " ").title()}</th>'
+                        yield '</tr></thead><tbody>'
+                    yield '<tr>' + ''.join(f'<td>{cls._html_cell(v)}</td>' for v in row.values()) + '</tr>'
+                    shown += 1
+                if shown:
+                    yield '</tbody></table>'
+                if hidden:
+                    yield f'<p><em>...and {hidden} more entries</em></p>'
+
+            yield '</div>'
+
+        yield "</body></html>"
+
+    @classmethod
+    async def _write_chunks(cls, filepath: str, chunks: AsyncIterator[bytes]):
+        """Write a chunk stream to a file atomically."""
+        with atomic_write(filepath, 'wb') as f:
+            async for chunk in chunks:
+                f.write(chunk)
 
     @classmethod
     def _write_pdf(cls, filepath: str, data: Dict[str, Any], user: User):
@@ -819,24 +907,33 @@ class ExportServiceV2:
             f.write(buffer.getvalue())
 
     @classmethod
-    def _encrypt_export(cls, filepath: str, password: str) -> str:
-        """Encrypt export file."""
-        try:
-            key = Fernet.generate_key()
-            fernet = Fernet(key)
+    def _new_export_key(cls, filepath: str) -> Fernet:
+        """Generate the key for an encrypted export and store it next to the export."""
+        key = Fernet.generate_key()
+        with atomic_write(filepath + '.key', 'wb') as f:
+            f.write(key)
+        return Fernet(key)
 
-            with open(filepath, 'rb') as f:
-                original_data = f.read()
+    @staticmethod
+    async def _encrypt_chunks(chunks: AsyncIterator[bytes], fernet: Fernet) -> AsyncIterator[bytes]:
+        """
+        Encrypt a chunk stream as newline-separated Fernet tokens, one per
+        chunk, so the export is never held in memory whole. An export
+        encrypted in one piece is the single-token case (see decrypt_export).
+        """
+        async for chunk in chunks:
+            yield fernet.encrypt(chunk) + b'\n'
 
-            encrypted_data = fernet.encrypt(original_data)
+    @classmethod
+    def _encrypt_export(cls, filepath: str, password: str) -> str:
+        """Encrypt an export file chunk by chunk."""
+        try:
+            fernet = cls._new_export_key(filepath)
             encrypted_path = filepath + '.encrypted'
-            
-            with atomic_write(encrypted_path, 'wb') as f:
-                f.write(encrypted_data)
 
-            key_path = filepath + '.key'
-            with atomic_write(key_path, 'wb') as f:
-                f.write(key)
+            with open(filepath, 'rb') as src, atomic_write(encrypted_path, 'wb') as dst:
+                for chunk in iter(lambda: src.read(cls.STREAM_CHUNK_BYTES), b''):
+                    dst.write(fernet.encrypt(chunk) + b'\n')
 
             os.remove(filepath)
             return encrypted_path
@@ -845,6 +942,15 @@ class ExportServiceV2:
             logger.error(f"Encryption failed: {e}")
             raise ValueError(f"Failed to encrypt export: {e}")
 
+    @staticmethod
+    def decrypt_export(lines: Iterable[bytes], key: bytes) -> Iterator[bytes]:
+        """Decrypt an encrypted export read line by line, yielding the plaintext chunks."""
+        fernet = Fernet(key)
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield fernet.decrypt(line)
+
     @classmethod
     async def _record_export(
         cls,
@@ -854,7 +960,8 @@ class ExportServiceV2:
         format: str,
         filepath: str,
         options: Dict[str, Any],
-        timestamp: datetime
+        timestamp: datetime,
+        status: str = 'completed'
     ):
         """Record export in database for audit trail (Async)."""
         """Record export in database."""
@@ -870,7 +977,7 @@ class ExportServiceV2:
                 date_range_end=datetime.fromisoformat(date_range['end']) if date_range.get('end') else None,
                 data_types=json.dumps(options.get('data_types', list(cls.DATA_TYPES))),
                 is_encrypted=options.get('encrypt', False),
-                status='completed',
+                status=status,
                 created_at=timestamp,
                 expires_at=timestamp + timedelta(hours=48)
             )
@@ -12,6 +12,9 @@ from ..models import (
     Challenge, UserChallenge, JournalEntry, Score
 )
 
+from .achievement_engine import achievement_engine
+from .leaderboard_service import GLOBAL, TENANT, leaderboards
+
 logger = logging.getLogger(__name__)
 
 from sqlalchemy import select, desc
@@ -27,7 +30,8 @@ class GamificationService:
         user_xp = result.scalar_one_or_none()
         
         if not user_xp:
-            user_xp = UserXP(user_id=user_id, total_xp=0, current_level=1, xp_to_next_level=500)
+            tenant_id = await db.scalar(select(User.tenant_id).filter(User.id == user_id))
+            user_xp = UserXP(user_id=user_id, tenant_id=tenant_id, total_xp=0, current_level=1, xp_to_next_level=500)
             db.add(user_xp)
             await db.flush()
 
@@ -40,6 +44,7 @@ class GamificationService:
             logger.info(f"User {user_id} leveled up to {user_xp.current_level}!")
 
         await db.commit()
+        await leaderboards.record_xp(user_id, user_xp.tenant_id, user_xp.total_xp, amount)
         return user_xp
 
     @staticmethod
@@ -92,91 +97,15 @@ class GamificationService:
 
     @staticmethod
     async def check_achievements(db: AsyncSession, user_id: int, activity: str) -> List[UserAchievement]:
-        """Check if any achievements are unlocked by the recent activity."""
-        # Get all potential achievements for the category/activity
-        ua_stmt = select(UserAchievement.achievement_id).filter(
-            UserAchievement.user_id == user_id,
-            UserAchievement.unlocked == True
-        )
-        ua_result = await db.execute(ua_stmt)
-        unlocked_ids = [ua.achievement_id for ua in ua_result.scalars().all()]
-        
-        ach_stmt = select(Achievement).filter(~Achievement.achievement_id.in_(unlocked_ids))
-        ach_result = await db.execute(ach_stmt)
-        potential_achievements = ach_result.scalars().all()
-        
-        new_unlocks = []
-        unlocked_ids = list(ua_result.scalars().all())
-        
-        ach_stmt = select(Achievement).filter(
-            ~Achievement.achievement_id.in_(unlocked_ids) if unlocked_ids else True
-        )
-        ach_result = await db.execute(ach_stmt)
-        potential_achievements = list(ach_result.scalars().all())
-        
-        new_unlocks = []
-        
-        for ach in potential_achievements:
-            met = False
-            if ach.achievement_id == "FIRST_JOURNAL" and activity == "journal":
-                met = True
-            elif ach.achievement_id == "EQ_EXPLORER" and activity == "assessment":
-                met = True
-            elif ach.achievement_id == "MONTHLY_MASTER":
-                thirty_days_ago = (datetime.now(UTC) - timedelta(days=30)).isoformat()
-                count_stmt = select(func.count(JournalEntry.id)).filter(
-                    JournalEntry.user_id == user_id,
-                    JournalEntry.timestamp >= thirty_days_ago
-                )
-                count_result = await db.execute(count_stmt)
-                if (count_result.scalar() or 0) >= 30:
-                    met = True
-            
-            if met:
-                stmt_lookup = select(UserAchievement).filter(
-                    UserAchievement.user_id == user_id,
-                    UserAchievement.achievement_id == ach.achievement_id
-                )
-                lookup_result = await db.execute(stmt_lookup)
-                ua = lookup_result.scalar_one_or_none()
-                # Check journal count in last 30 days
-                thirty_days_ago = (datetime.now(UTC) - timedelta(days=30))
-                journal_stmt = select(func.count(JournalEntry.id)).filter(
-                    JournalEntry.user_id == user_id,
-                    JournalEntry.timestamp >= thirty_days_ago,
-                    JournalEntry.is_deleted == False
-                )
-                journal_res = await db.execute(journal_stmt)
-                count = journal_res.scalar() or 0
-                if count >= 30:
-                    met = True
-            
-            if met:
-                ua_check_stmt = select(UserAchievement).filter(
-                    UserAchievement.user_id == user_id,
-                    UserAchievement.achievement_id == ach.achievement_id
-                )
-                ua_check_res = await db.execute(ua_check_stmt)
-                ua = ua_check_res.scalar_one_or_none()
-                
-                if not ua:
-                    ua = UserAchievement(
-                        user_id=user_id, achievement_id=ach.achievement_id,
-                        progress=100, unlocked=True, unlocked_at=datetime.utcnow()
-                    )
-                    db.add(ua)
-                else:
-                    ua.progress = 100
-                    ua.unlocked = True
-                    ua.unlocked_at = datetime.utcnow()
-                
-                new_unlocks.append(ua)
-                await GamificationService.award_xp(db, user_id, ach.points_reward, f"Unlocked {ach.name}")
-
-                await GamificationService.award_xp(db, user_id, ach.points_reward, f"Unlocked achievement: {ach.name}")
-
+        """
+        Record an activity event ("journal", "assessment") and unlock the achievements
+        whose rules listen to it (see services/achievement_engine.py). Call once per activity.
+        """
+        unlocks = await achievement_engine.handle(db, user_id, activity)
+        for ua, definition in unlocks:
+            await GamificationService.award_xp(db, user_id, definition.points_reward, f"Unlocked achievement: {definition.name}")
         await db.commit()
-        return new_unlocks
+        return [ua for ua, _ in unlocks]
 
     @staticmethod
     async def get_user_summary(db: AsyncSession, user_id: int) -> Dict[str, Any]:
@@ -253,26 +182,58 @@ class GamificationService:
         }
 
     @staticmethod
-    async def get_leaderboard(db: AsyncSession, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get the global anonymized leaderboard (Async)."""
-        stmt = select(UserXP, User.username).join(User, UserXP.user_id == User.id).order_by(desc(UserXP.total_xp)).limit(limit)
-        result = await db.execute(stmt)
-        results = result.all()
-        """Get the global anonymized leaderboard."""
-        stmt = select(UserXP, User.username).join(User, UserXP.user_id == User.id).order_by(desc(UserXP.total_xp)).limit(limit)
-        result = await db.execute(stmt)
-        rows = result.all()
-        
+    async def _leaderboard_entries(db: AsyncSession, ranked: List[tuple]) -> List[Dict[str, Any]]:
+        """Anonymized entries for (rank, user_id, score) board positions, with one query for names and levels."""
+        user_ids = [user_id for _, user_id, _ in ranked]
+        rows = {}
+        if user_ids:
+            stmt = select(UserXP.user_id, UserXP.total_xp, UserXP.current_level, User.username).join(
+                User, UserXP.user_id == User.id
+            ).filter(UserXP.user_id.in_(user_ids))
+            rows = {row.user_id: row for row in (await db.execute(stmt)).all()}
+
         leaderboard = []
-        for i, (xp, username) in enumerate(rows):
+        for rank, user_id, score in ranked:
+            row = rows.get(user_id)
+            if row is None:  # removed since the board was last reconciled
+                continue
             leaderboard.append({
-                "rank": i + 1,
-                "username": f"{username[:3]}***" if username else "Anonymous",
-                "total_xp": xp.total_xp,
-                "current_level": xp.current_level
+                "rank": rank,
+                "username": f"{row.username[:3]}***" if row.username else "Anonymous",
+                "total_xp": row.total_xp,
+                "current_level": row.current_level,
+                "score": score
             })
         return leaderboard
 
+    @staticmethod
+    async def get_leaderboard(db: AsyncSession, limit: int = 10, board: str = GLOBAL, tenant_id=None) -> List[Dict[str, Any]]:
+        """
+        Get an anonymized leaderboard: "global" and "tenant" rank total XP,
+        "weekly" the XP earned this week (see services/leaderboard_service.py).
+        """
+        top = await leaderboards.top(db, board, limit, tenant_id)
+        return await GamificationService._leaderboard_entries(
+            db, [(i + 1, user_id, score) for i, (user_id, score) in enumerate(top)]
+        )
+
+    @staticmethod
+    async def get_leaderboard_position(db: AsyncSession, user: User, board: str = GLOBAL, radius: int = 2) -> Dict[str, Any]:
+        """The user's rank on a board and the entries ranked around them."""
+        tenant_id = user.tenant_id if board == TENANT else None
+        position = None
+        if board != TENANT or tenant_id is not None:
+            position = await leaderboards.position(db, user.id, board, tenant_id, radius)
+        if position is None:
+            return {"board": board, "rank": None, "score": None, "size": None, "neighbours": []}
+        return {
+            "board": board,
+            "rank": position["rank"],
+            "score": position["score"],
+            "size": position["size"],
+            "neighbours": await GamificationService._leaderboard_entries(db, position["neighbours"])
+        }
+
     @staticmethod
     async def seed_initial_achievements(db: AsyncSession):
         """Seed the database with initial achievements if they don't exist (Async)."""
@@ -304,6 +265,15 @@ class GamificationService:
                 "category": "awareness",
                 "rarity": "common",
                 "points_reward": 100
+            },
+            {
+                "achievement_id": "MONTHLY_MASTER",
+                "name": "Monthly Master",
+                "description": "Write 30 journal entries within 30 days",
+                "icon": "🏆",
+                "category": "consistency",
+                "rarity": "epic",
+                "points_reward": 500
             }
         ]
         
@@ -315,3 +285,4 @@ class GamificationService:
                 ach = Achievement(**ach_data)
                 db.add(ach)
         await db.commit()
+        achievement_engine.invalidate_definitions()
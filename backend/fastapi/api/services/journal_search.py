@@ -0,0 +1,399 @@
+"""
+Blind full-text index for journal entries.
+
+``JournalEntry.content`` is stored encrypted, so substring matching in SQL
+(``content ILIKE '%q%'``) both scans every row of the user's journal and
+cannot match encrypted rows at all. Entries are instead indexed when they
+are written, but never with their words: each normalized word (NFKC,
+case-folded) is replaced by keyed HMAC tokens of its prefixes, three
+characters up to ``MAX_PREFIX``, so a query word matches the words it
+starts. The HMAC key is derived from the owner's DEK; without the DEK the
+index is a bag of opaque per-user tokens, and deleting the user's key
+leaves it unsearchable. Token frequencies within one user's journal remain
+visible, as with any deterministic index.
+
+* PostgreSQL: ``journal_search_tokens`` holds a ``tsvector`` of the tokens
+  per entry behind a GIN index; queries AND the query tokens with
+  ``plainto_tsquery('simple', ...)`` and rank with ``ts_rank``.
+* SQLite: ``journal_search_tokens_fts`` is an FTS5 table keyed by entry id
+  (contentless where the SQLite build supports deletes on contentless
+  tables). An ``owner`` token column scopes every MATCH to one user inside
+  the index itself; queries rank with ``bm25`` over the body.
+* Any other dialect falls back to the previous ILIKE filter.
+
+Indexing and searching need the owner's DEK in context (``current_dek``);
+without one the text is left out of the index and text queries match
+nothing. ``ensure_schema`` drops the plaintext tables of the first version
+of this index (``journal_search_documents`` / ``journal_search_fts``).
+
+Tags and detected emotions are normalized into ``journal_entry_tags`` and
+``journal_entry_emotions`` so tag / emotion filters are index lookups
+rather than LIKE scans over JSON strings. Both are stored in the clear in
+``journal_entries`` already.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import re
+import sqlite3
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, delete, false, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from ..models import JournalEntry, JournalEntryEmotion, JournalEntryTag, UserEncryptionKey
+from ..utils.encrypted_type import current_dek
+from .encryption_service import EncryptionService
+
+logger = logging.getLogger(__name__)
+
+PG_DOCUMENTS_TABLE = "journal_search_tokens"
+SQLITE_FTS_TABLE = "journal_search_tokens_fts"
+# Plaintext tables of the first index version, dropped by ensure_schema
+LEGACY_TABLES = {"postgresql": "journal_search_documents", "sqlite": "journal_search_fts"}
+TEXT_SEARCH_CONFIG = "simple"
+
+MAX_QUERY_LENGTH = 500
+MAX_QUERY_TERMS = 16
+MIN_PREFIX = 3
+MAX_PREFIX = 12
+TOKEN_BYTES = 12
+SEARCH_KEY_INFO = b"soulsense/journal-search/v1"
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+# Tokens are spelled with the letters a-p so every text search parser keeps them whole
+_TOKEN_ALPHABET = str.maketrans("0123456789abcdef", "abcdefghijklmnop")
+
+# contentless_delete=1 needs SQLite 3.43+; older builds keep a copy of the text
+_SQLITE_CONTENTLESS = sqlite3.sqlite_version_info >= (3, 43, 0)
+# CTE materialization hints need SQLite 3.35+
+_SQLITE_CTE_PREFIX = ("MATERIALIZED",) if sqlite3.sqlite_version_info >= (3, 35, 0) else ()
+
+_PG_SCHEMA = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {PG_DOCUMENTS_TABLE} (
+        entry_id INTEGER PRIMARY KEY REFERENCES journal_entries(id) ON DELETE CASCADE,
+        user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{PG_DOCUMENTS_TABLE}_document ON {PG_DOCUMENTS_TABLE} USING GIN (document)",
+    f"CREATE INDEX IF NOT EXISTS idx_{PG_DOCUMENTS_TABLE}_user ON {PG_DOCUMENTS_TABLE} (user_id)",
+)
+
+_SQLITE_SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+    "owner, body, tokenize='unicode61'"
+    + (", content='', contentless_delete=1" if _SQLITE_CONTENTLESS else "")
+    + ")",
+)
+
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    """Lower-case, trim and de-duplicate tags (order preserved)."""
+    seen = {}
+    for tag in tags or ():
+        if isinstance(tag, str):
+            value = tag.strip().lower()[:200]
+            if value:
+                seen.setdefault(value, None)
+    return list(seen)
+
+
+def _load_json_list(raw: Optional[str]) -> List[str]:
+    if not raw:
+        return []
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+    return value if isinstance(value, list) else []
+
+
+def _fts5_owner(user_id: int) -> str:
+    return f"u{user_id}"
+
+
+def search_key(dek: bytes) -> bytes:
+    """The per-user HMAC key of the blind index, derived from the user's DEK."""
+    return hmac.new(dek, SEARCH_KEY_INFO, hashlib.sha256).digest()
+
+
+def _context_search_key() -> Optional[bytes]:
+    dek = current_dek.get()
+    return search_key(dek) if dek else None
+
+
+def normalize_terms(text: str) -> List[str]:
+    """Words of ``text``, NFKC-normalized and case-folded."""
+    return _TERM_RE.findall(unicodedata.normalize("NFKC", text).casefold())
+
+
+def _blind(key: bytes, term: str) -> str:
+    digest = hmac.new(key, term.encode("utf-8"), hashlib.sha256).digest()[:TOKEN_BYTES]
+    return digest.hex().translate(_TOKEN_ALPHABET)
+
+
+def index_tokens(text: str, key: bytes) -> List[str]:
+    """
+    Blind tokens for a document: one per prefix of each word from
+    ``MIN_PREFIX`` to ``MAX_PREFIX`` characters; shorter words as a whole.
+    """
+    tokens = []
+    for term in normalize_terms(text):
+        if len(term) < MIN_PREFIX:
+            tokens.append(_blind(key, term))
+        else:
+            tokens.extend(_blind(key, term[:size]) for size in range(MIN_PREFIX, min(len(term), MAX_PREFIX) + 1))
+    return tokens
+
+
+def query_tokens(query: str, key: bytes) -> List[str]:
+    """
+    Blind tokens for a query, one per distinct word: a word matches the
+    indexed words it starts (words under ``MIN_PREFIX`` characters match
+    whole words only).
+    """
+    terms = normalize_terms(query[:MAX_QUERY_LENGTH])[:MAX_QUERY_TERMS]
+    return list(dict.fromkeys(_blind(key, term[:MAX_PREFIX]) for term in terms))
+
+
+def fts5_match_expression(tokens: Iterable[str]) -> Optional[str]:
+    """
+    Quote blind tokens into an FTS5 MATCH expression that ANDs them.
+
+    Tokens only ever contain the letters a-p, so the expression cannot carry
+    FTS5 operators or column filters.
+    """
+    tokens = list(tokens)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"' for token in tokens)
+
+
+async def _user_dek(db: AsyncSession, user_id: int) -> Optional[bytes]:
+    wrapped = await db.scalar(select(UserEncryptionKey.wrapped_dek).where(UserEncryptionKey.user_id == user_id))
+    return EncryptionService.unwrap_dek(wrapped) if wrapped else None
+
+
+class JournalSearchIndex:
+    """Maintains and queries the dialect-specific journal search structures."""
+
+    @staticmethod
+    def dialect_of(db) -> str:
+        return db.get_bind().dialect.name
+
+    @staticmethod
+    async def ensure_schema(conn: AsyncConnection) -> None:
+        """Create the dialect-specific full-text structures (idempotent)."""
+        dialect = conn.dialect.name
+        if dialect in LEGACY_TABLES:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {LEGACY_TABLES[dialect]}"))
+        statements = _PG_SCHEMA if dialect == "postgresql" else _SQLITE_SCHEMA if dialect == "sqlite" else ()
+        for statement in statements:
+            await conn.execute(text(statement))
+
+    @staticmethod
+    async def index_entry(
+        db: AsyncSession,
+        entry_id: int,
+        user_id: int,
+        title: Optional[str] = None,
+        content: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+        emotions: Optional[Iterable[str]] = None,
+        key: Optional[bytes] = None,
+    ) -> None:
+        """
+        (Re)index one entry inside the caller's transaction.
+
+        ``content`` must be plaintext; it is tokenized with ``key``, by
+        default the one derived from the DEK in context. Without a key the
+        entry's text is dropped from the index rather than left stale.
+        ``tags`` / ``emotions`` of None leave the stored rows untouched;
+        pass an empty list to clear them.
+        """
+        dialect = JournalSearchIndex.dialect_of(db)
+
+        if content is not None or title is not None:
+            key = key or _context_search_key()
+            if key is None:
+                logger.warning(f"No DEK in context; journal entry {entry_id} is left out of the search index")
+                await JournalSearchIndex._remove_document(db, dialect, entry_id)
+            else:
+                body = " ".join(index_tokens(" ".join(part for part in (title, content) if part), key))
+                if dialect == "postgresql":
+                    await db.execute(
+                        text(
+                            f"INSERT INTO {PG_DOCUMENTS_TABLE} (entry_id, user_id, document) "
+                            f"VALUES (:entry_id, :user_id, to_tsvector('{TEXT_SEARCH_CONFIG}', :body)) "
+                            "ON CONFLICT (entry_id) DO UPDATE SET document = EXCLUDED.document"
+                        ),
+                        {"entry_id": entry_id, "user_id": user_id, "body": body},
+                    )
+                elif dialect == "sqlite":
+                    await JournalSearchIndex._remove_document(db, dialect, entry_id)
+                    await db.execute(
+                        text(f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, owner, body) VALUES (:entry_id, :owner, :body)"),
+                        {"entry_id": entry_id, "owner": _fts5_owner(user_id), "body": body},
+                    )
+
+        if tags is not None:
+            await db.execute(delete(JournalEntryTag).where(JournalEntryTag.entry_id == entry_id))
+            rows = [{"entry_id": entry_id, "user_id": user_id, "tag": tag} for tag in normalize_tags(tags)]
+            if rows:
+                await db.execute(insert(JournalEntryTag), rows)
+
+        if emotions is not None:
+            await db.execute(delete(JournalEntryEmotion).where(JournalEntryEmotion.entry_id == entry_id))
+            rows = [{"entry_id": entry_id, "user_id": user_id, "emotion": e} for e in normalize_tags(emotions)]
+            if rows:
+                await db.execute(insert(JournalEntryEmotion), rows)
+
+    @staticmethod
+    async def index_journal_entry(db: AsyncSession, entry: JournalEntry, content: Optional[str] = None) -> None:
+        """Index an ORM entry; ``content`` overrides the attribute (pass plaintext)."""
+        await JournalSearchIndex.index_entry(
+            db,
+            entry_id=entry.id,
+            user_id=entry.user_id,
+            title=entry.title,
+            content=content if content is not None else entry.content,
+            tags=_load_json_list(entry.tags),
+            emotions=_load_json_list(entry.emotional_patterns),
+        )
+
+    @staticmethod
+    async def _remove_document(db: AsyncSession, dialect: str, entry_id: int) -> None:
+        if dialect == "postgresql":
+            await db.execute(text(f"DELETE FROM {PG_DOCUMENTS_TABLE} WHERE entry_id = :entry_id"), {"entry_id": entry_id})
+        elif dialect == "sqlite":
+            await db.execute(text(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = :entry_id"), {"entry_id": entry_id})
+
+    @staticmethod
+    async def remove_entry(db: AsyncSession, entry_id: int) -> None:
+        """Drop an entry from every search structure."""
+        await JournalSearchIndex._remove_document(db, JournalSearchIndex.dialect_of(db), entry_id)
+        await db.execute(delete(JournalEntryTag).where(JournalEntryTag.entry_id == entry_id))
+        await db.execute(delete(JournalEntryEmotion).where(JournalEntryEmotion.entry_id == entry_id))
+
+    @staticmethod
+    async def remove_user(db: AsyncSession, user_id: int) -> None:
+        """Drop every index row of a user, for hard deletes (the FTS5 table has no foreign keys)."""
+        dialect = JournalSearchIndex.dialect_of(db)
+        if dialect == "postgresql":
+            await db.execute(text(f"DELETE FROM {PG_DOCUMENTS_TABLE} WHERE user_id = :user_id"), {"user_id": user_id})
+        elif dialect == "sqlite":
+            # Contentless tables read back NULL columns, so select the rows through the index
+            await db.execute(
+                text(
+                    f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid IN "
+                    f"(SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH :match)"
+                ),
+                {"match": f'owner:"{_fts5_owner(user_id)}"'},
+            )
+        await db.execute(delete(JournalEntryTag).where(JournalEntryTag.user_id == user_id))
+        await db.execute(delete(JournalEntryEmotion).where(JournalEntryEmotion.user_id == user_id))
+
+    @staticmethod
+    def apply_text_search(stmt, dialect: str, user_id: int, query: str, key: Optional[bytes] = None):
+        """
+        Restrict ``stmt`` (a SELECT over JournalEntry) to entries matching
+        ``query``. Returns ``(stmt, rank)`` where ``rank`` is a column to
+        order by descending, or None when the dialect has no index.
+        ``key`` defaults to the one derived from the DEK in context.
+        """
+        query = query[:MAX_QUERY_LENGTH]
+
+        if dialect in ("postgresql", "sqlite"):
+            key = key or _context_search_key()
+            tokens = query_tokens(query, key) if key is not None else []
+            if not tokens:
+                return stmt.where(false()), None
+
+        if dialect == "postgresql":
+            docs = text(
+                f"SELECT entry_id, ts_rank(document, tsq) AS rank "
+                f"FROM {PG_DOCUMENTS_TABLE}, plainto_tsquery('{TEXT_SEARCH_CONFIG}', :q) AS tsq "
+                "WHERE user_id = :uid AND document @@ tsq"
+            ).bindparams(q=" ".join(tokens), uid=user_id).columns(entry_id=Integer, rank=Float).subquery("search_hits")
+            return stmt.join(docs, docs.c.entry_id == JournalEntry.id), docs.c.rank
+
+        if dialect == "sqlite":
+            hits = text(
+                f"SELECT rowid AS entry_id, -bm25({SQLITE_FTS_TABLE}, 0.0, 1.0) AS rank "
+                f"FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH :match"
+            ).bindparams(match=f'owner:"{_fts5_owner(user_id)}" AND body:({fts5_match_expression(tokens)})').columns(
+                entry_id=Integer, rank=Float
+            ).cte("search_hits").prefix_with(*_SQLITE_CTE_PREFIX)  # run the MATCH once, not per candidate row
+            return stmt.join(hits, hits.c.entry_id == JournalEntry.id), hits.c.rank
+
+        return stmt.where(JournalEntry.content.ilike(f"%{query}%")), None
+
+    @staticmethod
+    def tag_filter(user_id: int, tags: Iterable[str]):
+        """``JournalEntry.id IN (...)`` for entries carrying any of ``tags``."""
+        return JournalEntry.id.in_(
+            select(JournalEntryTag.entry_id).where(
+                JournalEntryTag.user_id == user_id,
+                JournalEntryTag.tag.in_(normalize_tags(tags)),
+            )
+        )
+
+    @staticmethod
+    def emotion_filter(user_id: int, emotions: Iterable[str]):
+        """``JournalEntry.id IN (...)`` for entries showing any of ``emotions``."""
+        return JournalEntry.id.in_(
+            select(JournalEntryEmotion.entry_id).where(
+                JournalEntryEmotion.user_id == user_id,
+                JournalEntryEmotion.emotion.in_(normalize_tags(emotions)),
+            )
+        )
+
+    @staticmethod
+    async def backfill(db: AsyncSession, batch_size: int = 500) -> int:
+        """
+        Index every live entry; safe to re-run.
+
+        Runs outside any request, so each owner's DEK is unwrapped from
+        ``user_encryption_keys`` to decrypt the content and key the tokens.
+        Entries of users without a DEK get tags and emotions only.
+        """
+        search_keys: Dict[int, Optional[Tuple[bytes, bytes]]] = {}  # user_id -> (DEK, search key)
+        indexed = 0
+        last_id = 0
+        while True:
+            rows = (await db.execute(
+                text(
+                    "SELECT id, user_id, title, content, tags, emotional_patterns FROM journal_entries "
+                    "WHERE id > :last_id AND is_deleted = :deleted ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "deleted": False, "limit": batch_size},
+            )).all()
+            if not rows:
+                break
+            for row in rows:
+                if row.user_id not in search_keys:
+                    dek = await _user_dek(db, row.user_id)
+                    search_keys[row.user_id] = (dek, search_key(dek)) if dek else None
+                owner_keys = search_keys[row.user_id]
+                content = None
+                if owner_keys is not None and row.content:
+                    content = EncryptionService.decrypt_data(row.content, owner_keys[0], log_audit=False)
+                    if content == "<DECRYPTION_FAILED>":
+                        content = None
+                await JournalSearchIndex.index_entry(
+                    db,
+                    entry_id=row.id,
+                    user_id=row.user_id,
+                    title=row.title if content is not None else None,
+                    content=content,
+                    tags=_load_json_list(row.tags),
+                    emotions=_load_json_list(row.emotional_patterns),
+                    key=owner_keys[1] if owner_keys is not None else None,
+                )
+            indexed += len(rows)
+            last_id = rows[-1].id
+            await db.commit()
+        return indexed
@@ -23,6 +23,8 @@ from fastapi import HTTPException, status
 # Import models from models module
 from ..models import JournalEntry, User
 from .gamification_service import GamificationService
+from .journal_search import JournalSearchIndex
+from .journal_stats import JournalStatsService
 from ..utils.cache import cache_manager
 try:
     from ..celery_tasks import generate_journal_embedding_task
@@ -200,6 +202,10 @@ class JournalService:
         self.db.add(entry)
         await self.db.flush()  # Assigns entry.id without committing
 
+        # Full-text / tag index rows are written from the plaintext in the same transaction
+        await JournalSearchIndex.index_journal_entry(self.db, entry, content=content)
+        await JournalStatsService.record_change(self.db, u_id, None, JournalStatsService.snapshot(entry))
+
         # Step 2: Write outbox event in the SAME transaction so they commit atomically.
         import uuid as _uuid
         from ..models import OutboxEvent
@@ -246,9 +252,6 @@ class JournalService:
 
         # Trigger Gamification Post-Commit
         try:
-            await GamificationService.award_xp(self.db, current_user.id, 50, "Journal entry")
-            await GamificationService.update_streak(self.db, current_user.id, "journal")
-            await GamificationService.check_achievements(self.db, current_user.id, "journal")
             await GamificationService.award_xp(self.db, u_id, 50, "Journal entry")
             await GamificationService.update_streak(self.db, u_id, "journal")
             await GamificationService.check_achievements(self.db, u_id, "journal")
@@ -411,6 +414,7 @@ class JournalService:
     ) -> JournalEntry:
         """Update a journal entry."""
         entry = await self.get_entry_by_id(entry_id, current_user)
+        stats_before = JournalStatsService.snapshot(entry)
         
         if content is not None:
             entry.content = content
@@ -431,6 +435,20 @@ class JournalService:
         entry.updated_at = datetime.now(UTC).isoformat()
         
         try:
+            # Only reindex the text from plaintext we were given; the loaded
+            # attribute may be a masked placeholder without a DEK context.
+            await JournalSearchIndex.index_entry(
+                self.db,
+                entry_id=entry.id,
+                user_id=entry.user_id,
+                title=entry.title if content is not None else None,
+                content=content,
+                tags=tags,
+                emotions=self._load_tags(entry.emotional_patterns) if content is not None else None,
+            )
+            await JournalStatsService.record_change(
+                self.db, entry.user_id, stats_before, JournalStatsService.snapshot(entry)
+            )
             await self.db.commit()
             await self.db.refresh(entry)
             
@@ -445,9 +463,12 @@ class JournalService:
     async def delete_entry(self, entry_id: int, current_user: User) -> bool:
         """Soft delete a journal entry."""
         entry = await self.get_entry_by_id(entry_id, current_user)
+        stats_before = JournalStatsService.snapshot(entry)
         
         entry.is_deleted = True
         entry.deleted_at = datetime.now(UTC)
+        await JournalSearchIndex.remove_entry(self.db, entry.id)
+        await JournalStatsService.record_change(self.db, entry.user_id, stats_before, None)
         
         # Outbox Pattern: Write delete event in same transaction as the soft-delete (#1176).
         # entry.id is set (fetched from DB), so no flush needed.
@@ -465,6 +486,10 @@ class JournalService:
         ))
         
         await self.db.commit()
+
+        # This host's local ANN shard; searches elsewhere skip and tombstone the entry
+        from .semantic_search_service import SemanticSearchService
+        SemanticSearchService.remove_from_local_index(entry.user_id, [entry.id])
         return True
 
     async def search_entries(
@@ -488,44 +513,44 @@ class JournalService:
         min_sleep_quality: Optional[int] = None,
         max_sleep_quality: Optional[int] = None,
         skip: int = 0,
-        limit: int = 20
+        limit: int = 20,
+        count_cap: Optional[int] = None
     ) -> Tuple[List[JournalEntry], int]:
         """
         Advanced emotion filtering with multiple dimensions (Issue #1325).
         Supports simultaneous filtering across date, emotion type, intensity ranges.
+
+        Text queries go through the full-text index and results are ranked
+        by relevance. With ``count_cap`` the returned total stops at that
+        value instead of counting every match.
         """
         limit = min(limit, 100)
+        user_id = current_user.id
         
         # Base filter: current user, not deleted
         stmt = select(JournalEntry).filter(
-            JournalEntry.user_id == current_user.id,
+            JournalEntry.user_id == user_id,
             JournalEntry.is_deleted == False
         )
 
-        # Text search
+        # Full-text search (tsvector / FTS5 by dialect)
+        rank = None
         if query:
-            safe_query = query[:500]
-            stmt = stmt.filter(JournalEntry.content.ilike(f"%{safe_query}%"))
+            stmt, rank = JournalSearchIndex.apply_text_search(
+                stmt, JournalSearchIndex.dialect_of(self.db), user_id, query
+            )
 
         # Tag filtering (OR logic - matches any tag)
         if tags:
-            tag_conditions = [
-                JournalEntry.tags.ilike(f"%{tag[:200]}%") 
-                for tag in tags
-            ]
-            stmt = stmt.filter(or_(*tag_conditions))
+            stmt = stmt.filter(JournalSearchIndex.tag_filter(user_id, tags))
         
         # Category filtering
         if category:
             stmt = stmt.filter(JournalEntry.category == category)
         
-        # Emotion type filtering (JSON pattern matching)
+        # Emotion type filtering (OR logic - matches any emotion)
         if emotion_types:
-            emotion_conditions = [
-                JournalEntry.emotional_patterns.ilike(f"%{emotion}%")
-                for emotion in emotion_types
-            ]
-            stmt = stmt.filter(or_(*emotion_conditions))
+            stmt = stmt.filter(JournalSearchIndex.emotion_filter(user_id, emotion_types))
         
         # Date range filtering
         if start_date:
@@ -574,15 +599,34 @@ class JournalService:
         if max_sleep_quality is not None:
             stmt = stmt.filter(JournalEntry.sleep_quality <= max_sleep_quality)
         
-        # Count total matching entries
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        count_result = await self.db.execute(count_stmt)
-        total = count_result.scalar() or 0
-        
-        # Paginate and sort
-        stmt = stmt.order_by(JournalEntry.entry_date.desc()).offset(skip).limit(limit)
-        result = await self.db.execute(stmt)
-        entries = list(result.scalars().all())
+        # Paginate and sort (most relevant first for text queries)
+        order_by = [JournalEntry.entry_date.desc()]
+        if rank is not None:
+            order_by.insert(0, rank.desc())
+        page_stmt = stmt.order_by(*order_by).offset(skip).limit(limit)
+
+        if count_cap:
+            # Capped count: stop counting once count_cap matches are seen
+            capped = stmt.with_only_columns(JournalEntry.id).limit(count_cap)
+            count_result = await self.db.execute(select(func.count()).select_from(capped.subquery()))
+            total = count_result.scalar() or 0
+            result = await self.db.execute(page_stmt)
+            entries = list(result.scalars().all())
+        else:
+            # Exact count computed alongside the page in a single query
+            result = await self.db.execute(page_stmt.add_columns(func.count().over().label("total_count")))
+            rows = result.all()
+            entries = [row[0] for row in rows]
+            if rows:
+                total = rows[0].total_count
+            elif skip:
+                # Past the last page: the window has no rows to report on
+                count_result = await self.db.execute(
+                    select(func.count()).select_from(stmt.with_only_columns(JournalEntry.id).subquery())
+                )
+                total = count_result.scalar() or 0
+            else:
+                total = 0
         
         # Attach dynamic fields
         for entry in entries:
@@ -595,122 +639,8 @@ class JournalService:
 
     @cache_manager.cache(ttl=300, prefix="journal_analytics")
     async def get_analytics(self, current_user: User) -> dict:
-        """Get analytics (Async)."""
-        """Get journal analytics."""
-        
-        base_filter = and_(
-            JournalEntry.user_id == current_user.id,
-            JournalEntry.is_deleted == False
-        )
-        
-        stmt = select(
-            func.count(JournalEntry.id).label('total'),
-            func.avg(JournalEntry.sentiment_score).label('avg_sentiment'),
-            func.avg(JournalEntry.stress_level).label('avg_stress'),
-            func.avg(JournalEntry.sleep_quality).label('avg_sleep')
-        ).filter(base_filter)
-        
-        result = await self.db.execute(stmt)
-        stats = result.first()
-        
-        total_entries = stats.total or 0
-        avg_sentiment = stats.avg_sentiment or 50.0
-        avg_stress = stats.avg_stress
-        avg_sleep = stats.avg_sleep
-
-        if total_entries == 0:
-             return {
-                "total_entries": 0, "average_sentiment": 50.0, "sentiment_trend": "stable",
-                "most_common_tags": [], "average_stress_level": None, "average_sleep_quality": None,
-                "entries_this_week": 0, "entries_this_month": 0
-            }
-
-        now = datetime.utcnow()
-        week_ago = (now - timedelta(days=7)).strftime("%Y-%m-%d")
-        two_weeks_ago = (now - timedelta(days=14)).strftime("%Y-%m-%d")
-
-        recent_stmt = select(func.avg(JournalEntry.sentiment_score)).filter(
-            JournalEntry.user_id == current_user.id,
-            JournalEntry.is_deleted == False,
-            JournalEntry.entry_date >= week_ago
-        )
-        recent_avg = (await self.db.execute(recent_stmt)).scalar() or 50.0
-            
-        older_stmt = select(func.avg(JournalEntry.sentiment_score)).filter(
-            JournalEntry.user_id == current_user.id,
-            JournalEntry.is_deleted == False,
-            JournalEntry.entry_date >= two_weeks_ago,
-            JournalEntry.entry_date < week_ago
-        )
-        older_avg = (await self.db.execute(older_stmt)).scalar() or 50.0
-        
-        trend = "improving" if recent_avg > older_avg + 5 else "declining" if recent_avg < older_avg - 5 else "stable"
-
-        month_ago = (now - timedelta(days=30)).strftime("%Y-%m-%d")
-        
-        week_count = (await self.db.execute(select(func.count(JournalEntry.id)).filter(
-            JournalEntry.user_id == current_user.id, JournalEntry.is_deleted == False, JournalEntry.entry_date >= week_ago
-        ))).scalar() or 0
-            
-        month_count = (await self.db.execute(select(func.count(JournalEntry.id)).filter(
-            JournalEntry.user_id == current_user.id, JournalEntry.is_deleted == False, JournalEntry.entry_date >= month_ago
-        ))).scalar() or 0
-
-        tag_entries = (await self.db.execute(select(JournalEntry.tags).filter(
-            JournalEntry.user_id == current_user.id, JournalEntry.is_deleted == False
-        ))).all()
-        now = datetime.now(UTC)
-        week_ago_date = (now - timedelta(days=7)).strftime("%Y-%m-%d")
-        two_weeks_ago_date = (now - timedelta(days=14)).strftime("%Y-%m-%d")
-
-        recent_avg_stmt = select(func.avg(JournalEntry.sentiment_score))\
-            .filter(base_filter, JournalEntry.entry_date >= week_ago_date)
-        recent_avg = (await self.db.execute(recent_avg_stmt)).scalar() or 50.0
-            
-        older_avg_stmt = select(func.avg(JournalEntry.sentiment_score))\
-            .filter(base_filter, 
-                   JournalEntry.entry_date >= two_weeks_ago_date,
-                   JournalEntry.entry_date < week_ago_date)
-        older_avg = (await self.db.execute(older_avg_stmt)).scalar() or 50.0
-        
-        if recent_avg > older_avg + 5:
-            trend = "improving"
-        elif recent_avg < older_avg - 5:
-            trend = "declining"
-        else:
-            trend = "stable"
-
-        month_ago_date = (now - timedelta(days=30)).strftime("%Y-%m-%d")
-        
-        week_count_stmt = select(func.count(JournalEntry.id))\
-            .filter(base_filter, JournalEntry.entry_date >= week_ago_date)
-        entries_this_week = (await self.db.execute(week_count_stmt)).scalar() or 0
-            
-        month_count_stmt = select(func.count(JournalEntry.id))\
-            .filter(base_filter, JournalEntry.entry_date >= month_ago_date)
-        entries_this_month = (await self.db.execute(month_count_stmt)).scalar() or 0
-
-        tag_stmt = select(JournalEntry.tags).filter(base_filter)
-        tag_entries = (await self.db.execute(tag_stmt)).all()
-        
-        all_tags = []
-        for (t_str,) in tag_entries:
-             all_tags.extend(self._load_tags(t_str))
-             
-        from collections import Counter
-        tag_counts = Counter(all_tags)
-        most_common = [t for t, c in tag_counts.most_common(5)]
-        
-        return {
-            "total_entries": total_entries,
-            "average_sentiment": round(float(avg_sentiment), 2),
-            "sentiment_trend": trend,
-            "most_common_tags": most_common,
-            "average_stress_level": round(float(avg_stress), 1) if avg_stress else None,
-            "average_sleep_quality": round(float(avg_sleep), 1) if avg_sleep else None,
-            "entries_this_week": entries_this_week,
-            "entries_this_month": entries_this_month
-        }
+        """Get journal analytics from the incrementally maintained per-user aggregates."""
+        return await JournalStatsService.get_analytics(self.db, current_user.id)
 
     async def get_filter_options(self, current_user: User) -> dict:
         """
@@ -0,0 +1,278 @@
+"""
+Incrementally maintained journal analytics.
+
+``JournalService.get_analytics`` used to aggregate a user's whole journal on
+every call (about ten sequential queries plus loading every ``tags`` string
+into Python). Instead, each entry write applies its delta to three small
+tables:
+
+* ``journal_user_stats``       — totals (entry count, sentiment / stress /
+                                 sleep-quality sums and non-null counts)
+* ``journal_user_daily_stats`` — entry count and sentiment per day, so the
+                                 7/14/30-day windows read at most ~31 rows
+* ``journal_user_tag_stats``   — tag frequencies
+
+Reading analytics is then one conditional-aggregate query over the totals
+row and the last month of daily rows, plus a top-N tag lookup, independent
+of how many entries the user has. A user without a totals row (written
+before this existed) is rebuilt from ``journal_entries`` on first touch.
+
+Deltas and rebuilds for one user both start by locking that user's ``users``
+row, so a rebuild never recomputes while another transaction's delta is in
+flight and then overwrites it.
+"""
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import JournalEntry, JournalUserDailyStats, JournalUserStats, JournalUserTagStats, User
+from ..utils.upsert import bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+UTC = timezone.utc
+TOP_TAGS = 5
+# Mirrors the neutral default the analytics endpoint has always reported
+NEUTRAL_SENTIMENT = 50.0
+
+
+def _load_tags(raw: Optional[str]) -> List[str]:
+    if not raw:
+        return []
+    try:
+        tags = json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+    return [tag[:200] for tag in tags if isinstance(tag, str)] if isinstance(tags, list) else []
+
+
+class JournalStatsService:
+    """Maintains and reads the per-user journal aggregates."""
+
+    @staticmethod
+    def snapshot(entry: JournalEntry) -> Optional[Dict]:
+        """What ``entry`` currently contributes to the aggregates (None once deleted)."""
+        if entry.is_deleted:
+            return None
+        return {
+            "day": (entry.entry_date or "")[:10] or None,
+            "sentiment": entry.sentiment_score,
+            "stress": entry.stress_level,
+            "sleep_quality": entry.sleep_quality,
+            "tags": _load_tags(entry.tags),
+        }
+
+    @staticmethod
+    async def record_change(db: AsyncSession, user_id: int, before: Optional[Dict], after: Optional[Dict]) -> None:
+        """
+        Apply the difference between two snapshots of one entry inside the
+        caller's transaction. Use ``before=None`` for a new entry and
+        ``after=None`` for a deletion.
+        """
+        if before == after:
+            return
+
+        await JournalStatsService._lock_user(db, user_id)
+        exists = (await db.execute(
+            select(JournalUserStats.user_id).where(JournalUserStats.user_id == user_id)
+        )).scalar_one_or_none()
+        if exists is None:
+            await db.flush()
+            await JournalStatsService.rebuild_user(db, user_id)
+            return
+
+        totals = Counter()
+        days: Dict[str, Counter] = {}
+        tags = Counter()
+        for snap, sign in ((before, -1), (after, 1)):
+            if snap is None:
+                continue
+            totals["entry_count"] += sign
+            for field in ("sentiment", "stress", "sleep_quality"):
+                if snap[field] is not None:
+                    totals[f"{field}_sum"] += sign * snap[field]
+                    totals[f"{field}_count"] += sign
+            if snap["day"]:
+                day = days.setdefault(snap["day"], Counter())
+                day["entry_count"] += sign
+                if snap["sentiment"] is not None:
+                    day["sentiment_sum"] += sign * snap["sentiment"]
+                    day["sentiment_count"] += sign
+            for tag in snap["tags"]:
+                tags[tag] += sign
+
+        totals = {k: v for k, v in totals.items() if v}
+        if totals:
+            await db.execute(
+                update(JournalUserStats)
+                .where(JournalUserStats.user_id == user_id)
+                .values({k: getattr(JournalUserStats, k) + v for k, v in totals.items()})
+            )
+        for day, deltas in days.items():
+            deltas = {k: v for k, v in deltas.items() if v}
+            if deltas:
+                await JournalStatsService._increment(
+                    db, JournalUserDailyStats, {"user_id": user_id, "day": day}, deltas
+                )
+        for tag, delta in tags.items():
+            if delta:
+                await JournalStatsService._increment(
+                    db, JournalUserTagStats, {"user_id": user_id, "tag": tag}, {"entry_count": delta}
+                )
+
+        if any(v < 0 for v in tags.values()):
+            await db.execute(delete(JournalUserTagStats).where(
+                JournalUserTagStats.user_id == user_id, JournalUserTagStats.entry_count <= 0
+            ))
+        if any(d["entry_count"] < 0 for d in days.values()):
+            await db.execute(delete(JournalUserDailyStats).where(
+                JournalUserDailyStats.user_id == user_id, JournalUserDailyStats.entry_count <= 0
+            ))
+
+    @staticmethod
+    async def _increment(db: AsyncSession, model, keys: Dict, deltas: Dict) -> None:
+        await bulk_upsert(db, model, list(keys), [{**keys, **deltas}], increment=list(deltas))
+
+    @staticmethod
+    async def _lock_user(db: AsyncSession, user_id: int) -> None:
+        """Serialize aggregate writers for one user until the caller's transaction ends."""
+        await db.execute(select(User.id).where(User.id == user_id).with_for_update())
+
+    @staticmethod
+    async def rebuild_user(db: AsyncSession, user_id: int) -> None:
+        """
+        Recompute a user's aggregates from ``journal_entries`` (idempotent).
+
+        Takes the user's row lock first, so entries whose deltas were in
+        flight are committed (and counted) before the recompute reads them,
+        and later deltas apply on top of the rebuilt rows. Rows are still
+        upserted for databases without row locks.
+        """
+        await JournalStatsService._lock_user(db, user_id)
+        live = and_(JournalEntry.user_id == user_id, JournalEntry.is_deleted == False)  # noqa: E712
+
+        for model in (JournalUserStats, JournalUserDailyStats, JournalUserTagStats):
+            await db.execute(delete(model).where(model.user_id == user_id))
+
+        totals = (await db.execute(select(
+            func.count(JournalEntry.id).label("entry_count"),
+            func.coalesce(func.sum(JournalEntry.sentiment_score), 0.0).label("sentiment_sum"),
+            func.count(JournalEntry.sentiment_score).label("sentiment_count"),
+            func.coalesce(func.sum(JournalEntry.stress_level), 0).label("stress_sum"),
+            func.count(JournalEntry.stress_level).label("stress_count"),
+            func.coalesce(func.sum(JournalEntry.sleep_quality), 0).label("sleep_quality_sum"),
+            func.count(JournalEntry.sleep_quality).label("sleep_quality_count"),
+        ).where(live))).one()
+        await bulk_upsert(db, JournalUserStats, ["user_id"], [{"user_id": user_id, **totals._asdict()}])
+
+        day = func.substr(JournalEntry.entry_date, 1, 10)
+        daily = (await db.execute(
+            select(
+                day.label("day"),
+                func.count(JournalEntry.id).label("entry_count"),
+                func.coalesce(func.sum(JournalEntry.sentiment_score), 0.0).label("sentiment_sum"),
+                func.count(JournalEntry.sentiment_score).label("sentiment_count"),
+            ).where(live, JournalEntry.entry_date.isnot(None)).group_by(day)
+        )).all()
+        await bulk_upsert(db, JournalUserDailyStats, ["user_id", "day"], [
+            {"user_id": user_id, **row._asdict()} for row in daily
+        ])
+
+        tag_counts = Counter()
+        for (raw,) in (await db.execute(select(JournalEntry.tags).where(live, JournalEntry.tags.isnot(None)))).all():
+            tag_counts.update(_load_tags(raw))
+        await bulk_upsert(db, JournalUserTagStats, ["user_id", "tag"], [
+            {"user_id": user_id, "tag": tag, "entry_count": n} for tag, n in tag_counts.items()
+        ])
+
+    @staticmethod
+    async def rebuild_all(db: AsyncSession) -> int:
+        """Rebuild every user with journal entries; commits per user."""
+        user_ids = (await db.execute(
+            select(JournalEntry.user_id).where(JournalEntry.user_id.isnot(None)).distinct()
+        )).scalars().all()
+        for user_id in user_ids:
+            await JournalStatsService.rebuild_user(db, user_id)
+            await db.commit()
+        return len(user_ids)
+
+    @staticmethod
+    async def get_analytics(db: AsyncSession, user_id: int, now: Optional[datetime] = None) -> Dict:
+        """Journal analytics from the aggregates, rebuilding them first if missing."""
+        now = now or datetime.now(UTC)
+        week_ago = (now - timedelta(days=7)).strftime("%Y-%m-%d")
+        two_weeks_ago = (now - timedelta(days=14)).strftime("%Y-%m-%d")
+        month_ago = (now - timedelta(days=30)).strftime("%Y-%m-%d")
+
+        stats, daily = JournalUserStats, JournalUserDailyStats
+
+        def window_sum(column, *conditions):
+            return func.coalesce(func.sum(case((and_(*conditions), column), else_=0)), 0)
+
+        stmt = (
+            select(
+                stats.entry_count, stats.sentiment_sum, stats.sentiment_count,
+                stats.stress_sum, stats.stress_count, stats.sleep_quality_sum, stats.sleep_quality_count,
+                window_sum(daily.entry_count, daily.day >= week_ago).label("week_count"),
+                window_sum(daily.entry_count, daily.day >= month_ago).label("month_count"),
+                window_sum(daily.sentiment_sum, daily.day >= week_ago).label("recent_sum"),
+                window_sum(daily.sentiment_count, daily.day >= week_ago).label("recent_n"),
+                window_sum(daily.sentiment_sum, daily.day >= two_weeks_ago, daily.day < week_ago).label("older_sum"),
+                window_sum(daily.sentiment_count, daily.day >= two_weeks_ago, daily.day < week_ago).label("older_n"),
+            )
+            .select_from(stats)
+            .outerjoin(daily, and_(daily.user_id == stats.user_id, daily.day >= month_ago))
+            .where(stats.user_id == user_id)
+            .group_by(
+                stats.user_id, stats.entry_count, stats.sentiment_sum, stats.sentiment_count,
+                stats.stress_sum, stats.stress_count, stats.sleep_quality_sum, stats.sleep_quality_count,
+            )
+        )
+        row = (await db.execute(stmt)).one_or_none()
+        if row is None:
+            await JournalStatsService.rebuild_user(db, user_id)
+            await db.commit()
+            row = (await db.execute(stmt)).one()
+
+        if not row.entry_count:
+            return {
+                "total_entries": 0, "average_sentiment": NEUTRAL_SENTIMENT, "sentiment_trend": "stable",
+                "most_common_tags": [], "average_stress_level": None, "average_sleep_quality": None,
+                "entries_this_week": 0, "entries_this_month": 0
+            }
+
+        # A zero average reads as "no signal", as SQL AVG(...) or 50.0 did before
+        recent_avg = (row.recent_sum / row.recent_n if row.recent_n else 0) or NEUTRAL_SENTIMENT
+        older_avg = (row.older_sum / row.older_n if row.older_n else 0) or NEUTRAL_SENTIMENT
+        if recent_avg > older_avg + 5:
+            trend = "improving"
+        elif recent_avg < older_avg - 5:
+            trend = "declining"
+        else:
+            trend = "stable"
+
+        top_tags = (await db.execute(
+            select(JournalUserTagStats.tag)
+            .where(JournalUserTagStats.user_id == user_id)
+            .order_by(JournalUserTagStats.entry_count.desc(), JournalUserTagStats.tag)
+            .limit(TOP_TAGS)
+        )).scalars().all()
+
+        avg_sentiment = (row.sentiment_sum / row.sentiment_count if row.sentiment_count else 0) or NEUTRAL_SENTIMENT
+        avg_stress = row.stress_sum / row.stress_count if row.stress_count else None
+        avg_sleep = row.sleep_quality_sum / row.sleep_quality_count if row.sleep_quality_count else None
+        return {
+            "total_entries": row.entry_count,
+            "average_sentiment": round(float(avg_sentiment), 2),
+            "sentiment_trend": trend,
+            "most_common_tags": list(top_tags),
+            "average_stress_level": round(float(avg_stress), 1) if avg_stress else None,
+            "average_sleep_quality": round(float(avg_sleep), 1) if avg_sleep else None,
+            "entries_this_week": int(row.week_count),
+            "entries_this_month": int(row.month_count)
+        }
@@ -0,0 +1,464 @@
+"""
+Sorted-set XP leaderboards.
+
+``GamificationService.get_leaderboard`` used to join and sort ``user_xp`` on
+every request. The boards are now Redis sorted sets kept up to date as XP is
+awarded:
+
+    leaderboard:global              user_id -> total XP
+    leaderboard:tenant:<tenant_id>  user_id -> total XP of the tenant's users
+    leaderboard:weekly:<YYYY-Www>   user_id -> XP earned in that ISO week (UTC)
+
+* ``record_xp`` runs once ``award_xp`` has committed and updates all of the
+  user's boards in one MULTI: totals with ZADD GT, so late or replayed
+  updates never move a score backwards, and the week's board with ZINCRBY.
+* Top-N, rank-of-user and the neighbourhood around a user are ZREVRANGE /
+  ZREVRANK reads, O(log n + k) whatever the number of users.
+* ``reconcile`` rebuilds the total boards from ``user_xp`` (swapped in with
+  RENAME), drops weekly entries of users without XP since the week began and
+  re-applies awards committed while it ran. ``run_reconciler`` repeats it
+  every ``leaderboard_reconcile_interval_seconds``; a Redis lock keeps it to
+  one worker at a time.
+
+When Redis is unreachable an in-process ``SortedSet`` per board takes over,
+loaded from ``user_xp`` on the first read. Weekly XP has no ledger to reload
+from, so during an outage the weekly board only holds the awards this worker
+has seen. The first read after Redis returns reconciles the total boards.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import redis.asyncio as redis
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings_instance
+from ..models import User, UserXP
+
+UTC = timezone.utc
+logger = logging.getLogger(__name__)
+
+GLOBAL = 'global'
+WEEKLY = 'weekly'
+TENANT = 'tenant'
+BOARDS = (GLOBAL, WEEKLY, TENANT)
+
+# Weekly boards stay readable for a week after they close
+WEEKLY_RETENTION = timedelta(days=14)
+RECONCILE_CHUNK_SIZE = 5000
+RECONCILE_LOCK_SECONDS = 600
+
+# Rank, board size and neighbourhood of one member, read atomically.
+# KEYS[1]: board
+# ARGV[1]: member
+# ARGV[2]: radius
+POSITION_SCRIPT = """
+local rank = redis.call('ZREVRANK', KEYS[1], ARGV[1])
+if not rank then
+    return false
+end
+local start = math.max(0, rank - tonumber(ARGV[2]))
+return {rank, redis.call('ZCARD', KEYS[1]), start,
+        redis.call('ZREVRANGE', KEYS[1], start, rank + tonumber(ARGV[2]), 'WITHSCORES')}
+"""
+
+
+def week_start(at: datetime) -> datetime:
+    """Monday 00:00 of the ISO week holding ``at``, as naive UTC like ``UserXP.last_xp_awarded_at``."""
+    if at.tzinfo:
+        at = at.astimezone(UTC).replace(tzinfo=None)
+    day = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday())
+
+
+def week_label(at: datetime) -> str:
+    year, week, _ = week_start(at).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class SortedSet:
+    """
+    In-process stand-in for a Redis sorted set. Members are kept in a list
+    ordered by (score, member) as Redis orders them, so ranks are bisects and
+    ranges are slices; an update shifts the list instead of rebalancing.
+    """
+
+    def __init__(self, scores: Optional[Dict[str, int]] = None):
+        self._scores: Dict[str, int] = dict(scores or {})
+        self._order: List[Tuple[int, str]] = sorted((score, member) for member, score in self._scores.items())
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self):
+        return iter(list(self._scores))
+
+    def score(self, member: str) -> Optional[int]:
+        return self._scores.get(member)
+
+    def add(self, member: str, score: int, gt: bool = False) -> None:
+        current = self._scores.get(member)
+        if current is not None:
+            if score == current or (gt and score < current):
+                return
+            del self._order[bisect_left(self._order, (current, member))]
+        self._scores[member] = score
+        insort(self._order, (score, member))
+
+    def incr(self, member: str, amount: int) -> int:
+        score = self._scores.get(member, 0) + amount
+        self.add(member, score)
+        return score
+
+    def remove(self, member: str) -> None:
+        current = self._scores.pop(member, None)
+        if current is not None:
+            del self._order[bisect_left(self._order, (current, member))]
+
+    def rev_rank(self, member: str) -> Optional[int]:
+        """0-based rank from the highest score, like ZREVRANK."""
+        current = self._scores.get(member)
+        if current is None:
+            return None
+        return len(self._order) - 1 - bisect_left(self._order, (current, member))
+
+    def rev_range(self, start: int, stop: int) -> List[Tuple[str, int]]:
+        """Members ranked ``start``..``stop`` (inclusive, highest first) with their scores, like ZREVRANGE."""
+        size = len(self._order)
+        stop = min(stop, size - 1)
+        if start > stop:
+            return []
+        return [(member, score) for score, member in reversed(self._order[size - 1 - stop:size - start])]
+
+
+def _position(rank: int, size: int, start: int, around: List[Tuple[str, float]]) -> Dict:
+    neighbours = [(start + i + 1, int(member), int(float(score))) for i, (member, score) in enumerate(around)]
+    return {
+        "rank": rank + 1,
+        "score": next(score for r, _, score in neighbours if r == rank + 1),
+        "size": size,
+        "neighbours": neighbours,
+    }
+
+
+class LeaderboardStore:
+    """
+    XP leaderboards in Redis sorted sets with an in-process stand-in.
+
+    Reads take a session so the boards can be (re)loaded from ``user_xp``
+    when they are known to be behind: the in-process boards before their
+    first use, Redis after it missed updates.
+    """
+
+    # Seconds to wait before retrying Redis after a failed connection
+    REDIS_RETRY_SECONDS = 30.0
+
+    def __init__(self, key_prefix: str = "leaderboard"):
+        self.settings = get_settings_instance()
+        self.key_prefix = key_prefix
+        self._redis = None
+        self._scripts = {}
+        self._redis_retry_at = 0.0
+        # Redis missed updates while unreachable and needs a reconcile
+        self._stale = False
+        self._local: Dict[str, SortedSet] = {}
+        self._local_loaded = False
+        self._counters = {
+            "updates": 0, "update_errors": 0, "reads": 0,
+            "reconciles": 0, "reconcile_skipped": 0, "reconciled_users": 0,
+        }
+
+    def board_key(self, board: str, tenant_id=None, at: Optional[datetime] = None) -> str:
+        if board == GLOBAL:
+            return f"{self.key_prefix}:global"
+        if board == WEEKLY:
+            return f"{self.key_prefix}:weekly:{week_label(at or datetime.now(UTC))}"
+        if board == TENANT:
+            if tenant_id is None:
+                raise ValueError("The tenant leaderboard needs a tenant_id")
+            return f"{self.key_prefix}:tenant:{tenant_id}"
+        raise ValueError(f"Unknown leaderboard: {board}")
+
+    @property
+    def _lock_key(self) -> str:
+        return f"{self.key_prefix}:reconcile-lock"
+
+    async def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            client = redis.from_url(
+                self.settings.redis_url,
+                decode_responses=True,
+                socket_timeout=1.0,
+                socket_connect_timeout=1.0,
+                retry_on_timeout=False,
+            )
+            await client.ping()
+            self._scripts = {'position': client.register_script(POSITION_SCRIPT)}
+            self._redis = client
+        except Exception as e:
+            logger.warning(f"Redis unavailable for leaderboards, using in-process boards: {e}")
+            self._reset_redis()
+        return self._redis
+
+    def _reset_redis(self) -> None:
+        if self._redis is not None:
+            # Connection lost: the in-process boards were not kept up to date while
+            # Redis was up, so they are reloaded from user_xp on the next read.
+            # A failed reconnect keeps them, with the weekly XP counted meanwhile.
+            self._local = {}
+            self._local_loaded = False
+        self._redis = None
+        self._scripts = {}
+        self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_SECONDS
+        self._stale = True
+
+    def _board(self, key: str) -> SortedSet:
+        board = self._local.get(key)
+        if board is None:
+            board = self._local[key] = SortedSet()
+        return board
+
+    async def record_xp(
+        self,
+        user_id: int,
+        tenant_id,
+        total_xp: int,
+        amount: int,
+        at: Optional[datetime] = None,
+    ) -> None:
+        """Apply one committed award to the user's boards. Never raises; ``reconcile`` repairs missed updates."""
+        at = at or datetime.now(UTC)
+        member = str(user_id)
+        totals = [self.board_key(GLOBAL)] + ([self.board_key(TENANT, tenant_id)] if tenant_id else [])
+        weekly = self.board_key(WEEKLY, at=at)
+        self._counters["updates"] += 1
+        red = await self._get_redis()
+        if red:
+            try:
+                async with red.pipeline(transaction=True) as pipe:
+                    for key in totals:
+                        pipe.zadd(key, {member: total_xp}, gt=True)
+                    pipe.zincrby(weekly, amount, member)
+                    pipe.expireat(weekly, int((week_start(at) + WEEKLY_RETENTION).replace(tzinfo=UTC).timestamp()))
+                    await pipe.execute()
+                return
+            except (redis.TimeoutError, redis.ConnectionError) as e:
+                self._counters["update_errors"] += 1
+                logger.warning(f"Redis leaderboard update failed for user {user_id}: {e}")
+                self._reset_redis()
+            except redis.RedisError as e:
+                # A command error (OOM, WRONGTYPE, ...) on a live connection:
+                # the next read reconciles the total boards
+                self._counters["update_errors"] += 1
+                logger.error(f"Redis leaderboard update rejected for user {user_id}: {e}")
+                self._stale = True
+                return
+
+        if self._local_loaded:
+            for key in totals:
+                self._board(key).add(member, total_xp, gt=True)
+        self._board(weekly).incr(member, amount)
+
+    async def _ready(self, db: AsyncSession):
+        """The Redis client to read from, or None for the in-process boards; reconciles boards known to be behind."""
+        red = await self._get_redis()
+        if (red and self._stale) or (red is None and not self._local_loaded):
+            await self.reconcile(db)
+            red = await self._get_redis()
+        return red
+
+    async def _read(self, db: AsyncSession, from_redis, from_local):
+        self._counters["reads"] += 1
+        red = await self._ready(db)
+        if red:
+            try:
+                return await from_redis(red)
+            except (redis.TimeoutError, redis.ConnectionError) as e:
+                logger.warning(f"Redis leaderboard read failed, using in-process boards: {e}")
+                self._reset_redis()
+                await self._ready(db)
+        return from_local()
+
+    async def top(self, db: AsyncSession, board: str, limit: int = 10, tenant_id=None) -> List[Tuple[int, int]]:
+        """(user_id, score) of the ``limit`` highest entries of a board."""
+        key = self.board_key(board, tenant_id)
+
+        async def from_redis(red):
+            entries = await red.zrevrange(key, 0, limit - 1, withscores=True)
+            return [(int(member), int(score)) for member, score in entries]
+
+        def from_local():
+            board_set = self._local.get(key) or SortedSet()
+            return [(int(member), score) for member, score in board_set.rev_range(0, limit - 1)]
+
+        return await self._read(db, from_redis, from_local)
+
+    async def position(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        board: str,
+        tenant_id=None,
+        radius: int = 2,
+    ) -> Optional[Dict]:
+        """
+        The user's 1-based rank and score on a board, the board size and the
+        (rank, user_id, score) entries within ``radius`` places of the user.
+        None when the user is not on the board.
+        """
+        key, member = self.board_key(board, tenant_id), str(user_id)
+
+        async def from_redis(red):
+            found = await self._scripts['position'](keys=[key], args=[member, radius])
+            if not found:
+                return None
+            rank, size, start, flat = found
+            return _position(int(rank), int(size), int(start), list(zip(flat[::2], flat[1::2])))
+
+        def from_local():
+            board_set = self._local.get(key) or SortedSet()
+            rank = board_set.rev_rank(member)
+            if rank is None:
+                return None
+            start = max(0, rank - radius)
+            return _position(rank, len(board_set), start, board_set.rev_range(start, rank + radius))
+
+        return await self._read(db, from_redis, from_local)
+
+    async def _load(self, db: AsyncSession, since: Optional[datetime] = None) -> Tuple[Dict[str, Dict[str, int]], Set[str]]:
+        """
+        Total-board scores from ``user_xp`` (of rows awarded at or after
+        ``since``, when given) and the users awarded XP this week.
+        """
+        boards: Dict[str, Dict[str, int]] = {self.board_key(GLOBAL): {}}
+        this_week = week_start(datetime.now(UTC))
+        active: Set[str] = set()
+        stmt = select(UserXP.user_id, UserXP.tenant_id, UserXP.total_xp, UserXP.last_xp_awarded_at)
+        if since is not None:
+            stmt = stmt.where(UserXP.last_xp_awarded_at >= since)
+        result = await db.stream(stmt.execution_options(yield_per=RECONCILE_CHUNK_SIZE))
+        async for user_id, tenant_id, total_xp, awarded_at in result:
+            member = str(user_id)
+            boards[self.board_key(GLOBAL)][member] = total_xp or 0
+            if tenant_id is not None:
+                boards.setdefault(self.board_key(TENANT, tenant_id), {})[member] = total_xp or 0
+            if awarded_at is not None and awarded_at >= this_week:
+                active.add(member)
+        return boards, active
+
+    @staticmethod
+    async def _backfill_tenants(db: AsyncSession) -> None:
+        """Copy users' tenants onto XP rows created without one, so they reach their tenant board."""
+        await db.execute(
+            update(UserXP)
+            .where(UserXP.tenant_id.is_(None), UserXP.user_id.in_(select(User.id).where(User.tenant_id.isnot(None))))
+            .values(tenant_id=select(User.tenant_id).where(User.id == UserXP.user_id).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    async def _replace_in_redis(self, red, boards: Dict[str, Dict[str, int]], active: Set[str]) -> None:
+        for key, scores in boards.items():
+            if not scores:
+                await red.delete(key)
+                continue
+            staging = f"{key}:rebuild"
+            await red.delete(staging)
+            items = list(scores.items())
+            for offset in range(0, len(items), RECONCILE_CHUNK_SIZE):
+                await red.zadd(staging, dict(items[offset:offset + RECONCILE_CHUNK_SIZE]))
+            await red.rename(staging, key)
+        async for key in red.scan_iter(match=self.board_key(TENANT, "*")):
+            if key not in boards and not key.endswith(":rebuild"):
+                await red.delete(key)
+
+        weekly = self.board_key(WEEKLY)
+        idle = [member for member in await red.zrange(weekly, 0, -1) if member not in active]
+        for offset in range(0, len(idle), RECONCILE_CHUNK_SIZE):
+            await red.zrem(weekly, *idle[offset:offset + RECONCILE_CHUNK_SIZE])
+
+    def _replace_in_process(self, boards: Dict[str, Dict[str, int]], active: Set[str]) -> None:
+        weekly = self.board_key(WEEKLY)
+        weekly_set = self._local.get(weekly) or SortedSet()
+        for member in list(weekly_set):
+            if member not in active:
+                weekly_set.remove(member)
+        self._local = {key: SortedSet(scores) for key, scores in boards.items()}
+        self._local[weekly] = weekly_set
+        self._local_loaded = True
+
+    async def reconcile(self, db: AsyncSession) -> int:
+        """
+        Rebuild the total boards from ``user_xp`` and prune the weekly board.
+        Returns the number of users on the global board, or 0 when another
+        worker holds the reconcile lock.
+        """
+        await self._backfill_tenants(db)
+        started = datetime.utcnow()
+        red = await self._get_redis()
+        if red:
+            token = uuid.uuid4().hex
+            try:
+                if not await red.set(self._lock_key, token, nx=True, ex=RECONCILE_LOCK_SECONDS):
+                    self._counters["reconcile_skipped"] += 1
+                    self._stale = False
+                    return 0
+                try:
+                    boards, active = await self._load(db)
+                    await self._replace_in_redis(red, boards, active)
+                    # Awards committed while loading may have been overwritten by the swap
+                    recent, _ = await self._load(db, since=started)
+                    for key, scores in recent.items():
+                        if scores:
+                            await red.zadd(key, scores, gt=True)
+                finally:
+                    if await red.get(self._lock_key) == token:
+                        await red.delete(self._lock_key)
+                self._stale = False
+                return self._finish_reconcile(boards)
+            except (redis.TimeoutError, redis.ConnectionError) as e:
+                logger.warning(f"Redis leaderboard reconcile failed, rebuilding in-process boards: {e}")
+                self._reset_redis()
+
+        boards, active = await self._load(db)
+        self._replace_in_process(boards, active)
+        return self._finish_reconcile(boards)
+
+    def _finish_reconcile(self, boards: Dict[str, Dict[str, int]]) -> int:
+        users = len(boards[self.board_key(GLOBAL)])
+        self._counters["reconciles"] += 1
+        self._counters["reconciled_users"] = users
+        logger.info(f"Reconciled leaderboards: {users} users, {len(boards) - 1} tenant boards")
+        return users
+
+    async def run_reconciler(self, session_factory, interval_seconds: Optional[float] = None) -> None:
+        """Background loop reconciling the boards against ``user_xp``."""
+        interval = interval_seconds or self.settings.leaderboard_reconcile_interval_seconds
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as db:
+                    await self.reconcile(db)
+            except Exception as e:
+                logger.error(f"Leaderboard reconcile failed: {e}", exc_info=True)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "redis" if self._redis is not None else "local",
+            "stale": self._stale,
+            "local_boards": len(self._local) if self._local_loaded else 0,
+            **self._counters,
+        }
+
+
+# Process-wide instance
+leaderboards = LeaderboardStore()
@@ -4,9 +4,10 @@ from datetime import datetime, timedelta, timezone
 UTC = timezone.utc
 from typing import Optional
 
-from sqlalchemy import or_, select
+from sqlalchemy import or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..config import get_settings_instance
 from ..models import OutboxEvent, JournalEntry
 from .es_service import get_es_service
 
@@ -84,13 +85,7 @@ class OutboxRelayService:
                         await es_service.index_document(
                             entity="journal",
                             doc_id=journal.id,
-                            data={
-                                "event_id": event_id,  # Carried through for ES-side dedup if needed
-                                "user_id": journal.user_id,
-                                "tenant_id": str(journal.tenant_id) if journal.tenant_id else None,
-                                "content": journal.content,
-                                "timestamp": journal.timestamp
-                            }
+                            data=OutboxRelayService._journal_document(journal, event_id)
                         )
                         logger.debug(f"[Outbox] Relayed UPSERT journal={journal_id} event={event_id}")
                     elif journal and journal.is_deleted:
@@ -119,28 +114,134 @@ class OutboxRelayService:
 
             except Exception as e:
                 logger.error(f"[Outbox] Failed to relay event {event.id}: {e}")
-
                 # Exponential backoff using per-event timestamp for accurate scheduling
-                event.retry_count = (event.retry_count or 0) + 1
-                event.last_error = str(e)
-
-                if event.retry_count >= 3:
-                    event.status = "dead_letter"
-                    logger.critical(
-                        f"[Outbox] Permanently moving event {event.id} to DEAD LETTER after {event.retry_count} retries."
-                    )
-                else:
-                    delay_seconds = 60 * (2 ** (event.retry_count - 1))  # 60s, 120s, 240s
-                    event.next_retry_at = event_now + timedelta(seconds=delay_seconds)
-                    logger.warning(
-                        f"[Outbox] Scheduled retry for event {event.id} "
-                        f"in {delay_seconds}s (attempt {event.retry_count}/3)"
-                    )
+                OutboxRelayService._schedule_retry(event, str(e), event_now)
 
         # Single batch commit after all events are processed
         await db.commit()
         return processed_count
 
+    @staticmethod
+    def _schedule_retry(event: OutboxEvent, error: str, now: datetime) -> None:
+        """Record a failed delivery: back off exponentially, dead-letter after 3 attempts."""
+        event.retry_count = (event.retry_count or 0) + 1
+        event.last_error = error
+
+        if event.retry_count >= 3:
+            event.status = "dead_letter"
+            logger.critical(
+                f"[Outbox] Permanently moving event {event.id} to DEAD LETTER after {event.retry_count} retries."
+            )
+        else:
+            delay_seconds = 60 * (2 ** (event.retry_count - 1))  # 60s, 120s, 240s
+            event.next_retry_at = now + timedelta(seconds=delay_seconds)
+            logger.warning(
+                f"[Outbox] Scheduled retry for event {event.id} "
+                f"in {delay_seconds}s (attempt {event.retry_count}/3)"
+            )
+
+    @staticmethod
+    def _journal_document(journal: JournalEntry, event_id: str) -> dict:
+        return {
+            "event_id": event_id,  # Carried through for ES-side dedup if needed
+            "user_id": journal.user_id,
+            "tenant_id": str(journal.tenant_id) if journal.tenant_id else None,
+            "content": journal.content,
+            "timestamp": journal.timestamp
+        }
+
+    @staticmethod
+    async def process_pending_indexing_events_bulk(db: AsyncSession, batch_size: int = 500) -> int:
+        """
+        Bulk relay mode: drain up to ``batch_size`` events with one claim
+        query, one journal prefetch and one ES ``_bulk`` request.
+
+        - Claims rows with ``FOR UPDATE SKIP LOCKED`` so concurrent relay
+          workers take disjoint batches (a no-op on SQLite, which has a
+          single writer anyway).
+        - Coalesces events per journal id: only the final state is sent.
+          The last event's action decides between index and delete, and an
+          upsert for a missing or soft-deleted journal becomes a delete, as
+          in the serial relay.
+        - A transport failure backs off the whole batch; a per-document
+          failure backs off only the events for that journal.
+        """
+        stmt = select(OutboxEvent).filter(
+            OutboxEvent.topic == "search_indexing",
+            OutboxEvent.status == "pending",
+            or_(
+                OutboxEvent.next_retry_at == None,
+                OutboxEvent.next_retry_at <= datetime.now(UTC)
+            )
+        ).order_by(OutboxEvent.id).limit(batch_size).with_for_update(skip_locked=True)
+
+        events = (await db.execute(stmt)).scalars().all()
+        if not events:
+            return 0
+
+        # Coalesce per journal, keeping the last event (strict ID order)
+        events_by_journal: dict = {}
+        last_event = {}
+        for event in events:
+            journal_id = event.payload.get("journal_id")
+            events_by_journal.setdefault(journal_id, []).append(event)
+            last_event[journal_id] = event
+
+        journal_ids = [jid for jid in events_by_journal if jid is not None]
+        journals = {}
+        if journal_ids:
+            result = await db.execute(select(JournalEntry).filter(JournalEntry.id.in_(journal_ids)))
+            journals = {journal.id: journal for journal in result.scalars().all()}
+
+        operations = []
+        for journal_id in journal_ids:
+            payload = last_event[journal_id].payload
+            journal = journals.get(journal_id)
+            if payload.get("action") == "upsert" and journal and not journal.is_deleted:
+                event_id = payload.get("event_id", str(last_event[journal_id].id))
+                operations.append(
+                    ("index", "journal", journal_id, OutboxRelayService._journal_document(journal, event_id))
+                )
+            elif payload.get("action") == "upsert" and journal is None:
+                logger.warning(f"[Outbox] Journal {journal_id} not found; marking its events as processed.")
+            else:
+                # Explicit delete, or soft-delete race on an upsert
+                operations.append(("delete", "journal", journal_id, None))
+
+        es_service = get_es_service()
+        now = datetime.now(UTC)
+        try:
+            failures = await es_service.bulk(operations) if operations else {}
+        except Exception as e:
+            logger.error(f"[Outbox] Bulk relay of {len(events)} events failed: {e}")
+            for event in events:
+                OutboxRelayService._schedule_retry(event, str(e), now)
+            await db.commit()
+            return 0
+
+        processed_ids = []
+        for journal_id, journal_events in events_by_journal.items():
+            error = failures.get(f"journal_{journal_id}")
+            if error is None:
+                processed_ids.extend(event.id for event in journal_events)
+                continue
+            logger.error(f"[Outbox] Failed to relay journal {journal_id}: {error}")
+            for event in journal_events:
+                OutboxRelayService._schedule_retry(event, error, now)
+
+        if processed_ids:
+            await db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(processed_ids))
+                .values(status="processed", processed_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+        logger.debug(
+            f"[Outbox] Bulk relayed {len(processed_ids)} events as {len(operations)} ES operations"
+        )
+        return len(processed_ids)
+
     @staticmethod
     async def cleanup_purgatory(db: AsyncSession, threshold: int = 10000) -> dict:
         """
@@ -180,8 +281,6 @@ class OutboxRelayService:
         """
         Reset all 'failed' or 'dead_letter' events back to 'pending' for retry.
         """
-        from sqlalchemy import update
-        
         stmt = update(OutboxEvent).where(
             OutboxEvent.status.in_(['failed', 'dead_letter'])
         ).values(
@@ -197,19 +296,46 @@ class OutboxRelayService:
         return result.rowcount
 
     @classmethod
-    async def start_relay_worker(cls, async_session_factory, interval_seconds: int = 2):
+    async def start_relay_worker(
+        cls,
+        async_session_factory,
+        interval_seconds: int = 2,
+        mode: Optional[str] = None,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
         """
         Background worker loop that continuously polls the outbox table.
         Intended to run as a dedicated process or be started at app startup.
+
+        ``mode``, ``workers`` and ``batch_size`` default to the
+        ``outbox_relay_*`` settings. In bulk mode several loops can run
+        side by side; serial mode always runs a single loop.
         """
-        logger.info("[Outbox] Search Index Relay Worker started.")
-        while True:
-            try:
-                async with async_session_factory() as db:
-                    count = await cls.process_pending_indexing_events(db)
-                    if count > 0:
-                        logger.info(f"[Outbox] Relayed {count} indexing events to Elasticsearch.")
-            except Exception as e:
-                logger.error(f"[Outbox] Critical worker error: {e}", exc_info=True)
+        settings = get_settings_instance()
+        mode = mode or settings.outbox_relay_mode
+        batch_size = batch_size or settings.outbox_relay_batch_size
+        workers = (workers or settings.outbox_relay_workers) if mode == "bulk" else 1
+
+        async def relay_once(db):
+            if mode == "bulk":
+                return await cls.process_pending_indexing_events_bulk(db, batch_size=batch_size)
+            return await cls.process_pending_indexing_events(db)
+
+        async def loop(worker_no: int):
+            while True:
+                count = 0
+                try:
+                    async with async_session_factory() as db:
+                        count = await relay_once(db)
+                        if count > 0:
+                            logger.info(f"[Outbox] Worker {worker_no} relayed {count} indexing events to Elasticsearch.")
+                except Exception as e:
+                    logger.error(f"[Outbox] Critical worker error: {e}", exc_info=True)
+
+                # Keep draining while a backlog remains
+                if mode != "bulk" or count < batch_size:
+                    await asyncio.sleep(interval_seconds)
 
-            await asyncio.sleep(interval_seconds)
+        logger.info(f"[Outbox] Search Index Relay Worker started ({mode} mode, {workers} worker(s)).")
+        await asyncio.gather(*(loop(n) for n in range(workers)))
@@ -0,0 +1,183 @@
+"""
+In-memory catalog of the active question bank.
+
+Active questions are loaded once per content version of the "questions"
+resource (services/resource_versions.py) into an immutable snapshot indexed
+by id, category and age bracket, so random exam samples and list pages are
+served from memory in O(k) instead of ``ORDER BY random()`` and a COUNT
+subquery per request.
+
+Age brackets: the distinct ``min_age`` and ``max_age + 1`` values split the
+age axis into intervals in which the set of eligible questions is constant.
+Each bracket holds its questions in id order, so an age lookup is a bisect
+and a sample is ``random.sample`` over that bracket.
+
+The snapshot is replaced when the stored version changes: a commit touching
+question_bank recomputes the version, and ``cache_service.set`` broadcasts
+it to the other workers, whose next lookup sees the new value and reloads.
+``invalidate()`` drops the local snapshot outright. If the version cannot be
+read, the current snapshot keeps being served.
+"""
+import asyncio
+import logging
+import random
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from ..models import Question
+
+logger = logging.getLogger(__name__)
+
+QUESTIONS_RESOURCE = "questions"
+# Filtered id-ordered lists kept per snapshot for get_questions pages
+FILTER_CACHE_ENTRIES = 256
+
+
+class QuestionIndex:
+    """Immutable snapshot of the active questions with age and category indexes."""
+
+    def __init__(self, questions: Sequence[Question], version: Optional[str] = None):
+        self.version = version
+        self.questions: Tuple[Question, ...] = tuple(sorted(questions, key=lambda q: q.id))
+        self.by_id: Dict[int, Question] = {q.id: q for q in self.questions}
+        by_category: Dict[Optional[int], List[Question]] = {}
+        for question in self.questions:
+            by_category.setdefault(question.category_id, []).append(question)
+        self.by_category: Dict[Optional[int], Tuple[Question, ...]] = {
+            category: tuple(items) for category, items in by_category.items()
+        }
+
+        # NULL bounds never match the SQL age filters, so those questions are left out
+        ranged = [q for q in self.questions if q.min_age is not None and q.max_age is not None]
+        self._bounds: List[int] = sorted({q.min_age for q in ranged} | {q.max_age + 1 for q in ranged})
+        self._brackets: List[Tuple[Question, ...]] = [
+            tuple(q for q in ranged if q.min_age <= start and q.max_age >= start)
+            for start in self._bounds
+        ]
+        self._filtered: Dict[tuple, Tuple[Question, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def for_age(self, age: int) -> Tuple[Question, ...]:
+        """Questions whose [min_age, max_age] contains age, in id order."""
+        position = bisect_right(self._bounds, age) - 1
+        return self._brackets[position] if position >= 0 else ()
+
+    def sample(self, age: int, count: int, rng: Optional[random.Random] = None) -> List[Question]:
+        """Up to count distinct random questions for age."""
+        bracket = self.for_age(age)
+        return (rng or random).sample(bracket, min(count, len(bracket)))
+
+    def filtered(
+        self,
+        category_id: Optional[int] = None,
+        min_age: Optional[int] = None,
+        max_age: Optional[int] = None,
+    ) -> Tuple[Question, ...]:
+        """Questions matching QuestionService.get_questions' filters, in id order."""
+        if min_age is None and max_age is None:
+            if category_id is None:
+                return self.questions
+            return self.by_category.get(category_id, ())
+
+        key = (category_id, min_age, max_age)
+        matches = self._filtered.get(key)
+        if matches is None:
+            source = self.questions if category_id is None else self.by_category.get(category_id, ())
+            matches = tuple(
+                q for q in source
+                if (min_age is None or (q.min_age is not None and q.min_age <= min_age))
+                and (max_age is None or (q.max_age is not None and q.max_age >= max_age))
+            )
+            if len(self._filtered) >= FILTER_CACHE_ENTRIES:
+                self._filtered.clear()
+            self._filtered[key] = matches
+        return matches
+
+    def page(self, skip: int, limit: int, **filters) -> Tuple[List[Question], int]:
+        matches = self.filtered(**filters)
+        return list(matches[skip:skip + limit]), len(matches)
+
+
+class QuestionCatalog:
+    """Per-worker holder of the current QuestionIndex, reloaded on version change."""
+
+    def __init__(self, session_factory: Optional[Callable] = None, versions=None):
+        self._session_factory = session_factory
+        self._versions = versions
+        self._index: Optional[QuestionIndex] = None
+        self._loading: Optional[Tuple[Optional[str], asyncio.Future]] = None
+        self._sequence = 0
+        self._installed = 0
+        self.stats = {"loads": 0, "version_errors": 0}
+
+    def _get_versions(self):
+        if self._versions is None:
+            from .resource_versions import resource_versions
+            self._versions = resource_versions
+        return self._versions
+
+    async def get(self) -> QuestionIndex:
+        """The index for the current question version, loading it if needed."""
+        try:
+            version = await self._get_versions().get(QUESTIONS_RESOURCE)
+        except Exception as e:
+            self.stats["version_errors"] += 1
+            if self._index is not None:
+                logger.warning(f"Question version unavailable, serving catalog {self._index.version}: {e}")
+                return self._index
+            version = None
+
+        index = self._index
+        if index is not None and index.version == version and version is not None:
+            return index
+        return await self._load(version)
+
+    async def _load(self, version: Optional[str]) -> QuestionIndex:
+        """Load the active questions. Concurrent callers for one version share a load."""
+        if self._loading is None or self._loading[0] != version:
+            self._sequence += 1
+            self._loading = (version, asyncio.ensure_future(self._read(version, self._sequence)))
+        loading = self._loading[1]
+        try:
+            return await asyncio.shield(loading)
+        finally:
+            if self._loading is not None and self._loading[1] is loading and loading.done():
+                self._loading = None
+
+    async def _read(self, version: Optional[str], sequence: int) -> QuestionIndex:
+        if self._session_factory is None:
+            from .db_service import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        # The session is closed without committing, so the instances stay loaded once detached
+        async with self._session_factory() as db:
+            questions = (await db.execute(
+                select(Question).filter(Question.is_active == 1).order_by(Question.id)
+            )).scalars().all()
+        index = QuestionIndex(questions, version)
+        self.stats["loads"] += 1
+        # An older load finishing late must not replace a newer snapshot
+        if sequence > self._installed:
+            self._index, self._installed = index, sequence
+        logger.info(f"Loaded {len(questions)} active questions into the catalog (version {version})")
+        return index
+
+    def invalidate(self) -> None:
+        """Drop the snapshot; the next lookup reloads it."""
+        self._index = None
+
+    def get_stats(self) -> Dict[str, object]:
+        index = self._index
+        return {
+            "version": index.version if index else None,
+            "questions": len(index) if index else 0,
+            "age_brackets": len(index._bounds) if index else 0,
+            "categories": len(index.by_category) if index else 0,
+            **self.stats,
+        }
+
+
+question_catalog = QuestionCatalog()
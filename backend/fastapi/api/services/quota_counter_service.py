@@ -0,0 +1,408 @@
+"""
+Redis-backed daily quota counters with write-behind persistence (#1135).
+
+The hot path of tenant quota enforcement used to SELECT the ``TenantQuota``
+row and COMMIT an increment on every API request.  This module moves the
+per-request work out of the primary database:
+
+* Daily request / ML-unit counts live in Redis under day-bucketed keys and are
+  checked-and-incremented atomically by a Lua script.  When Redis is not
+  reachable an in-process counter store takes over.
+* Tier configuration (limits, token bucket parameters, active flag) is cached
+  in-process for a short TTL.
+* Tenants touched since the last flush are written back to ``TenantQuota`` in a
+  single batched UPDATE on a schedule (and on shutdown).
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Optional, Set, Tuple
+from uuid import UUID
+
+import redis.asyncio as redis
+from redis.exceptions import NoScriptError
+from cachetools import TTLCache
+from sqlalchemy import bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings_instance
+from ..models import TenantQuota
+
+UTC = timezone.utc
+logger = logging.getLogger(__name__)
+
+# Atomic check-and-consume of the daily counters.
+# KEYS[1]: daily request counter
+# KEYS[2]: daily ML-unit counter
+# ARGV[1]: requests to consume
+# ARGV[2]: ML units to consume
+# ARGV[3]: daily request limit
+# ARGV[4]: daily ML-unit limit
+# ARGV[5]: key TTL in seconds
+# Returns {allowed, request_count, ml_units_count, reason}
+# reason: 0 = ok, 1 = request quota exceeded, 2 = ML quota exceeded
+QUOTA_CONSUME_SCRIPT = """
+local requests = tonumber(ARGV[1])
+local ml_units = tonumber(ARGV[2])
+local request_limit = tonumber(ARGV[3])
+local ml_limit = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[5])
+
+local request_count = tonumber(redis.call('GET', KEYS[1]) or '0')
+local ml_count = tonumber(redis.call('GET', KEYS[2]) or '0')
+
+if request_count + requests > request_limit then
+    return {0, request_count, ml_count, 1}
+end
+if ml_units > 0 and ml_count + ml_units > ml_limit then
+    return {0, request_count, ml_count, 2}
+end
+
+request_count = redis.call('INCRBY', KEYS[1], requests)
+redis.call('EXPIRE', KEYS[1], ttl)
+if ml_units > 0 then
+    ml_count = redis.call('INCRBY', KEYS[2], ml_units)
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+
+return {1, request_count, ml_count, 0}
+"""
+
+QUOTA_EXCEEDED_REQUESTS = "Daily request quota exceeded"
+QUOTA_EXCEEDED_ML = "Daily ML compute quota exceeded"
+_REASONS = {1: QUOTA_EXCEEDED_REQUESTS, 2: QUOTA_EXCEEDED_ML}
+
+
+def quota_day(now: Optional[datetime] = None) -> date:
+    """Return the UTC day bucket that counters are attributed to."""
+    return (now or datetime.now(UTC)).astimezone(UTC).date()
+
+
+@dataclass(frozen=True)
+class QuotaConfig:
+    """Immutable snapshot of a tenant's quota tier, safe to cache in-process."""
+    tenant_id: UUID
+    tier: str
+    max_tokens: int
+    refill_rate: float
+    daily_request_limit: int
+    ml_units_daily_limit: int
+    is_active: bool
+
+    @classmethod
+    def from_model(cls, quota: TenantQuota) -> "QuotaConfig":
+        return cls(
+            tenant_id=quota.tenant_id,
+            tier=quota.tier,
+            max_tokens=quota.max_tokens,
+            refill_rate=quota.refill_rate,
+            daily_request_limit=quota.daily_request_limit,
+            ml_units_daily_limit=quota.ml_units_daily_limit,
+            is_active=bool(quota.is_active),
+        )
+
+
+class QuotaConfigCache:
+    """Short-lived in-process cache of tenant quota tiers."""
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[int] = None):
+        settings = get_settings_instance()
+        ttl = ttl if ttl is not None else getattr(settings, "quota_config_cache_ttl_seconds", 60)
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, tenant_id: UUID) -> Optional[QuotaConfig]:
+        return self._cache.get(tenant_id)
+
+    def set(self, config: QuotaConfig) -> None:
+        self._cache[config.tenant_id] = config
+
+    def invalidate(self, tenant_id: Optional[UUID] = None) -> None:
+        """Drop one tenant (or every tenant) so the next request reloads its tier."""
+        if tenant_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(tenant_id, None)
+
+
+class QuotaCounterStore:
+    """
+    Day-bucketed quota counters in Redis with an in-process stand-in.
+
+    Counters are authoritative while the day is live; ``TenantQuota`` receives
+    absolute values from :meth:`flush`, so several workers flushing the same
+    tenant never double count.
+    """
+
+    # Seconds to wait before retrying Redis after a failed connection
+    REDIS_RETRY_SECONDS = 30.0
+
+    def __init__(self, key_prefix: str = "quota", ttl_seconds: int = 2 * 86400):
+        self.key_prefix = key_prefix
+        self.ttl_seconds = ttl_seconds
+        self.settings = get_settings_instance()
+        self._redis = None
+        self._lua_sha = None
+        self._redis_retry_at = 0.0
+        # (tenant_id, day) -> [request_count, ml_units_count]
+        self._local: Dict[Tuple[UUID, date], list] = {}
+        self._local_day: Optional[date] = None
+        # (tenant_id, day) pairs touched since the last flush
+        self._dirty: Set[Tuple[UUID, date]] = set()
+        # Dirty pairs with increments held in Redis; only Redis can flush them
+        self._in_redis: Set[Tuple[UUID, date]] = set()
+
+    def _keys(self, tenant_id: UUID, day: date) -> Tuple[str, str]:
+        base = f"{self.key_prefix}:{tenant_id}:{day.strftime('%Y%m%d')}"
+        return f"{base}:req", f"{base}:ml"
+
+    async def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            client = redis.from_url(
+                self.settings.redis_url,
+                decode_responses=True,
+                socket_timeout=1.0,
+                socket_connect_timeout=1.0,
+                retry_on_timeout=False,
+            )
+            self._lua_sha = await client.script_load(QUOTA_CONSUME_SCRIPT)
+            self._redis = client
+            logger.debug("Quota counter Lua script loaded")
+        except Exception as e:
+            logger.warning(f"Redis unavailable for quota counters, using in-process store: {e}")
+            self._redis = None
+            self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_SECONDS
+        return self._redis
+
+    def _reset_redis(self) -> None:
+        self._redis = None
+        self._lua_sha = None
+        self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_SECONDS
+
+    def _prune_local(self, today: date) -> None:
+        """Drop in-process buckets from previous days that have been flushed."""
+        stale = [k for k in self._local if k[1] < today and k not in self._dirty]
+        for key in stale:
+            del self._local[key]
+
+    async def seed(self, tenant_id: UUID, day: date, request_count: int, ml_units_count: int) -> None:
+        """
+        Initialise today's counters from the persisted row if they don't exist yet.
+
+        Used when a tenant's config is (re)loaded so that a restart or a Redis
+        flush does not hand out a fresh daily allowance.
+        """
+        red = await self._get_redis()
+        if red:
+            req_key, ml_key = self._keys(tenant_id, day)
+            try:
+                async with red.pipeline(transaction=False) as pipe:
+                    pipe.set(req_key, int(request_count or 0), nx=True, ex=self.ttl_seconds)
+                    pipe.set(ml_key, int(ml_units_count or 0), nx=True, ex=self.ttl_seconds)
+                    await pipe.execute()
+                return
+            except (redis.TimeoutError, redis.ConnectionError) as e:
+                logger.warning(f"Redis seed failed for tenant {tenant_id}: {e}")
+                self._reset_redis()
+        self._local.setdefault((tenant_id, day), [int(request_count or 0), int(ml_units_count or 0)])
+
+    async def consume(
+        self,
+        tenant_id: UUID,
+        requests: int,
+        ml_units: int,
+        request_limit: int,
+        ml_units_limit: int,
+        now: Optional[datetime] = None,
+    ) -> Tuple[bool, int, int, Optional[str]]:
+        """
+        Atomically check the daily limits and consume them.
+
+        Returns (allowed, request_count, ml_units_count, error).
+        """
+        day = quota_day(now)
+        red = await self._get_redis()
+        if red:
+            req_key, ml_key = self._keys(tenant_id, day)
+            try:
+                result = await self._run_consume_script(
+                    red, req_key, ml_key, requests, ml_units, request_limit, ml_units_limit,
+                )
+                allowed = int(result[0]) == 1
+                if allowed:
+                    self._dirty.add((tenant_id, day))
+                    self._in_redis.add((tenant_id, day))
+                return allowed, int(result[1]), int(result[2]), _REASONS.get(int(result[3]))
+            except asyncio.CancelledError:
+                raise
+            except (redis.TimeoutError, redis.ConnectionError, redis.ReadOnlyError) as e:
+                # ReadOnlyError: still connected to a node demoted by a failover.
+                # Count in-process until the next probe after the backoff.
+                logger.warning(f"Redis quota counter issue for tenant {tenant_id}: {type(e).__name__}: {e}")
+                self._reset_redis()
+
+        return self._consume_local(tenant_id, day, requests, ml_units, request_limit, ml_units_limit)
+
+    async def _run_consume_script(self, red, req_key: str, ml_key: str, *args):
+        try:
+            return await red.evalsha(self._lua_sha, 2, req_key, ml_key, *args, self.ttl_seconds)
+        except NoScriptError:
+            # Redis restarted or failed over and lost its script cache
+            logger.info("Quota counter Lua script missing from Redis, reloading")
+            self._lua_sha = await red.script_load(QUOTA_CONSUME_SCRIPT)
+            return await red.evalsha(self._lua_sha, 2, req_key, ml_key, *args, self.ttl_seconds)
+
+    def _consume_local(
+        self,
+        tenant_id: UUID,
+        day: date,
+        requests: int,
+        ml_units: int,
+        request_limit: int,
+        ml_units_limit: int,
+    ) -> Tuple[bool, int, int, Optional[str]]:
+        if day != self._local_day:
+            self._prune_local(day)
+            self._local_day = day
+        counts = self._local.setdefault((tenant_id, day), [0, 0])
+        if counts[0] + requests > request_limit:
+            return False, counts[0], counts[1], QUOTA_EXCEEDED_REQUESTS
+        if ml_units > 0 and counts[1] + ml_units > ml_units_limit:
+            return False, counts[0], counts[1], QUOTA_EXCEEDED_ML
+        counts[0] += requests
+        counts[1] += ml_units
+        self._dirty.add((tenant_id, day))
+        return True, counts[0], counts[1], None
+
+    async def _read_redis(self, pairs) -> Optional[Dict[Tuple[UUID, date], Tuple[int, int]]]:
+        """Counts of several (tenant, day) pairs from Redis in one MGET; None if Redis is unavailable."""
+        red = await self._get_redis()
+        if not red:
+            return None
+        keys = [key for pair in pairs for key in self._keys(*pair)]
+        try:
+            values = await red.mget(keys)
+        except (redis.TimeoutError, redis.ConnectionError) as e:
+            logger.warning(f"Redis quota counter read failed: {e}")
+            self._reset_redis()
+            return None
+        return {
+            pair: (int(values[2 * i] or 0), int(values[2 * i + 1] or 0))
+            for i, pair in enumerate(pairs)
+        }
+
+    async def get_counts_many(self, pairs: Iterable[Tuple[UUID, date]]) -> Dict[Tuple[UUID, date], Tuple[int, int]]:
+        """Read current counts for several (tenant, day) pairs in one round trip."""
+        pairs = list(pairs)
+        if not pairs:
+            return {}
+        counts = await self._read_redis(pairs)
+        if counts is not None:
+            return counts
+        return {pair: tuple(self._local.get(pair, (0, 0))) for pair in pairs}
+
+    async def get_counts(self, tenant_id: UUID, day: Optional[date] = None) -> Tuple[int, int]:
+        day = day or quota_day()
+        counts = await self.get_counts_many([(tenant_id, day)])
+        return counts[(tenant_id, day)]
+
+    @property
+    def pending_flush(self) -> int:
+        return len(self._dirty)
+
+    async def flush(self, db: AsyncSession) -> int:
+        """
+        Write the counters of every tenant touched since the last flush back to
+        ``TenantQuota`` using a single batched UPDATE. Returns the number of rows.
+
+        While Redis cannot be read, only tenants counted entirely in-process are
+        written; the in-process store does not hold the Redis counts, so
+        writing it would overwrite the persisted counts with lower values.
+        The other tenants stay dirty until Redis is back.
+        """
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+
+        # Only the most recent day matters per tenant
+        latest: Dict[UUID, date] = {}
+        for tenant_id, day in dirty:
+            if tenant_id not in latest or day > latest[tenant_id]:
+                latest[tenant_id] = day
+
+        try:
+            pairs = list(latest.items())
+            counts = await self._read_redis(pairs)
+            if counts is None:
+                counts = {pair: tuple(self._local[pair]) for pair in pairs
+                          if pair in self._local and pair not in self._in_redis}
+                unflushed = {pair for pair in dirty if (pair[0], latest[pair[0]]) not in counts}
+                if unflushed:
+                    logger.warning(f"Redis unavailable, deferring quota flush of {len(unflushed)} tenants")
+                    self._dirty |= unflushed
+                    dirty -= unflushed
+            now = datetime.now(UTC)
+            rows = [
+                {
+                    "b_tenant_id": tenant_id,
+                    "b_request_count": request_count,
+                    "b_ml_units_count": ml_units_count,
+                    "b_reset_date": datetime.combine(day, datetime.min.time(), tzinfo=UTC),
+                    "b_updated_at": now,
+                }
+                for (tenant_id, day), (request_count, ml_units_count) in counts.items()
+            ]
+            if not rows:
+                return 0
+            table = TenantQuota.__table__
+            stmt = (
+                table.update()
+                .where(table.c.tenant_id == bindparam("b_tenant_id"))
+                .values(
+                    daily_request_count=bindparam("b_request_count"),
+                    ml_units_daily_count=bindparam("b_ml_units_count"),
+                    last_reset_date=bindparam("b_reset_date"),
+                    updated_at=bindparam("b_updated_at"),
+                )
+            )
+            await db.execute(stmt, rows)
+            await db.commit()
+        except Exception:
+            # Keep the tenants dirty so the next cycle retries them
+            self._dirty |= dirty
+            await db.rollback()
+            raise
+
+        self._in_redis -= dirty
+        self._prune_local(quota_day())
+        logger.debug(f"Flushed quota counters for {len(rows)} tenants")
+        return len(rows)
+
+    async def run_flush_loop(self, session_factory, interval_seconds: Optional[float] = None) -> None:
+        """Background write-behind loop; flushes once more when cancelled."""
+        interval = interval_seconds or getattr(self.settings, "quota_flush_interval_seconds", 300)
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    async with session_factory() as db:
+                        await self.flush(db)
+                except Exception as e:
+                    logger.error(f"Quota counter flush failed: {e}", exc_info=True)
+        except asyncio.CancelledError:
+            try:
+                async with session_factory() as db:
+                    await self.flush(db)
+            except Exception as e:
+                logger.error(f"Final quota counter flush failed: {e}")
+            raise
+
+
+# Process-wide instances
+quota_counters = QuotaCounterStore()
+quota_config_cache = QuotaConfigCache()
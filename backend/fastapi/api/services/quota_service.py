@@ -10,6 +10,7 @@ from uuid import UUID
 
 from ..models import TenantQuota
 from ..middleware.rate_limiter import TokenBucketLimiter
+from .quota_counter_service import QuotaConfig, quota_config_cache, quota_counters, quota_day
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,27 @@ class QuotaService:
             
         return quota
 
+    @staticmethod
+    async def get_quota_config(db: AsyncSession, tenant_id: UUID) -> QuotaConfig:
+        """
+        Return the tenant's quota tier from the in-process cache, loading it
+        (and seeding today's counters from the persisted row) on a miss.
+        """
+        config = quota_config_cache.get(tenant_id)
+        if config is not None:
+            return config
+
+        quota = await QuotaService.get_quota(db, tenant_id)
+        config = QuotaConfig.from_model(quota)
+        quota_config_cache.set(config)
+
+        today = quota_day()
+        if quota.last_reset_date and quota.last_reset_date.date() == today:
+            await quota_counters.seed(
+                tenant_id, today, quota.daily_request_count, quota.ml_units_daily_count
+            )
+        return config
+
     @staticmethod
     async def check_and_consume_quota(
         db: AsyncSession, 
@@ -50,8 +72,12 @@ class QuotaService:
         """
         Main entry point for multi-tenant rate limiting and quota management (#1135).
         Returns (allowed, quota_status)
+
+        Daily counters are consumed in Redis (or the in-process stand-in) and
+        written back to ``TenantQuota`` by the write-behind flusher, so the
+        database is only touched when the tenant's tier is not cached.
         """
-        quota = await QuotaService.get_quota(db, tenant_id)
+        quota = await QuotaService.get_quota_config(db, tenant_id)
         
         if not quota.is_active:
             return False, {"error": "Tenant account is inactive"}
@@ -66,38 +92,24 @@ class QuotaService:
         if not allowed:
             return False, {"error": "Rate limit exceeded (Token Bucket)"}
 
-        # 2. Check Daily Request Quota
-        now = datetime.now(UTC)
-        if quota.last_reset_date.date() < now.date():
-            # Reset daily counters if its a new day
-            quota.daily_request_count = 0
-            quota.ml_units_daily_count = 0
-            quota.last_reset_date = now
-        
-        if quota.daily_request_count + tokens_requested > quota.daily_request_limit:
-            return False, {"error": "Daily request quota exceeded"}
-            
-        if ml_units_requested > 0:
-            if quota.ml_units_daily_count + ml_units_requested > quota.ml_units_daily_limit:
-                 return False, {"error": "Daily ML compute quota exceeded"}
-
-        # 3. Commit Consumption
-        quota.daily_request_count += tokens_requested
-        quota.ml_units_daily_count += ml_units_requested
-        
-        # We don't necessarily need to await commit here for every request if we use 
-        # a more optimized approach (like Redis counters), but for strict accuracy 
-        # in this demo/impl, we use the DB. 
-        # Optimized alternative: Increment in Redis, sync to DB every 5 mins.
-        await db.commit()
+        # 2. Check and consume the daily request / ML quotas atomically
+        allowed, daily_count, ml_units_count, error = await quota_counters.consume(
+            tenant_id,
+            requests=tokens_requested,
+            ml_units=ml_units_requested,
+            request_limit=quota.daily_request_limit,
+            ml_units_limit=quota.ml_units_daily_limit,
+        )
+        if not allowed:
+            return False, {"error": error}
         
-        # 4. Analytics: Feed back usage metadata
+        # 3. Analytics: Feed back usage metadata
         quota_status = {
             "tier": quota.tier,
             "tokens_remaining": remaining,
-            "daily_count": quota.daily_request_count,
+            "daily_count": daily_count,
             "daily_limit": quota.daily_request_limit,
-            "ml_units_count": quota.ml_units_daily_count,
+            "ml_units_count": ml_units_count,
             "ml_units_limit": quota.ml_units_daily_limit
         }
         
@@ -106,11 +118,17 @@ class QuotaService:
     @staticmethod
     async def get_usage_analytics(db: AsyncSession, tenant_id: UUID) -> Dict[str, Any]:
         """Returns quota usage data for the dashboard (#1135)."""
-        quota = await QuotaService.get_quota(db, tenant_id)
+        quota = await QuotaService.get_quota_config(db, tenant_id)
+        daily_count, ml_units_count = await quota_counters.get_counts(tenant_id)
         return {
             "tenant_id": str(tenant_id),
             "tier": quota.tier,
-            "usage_percentage": (quota.daily_request_count / quota.daily_request_limit) * 100 if quota.daily_request_limit > 0 else 0,
-            "ml_usage_percentage": (quota.ml_units_daily_count / quota.ml_units_daily_limit) * 100 if quota.ml_units_daily_limit > 0 else 0,
+            "usage_percentage": (daily_count / quota.daily_request_limit) * 100 if quota.daily_request_limit > 0 else 0,
+            "ml_usage_percentage": (ml_units_count / quota.ml_units_daily_limit) * 100 if quota.ml_units_daily_limit > 0 else 0,
             "is_throttled": not quota.is_active
         }
+
+    @staticmethod
+    async def flush_usage(db: AsyncSession) -> int:
+        """Persist buffered daily counters to ``TenantQuota`` (write-behind)."""
+        return await quota_counters.flush(db)
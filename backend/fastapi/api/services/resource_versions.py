@@ -0,0 +1,184 @@
+"""
+Content versions for slowly changing resources (question bank, categories).
+
+A resource's version is a hash of all its rows, so every worker computes the
+same value from the same data. It is stored in Redis under
+``resource_version:<name>`` through ``cache_service``, whose in-process tier
+makes the per-request lookup a dictionary read.
+
+Versions are recomputed:
+
+* after a commit that inserted, updated or deleted a row of the resource's
+  models (ORM listeners); the new value is written with ``cache_service.set``,
+  which broadcasts the invalidation to the other workers
+* when the stored version expires (``resource_version_ttl_seconds``), which
+  also picks up edits made outside the ORM, e.g. by seed scripts
+* on ``invalidate(name)``
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from ..config import get_settings_instance
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_VERSION_KEY_PREFIX = "resource_version:"
+_SESSION_INFO_KEY = "changed_versioned_resources"
+_ROW_EVENTS = ("after_insert", "after_update", "after_delete")
+
+
+class ResourceVersions:
+    """Registry of versioned resources and their current content hashes."""
+
+    def __init__(self, session_factory: Optional[Callable] = None, ttl_seconds: Optional[int] = None):
+        settings = get_settings_instance()
+        self.ttl_seconds = settings.resource_version_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._session_factory = session_factory
+        self._models: Dict[str, tuple] = {}
+        self._resource_of_model: Dict[type, str] = {}
+        self._stale: Set[str] = set()
+        self._generations: Dict[str, int] = {}
+        # Last computed version per resource, used while Redis is unavailable
+        self._local: Dict[str, Tuple[str, float]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._listeners_installed = False
+        self.stats = {"computed": 0, "invalidations": 0}
+
+    def register(self, name: str, *models: type) -> None:
+        self._models[name] = models
+        for model in models:
+            self._resource_of_model[model] = name
+            if self._listeners_installed:
+                self._listen(model)
+
+    def install_listeners(self) -> None:
+        """Recompute a resource's version after commits that change its rows."""
+        if self._listeners_installed:
+            return
+        for model in self._resource_of_model:
+            self._listen(model)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_soft_rollback", self._after_rollback)
+        self._listeners_installed = True
+
+    def remove_listeners(self) -> None:
+        if not self._listeners_installed:
+            return
+        for model in self._resource_of_model:
+            for name in _ROW_EVENTS:
+                event.remove(model, name, self._row_changed)
+        event.remove(Session, "after_commit", self._after_commit)
+        event.remove(Session, "after_soft_rollback", self._after_rollback)
+        self._listeners_installed = False
+
+    def _listen(self, model: type) -> None:
+        for name in _ROW_EVENTS:
+            event.listen(model, name, self._row_changed)
+
+    def _row_changed(self, mapper, connection, target) -> None:
+        session = object_session(target)
+        resource = self._resource_of_model.get(type(target))
+        if session is not None and resource is not None:
+            session.info.setdefault(_SESSION_INFO_KEY, set()).add(resource)
+
+    def _after_commit(self, session: Session) -> None:
+        for resource in session.info.pop(_SESSION_INFO_KEY, ()):
+            self.invalidate(resource)
+
+    def _after_rollback(self, session: Session, previous_transaction) -> None:
+        session.info.pop(_SESSION_INFO_KEY, None)
+
+    def invalidate(self, name: str) -> None:
+        """Mark a resource changed; its version is recomputed now if a loop is running, else on next use."""
+        self._stale.add(name)
+        self._generations[name] = self._generations.get(name, 0) + 1
+        self.stats["invalidations"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._refresh_logged(name))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get(self, name: str) -> str:
+        """Current version of a registered resource."""
+        if name in self._stale:
+            return await self.refresh(name)
+        from .cache_service import cache_service
+        version = await cache_service.get(f"{RESOURCE_VERSION_KEY_PREFIX}{name}")
+        if version:
+            return version
+        local = self._local.get(name)
+        if local and time.monotonic() - local[1] < self.ttl_seconds:
+            return local[0]
+        return await self.refresh(name)
+
+    async def refresh(self, name: str) -> str:
+        """Recompute and publish a resource's version. Concurrent callers share one computation."""
+        task = self._inflight.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._recompute(name))
+            self._inflight[name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(name, None))
+        return await asyncio.shield(task)
+
+    async def _recompute(self, name: str) -> str:
+        while True:
+            generation = self._generations.get(name, 0)
+            version = await self.compute(name)
+            # A commit that landed while we were reading may not be included
+            if self._generations.get(name, 0) == generation:
+                break
+        self._stale.discard(name)
+        self._local[name] = (version, time.monotonic())
+        from .cache_service import cache_service
+        await cache_service.set(f"{RESOURCE_VERSION_KEY_PREFIX}{name}", version, ttl_seconds=self.ttl_seconds)
+        return version
+
+    async def _refresh_logged(self, name: str) -> None:
+        try:
+            await self.refresh(name)
+        except Exception as e:
+            logger.warning(f"Failed to refresh version of {name}: {e}")
+
+    async def compute(self, name: str) -> str:
+        """Hash every row of the resource's models in primary-key order."""
+        if self._session_factory is None:
+            from .db_service import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        digest = hashlib.sha256()
+        async with self._session_factory() as db:
+            for model in self._models[name]:
+                table = model.__table__
+                stmt = select(*table.columns).order_by(*table.primary_key.columns)
+                digest.update(table.name.encode("utf-8"))
+                for row in (await db.execute(stmt)).all():
+                    digest.update(repr(tuple(row)).encode("utf-8"))
+        self.stats["computed"] += 1
+        return digest.hexdigest()[:16]
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "resources": {name: self._local.get(name, (None,))[0] for name in self._models},
+            "stale": sorted(self._stale),
+            **self.stats,
+        }
+
+
+def _build_registry() -> ResourceVersions:
+    from ..models import Question, QuestionCategory
+    registry = ResourceVersions()
+    registry.register("questions", Question)
+    registry.register("question_categories", QuestionCategory)
+    return registry
+
+
+resource_versions = _build_registry()
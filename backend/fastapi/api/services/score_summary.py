@@ -0,0 +1,215 @@
+"""
+Per-user score summaries behind the dashboard.
+
+``UserAnalyticsService.get_dashboard_summary`` used to aggregate the user's
+scores on every load and fetch all of them to compute a standard deviation.
+Instead, ``ExamService.save_score`` folds each new score into a
+``user_score_summaries`` row in the same transaction:
+
+* count, sum and sum of squares (mean and sample stdev, exactly, in integers)
+* best and latest score
+* the last five scores, for the trend
+* the run of consecutive UTC days with an exam, ending at ``last_exam_day``
+
+so the dashboard is a single primary-key read. ``rebuild`` recomputes
+summaries from ``scores`` in one streamed pass and ``check`` compares the
+stored rows with a recomputation (see rebuild_score_summaries.py).
+"""
+import logging
+import math
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Score, User, UserScoreSummary
+from ..utils.upsert import bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+RECENT_SCORES = 5
+REBUILD_CHUNK_SIZE = 5000
+
+
+def _day(timestamp) -> Optional[str]:
+    if not timestamp:
+        return None
+    if hasattr(timestamp, "date"):
+        return timestamp.date().isoformat()
+    return str(timestamp)[:10]
+
+
+@dataclass
+class SummaryState:
+    """In-memory form of a UserScoreSummary row."""
+    exam_count: int = 0
+    score_sum: int = 0
+    score_sum_sq: int = 0
+    best_score: Optional[int] = None
+    latest_score: Optional[int] = None
+    latest_score_id: Optional[int] = None
+    recent_scores: List[int] = field(default_factory=list)
+    streak_days: int = 0
+    last_exam_day: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: UserScoreSummary) -> "SummaryState":
+        return cls(
+            exam_count=row.exam_count,
+            score_sum=row.score_sum,
+            score_sum_sq=row.score_sum_sq,
+            best_score=row.best_score,
+            latest_score=row.latest_score,
+            latest_score_id=row.latest_score_id,
+            recent_scores=[int(v) for v in row.recent_scores.split(",") if v],
+            streak_days=row.streak_days,
+            last_exam_day=row.last_exam_day,
+        )
+
+    def to_values(self) -> Dict:
+        return {
+            "exam_count": self.exam_count,
+            "score_sum": self.score_sum,
+            "score_sum_sq": self.score_sum_sq,
+            "best_score": self.best_score,
+            "latest_score": self.latest_score,
+            "latest_score_id": self.latest_score_id,
+            "recent_scores": ",".join(str(v) for v in self.recent_scores),
+            "streak_days": self.streak_days,
+            "last_exam_day": self.last_exam_day,
+        }
+
+    def add(self, score_id: int, total_score: Optional[int], day: Optional[str]) -> None:
+        """Fold one score in. Scores must arrive in id order; repeats of ``latest_score_id`` are ignored."""
+        if self.latest_score_id is not None and score_id <= self.latest_score_id:
+            return
+        value = int(total_score or 0)
+        self.exam_count += 1
+        self.score_sum += value
+        self.score_sum_sq += value * value
+        self.best_score = value if self.best_score is None else max(self.best_score, value)
+        self.latest_score, self.latest_score_id = value, score_id
+        self.recent_scores = (self.recent_scores + [value])[-RECENT_SCORES:]
+        if day is None:
+            return
+        if self.last_exam_day is None or self.streak_days == 0:
+            self.streak_days, self.last_exam_day = 1, day
+        elif day == self.last_exam_day:
+            pass
+        elif date.fromisoformat(day) - date.fromisoformat(self.last_exam_day) == timedelta(days=1):
+            self.streak_days, self.last_exam_day = self.streak_days + 1, day
+        elif day > self.last_exam_day:
+            self.streak_days, self.last_exam_day = 1, day
+
+    @property
+    def average(self) -> float:
+        return self.score_sum / self.exam_count if self.exam_count else 0.0
+
+    @property
+    def stdev(self) -> Optional[float]:
+        """Sample standard deviation (as statistics.stdev), None below two scores."""
+        n = self.exam_count
+        if n < 2:
+            return None
+        return math.sqrt(max(n * self.score_sum_sq - self.score_sum ** 2, 0) / (n * (n - 1)))
+
+    def current_streak(self, today: date) -> int:
+        """Streak that is still alive: its last exam was today or yesterday."""
+        if self.last_exam_day is None or date.fromisoformat(self.last_exam_day) < today - timedelta(days=1):
+            return 0
+        return self.streak_days
+
+
+def _user_key():
+    """Score owner: scores.user_id, or the user matching scores.username for legacy rows."""
+    return func.coalesce(Score.user_id, User.id)
+
+
+class ScoreSummaryService:
+    """Maintains, reads and verifies per-user score summaries."""
+
+    @staticmethod
+    async def record_score(db: AsyncSession, score: Score) -> None:
+        """Fold a flushed score into its user's summary inside the caller's transaction."""
+        if score.user_id is None:
+            return
+        key = UserScoreSummary.user_id == score.user_id
+        for _ in range(2):
+            stmt = select(UserScoreSummary).where(key).with_for_update().execution_options(populate_existing=True)
+            row = (await db.execute(stmt)).scalar_one_or_none()
+            state = SummaryState.from_row(row) if row is not None else SummaryState()
+            state.add(score.id, score.total_score, _day(score.timestamp))
+            if row is not None:
+                await db.execute(update(UserScoreSummary).where(key).values(**state.to_values()))
+                return
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(UserScoreSummary).values(user_id=score.user_id, **state.to_values()))
+                return
+            except IntegrityError:
+                # A concurrent save created the row first; fold into it
+                continue
+
+    @staticmethod
+    async def get_summary(db: AsyncSession, user_id: int) -> SummaryState:
+        row = await db.get(UserScoreSummary, user_id, populate_existing=True)
+        return SummaryState.from_row(row) if row is not None else SummaryState()
+
+    @staticmethod
+    async def compute(db: AsyncSession, user_ids: Optional[Sequence[int]] = None) -> Dict[int, SummaryState]:
+        """Recompute summaries from ``scores`` in one pass ordered by (user, score id)."""
+        owner = _user_key().label("owner")
+        stmt = (
+            select(owner, Score.id, Score.total_score, Score.timestamp)
+            .select_from(Score)
+            .outerjoin(User, (Score.user_id.is_(None)) & (User.username == Score.username))
+            .where(owner.isnot(None))
+            .order_by(owner, Score.id)
+        )
+        if user_ids is not None:
+            stmt = stmt.where(owner.in_(list(user_ids)))
+        states: Dict[int, SummaryState] = {}
+        result = await db.stream(stmt.execution_options(yield_per=REBUILD_CHUNK_SIZE))
+        async for user_id, score_id, total_score, timestamp in result:
+            state = states.get(user_id)
+            if state is None:
+                state = states[user_id] = SummaryState()
+            state.add(score_id, total_score, _day(timestamp))
+        return states
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, user_ids: Optional[Sequence[int]] = None) -> int:
+        """Replace the summaries of ``user_ids`` (all users by default) with recomputed ones; commits."""
+        states = await ScoreSummaryService.compute(db, user_ids)
+        if user_ids is None:
+            await db.execute(delete(UserScoreSummary))
+        else:
+            await db.execute(delete(UserScoreSummary).where(UserScoreSummary.user_id.in_(list(user_ids))))
+        await bulk_upsert(db, UserScoreSummary, ["user_id"], [
+            {"user_id": user_id, **state.to_values()} for user_id, state in states.items()
+        ])
+        await db.commit()
+        logger.info(f"Rebuilt score summaries for {len(states)} users")
+        return len(states)
+
+    @staticmethod
+    async def check(db: AsyncSession, user_ids: Optional[Sequence[int]] = None, repair: bool = False) -> List[int]:
+        """User ids whose stored summary differs from a recomputation; with ``repair``, rebuild those."""
+        expected = await ScoreSummaryService.compute(db, user_ids)
+        stmt = select(UserScoreSummary)
+        if user_ids is not None:
+            stmt = stmt.where(UserScoreSummary.user_id.in_(list(user_ids)))
+        stored = {row.user_id: SummaryState.from_row(row) for row in (await db.execute(stmt)).scalars()}
+
+        mismatched = sorted(
+            user_id for user_id in set(expected) | set(stored)
+            if expected.get(user_id) != stored.get(user_id)
+        )
+        if mismatched:
+            logger.warning(f"{len(mismatched)} score summaries out of date")
+            if repair:
+                await ScoreSummaryService.rebuild(db, mismatched)
+        return mismatched
@@ -8,6 +8,7 @@ UTC = timezone.utc
 
 from ..models import User, ExportRecord, OutboxEvent, GDPRScrubLog
 from .storage_service import storage_service
+from .journal_search import JournalSearchIndex
 
 logger = logging.getLogger("api.scrubber")
 
@@ -39,7 +40,8 @@ class DistributedScrubberService:
                 
             # --- INIT PHASE: Capture all asset references before they're lost ---
             # Capture all known file uploads/exports from DB metadata
-            exp_stmt = select(ExportRecord.file_path).where(ExportRecord.user_id == user_id)
+            # (streamed exports are recorded without a file)
+            exp_stmt = select(ExportRecord.file_path).where(ExportRecord.user_id == user_id, ExportRecord.file_path != "")
             exp_res = await db.execute(exp_stmt)
             assets = exp_res.scalars().all()
             
@@ -97,6 +99,8 @@ class DistributedScrubberService:
                 if user:
                     # Capture user info for audit logging before delete
                     username = user.username
+                    # Search index rows are keyed by entry id outside the ORM cascade
+                    await JournalSearchIndex.remove_user(db, user_id)
                     await db.delete(user)
                     
                     # Log completion to Outbox for reliable auditing/reporting
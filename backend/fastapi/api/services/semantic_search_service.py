@@ -1,15 +1,25 @@
 import logging
+import time
 from typing import List, Dict, Any, Optional, Tuple
-from sqlalchemy import text, select, func
+from sqlalchemy import Text, text, select, func, type_coerce, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from api.config import get_settings_instance
 from api.models import JournalEntry
+from api.services.cache_service import cache_service
 from api.services.embedding_service import embedding_service
+from api.services.encryption_service import EncryptionService
+from api.services.journal_search import _user_dek
+from api.services.vector_index import get_vector_index
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Set once a query shows the database lacks pgvector, so later searches go
+# straight to the local index.
+_pgvector_unavailable = False
+
 class SemanticSearchService:
-    """Service to handle semantic vector similarity search using pgvector."""
+    """Service to handle semantic vector similarity search using pgvector, with a local ANN fallback."""
 
     @staticmethod
     async def search_journal_entries(
@@ -21,12 +31,17 @@ class SemanticSearchService:
     ) -> List[Dict[str, Any]]:
         """
         Perform a semantic search for journal entries using cosine similarity.
+        Uses pgvector on PostgreSQL, otherwise the local vector index.
         """
+        global _pgvector_unavailable
         # Generate query embedding
         query_vector = await embedding_service.generate_embedding(query)
         if not query_vector:
             return []
 
+        if _pgvector_unavailable or db.get_bind().dialect.name != "postgresql":
+            return await SemanticSearchService._search_local_index(db, query_vector, user_id, limit, min_similarity)
+
         # pgvector uses <=> for cosine distance (1 - cosine similarity)
         # Cosine similarity is calculated as: 1 - (query_vector <=> embedding)
         try:
@@ -79,35 +94,254 @@ class SemanticSearchService:
             logger.error(f"Semantic search failed: {e}")
             # Fallback or empty result
             # If the error is about missing operators, it's likely not pgvector-postgres
-            if "operator does not exist: vector <=>" in str(e):
-                logger.warning("pgvector operators not found, falling back to basic content search.")
-                return []
+            if "operator does not exist" in str(e) or 'type "vector" does not exist' in str(e):
+                logger.warning("pgvector operators not found, falling back to the local vector index.")
+                _pgvector_unavailable = True
+                await db.rollback()
+                return await SemanticSearchService._search_local_index(db, query_vector, user_id, limit, min_similarity)
             raise
 
     @staticmethod
-    async def reindex_journal_entries(db: AsyncSession, user_id: Optional[int] = None) -> int:
+    async def _search_local_index(
+        db: AsyncSession,
+        query_vector: List[float],
+        user_id: int,
+        limit: int,
+        min_similarity: float
+    ) -> List[Dict[str, Any]]:
         """
-        Trigger re-indexing of journal entries that don't have embeddings.
-        Returns the number of entries queued for indexing.
+        ANN lookup in the user's local shard, then a primary-key fetch of the matching rows.
+
+        Hits whose entry was deleted since it was indexed (e.g. by a delete served
+        on another host) are dropped and tombstoned in the shard; the lookup widens
+        until ``limit`` live rows are found or the shard has no more candidates.
         """
-        # Find entries that need indexing
-        stmt = select(JournalEntry.id).where(
-            JournalEntry.embedding.is_(None),
-            JournalEntry.is_deleted == False
-        )
+        index = get_vector_index()
+        dim = len(query_vector)
+        if not index.has_shard(user_id, dim):
+            await index.build_user(db, user_id, dim)
+
+        results: List[Dict[str, Any]] = []
+        checked, stale = set(), []
+        fetch = limit * 2
+        while True:
+            hits = index.search(user_id, query_vector, k=fetch)
+            fresh = [(entry_id, score) for entry_id, score in hits
+                     if entry_id not in checked and score >= min_similarity]
+            checked.update(entry_id for entry_id, _ in fresh)
+            if fresh:
+                result = await db.execute(
+                    select(JournalEntry.id, JournalEntry.title, JournalEntry.content,
+                           JournalEntry.timestamp, JournalEntry.mood_score).where(
+                        JournalEntry.id.in_([entry_id for entry_id, _ in fresh]),
+                        JournalEntry.user_id == user_id,
+                        JournalEntry.is_deleted == False
+                    )
+                )
+                rows = {row.id: row for row in result}
+                for entry_id, score in fresh:
+                    if entry_id not in rows:
+                        stale.append(entry_id)
+                        continue
+                    results.append({
+                        "id": entry_id,
+                        "title": rows[entry_id].title,
+                        "content": rows[entry_id].content,
+                        "timestamp": rows[entry_id].timestamp,
+                        "mood_score": rows[entry_id].mood_score,
+                        "similarity": score
+                    })
+            # Hits come best first, so a hit below the threshold ends the search
+            exhausted = len(hits) < fetch or (hits and hits[-1][1] < min_similarity)
+            if len(results) >= limit or exhausted:
+                break
+            fetch *= 2
+
+        if stale:
+            SemanticSearchService.remove_from_local_index(user_id, stale, dim)
+        results.sort(key=lambda r: -r["similarity"])
+        return results[:limit]
+
+    @staticmethod
+    def update_local_index(entries) -> None:
+        """Append fresh (user_id, entry_id, vector) triples to any existing local shards."""
+        by_user: Dict[int, List[Tuple[int, List[float]]]] = {}
+        for user_id, entry_id, vector in entries:
+            by_user.setdefault(user_id, []).append((entry_id, vector))
+        index = get_vector_index()
+        for user_id, items in by_user.items():
+            try:
+                index.upsert(user_id, items)
+            except Exception as e:
+                # The shard is rebuilt from the database if it falls behind
+                logger.warning(f"Local vector index update failed for user {user_id}: {e}")
+
+    @staticmethod
+    def remove_from_local_index(user_id: int, entry_ids: List[int], dim: Optional[int] = None) -> None:
+        """Tombstone deleted entries in the user's local shard, if this host has one."""
+        try:
+            get_vector_index().remove(user_id, entry_ids, dim or embedding_service.dimension)
+        except Exception as e:
+            # Searches skip deleted entries anyway and tombstone them when they do
+            logger.warning(f"Local vector index removal failed for user {user_id}: {e}")
+
+    @staticmethod
+    async def entry_text(
+        db: AsyncSession,
+        deks: Dict[int, Optional[bytes]],
+        user_id: int,
+        title: Optional[str],
+        content: Optional[str],
+    ) -> Optional[str]:
+        """
+        Text to embed for an entry, from its stored (possibly encrypted) content.
+
+        Runs outside any request, so encrypted content is decrypted with the owner's
+        DEK unwrapped from ``user_encryption_keys`` (cached in ``deks`` per user).
+        Returns None when that fails, so the entry is left unindexed rather than
+        embedded from a placeholder.
+        """
+        if content and content.startswith("ENC:"):
+            if user_id not in deks:
+                deks[user_id] = await _user_dek(db, user_id)
+            if deks[user_id] is None:
+                return None
+            content = EncryptionService.decrypt_data(content, deks[user_id], log_audit=False)
+            if content == "<DECRYPTION_FAILED>":
+                return None
+        return f"{title}: {content or ''}" if title else (content or "")
+
+    @staticmethod
+    def _reindex_checkpoint_key(user_id: Optional[int], force: bool) -> str:
+        scope = f"user:{user_id}" if user_id else "all"
+        return f"embedding_reindex:{scope}:{'force' if force else 'missing'}"
+
+    @staticmethod
+    async def _load_checkpoint(key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await cache_service.get(key)
+        except Exception as e:
+            logger.warning(f"Could not read reindex checkpoint {key}: {e}")
+            return None
+
+    @staticmethod
+    async def _save_checkpoint(key: str, state: Optional[Dict[str, Any]]) -> None:
+        try:
+            if state is None:
+                await cache_service.delete(key)
+            else:
+                ttl = get_settings_instance().embedding_reindex_checkpoint_ttl_seconds
+                await cache_service.set(key, state, ttl_seconds=ttl)
+        except Exception as e:
+            # A lost checkpoint only means re-scanning from the start next time
+            logger.warning(f"Could not write reindex checkpoint {key}: {e}")
+
+    @staticmethod
+    async def reindex_journal_entries(
+        db: AsyncSession,
+        user_id: Optional[int] = None,
+        force: bool = False,
+        chunk_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate embeddings for journal entries in id-ordered chunks.
+
+        Each chunk is embedded with one batched call, written back with a single
+        bulk UPDATE and committed, after which the last processed id is stored as a
+        checkpoint. An interrupted run resumes after that id. Without `force` only
+        entries lacking an embedding are selected; with `force` every entry is
+        re-embedded (e.g. after a model change).
+        Returns throughput metrics for the run.
+        """
+        chunk_size = chunk_size or get_settings_instance().embedding_reindex_chunk_size
+        checkpoint_key = SemanticSearchService._reindex_checkpoint_key(user_id, force)
+        checkpoint = await SemanticSearchService._load_checkpoint(checkpoint_key) or {}
+        last_id = checkpoint.get("last_id", 0)
+
+        stats = {
+            "resumed_from_id": last_id,
+            "last_id": last_id,
+            "processed": 0,
+            "embedded": 0,
+            "skipped": 0,
+            "chunks": 0,
+            "embed_seconds": 0.0,
+            "write_seconds": 0.0,
+        }
+        started = time.perf_counter()
+
+        # Stored ciphertext: decrypted per owner in entry_text, not by the column type
+        base_stmt = select(
+            JournalEntry.id, JournalEntry.user_id, JournalEntry.title,
+            type_coerce(JournalEntry.content, Text).label("content"),
+        ).where(JournalEntry.is_deleted == False)
+        if not force:
+            base_stmt = base_stmt.where(JournalEntry.embedding.is_(None))
         if user_id:
-            stmt = stmt.where(JournalEntry.user_id == user_id)
-            
-        result = await db.execute(stmt)
-        entry_ids = result.scalars().all()
-        
-        if not entry_ids:
-            return 0
-            
-        from api.celery_tasks import generate_journal_embedding_task
-        for entry_id in entry_ids:
-            generate_journal_embedding_task.delay(entry_id)
-            
-        return len(entry_ids)
+            base_stmt = base_stmt.where(JournalEntry.user_id == user_id)
+
+        deks: Dict[int, Optional[bytes]] = {}
+        while True:
+            rows = (await db.execute(
+                base_stmt.where(JournalEntry.id > last_id).order_by(JournalEntry.id).limit(chunk_size)
+            )).all()
+            if not rows:
+                break
+
+            texts = []
+            for row in rows:
+                entry_text = await SemanticSearchService.entry_text(db, deks, row.user_id, row.title, row.content)
+                if entry_text is None:
+                    logger.warning(f"Skipping journal entry {row.id}: its content can't be decrypted")
+                # Empty text gets no embedding, so the entry is counted as skipped
+                texts.append(entry_text or "")
+            t0 = time.perf_counter()
+            embeddings = await embedding_service.generate_embeddings(texts)
+            t1 = time.perf_counter()
+
+            indexed_at = datetime.utcnow()
+            updates = [
+                {
+                    "id": row.id,
+                    "embedding": vector,
+                    "embedding_model": embedding_service.active_model_name,
+                    "last_indexed_at": indexed_at,
+                }
+                for row, vector in zip(rows, embeddings) if vector
+            ]
+            if updates:
+                # ORM bulk UPDATE by primary key: one executemany for the chunk
+                await db.execute(update(JournalEntry), updates)
+            await db.commit()
+            SemanticSearchService.update_local_index(
+                (row.user_id, row.id, vector) for row, vector in zip(rows, embeddings) if vector
+            )
+            stats["write_seconds"] += time.perf_counter() - t1
+            stats["embed_seconds"] += t1 - t0
+
+            last_id = rows[-1].id
+            stats["last_id"] = last_id
+            stats["processed"] += len(rows)
+            stats["embedded"] += len(updates)
+            stats["skipped"] += len(rows) - len(updates)
+            stats["chunks"] += 1
+            await SemanticSearchService._save_checkpoint(checkpoint_key, {"last_id": last_id})
+            logger.info(
+                f"Embedding reindex chunk {stats['chunks']}: {len(updates)}/{len(rows)} entries "
+                f"(through id {last_id}, embed {t1 - t0:.2f}s)"
+            )
+
+        await SemanticSearchService._save_checkpoint(checkpoint_key, None)
+
+        elapsed = time.perf_counter() - started
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["embed_seconds"] = round(stats["embed_seconds"], 3)
+        stats["write_seconds"] = round(stats["write_seconds"], 3)
+        stats["entries_per_second"] = round(stats["processed"] / elapsed, 1) if elapsed > 0 else 0.0
+        logger.info(
+            f"Embedding reindex finished: {stats['embedded']} embedded, {stats['skipped']} skipped "
+            f"in {stats['chunks']} chunks ({stats['entries_per_second']} entries/s)"
+        )
+        return stats
 
 semantic_search_service = SemanticSearchService()
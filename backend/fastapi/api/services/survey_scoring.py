@@ -0,0 +1,254 @@
+"""
+Compiled evaluation of the survey scoring DSL.
+
+``SurveyTemplate.scoring_logic`` is a list of rules:
+
+    {"if": {"qid": 12, "op": "==", "val": "High Stress"},
+     "then": {"anxiety": 5, "resilience": -2}}
+
+It used to be interpreted for every submission: every rule was walked,
+whether or not its question was answered, and its target and deltas were
+converted with ``str()`` / ``float()`` on each pass. ``compile_scoring``
+turns the list into a ``CompiledScoring`` once:
+
+* rules grouped by question id, so a submission only touches the rules of
+  the questions it answered; within a question ``==`` targets are a dict
+  lookup and ``>`` / ``<`` thresholds a bisect over sorted values;
+* thresholds pre-converted: ``==`` compares against ``str(val)``, ``>`` /
+  ``<`` against ``float(val)``; rules that can never match (an unknown op,
+  a non-numeric threshold) are dropped;
+* deltas as (dimension index, value) pairs and as a rules x dimensions
+  matrix, which ``score_many`` multiplies by a submissions x rules match
+  matrix built column by column with NumPy.
+
+``score`` returns exactly what the interpreter returned. ``score_many`` sums
+with a matrix product, so with fractional deltas a score may differ from it
+in the last bits. Malformed rules (a rule or condition that is not an
+object, a non-numeric delta) raise ValueError when new logic is saved
+(``strict=True``). Logic already stored is compiled with ``strict=False``:
+a malformed rule is logged and dropped, so one bad rule saved before the
+check existed does not fail every submission of its template.
+
+``scoring_cache`` keeps one compiled evaluator per template version, keyed
+by id, version and ``updated_at`` so an edited draft is recompiled.
+"""
+import logging
+import math
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+OPS = ('==', '>', '<')
+CACHE_ENTRIES = 256
+
+
+def _to_float(value: Any) -> float:
+    """float(value), or NaN (which compares false with every threshold) when it does not convert."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class CompiledRule:
+    __slots__ = ('index', 'qid', 'op', 'text', 'number', 'effects')
+
+    def __init__(self, index: int, qid: Any, op: str, text: str, number: float, effects: Tuple[Tuple[str, float], ...]):
+        self.index = index
+        self.qid = qid
+        self.op = op
+        self.text = text
+        self.number = number
+        self.effects = effects
+
+
+def _rule_effects(position: int, rule: Any) -> Tuple[Dict[str, Any], Tuple[Tuple[str, float], ...]]:
+    """The condition and (dimension, delta) pairs of a rule; raises ValueError when it is malformed."""
+    if not isinstance(rule, dict):
+        raise ValueError(f"Scoring rule {position} must be an object")
+    condition = rule.get('if', {})
+    consequences = rule.get('then', {})
+    if not isinstance(condition, dict) or not isinstance(consequences, dict):
+        raise ValueError(f"Scoring rule {position} needs 'if' and 'then' objects")
+    effects = []
+    for dimension, delta in consequences.items():
+        try:
+            effects.append((dimension, float(delta)))
+        except (TypeError, ValueError):
+            raise ValueError(f"Scoring rule {position}: delta for '{dimension}' is not a number")
+    return condition, tuple(effects)
+
+
+def compile_scoring(logic: Optional[Sequence[Dict[str, Any]]], strict: bool = True) -> "CompiledScoring":
+    """
+    Compile a scoring_logic list. A malformed rule raises ValueError, or with
+    ``strict=False`` is logged and left out.
+    """
+    rules: List[CompiledRule] = []
+    for position, rule in enumerate(logic or []):
+        try:
+            condition, effects = _rule_effects(position, rule)
+        except ValueError as e:
+            if strict:
+                raise
+            logger.warning(f"Skipping malformed stored scoring rule: {e}")
+            continue
+
+        qid = condition.get('qid')
+        op = condition.get('op', '==')
+        target = condition.get('val')
+        if qid is None or op not in OPS:
+            continue
+        threshold = math.nan if op == '==' else _to_float(target)
+        if op != '==' and math.isnan(threshold):
+            continue
+        rules.append(CompiledRule(position, qid, op, str(target), threshold, effects))
+    return CompiledScoring(rules)
+
+
+class QuestionRules:
+    """
+    The rules of one question, indexed for a single answer: ``==`` targets by
+    text, ``>`` / ``<`` thresholds sorted so the matching ones are a bisect away.
+    """
+    __slots__ = ('equals', 'above', 'above_rules', 'below', 'below_rules')
+
+    def __init__(self, rules: Sequence[CompiledRule]):
+        self.equals: Dict[str, Tuple[int, ...]] = {}
+        for rule in rules:
+            if rule.op == '==':
+                self.equals[rule.text] = self.equals.get(rule.text, ()) + (rule.index,)
+        above = sorted((rule.number, rule.index) for rule in rules if rule.op == '>')
+        below = sorted((rule.number, rule.index) for rule in rules if rule.op == '<')
+        self.above = [number for number, _ in above]
+        self.above_rules = [index for _, index in above]
+        self.below = [number for number, _ in below]
+        self.below_rules = [index for _, index in below]
+
+    def matches(self, value: Any) -> List[int]:
+        """Indexes of the rules matched by ``value``."""
+        matched = list(self.equals.get(str(value), ()))
+        if self.above or self.below:
+            number = _to_float(value)
+            if not math.isnan(number):
+                # answer > threshold for every threshold below the answer, and vice versa
+                matched.extend(self.above_rules[:bisect_left(self.above, number)])
+                matched.extend(self.below_rules[bisect_right(self.below, number):])
+        return matched
+
+
+class CompiledScoring:
+    """Scoring rules indexed by question id, with their deltas as dimension-index arrays."""
+
+    def __init__(self, rules: Sequence[CompiledRule]):
+        self.rules: Tuple[CompiledRule, ...] = tuple(rules)
+        self._by_index = {rule.index: rule for rule in self.rules}
+        self.by_qid: Dict[Any, Tuple[CompiledRule, ...]] = {}
+        for rule in self.rules:
+            self.by_qid[rule.qid] = self.by_qid.get(rule.qid, ()) + (rule,)
+        self._questions = {qid: QuestionRules(rules) for qid, rules in self.by_qid.items()}
+
+        dimensions: Dict[str, int] = {}
+        for rule in self.rules:
+            for dimension, _ in rule.effects:
+                dimensions.setdefault(dimension, len(dimensions))
+        self.dimensions: Tuple[str, ...] = tuple(dimensions)
+        # Column of each rule in the match matrix, by position in self.rules
+        self._column = {rule.index: column for column, rule in enumerate(self.rules)}
+        self._deltas = np.zeros((len(self.rules), len(self.dimensions)))
+        self._presence = np.zeros((len(self.rules), len(self.dimensions)))
+        for column, rule in enumerate(self.rules):
+            for dimension, delta in rule.effects:
+                self._deltas[column, dimensions[dimension]] += delta
+                self._presence[column, dimensions[dimension]] = 1.0
+
+    def score(self, answers: Dict[Any, Any]) -> Dict[str, float]:
+        """Dimension scores of one submission's {question_id: answer}."""
+        matched = []
+        for qid, value in answers.items():
+            rules = self._questions.get(qid)
+            if rules is not None and value is not None:
+                matched.extend(rules.matches(value))
+
+        # Accumulate in rule order, as the interpreter did
+        scores: Dict[str, float] = {}
+        for index in sorted(matched):
+            for dimension, delta in self._by_index[index].effects:
+                scores[dimension] = scores.get(dimension, 0.0) + delta
+        return scores
+
+    def score_many(self, answer_maps: Sequence[Dict[Any, Any]]) -> List[Dict[str, float]]:
+        """Dimension scores of many submissions at once (same result as ``score`` for each)."""
+        if not self.rules or not answer_maps:
+            return [{} for _ in answer_maps]
+
+        # One column of (submission row, answer text) per question with rules
+        columns: Dict[Any, Tuple[List[int], List[str]]] = {qid: ([], []) for qid in self.by_qid}
+        for row, answers in enumerate(answer_maps):
+            for qid, value in answers.items():
+                column = columns.get(qid)
+                if column is not None and value is not None:
+                    column[0].append(row)
+                    column[1].append(str(value))
+
+        matches = np.zeros((len(answer_maps), len(self.rules)), dtype=bool)
+        for qid, (rows, texts) in columns.items():
+            if not rows:
+                continue
+            rows = np.asarray(rows, dtype=np.intp)
+            uniques, codes = np.unique(np.asarray(texts, dtype=str), return_inverse=True)
+            numbers = np.array([_to_float(text) for text in uniques.tolist()])[codes]
+            positions = {text: code for code, text in enumerate(uniques.tolist())}
+            for rule in self.by_qid[qid]:
+                if rule.op == '==':
+                    code = positions.get(rule.text)
+                    if code is None:
+                        continue
+                    hit = codes == code
+                elif rule.op == '>':
+                    hit = numbers > rule.number
+                else:
+                    hit = numbers < rule.number
+                matches[rows[hit], self._column[rule.index]] = True
+
+        weights = matches.astype(np.float64)
+        totals = weights @ self._deltas
+        touched = (weights @ self._presence) > 0
+        return [
+            {self.dimensions[k]: float(totals[row, k]) for k in np.flatnonzero(touched[row])}
+            for row in range(len(answer_maps))
+        ]
+
+
+class ScoringCache:
+    """LRU of compiled scoring logic per survey template version."""
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, CompiledScoring]" = OrderedDict()
+        self.stats = {"hits": 0, "compiles": 0}
+
+    def get(self, template) -> CompiledScoring:
+        key = (template.id, template.version, template.updated_at)
+        compiled = self._entries.get(key)
+        if compiled is not None:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return compiled
+        compiled = compile_scoring(template.scoring_logic, strict=False)
+        self.stats["compiles"] += 1
+        self._entries[key] = compiled
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Process-wide instance
+scoring_cache = ScoringCache()
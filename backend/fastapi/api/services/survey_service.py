@@ -11,15 +11,20 @@ from ..models import (
     SurveyTemplate, SurveySection, SurveyQuestion, 
     SurveySubmission, SurveyResponse, SurveyStatus, QuestionType, User
 )
+from .survey_scoring import compile_scoring, scoring_cache
 
 logger = logging.getLogger("api.surveys")
 
+# Submissions loaded, scored and updated per round trip when re-scoring
+RESCORE_BATCH_SIZE = 2000
+
 class SurveyService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def create_template(self, user_id: int, data: Dict[str, Any]) -> SurveyTemplate:
         """Create a new survey template (Draft)."""
+        compile_scoring(data.get('scoring_logic'))  # reject malformed rules before saving
         template = SurveyTemplate(
             uuid=str(uuid4()),
             title=data['title'],
@@ -203,12 +208,64 @@ class SurveyService:
             answer_map[qid] = val
         
         # Apply Scoring DSL Engine
-        total_scores = self._calculate_scores_dsl(survey.scoring_logic, answer_map)
+        total_scores = scoring_cache.get(survey).score(answer_map)
         submission.total_scores = total_scores
         
         await self.db.commit()
         return submission
 
+    async def rescore_submissions(self, template_id: int, batch_size: int = RESCORE_BATCH_SIZE) -> int:
+        """
+        Recompute total_scores of every submission of a template with its
+        current scoring logic, a batch of submissions at a time. Returns the
+        number of submissions rescored.
+        """
+        template = await self.get_template_by_id(template_id, admin_access=True)
+        if not template:
+            raise ValueError("Template not found")
+        scoring = scoring_cache.get(template)
+
+        rescored, last_id = 0, 0
+        while True:
+            ids = list((await self.db.execute(
+                select(SurveySubmission.id)
+                .where(SurveySubmission.survey_id == template_id, SurveySubmission.id > last_id)
+                .order_by(SurveySubmission.id)
+                .limit(batch_size)
+            )).scalars())
+            if not ids:
+                break
+            answer_maps = {submission_id: {} for submission_id in ids}
+            rows = await self.db.execute(
+                select(SurveyResponse.submission_id, SurveyResponse.question_id, SurveyResponse.answer_value)
+                .where(SurveyResponse.submission_id.in_(ids))
+                .order_by(SurveyResponse.id)
+            )
+            for submission_id, question_id, answer_value in rows:
+                answer_maps[submission_id][question_id] = answer_value
+
+            scores = scoring.score_many(list(answer_maps.values()))
+            await self.db.execute(update(SurveySubmission), [
+                {"id": submission_id, "total_scores": total_scores}
+                for submission_id, total_scores in zip(answer_maps, scores)
+            ])
+            await self.db.commit()
+            rescored += len(ids)
+            last_id = ids[-1]
+
+        logger.info(f"Rescored {rescored} submissions of survey template {template_id}")
+        return rescored
+
+    async def update_scoring_logic(self, template_id: int, scoring_logic: List[Dict[str, Any]]) -> int:
+        """Replace a template's scoring logic and rescore its submissions; returns the number rescored."""
+        compile_scoring(scoring_logic)  # reject malformed rules before saving
+        template = await self.get_template_by_id(template_id, admin_access=True)
+        if not template:
+            raise ValueError("Template not found")
+        template.scoring_logic = scoring_logic
+        await self.db.commit()
+        return await self.rescore_submissions(template_id)
+
     def _calculate_scores_dsl(self, logic: List[Dict], answers: Dict[int, Any]) -> Dict[str, float]:
         """
         Custom JSON-based Scoring DSL.
@@ -219,33 +276,7 @@ class SurveyService:
                 "then": {"anxiety": 5, "resilience": -2}
             }
         ]
+        Compiles ``logic`` on every call; submissions use the per-template
+        compiled form (services/survey_scoring.py).
         """
-        scores = {}
-        if not logic: return scores
-        
-        for rule in logic:
-            condition = rule.get('if', {})
-            qid = condition.get('qid')
-            op = condition.get('op', '==')
-            target_val = condition.get('val')
-            
-            actual_val = answers.get(qid)
-            if actual_val is None: continue
-
-            # Evaluation logic
-            match = False
-            if op == '==':
-                match = str(actual_val) == str(target_val)
-            elif op == '>':
-                try: match = float(actual_val) > float(target_val)
-                except: pass
-            elif op == '<':
-                try: match = float(actual_val) < float(target_val)
-                except: pass
-
-            if match:
-                consequences = rule.get('then', {})
-                for dimension, delta in consequences.items():
-                    scores[dimension] = scores.get(dimension, 0.0) + float(delta)
-        
-        return scores
+        return compile_scoring(logic, strict=False).score(answers)
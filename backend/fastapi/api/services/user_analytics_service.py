@@ -4,126 +4,69 @@ from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, desc, select
 
-from ..models import Score, JournalEntry, UserSession
+from ..models import Score, JournalEntry
 from ..schemas import (
     UserAnalyticsSummary,
     EQScorePoint,
     WellbeingPoint,
     UserTrendsResponse
 )
-
-from sqlalchemy import select, func, desc
-from sqlalchemy.ext.asyncio import AsyncSession
+from .score_summary import ScoreSummaryService
 
 class UserAnalyticsService:
     @classmethod
     async def get_dashboard_summary(cls, db: AsyncSession, user_id: int) -> UserAnalyticsSummary:
-        """Dashboard summary (Async)."""
         """
         Calculate headline stats for the user dashboard.
+
+        Reads the user's maintained score summary (one primary-key lookup);
+        see services/score_summary.py.
         """
-        # 1. Basic Aggregates
-        stmt = select(
-            func.count(Score.id),
-            func.avg(Score.total_score),
-            func.max(Score.total_score)
-        ).filter(Score.user_id == user_id)
-        ).join(UserSession, Score.session_id == UserSession.session_id).filter(UserSession.user_id == user_id)
-        
-        result = await db.execute(stmt)
-        stats = result.first()
-        
-        total_exams = stats[0] or 0
-        average_score = float(stats[1]) if stats[1] is not None else 0.0
-        best_score = stats[2] or 0
-        
-        stmt_latest = select(Score).filter(Score.user_id == user_id).order_by(Score.id.desc())
-        latest_exam = (await db.execute(stmt_latest)).scalar_one_or_none()
-        latest_score = latest_exam.total_score if latest_exam else 0
-        
-        consistency_score = None
-        if total_exams >= 2 and average_score > 0:
-            stmt_scores = select(Score.total_score).filter(Score.user_id == user_id)
-            scores = (await db.execute(stmt_scores)).scalars().all()
-            score_values = list(scores)
-        # 2. Latest Score
-        latest_stmt = select(Score).join(UserSession, Score.session_id == UserSession.session_id).filter(
-            UserSession.user_id == user_id
-        ).order_by(desc(Score.id))
-        
-        latest_res = await db.execute(latest_stmt)
-        latest_exam = latest_res.scalar_one_or_none()
-        
-        latest_score = latest_exam.total_score if latest_exam else 0
-        
-        # 3. Consistency Score
+        summary = await ScoreSummaryService.get_summary(db, user_id)
+
+        total_exams = summary.exam_count
+        average_score = summary.average
+
+        # Consistency: coefficient of variation of all scores
         consistency_score = None
-        if total_exams >= 2 and average_score > 0:
-            scores_stmt = select(Score.total_score).join(UserSession, Score.session_id == UserSession.session_id).filter(UserSession.user_id == user_id)
-            scores_res = await db.execute(scores_stmt)
-            score_values = [s for s in scores_res.scalars().all()]
-            
-            import statistics
-            if len(score_values) > 1:
-                stdev = statistics.stdev(score_values)
-                consistency_score = (stdev / average_score) * 100
-        
-        sentiment_trend = "stable"
-        if total_exams >= 3:
-            stmt_recent = select(Score.total_score).filter(Score.user_id == user_id).order_by(Score.id.desc()).limit(5)
-            recent_scores = (await db.execute(stmt_recent)).scalars().all()
-            recent_values = list(recent_scores)[::-1]
-        # 4. Sentiment Trend
+        stdev = summary.stdev
+        if stdev is not None and average_score > 0:
+            consistency_score = (stdev / average_score) * 100
+
+        # Sentiment trend over the last five exams
         sentiment_trend = "stable"
-        if total_exams >= 3:
-            recent_stmt = select(Score.total_score).join(UserSession, Score.session_id == UserSession.session_id).filter(
-                UserSession.user_id == user_id
-            ).order_by(desc(Score.id)).limit(5)
-            
-            recent_res = await db.execute(recent_stmt)
-            recent_values = [s for s in recent_res.scalars().all()][::-1]
-            
-            if len(recent_values) >= 2:
-                delta = recent_values[-1] - recent_values[0]
-                if delta > 5: sentiment_trend = "improving"
-                elif delta < -5: sentiment_trend = "declining"
-                    
-        # 5. Streak
-        streak_days = 0 
-        
+        recent_values = summary.recent_scores
+        if total_exams >= 3 and len(recent_values) >= 2:
+            delta = recent_values[-1] - recent_values[0]
+            if delta > 5: sentiment_trend = "improving"
+            elif delta < -5: sentiment_trend = "declining"
+
         return UserAnalyticsSummary(
             total_exams=total_exams,
             average_score=round(average_score, 1),
-            best_score=best_score,
-            latest_score=latest_score,
+            best_score=summary.best_score or 0,
+            latest_score=summary.latest_score or 0,
             sentiment_trend=sentiment_trend,
-            streak_days=0,
+            streak_days=summary.current_streak(datetime.now(UTC).date()),
             consistency_score=round(consistency_score, 1) if consistency_score is not None else None
         )
 
     @classmethod
     async def get_eq_trends(cls, db: AsyncSession, user_id: int, days: int = 30) -> List[EQScorePoint]:
-        """EQ trends (Async)."""
+        """Get EQ score history for charting."""
         cutoff = datetime.now(UTC) - timedelta(days=days)
+
         stmt = select(Score).filter(
             Score.user_id == user_id,
             Score.timestamp >= cutoff.isoformat()
         ).order_by(Score.timestamp.asc())
-        """Get EQ score history for charting."""
-        cutoff = datetime.now(UTC) - timedelta(days=days)
-        
-        stmt = select(Score).join(UserSession, Score.session_id == UserSession.session_id).filter(
-            UserSession.user_id == user_id,
-            Score.timestamp >= cutoff
-        ).order_by(Score.timestamp.asc())
-        
+
         result = await db.execute(stmt)
         scores = result.scalars().all()
-        
+
         return [
             EQScorePoint(
                 id=s.id,
-                timestamp=s.timestamp,
                 timestamp=s.timestamp.isoformat() if isinstance(s.timestamp, datetime) else s.timestamp,
                 total_score=s.total_score,
                 sentiment_score=s.sentiment_score
@@ -133,22 +76,19 @@ class UserAnalyticsService:
 
     @classmethod
     async def get_wellbeing_trends(cls, db: AsyncSession, user_id: int, days: int = 30) -> List[WellbeingPoint]:
-        """Wellbeing trends (Async)."""
         """Get wellbeing metrics from Journal (Sleep, Stress, Energy)."""
         cutoff = datetime.now(UTC) - timedelta(days=days)
         cutoff_str = cutoff.strftime("%Y-%m-%d")
-        
+
         stmt = select(JournalEntry).filter(
             JournalEntry.user_id == user_id,
-            JournalEntry.entry_date >= cutoff_str
-        ).order_by(JournalEntry.entry_date.asc())
             JournalEntry.entry_date >= cutoff_str,
             JournalEntry.is_deleted == False
         ).order_by(JournalEntry.entry_date.asc())
-        
+
         result = await db.execute(stmt)
         entries = result.scalars().all()
-        
+
         points = []
         for entry in entries:
             date_str = entry.entry_date.split(" ")[0]
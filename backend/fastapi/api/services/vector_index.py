@@ -0,0 +1,312 @@
+"""
+Local approximate nearest-neighbour index for journal embeddings.
+
+Semantic search uses it when the database has no pgvector (SQLite, plain
+PostgreSQL). The index is sharded per user, since every query is scoped to
+one user. Each shard is a single append-only file of fixed-size records
+``(entry_id: int64, vector: float32[dim])`` under ``vector_index_dir``. The
+file is named ``user_{id}.d{dim}.vec``, so a model with a different
+dimension starts a fresh shard.
+
+* Writers append whole records: one write() per batch, under an flock where
+  available. The newest record for an entry id wins. A negative id marks the
+  entry as removed. Once more than half the records are superseded, the shard
+  is compacted, i.e. rewritten and swapped in atomically.
+* Readers memory-map the file and build an IVF structure (inverted file) over
+  the live rows: spherical k-means centroids, plus one posting list per
+  centroid. A query scores the rows of the ``nprobe`` closest lists exactly.
+  Shards below ``ivf_min_vectors`` are scanned in full. Records appended
+  later by other processes are picked up on the next query and assigned to
+  their nearest centroid. A shard is retrained once it has doubled in size.
+
+Vectors are unit-normalised on write, so scores are cosine similarities.
+"""
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from cachetools import LRUCache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.config import get_settings_instance
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still single writes, compaction is unguarded
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _record_dtype(dim: int) -> np.dtype:
+    return np.dtype([("id", "<i8"), ("vec", "<f4", (dim,))])
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids maximising cosine similarity to their members."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        filled = np.bincount(assignment, minlength=k) > 0
+        # Empty clusters keep their previous centroid
+        centroids[filled] = _normalize(sums[filled])
+    return centroids
+
+
+@contextmanager
+def _locked(path: str):
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class UserShard:
+    """Read side of one user's shard: memory-mapped records plus the IVF lists."""
+
+    def __init__(self, path: str, dim: int, nprobe: int, ivf_min_vectors: int):
+        self.path = path
+        self.dim = dim
+        self.dtype = _record_dtype(dim)
+        self.nprobe = nprobe
+        self.ivf_min_vectors = ivf_min_vectors
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._inode = None
+        self._records: Optional[np.memmap] = None
+        self._rows_read = 0
+        self._row_of: Dict[int, int] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        self._trained_on = 0
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def refresh(self) -> None:
+        """Pick up records appended (or a compaction done) since the last call."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return
+        if self._inode is not None and stat.st_ino != self._inode:
+            self._reset()
+        self._inode = stat.st_ino
+
+        rows = stat.st_size // self.dtype.itemsize
+        if rows == self._rows_read:
+            return
+        self._records = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(rows,))
+        if len(self._live) < rows:
+            self._live = np.concatenate([self._live, np.zeros(max(rows, 2 * len(self._live)) - len(self._live), bool)])
+
+        new_rows = range(self._rows_read, rows)
+        ids = self._records["id"][self._rows_read:rows]
+        for row, entry_id in zip(new_rows, ids.tolist()):
+            previous = self._row_of.pop(abs(entry_id), None)
+            if previous is not None:
+                self._live[previous] = False
+            if entry_id >= 0:
+                self._row_of[entry_id] = row
+                self._live[row] = True
+        self._rows_read = rows
+
+        if len(self._row_of) >= self.ivf_min_vectors and len(self._row_of) >= 2 * max(self._trained_on, 1):
+            self._train()
+        elif self._centroids is not None:
+            self._assign([row for row in new_rows if self._live[row]])
+
+    def _train(self):
+        live_rows = np.flatnonzero(self._live[:self._rows_read])
+        k = max(1, int(np.sqrt(len(live_rows))))
+        vectors = np.asarray(self._records["vec"][live_rows])
+        # Train on a sample; posting lists still cover every row
+        sample = vectors if len(vectors) <= 64 * k else vectors[
+            np.random.default_rng(0).choice(len(vectors), size=64 * k, replace=False)]
+        self._centroids = spherical_kmeans(sample, k)
+        self._lists = [[] for _ in range(k)]
+        self._list_arrays = {}
+        self._trained_on = len(live_rows)
+        self._assign(live_rows.tolist(), vectors)
+
+    def _assign(self, rows: Sequence[int], vectors: Optional[np.ndarray] = None):
+        if not rows:
+            return
+        if vectors is None:
+            vectors = np.asarray(self._records["vec"][list(rows)])
+        for row, cluster in zip(rows, np.argmax(vectors @ self._centroids.T, axis=1).tolist()):
+            self._lists[cluster].append(row)
+            self._list_arrays.pop(cluster, None)
+
+    def _candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        if self._centroids is None:
+            return np.flatnonzero(self._live[:self._rows_read])
+        probe = np.argsort(-(self._centroids @ query))[:nprobe]
+        arrays = []
+        for cluster in probe.tolist():
+            if cluster not in self._list_arrays:
+                self._list_arrays[cluster] = np.asarray(self._lists[cluster], dtype=np.int64)
+            arrays.append(self._list_arrays[cluster])
+        rows = np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+        # Posting lists keep superseded rows until the next training pass
+        return rows[self._live[rows]]
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None, exact: bool = False) -> List[Tuple[int, float]]:
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        with self.lock:
+            self.refresh()
+            if not self._row_of:
+                return []
+            rows = np.flatnonzero(self._live[:self._rows_read]) if exact else self._candidates(query, nprobe or self.nprobe)
+            if not len(rows):
+                return []
+            records = self._records[rows]
+            scores = records["vec"] @ query
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            return [(int(records["id"][i]), float(scores[i])) for i in top]
+
+
+class VectorIndex:
+    """Per-user shard files plus a bounded set of loaded shards for this process."""
+
+    def __init__(self, root: Optional[str] = None, nprobe: Optional[int] = None,
+                 ivf_min_vectors: Optional[int] = None, max_loaded_shards: Optional[int] = None):
+        settings = get_settings_instance()
+        self.root = root or settings.vector_index_dir
+        self.nprobe = nprobe or settings.vector_index_nprobe
+        self.ivf_min_vectors = settings.vector_index_ivf_min_vectors if ivf_min_vectors is None else ivf_min_vectors
+        self._shards: LRUCache = LRUCache(maxsize=max_loaded_shards or settings.vector_index_max_loaded_shards)
+        self._lock = threading.Lock()
+
+    def shard_path(self, user_id: int, dim: int) -> str:
+        return os.path.join(self.root, f"user_{user_id}.d{dim}.vec")
+
+    def has_shard(self, user_id: int, dim: int) -> bool:
+        return os.path.exists(self.shard_path(user_id, dim))
+
+    def _shard(self, user_id: int, dim: int) -> UserShard:
+        key = (user_id, dim)
+        with self._lock:
+            shard = self._shards.get(key)
+            if shard is None:
+                shard = UserShard(self.shard_path(user_id, dim), dim, self.nprobe, self.ivf_min_vectors)
+                self._shards[key] = shard
+            return shard
+
+    def _records(self, items: Sequence[Tuple[int, Sequence[float]]], dim: int) -> np.ndarray:
+        records = np.zeros(len(items), dtype=_record_dtype(dim))
+        records["id"] = [entry_id for entry_id, _ in items]
+        if items:
+            records["vec"] = _normalize(np.asarray([vector for _, vector in items], dtype=np.float32))
+        return records
+
+    def _append(self, path: str, records: np.ndarray):
+        with _locked(path):
+            with open(path, "ab") as f:
+                before = f.tell() // records.itemsize
+                f.write(records.tobytes())
+            rows = before + len(records)
+            # Check for garbage only when the file crosses a power of two, so the
+            # full read that compaction needs stays amortised O(1) per record
+            if rows >= 1024 and rows.bit_length() != before.bit_length():
+                self._maybe_compact(path, records.dtype, rows)
+
+    def _maybe_compact(self, path: str, dtype: np.dtype, rows: int):
+        records = np.fromfile(path, dtype=dtype, count=rows)
+        ids = records["id"]
+        # Last record per entry id wins; tombstones drop the entry
+        _, last = np.unique(np.abs(ids[::-1]), return_index=True)
+        keep = np.sort(rows - 1 - last)
+        keep = keep[ids[keep] >= 0]
+        if len(keep) * 2 > rows:
+            return
+        tmp_path = path + ".tmp"
+        records[keep].tofile(tmp_path)
+        os.replace(tmp_path, path)
+        logger.info(f"Compacted vector shard {path}: {rows} -> {len(keep)} records")
+
+    def upsert(self, user_id: int, items: Sequence[Tuple[int, Sequence[float]]], create: bool = False) -> bool:
+        """
+        Add or replace entry vectors in the user's shard.
+        Without `create`, users that have no shard yet are skipped: their shard is
+        built from the database on first search, which already includes these rows.
+        """
+        items = [(entry_id, vector) for entry_id, vector in items if vector is not None and len(vector)]
+        if not items:
+            return False
+        dim = len(items[0][1])
+        path = self.shard_path(user_id, dim)
+        if not create and not os.path.exists(path):
+            return False
+        os.makedirs(self.root, exist_ok=True)
+        self._append(path, self._records(items, dim))
+        return True
+
+    def remove(self, user_id: int, entry_ids: Sequence[int], dim: int) -> None:
+        path = self.shard_path(user_id, dim)
+        if not entry_ids or not os.path.exists(path):
+            return
+        records = np.zeros(len(entry_ids), dtype=_record_dtype(dim))
+        records["id"] = [-entry_id for entry_id in entry_ids]
+        self._append(path, records)
+
+    def search(self, user_id: int, query: Sequence[float], k: int = 10,
+               nprobe: Optional[int] = None, exact: bool = False) -> List[Tuple[int, float]]:
+        """Top-k ``(entry_id, cosine similarity)`` for the user, best first."""
+        return self._shard(user_id, len(query)).search(query, k, nprobe=nprobe, exact=exact)
+
+    async def build_user(self, db: AsyncSession, user_id: int, dim: int) -> int:
+        """(Re)write a user's shard from the embeddings stored in journal_entries."""
+        from api.models import JournalEntry
+
+        rows = (await db.execute(
+            select(JournalEntry.id, JournalEntry.embedding).where(
+                JournalEntry.user_id == user_id,
+                JournalEntry.is_deleted == False,
+                JournalEntry.embedding.isnot(None),
+            ).order_by(JournalEntry.id)
+        )).all()
+        items = [(row.id, row.embedding) for row in rows if row.embedding is not None and len(row.embedding) == dim]
+
+        os.makedirs(self.root, exist_ok=True)
+        path = self.shard_path(user_id, dim)
+        with _locked(path):
+            tmp_path = path + ".tmp"
+            self._records(items, dim).tofile(tmp_path)
+            os.replace(tmp_path, path)
+        logger.info(f"Built vector shard for user {user_id}: {len(items)} vectors")
+        return len(items)
+
+
+_vector_index: Optional[VectorIndex] = None
+
+
+def get_vector_index() -> VectorIndex:
+    global _vector_index
+    if _vector_index is None:
+        _vector_index = VectorIndex()
+    return _vector_index
@@ -1,33 +1,131 @@
+"""
+WebSocket connection manager with Redis Pub/Sub fan-out across nodes.
+
+Routing: broadcasts are published on ``soulsense_ws_events``, which every node
+subscribes to. Personal messages are published on a per-user channel
+(``soulsense_ws_events:user:<id>``). A node subscribes to that channel only
+while it holds a connection for the user, so it never receives or decodes
+traffic for users connected elsewhere.
+
+Encoding: a message is serialized once, by the publisher. What travels over
+Redis is the exact text sent to the clients, so receiving nodes forward it
+without decoding.
+
+Fan-out: each connection has a bounded send queue drained by its own writer
+task. A broadcast only enqueues, so one slow client cannot stall delivery to
+the others. When a queue is full, ``ws_slow_consumer_policy`` applies:
+``drop_oldest`` discards the oldest queued message, and ``disconnect``
+closes the connection with 1013 (try again later).
+"""
 import json
 import asyncio
 import logging
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Set
 from fastapi import WebSocket
-from sqlalchemy.ext.asyncio import AsyncSession
 import redis.asyncio as redis
 
-from ..models import User
 from ..config import get_settings_instance
 
 logger = logging.getLogger("websocket_manager")
 settings = get_settings_instance()
 
+BROADCAST_CHANNEL = "soulsense_ws_events"
+USER_CHANNEL_PREFIX = "soulsense_ws_events:user:"
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def encode_message(message: dict) -> str:
+    """Serialize a message exactly as ``WebSocket.send_json`` would."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def user_channel(user_id: int) -> str:
+    return f"{USER_CHANNEL_PREFIX}{user_id}"
+
+
+class _ConnectionSender:
+    """Bounded send queue for one WebSocket, drained by its own writer task."""
+
+    def __init__(self, manager: "ConnectionManager", websocket: WebSocket, user_id: int):
+        self.manager = manager
+        self.websocket = websocket
+        self.user_id = user_id
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=manager.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, text: str) -> None:
+        if self.closed:
+            return
+        try:
+            self._queue.put_nowait(text)
+            return
+        except asyncio.QueueFull:
+            pass
+        if self.manager.slow_consumer_policy == "disconnect":
+            self.manager.stats["slow_disconnects"] += 1
+            logger.warning(f"Disconnecting slow WebSocket consumer for user {self.user_id}")
+            self.manager._remove_sender(self, close_code=SLOW_CONSUMER_CLOSE_CODE)
+            return
+        self._queue.get_nowait()
+        self._queue.put_nowait(text)
+        self.manager.stats["dropped"] += 1
+
+    async def _run(self):
+        try:
+            while True:
+                text = await self._queue.get()
+                await self.websocket.send_text(text)
+                self.manager.stats["sent"] += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error sending to user {self.user_id}: {e}")
+            self.manager.stats["send_errors"] += 1
+            self.manager._remove_sender(self)
+
+    def close(self, close_code: Optional[int] = None):
+        self.closed = True
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+        if close_code is not None:
+            self.manager._spawn(self._close_socket(close_code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, max_queue: Optional[int] = None, slow_consumer_policy: Optional[str] = None):
         # Maps user_id to a list of active WebSocket connections
         self.active_connections: Dict[int, List[WebSocket]] = {}
         self.redis_client = None
         self.pubsub = None
-        self.channel_name = "soulsense_ws_events"
+        self.channel_name = BROADCAST_CHANNEL
         self._listener_task = None
         self._is_connected = False
 
+        self.max_queue = max_queue or settings.ws_send_queue_size
+        self.slow_consumer_policy = slow_consumer_policy or settings.ws_slow_consumer_policy
+        self._senders: Dict[WebSocket, _ConnectionSender] = {}
+        self._subscribed_users: Set[int] = set()
+        self._subscription_lock = asyncio.Lock()
+        self._background: Set[asyncio.Task] = set()
+        self.stats = {"sent": 0, "dropped": 0, "slow_disconnects": 0, "send_errors": 0}
+
     async def connect_redis(self):
         if not self._is_connected:
             try:
                 self.redis_client = redis.from_url(
-                    settings.redis_url, 
-                    encoding="utf-8", 
+                    settings.redis_url,
+                    encoding="utf-8",
                     decode_responses=True
                 )
                 self.pubsub = self.redis_client.pubsub()
@@ -36,6 +134,9 @@ class ConnectionManager:
                 self._is_connected = True
                 logger.info(f"[OK] WebSocketManager subscribed to Redis channel: {self.channel_name}")
                 print(f"[OK] WebSocketManager subscribed to Redis channel: {self.channel_name}")
+                # Users that connected before Redis was available
+                for user_id in list(self.active_connections):
+                    await self._sync_subscription(user_id)
             except Exception as e:
                 logger.error(f"[WARNING] Failed to connect WebSocketManager to Redis: {e}. Falling back to local broadcasting.")
                 print(f"[WARNING] Failed to connect WebSocketManager to Redis: {e}. Falling back to local broadcasting.")
@@ -44,93 +145,129 @@ class ConnectionManager:
         try:
             async for message in self.pubsub.listen():
                 if message["type"] == "message":
-                    data = json.loads(message["data"])
-                    user_id = data.get("user_id")
-                    payload = data.get("payload")
-                    
-                    if user_id:
-                        # Direct message to specific local user connections
-                        await self._send_to_local_user(user_id, payload)
-                    else:
-                        # Broadcast message to all local user connections
-                        await self._broadcast_local(payload)
+                    self._dispatch(message["channel"], message["data"])
         except asyncio.CancelledError:
             logger.info("Redis listener task cancelled")
         except Exception as e:
             logger.error(f"Redis listener error: {e}")
 
+    def _dispatch(self, channel: str, text: str):
+        """Route a Pub/Sub message to local connections; the text is forwarded as is."""
+        if channel == self.channel_name:
+            self._broadcast_local(text)
+        elif channel.startswith(USER_CHANNEL_PREFIX):
+            self._send_to_local_user(int(channel[len(USER_CHANNEL_PREFIX):]), text)
+
     async def connect(self, websocket: WebSocket, user_id: int):
         await websocket.accept()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
         self.active_connections[user_id].append(websocket)
+        self._senders[websocket] = _ConnectionSender(self, websocket, user_id)
         # Verify redis connection on first connect
         if not self._is_connected:
             await self.connect_redis()
+        await self._sync_subscription(user_id)
 
     def disconnect(self, websocket: WebSocket, user_id: int):
+        sender = self._senders.pop(websocket, None)
+        if sender is not None:
+            sender.close()
         if user_id in self.active_connections:
             if websocket in self.active_connections[user_id]:
                 self.active_connections[user_id].remove(websocket)
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
+                if user_id in self._subscribed_users:
+                    self._spawn(self._sync_subscription(user_id))
 
-    async def _send_to_local_user(self, user_id: int, payload: dict):
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(payload)
-                except Exception as e:
-                    logger.error(f"Error sending to local user {user_id}: {e}")
+    def _remove_sender(self, sender: _ConnectionSender, close_code: Optional[int] = None):
+        """Drop a connection whose writer failed or that fell too far behind."""
+        if self._senders.get(sender.websocket) is sender:
+            self.disconnect(sender.websocket, sender.user_id)
+        sender.close(close_code)
 
-    async def _broadcast_local(self, payload: dict):
-        for user_connections in self.active_connections.values():
-            for connection in user_connections:
-                try:
-                    await connection.send_json(payload)
-                except Exception as e:
-                    pass
+    async def _sync_subscription(self, user_id: int):
+        """Subscribe to a user's channel while they have local connections, unsubscribe after."""
+        if not self._is_connected or self.pubsub is None:
+            return
+        async with self._subscription_lock:
+            wanted = user_id in self.active_connections
+            if wanted == (user_id in self._subscribed_users):
+                return
+            try:
+                if wanted:
+                    await self.pubsub.subscribe(user_channel(user_id))
+                    self._subscribed_users.add(user_id)
+                else:
+                    await self.pubsub.unsubscribe(user_channel(user_id))
+                    self._subscribed_users.discard(user_id)
+            except Exception as e:
+                logger.error(f"Failed to update Redis subscription for user {user_id}: {e}")
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _send_to_local_user(self, user_id: int, text: str):
+        for connection in self.active_connections.get(user_id, ()):
+            sender = self._senders.get(connection)
+            if sender is not None:
+                sender.enqueue(text)
+
+    def _broadcast_local(self, text: str):
+        # Copy: the disconnect policy may remove senders while enqueueing
+        for sender in list(self._senders.values()):
+            sender.enqueue(text)
 
     async def send_personal_message(self, user_id: int, message: dict):
         """Sends message via Redis to reach user on any node"""
+        text = encode_message(message)
         if not self.redis_client or not self._is_connected:
             # Fallback for local-only functionality
-            await self._send_to_local_user(user_id, message)
+            self._send_to_local_user(user_id, text)
             return
-            
-        payload = {
-            "user_id": user_id,
-            "payload": message
-        }
+
         try:
-            await self.redis_client.publish(self.channel_name, json.dumps(payload))
+            await self.redis_client.publish(user_channel(user_id), text)
         except Exception as e:
             logger.error(f"Failed to publish personal message to Redis: {e}")
-            await self._send_to_local_user(user_id, message)
+            self._send_to_local_user(user_id, text)
 
     async def broadcast(self, message: dict):
         """Broadcasts message via Redis to all nodes"""
+        text = encode_message(message)
         if not self.redis_client or not self._is_connected:
-            await self._broadcast_local(message)
+            self._broadcast_local(text)
             return
 
-        payload = {
-            "user_id": None,
-            "payload": message
-        }
         try:
-            await self.redis_client.publish(self.channel_name, json.dumps(payload))
+            await self.redis_client.publish(self.channel_name, text)
         except Exception as e:
             logger.error(f"Failed to publish broadcast message to Redis: {e}")
-            await self._broadcast_local(message)
-            
+            self._broadcast_local(text)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self._senders),
+            "users": len(self.active_connections),
+            "subscribed_user_channels": len(self._subscribed_users),
+            "queued": sum(sender.queued for sender in self._senders.values()),
+            "max_queue": self.max_queue,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            **self.stats,
+        }
+
     async def shutdown(self):
         try:
+            for sender in list(self._senders.values()):
+                sender.close()
             if self._listener_task:
                 self._listener_task.cancel()
             if self.pubsub:
                 try:
-                    await self.pubsub.unsubscribe(self.channel_name)
+                    await self.pubsub.unsubscribe()
                     await self.pubsub.close()
                 except Exception:
                     pass
@@ -139,6 +276,7 @@ class ConnectionManager:
                     await self.redis_client.close()
                 except Exception:
                     pass
+            self._subscribed_users.clear()
             self._is_connected = False
         except Exception:
             pass
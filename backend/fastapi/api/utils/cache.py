@@ -1,38 +1,71 @@
+import asyncio
 import json
 import logging
 import hashlib
+import time
 from functools import wraps
 from typing import Any, Callable, Optional
-import redis
+import redis.asyncio as aioredis
 from ..config import get_settings_instance
+from .singleflight import singleflight_service
 
 logger = logging.getLogger("api.cache")
 
 class RedisCache:
     """
     Utility class for Redis-based caching.
+
+    Uses ``redis.asyncio`` on a shared connection pool so cache round trips
+    never block the event loop. Every key written by :meth:`cache` is also
+    recorded in a per-prefix sorted set scored by its expiry time, which lets
+    :meth:`invalidate_prefix` drop a whole family of keys without scanning the
+    keyspace. Members whose key has expired are pruned on each write, so the
+    index stays proportional to the live keys under the prefix.
     """
-    def __init__(self):
-        settings = get_settings_instance()
-        self.enabled = False
+    # Seconds to wait before retrying Redis after a failed connection
+    RETRY_SECONDS = 30.0
+
+    def __init__(self, max_connections: int = 50):
+        self.settings = get_settings_instance()
+        self.enabled = bool(self.settings.redis_url)
+        self.max_connections = max_connections
+        self.client: Optional[aioredis.Redis] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._retry_at = 0.0
+
+    async def _get_client(self) -> Optional[aioredis.Redis]:
+        """Return the pooled async client, connecting lazily on first use."""
+        if not self.enabled:
+            return None
+        loop = asyncio.get_running_loop()
+        # Pools are bound to the loop that created them (tests, Celery tasks)
+        if self.client is not None and self._loop is loop:
+            return self.client
+        if time.monotonic() < self._retry_at:
+            return None
         try:
-            if settings.redis_url:
-                self.client = redis.from_url(settings.redis_url)
-            else:
-                self.client = redis.Redis(
-                    host=settings.redis_host,
-                    port=settings.redis_port,
-                    password=settings.redis_password,
-                    db=settings.redis_db,
-                    decode_responses=True
-                )
-            # Short timeout for ping to avoid hanging startup
-            self.client.execute_command('CLIENT', 'SETNAME', 'soulsense_cache')
-            self.client.ping()
-            self.enabled = True
+            # from_url owns its connection pool, so close() releases it
+            client = aioredis.from_url(
+                self.settings.redis_url,
+                max_connections=self.max_connections,
+                decode_responses=True,
+                socket_timeout=1.0,
+                socket_connect_timeout=1.0,
+                client_name="soulsense_cache",
+            )
+            await client.ping()
+            self.client, self._loop = client, loop
             logger.info("Redis cache initialized successfully")
         except Exception as e:
             logger.warning(f"Redis cache disabled: Could not connect to Redis: {e}")
+            self.client = None
+            self._retry_at = time.monotonic() + self.RETRY_SECONDS
+        return self.client
+
+    @staticmethod
+    def _tag_key(prefix: str) -> str:
+        # Sorted set (member -> expiry); a new name so a pre-existing SET never hits WRONGTYPE
+        return f"{prefix}:__key_expiry__"
 
     def _generate_key(self, func_name: str, args: tuple, kwargs: dict, prefix: str) -> str:
         """Generate a stable cache key."""
@@ -45,61 +78,119 @@ class RedisCache:
             if hasattr(arg, '__class__') and arg.__class__.__name__ in ['AssessmentService', 'QuestionService', 'ExamService', 'JournalService']:
                 continue
             clean_args.append(str(arg))
-            
+
         # Clean kwargs
         clean_kwargs = {k: v for k, v in kwargs.items() if k not in ['db', 'session']}
-        
+
         arg_str = f"{func_name}:{json.dumps(clean_args)}:{json.dumps(clean_kwargs, sort_keys=True)}"
         arg_hash = hashlib.md5(arg_str.encode()).hexdigest()
         return f"{prefix}:{func_name}:{arg_hash}"
 
+    async def _store(self, client: aioredis.Redis, cache_key: str, prefix: str, ttl: int, value: str) -> None:
+        """Write the value, index it by expiry and prune expired members in one round trip."""
+        tag_key = self._tag_key(prefix)
+        now = time.time()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.setex(cache_key, ttl, value)
+            pipe.zadd(tag_key, {cache_key: now + ttl})
+            pipe.zremrangebyscore(tag_key, "-inf", now)
+            pipe.expire(tag_key, ttl)
+            await pipe.execute()
+
     def cache(self, ttl: int = 300, prefix: str = "ssc"):
         """
         Decorator to cache async function results in Redis.
         Result must be JSON serializable.
+
+        Concurrent misses for the same key are collapsed through the
+        singleflight service so only one caller recomputes the value.
         """
         def decorator(func: Callable):
             @wraps(func)
             async def wrapper(*args, **kwargs):
-                if not self.enabled:
+                client = await self._get_client()
+                if client is None:
                     return await func(*args, **kwargs)
 
                 cache_key = self._generate_key(func.__name__, args, kwargs, prefix)
 
                 try:
-                    cached_val = self.client.get(cache_key)
-                    if cached_val:
+                    cached_val = await client.get(cache_key)
+                    if cached_val is not None:
                         logger.debug(f"Cache hit: {cache_key}")
                         return json.loads(cached_val)
                 except Exception as e:
                     logger.error(f"Cache retrieval error for {cache_key}: {e}")
 
-                # Call the actual function
-                result = await func(*args, **kwargs)
+                async def load():
+                    # Call the actual function
+                    result = await func(*args, **kwargs)
 
-                try:
-                    # Only cache if result is not None
-                    if result is not None:
-                        self.client.setex(cache_key, ttl, json.dumps(result))
-                        logger.debug(f"Cache miss, saved: {cache_key}")
-                except Exception as e:
-                    logger.error(f"Cache storage error for {cache_key}: {e}")
+                    try:
+                        # Only cache if result is not None
+                        if result is not None:
+                            await self._store(client, cache_key, prefix, ttl, json.dumps(result))
+                            logger.debug(f"Cache miss, saved: {cache_key}")
+                    except Exception as e:
+                        logger.error(f"Cache storage error for {cache_key}: {e}")
 
-                return result
+                    return result
+
+                return await singleflight_service.execute(cache_key, load)
             return wrapper
         return decorator
 
-    def invalidate(self, pattern: str):
-        """Invalidate cache keys matching a pattern."""
-        if not self.enabled:
-            return
+    async def invalidate_prefix(self, prefix: str) -> int:
+        """Invalidate every live key written under ``prefix`` using its expiry index."""
+        client = await self._get_client()
+        if client is None:
+            return 0
+        tag_key = self._tag_key(prefix)
         try:
-            keys = self.client.keys(pattern)
+            keys = await client.zrangebyscore(tag_key, time.time(), "+inf")
+            async with client.pipeline(transaction=False) as pipe:
+                if keys:
+                    pipe.unlink(*keys)
+                pipe.unlink(tag_key)
+                await pipe.execute()
             if keys:
-                self.client.delete(*keys)
-                logger.info(f"Invalidated {len(keys)} cache keys matching {pattern}")
+                logger.info(f"Invalidated {len(keys)} cache keys with prefix {prefix}")
+            return len(keys)
+        except Exception as e:
+            logger.error(f"Cache invalidation error for prefix {prefix}: {e}")
+            return 0
+
+    async def invalidate(self, pattern: str, batch_size: int = 500) -> int:
+        """Invalidate cache keys matching a pattern (incremental SCAN, never KEYS)."""
+        client = await self._get_client()
+        if client is None:
+            return 0
+        deleted = 0
+        try:
+            batch = []
+            async for key in client.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += await client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await client.unlink(*batch)
+            if deleted:
+                logger.info(f"Invalidated {deleted} cache keys matching {pattern}")
         except Exception as e:
             logger.error(f"Cache invalidation error for {pattern}: {e}")
+        return deleted
+
+    async def close(self) -> None:
+        """Release the shared connection pool."""
+        if self.client is not None:
+            try:
+                close = getattr(self.client, "aclose", None) or self.client.close
+                await close()
+            except Exception as e:
+                logger.warning(f"Error closing Redis cache pool: {e}")
+            self.client = None
+            self._loop = None
 
 # Global cache instance
 cache_manager = RedisCache()
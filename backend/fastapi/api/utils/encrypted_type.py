@@ -45,7 +45,7 @@ class EncryptedString(TypeDecorator):
             return value
         
         # Lazy import to avoid circular dependency with encryption_service
-        from .encryption_service import EncryptionService
+        from ..services.encryption_service import EncryptionService
         return EncryptionService.encrypt_data(str(value), dek)
 
     def process_result_value(self, value, dialect):
@@ -62,5 +62,5 @@ class EncryptedString(TypeDecorator):
             return "<ENCRYPTED_DATA: DEK Context Required>"
         
         # Lazy import to avoid circular dependency with encryption_service
-        from .encryption_service import EncryptionService
+        from ..services.encryption_service import EncryptionService
         return EncryptionService.decrypt_data(value, dek)
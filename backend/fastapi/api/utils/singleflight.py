@@ -32,6 +32,8 @@ class SingleflightService:
             return result
         except Exception as e:
             future.set_exception(e)
+            # Mark as retrieved so a failure with no waiters isn't logged by the loop
+            future.exception()
             raise e
         finally:
             # Always clean up so subsequent requests can re-run if needed
@@ -0,0 +1,60 @@
+"""
+Multi-row upserts shared by the incrementally maintained read models.
+
+``bulk_upsert`` issues one ``INSERT ... ON CONFLICT DO UPDATE`` per chunk of
+rows on PostgreSQL and SQLite, and falls back to UPDATE-then-INSERT per row
+elsewhere.
+"""
+from typing import Dict, Iterable, List, Sequence
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Rows per multi-row INSERT, well under SQLite's bound-parameter limit
+UPSERT_CHUNK_SIZE = 500
+
+
+def chunks(rows: List, size: int = UPSERT_CHUNK_SIZE) -> Iterable[List]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+async def bulk_upsert(db: AsyncSession, model, keys: List[str], rows: List[Dict], increment: Sequence[str] = ()):
+    """
+    Multi-row ``INSERT ... ON CONFLICT (keys) DO UPDATE`` for PostgreSQL / SQLite.
+    Columns in ``increment`` are added to the stored value, the rest replace it.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    for chunk in chunks(rows):
+        if dialect_insert is not None:
+            stmt = dialect_insert(model).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=keys,
+                set_={
+                    column: getattr(model, column) + stmt.excluded[column] if column in increment
+                    else stmt.excluded[column]
+                    for column in chunk[0] if column not in keys
+                },
+            )
+            await db.execute(stmt)
+            continue
+        # Dialects without ON CONFLICT: update, then insert if nothing matched
+        for row in chunk:
+            values = {
+                column: getattr(model, column) + value if column in increment else value
+                for column, value in row.items() if column not in keys
+            }
+            result = await db.execute(
+                update(model).where(*[getattr(model, k) == row[k] for k in keys]).values(values)
+            )
+            if result.rowcount == 0:
+                await db.execute(insert(model).values(**row))
@@ -0,0 +1,23 @@
+import asyncio
+import logging
+from api.services.db_service import engine, AsyncSessionLocal
+from api.services.achievement_engine import AchievementEngine
+from api.models import Base
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def apply_activity_counter_migration():
+    """Creates the user_activity_counters table and fills it from journal entries and assessments."""
+    logger.info("Applying activity counter migration...")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        counters = await AchievementEngine.rebuild_counters(db)
+
+    logger.info(f"Migration complete. {counters} activity counters built.")
+
+if __name__ == "__main__":
+    asyncio.run(apply_activity_counter_migration())
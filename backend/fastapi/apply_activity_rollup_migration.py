@@ -0,0 +1,30 @@
+import asyncio
+import logging
+from sqlalchemy import inspect, text
+from api.services.db_service import engine
+from api.models import Base
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def apply_activity_rollup_migration():
+    """Creates the daily activity rollup tables and adds analytics_events.environment if missing."""
+    logger.info("Applying activity rollup migration...")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+        existing = await conn.run_sync(
+            lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns("analytics_events")}
+        )
+        if "environment" in existing:
+            logger.info("Column 'environment' already exists.")
+        else:
+            await conn.execute(text("ALTER TABLE analytics_events ADD COLUMN environment VARCHAR"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_analytics_events_environment ON analytics_events (environment)"))
+            logger.info("Added column 'environment'.")
+
+    logger.info("Migration complete. Run backfill_activity_rollups.py to fill the rollups from past events.")
+
+if __name__ == "__main__":
+    asyncio.run(apply_activity_rollup_migration())
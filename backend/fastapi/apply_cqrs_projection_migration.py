@@ -0,0 +1,24 @@
+import asyncio
+import logging
+from api.services.db_service import engine, AsyncSessionLocal
+from api.services.cqrs_service import CQRSService
+from api.models import Base
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def apply_cqrs_projection_migration():
+    """Creates the CQRS score histogram tables and backfills them (and the read models) from scores."""
+    logger.info("Applying CQRS projection migration...")
+    
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    # Also the repair path whenever projections drift (e.g. after score deletions)
+    async with AsyncSessionLocal() as db:
+        await CQRSService.rebuild_score_projections(db)
+    
+    logger.info("Migration complete. CQRS score projections rebuilt.")
+
+if __name__ == "__main__":
+    asyncio.run(apply_cqrs_projection_migration())
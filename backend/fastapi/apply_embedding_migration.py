@@ -0,0 +1,37 @@
+import asyncio
+import logging
+from sqlalchemy import inspect, text
+from api.services.db_service import engine
+from api.models import JournalEntry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_COLUMNS = ("embedding", "embedding_model", "last_indexed_at")
+
+async def apply_embedding_migration():
+    """Adds the semantic search columns to journal_entries if they are missing."""
+    logger.info("Applying journal embedding migration...")
+
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            try:
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            except Exception as e:
+                logger.warning(f"pgvector extension unavailable, embeddings will be stored as text: {e}")
+
+        existing = await conn.run_sync(
+            lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns("journal_entries")}
+        )
+        for name in EMBEDDING_COLUMNS:
+            if name in existing:
+                logger.info(f"Column '{name}' already exists.")
+                continue
+            column_type = JournalEntry.__table__.c[name].type.compile(dialect=conn.dialect)
+            await conn.execute(text(f"ALTER TABLE journal_entries ADD COLUMN {name} {column_type}"))
+            logger.info(f"Added column '{name}' ({column_type}).")
+
+    logger.info("Migration complete. Run reindex_vectors.py to backfill embeddings.")
+
+if __name__ == "__main__":
+    asyncio.run(apply_embedding_migration())
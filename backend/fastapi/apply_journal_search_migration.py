@@ -0,0 +1,28 @@
+import asyncio
+import logging
+from api.services.db_service import engine, AsyncSessionLocal
+from api.services.journal_search import JournalSearchIndex
+from api.models import Base
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def apply_journal_search_migration():
+    """Creates the blind journal search index and tag/emotion tables, then backfills them."""
+    logger.info("Applying journal search migration...")
+    
+    async with engine.begin() as conn:
+        # journal_entry_tags / journal_entry_emotions are plain tables
+        await conn.run_sync(Base.metadata.create_all)
+        # tsvector + GIN on PostgreSQL, FTS5 virtual table on SQLite; drops the
+        # plaintext tables of the first index version
+        await JournalSearchIndex.ensure_schema(conn)
+    
+    # Unwraps each owner's DEK to decrypt and tokenize their entries
+    async with AsyncSessionLocal() as db:
+        indexed = await JournalSearchIndex.backfill(db)
+    
+    logger.info(f"Migration complete. Indexed {indexed} journal entries.")
+
+if __name__ == "__main__":
+    asyncio.run(apply_journal_search_migration())
@@ -0,0 +1,24 @@
+import asyncio
+import logging
+from api.services.db_service import engine, AsyncSessionLocal
+from api.services.journal_stats import JournalStatsService
+from api.models import Base
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def apply_journal_stats_migration():
+    """Creates the per-user journal aggregate tables and fills them from existing entries."""
+    logger.info("Applying journal stats migration...")
+    
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    # Optional: users are also rebuilt lazily on their next write or analytics read
+    async with AsyncSessionLocal() as db:
+        rebuilt = await JournalStatsService.rebuild_all(db)
+    
+    logger.info(f"Migration complete. Rebuilt journal stats for {rebuilt} users.")
+
+if __name__ == "__main__":
+    asyncio.run(apply_journal_stats_migration())
@@ -0,0 +1,23 @@
+import asyncio
+import logging
+from api.services.db_service import engine, AsyncSessionLocal
+from api.services.score_summary import ScoreSummaryService
+from api.models import Base
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def apply_score_summary_migration():
+    """Creates the user_score_summaries table and fills it from existing scores."""
+    logger.info("Applying score summary migration...")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        users = await ScoreSummaryService.rebuild(db)
+
+    logger.info(f"Migration complete. Score summaries built for {users} users.")
+
+if __name__ == "__main__":
+    asyncio.run(apply_score_summary_migration())
@@ -0,0 +1,35 @@
+"""
+Rebuild the daily activity rollups (KPI counters and active-user sets) from
+analytics_events. Safe to re-run; each run replaces the rollups in its range.
+
+Usage: python backfill_activity_rollups.py [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add project root to sys.path
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+os.environ.setdefault("APP_ENV", "development")
+
+from api.services.db_service import AsyncSessionLocal
+from api.services.activity_rollups import ActivityRollupService
+
+async def main(since=None, until=None):
+    print(f"Backfilling activity rollups ({since or 'first event'} .. {until or 'last event'})...")
+    async with AsyncSessionLocal() as db:
+        stats = await ActivityRollupService.backfill(db, since=since, until=until)
+    print(f"Wrote {stats['days']} daily active-user sets ({stats['exact_days']} exact, "
+          f"{stats['days'] - stats['exact_days']} HyperLogLog).")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=date.fromisoformat, default=None)
+    parser.add_argument("--until", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.since, args.until))
@@ -39,9 +39,10 @@ async def run_demo():
         print("[ Worker  ] Building pre-computed Read Models (cqrs_global_stats, etc.)...")
         
         start_time = time.perf_counter()
-        await CQRSService.update_score_projections(db)
+        events = [{"type": "CREATED", "entity": "Score", "payload": {"id": s.id}} for s in new_scores]
+        await CQRSService.process_events(db, events)
         duration = time.perf_counter() - start_time
-        print(f"[ Worker  ] Projection refresh completed in {duration:.4f}s")
+        print(f"[ Worker  ] Incremental projection update completed in {duration:.4f}s")
 
     # 3. Demonstrate the Query Performance (Query Side)
     async with AsyncSessionLocal() as db:
@@ -32,7 +32,7 @@ async def run_demo():
         
         # 1. Ping test
         logger.info("Task 1: Ping ML Process...")
-        pong = inference_proxy.run_inference("ping", {})
+        pong = await inference_proxy.run_inference("ping", {})
         logger.info(f"Response: {pong}")
         
         # 2. Burnout Analytics test
@@ -44,7 +44,7 @@ async def run_demo():
             {"sentiment": 0.6, "stress": 0.4},
             {"sentiment": 0.1, "stress": 0.9} # High stress detected
         ]
-        result = inference_proxy.run_inference("burnout_detection", {"stats": stats})
+        result = await inference_proxy.run_inference("burnout_detection", {"stats": stats})
         logger.info(f"ML Output: {json.dumps(result, indent=2)}")
         
         logger.info("--- Architecture Isolation Verified ---")
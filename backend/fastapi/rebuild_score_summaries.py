@@ -0,0 +1,46 @@
+"""
+Check or rebuild the per-user score summaries behind the dashboard against
+the scores table.
+
+Usage: python rebuild_score_summaries.py [--check] [--repair] [--user-id ID ...]
+
+Without options every summary is rebuilt. --check only reports users whose
+stored summary differs from a recomputation; --repair rebuilds just those.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+os.environ.setdefault("APP_ENV", "development")
+
+from api.services.db_service import AsyncSessionLocal
+from api.services.score_summary import ScoreSummaryService
+
+async def main(user_ids=None, check=False, repair=False):
+    async with AsyncSessionLocal() as db:
+        if not (check or repair):
+            users = await ScoreSummaryService.rebuild(db, user_ids)
+            print(f"Rebuilt score summaries for {users} users.")
+            return
+        mismatched = await ScoreSummaryService.check(db, user_ids, repair=repair)
+    if not mismatched:
+        print("All score summaries match the scores table.")
+        return
+    shown = ", ".join(str(u) for u in mismatched[:20]) + (" ..." if len(mismatched) > 20 else "")
+    print(f"{len(mismatched)} summaries {'repaired' if repair else 'out of date'}: {shown}")
+    if not repair:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="Report mismatched summaries without writing")
+    parser.add_argument("--repair", action="store_true", help="Rebuild only mismatched summaries")
+    parser.add_argument("--user-id", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.user_id, args.check, args.repair))
@@ -13,27 +13,26 @@ os.environ.setdefault("APP_ENV", "development")
 from api.services.db_service import AsyncSessionLocal
 from api.services.semantic_search_service import semantic_search_service
 from api.models import JournalEntry
-from sqlalchemy import select
+from sqlalchemy import select, func
 
-async def main():
+async def main(force: bool = False):
     print("Starting Semantic Vector Re-indexing...")
     async with AsyncSessionLocal() as db:
         # Get count of entries without embeddings
-        stmt = select(JournalEntry.id).where(JournalEntry.embedding.is_(None))
-        result = await db.execute(stmt)
-        entry_ids = result.scalars().all()
+        stmt = select(func.count(JournalEntry.id)).where(JournalEntry.embedding.is_(None))
+        pending = (await db.execute(stmt)).scalar()
         
-        print(f"Found {len(entry_ids)} entries needing indexing.")
+        print(f"Found {pending} entries needing indexing.")
         
-        if not entry_ids:
+        if not pending and not force:
             print("Everything up to date.")
             return
 
-        # Trigger indexing via service (which uses Celery)
-        # Or we can do it synchronously here for a migration script
-        count = await semantic_search_service.reindex_journal_entries(db)
-        print(f"Queued {count} entries for background indexing.")
-        print("Check Celery worker logs for progress.")
+        # Runs the chunked pipeline in this process; safe to interrupt and re-run
+        stats = await semantic_search_service.reindex_journal_entries(db, force=force)
+        print(f"Embedded {stats['embedded']} entries ({stats['skipped']} skipped) "
+              f"in {stats['chunks']} chunks, {stats['elapsed_seconds']}s "
+              f"({stats['entries_per_second']} entries/s).")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(force="--force" in sys.argv))
@@ -0,0 +1,128 @@
+"""
+Achievement checks: per-activity table scans vs the event-driven engine.
+
+Seeds a temporary SQLite database with ``--users`` users holding
+``--entries`` journal entries each, spread over the last ``--days`` days (so
+with the defaults most users are still working towards MONTHLY_MASTER),
+records one event per user so earlier unlocks are settled, then times
+``--events`` journal events for random users:
+
+* legacy — the previous check_achievements queries: every unlocked id, every
+           remaining achievement, and for MONTHLY_MASTER a 30-day COUNT over
+           journal_entries, twice
+* engine — AchievementEngine.handle: update one counter row, look up the
+           unlocked rows among the journal rules, evaluate those rules
+
+Usage: python tests/performance/benchmark_achievements.py [--users 500] [--entries 200] [--days 730] [--events 1000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import (
+    Achievement, AssessmentResult, Base, JournalEntry, OutboxEvent, User, UserAchievement, UserActivityCounter, UserXP,
+)
+from api.services.achievement_engine import AchievementEngine
+from api.services.gamification_service import GamificationService
+
+UTC = timezone.utc
+
+
+async def legacy_check(db, user_id):
+    unlocked_ids = list((await db.execute(select(UserAchievement.achievement_id).filter(
+        UserAchievement.user_id == user_id, UserAchievement.unlocked == True  # noqa: E712
+    ))).scalars())
+    stmt = select(Achievement)
+    if unlocked_ids:
+        stmt = stmt.filter(~Achievement.achievement_id.in_(unlocked_ids))
+    for ach in (await db.execute(stmt)).scalars().all():
+        if ach.achievement_id == "MONTHLY_MASTER":
+            since = (datetime.now(UTC) - timedelta(days=30)).isoformat()
+            for _ in range(2):
+                await db.execute(select(func.count(JournalEntry.id)).filter(
+                    JournalEntry.user_id == user_id, JournalEntry.timestamp >= since,
+                    JournalEntry.is_deleted == False  # noqa: E712
+                ))
+    await db.commit()
+
+
+async def time_events(session_factory, args, fn):
+    rng = random.Random(4)
+    async with session_factory() as db:
+        start = time.perf_counter()
+        for _ in range(args.events):
+            await fn(db, rng.randint(1, args.users))
+        return (time.perf_counter() - start) / args.events * 1000
+
+
+async def main(args):
+    rng = random.Random(1)
+    now = datetime.now(UTC)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'achievements.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[
+                User.__table__, OutboxEvent.__table__, Achievement.__table__, UserAchievement.__table__,
+                UserActivityCounter.__table__, UserXP.__table__, JournalEntry.__table__, AssessmentResult.__table__])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with session_factory() as db:
+            await db.execute(insert(User), [
+                {"id": u, "username": f"user_{u}", "password_hash": "x"} for u in range(1, args.users + 1)
+            ])
+            rows = [
+                {"user_id": u, "username": f"user_{u}", "is_deleted": False,
+                 "timestamp": (now - timedelta(minutes=rng.randint(0, args.days * 24 * 60))).isoformat()}
+                for u in range(1, args.users + 1) for _ in range(args.entries)
+            ]
+            for offset in range(0, len(rows), 5000):
+                await db.execute(insert(JournalEntry), rows[offset:offset + 5000])
+            await db.commit()
+            await GamificationService.seed_initial_achievements(db)
+
+            start = time.perf_counter()
+            await AchievementEngine.rebuild_counters(db)
+            rebuild_s = time.perf_counter() - start
+
+        achievement_engine = AchievementEngine()
+
+        async def engine_check(db, user_id):
+            await achievement_engine.handle(db, user_id, "journal")
+            await db.commit()
+
+        async with session_factory() as db:
+            for user_id in range(1, args.users + 1):
+                await engine_check(db, user_id)
+        achievement_engine.stats.update(events=0, rules_evaluated=0)
+
+        legacy_ms = await time_events(session_factory, args, legacy_check)
+        engine_ms = await time_events(session_factory, args, engine_check)
+        await engine.dispose()
+
+    print("=" * 60)
+    print(f"Achievement checks: {args.users} users x {args.entries} journal entries, {args.events} events")
+    print("=" * 60)
+    print(f"{'':<10}{'ms/event':>12}")
+    print(f"{'legacy':<10}{legacy_ms:>12.3f}")
+    print(f"{'engine':<10}{engine_ms:>12.3f}")
+    print(f"\nspeedup {legacy_ms / engine_ms:.1f}x; counter rebuild {rebuild_s:.2f} s; "
+          f"{achievement_engine.stats['rules_evaluated'] / args.events:.2f} rules evaluated per event")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--entries", type=int, default=200, help="Journal entries per user")
+    parser.add_argument("--days", type=int, default=730, help="Days of history the entries are spread over")
+    parser.add_argument("--events", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
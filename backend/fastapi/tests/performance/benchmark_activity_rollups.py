@@ -0,0 +1,127 @@
+"""
+KPI latency: scanning analytics_events vs reading the daily activity rollups.
+
+Seeds a temporary SQLite database with ``--events`` analytics events spread
+over ``--days`` days, backfills the rollups, then times each KPI both ways:
+
+* scan    — the previous queries: COUNT / COUNT(DISTINCT user_id) over the
+            events table, ``date(timestamp) = :day`` for retention
+* rollup  — ActivityRollupService reads (daily counters and user sketches)
+
+Also reports the per-event cost of maintaining the rollups on the write path.
+
+Usage: python tests/performance/benchmark_activity_rollups.py [--events 500000] [--users 50000] [--days 60]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import AnalyticsDailyActiveUsers, AnalyticsDailyEventCount, AnalyticsEvent, Base, User
+from api.services.activity_rollups import ActivityRollupService
+
+ENVIRONMENT = "production"
+EVENT_NAMES = ["page_view"] * 8 + ["signup_start", "signup_success"]
+
+
+async def scan_kpis(db, today):
+    cutoff = datetime.combine(today - timedelta(days=30), datetime.min.time())
+    for name in ("signup_start", "signup_success"):
+        await db.execute(select(func.count(AnalyticsEvent.id)).filter(
+            AnalyticsEvent.event_name == name, AnalyticsEvent.timestamp >= cutoff,
+            AnalyticsEvent.environment == ENVIRONMENT))
+    day_0 = today - timedelta(days=7)
+    await db.execute(select(func.count(func.distinct(AnalyticsEvent.user_id))).filter(
+        AnalyticsEvent.user_id.isnot(None), func.date(AnalyticsEvent.timestamp) == day_0.isoformat(),
+        AnalyticsEvent.environment == ENVIRONMENT))
+    returning = select(func.distinct(AnalyticsEvent.user_id)).filter(
+        func.date(AnalyticsEvent.timestamp) == today.isoformat(), AnalyticsEvent.environment == ENVIRONMENT)
+    await db.execute(select(func.count(func.distinct(AnalyticsEvent.user_id))).filter(
+        AnalyticsEvent.user_id.isnot(None), func.date(AnalyticsEvent.timestamp) == day_0.isoformat(),
+        AnalyticsEvent.user_id.in_(returning), AnalyticsEvent.environment == ENVIRONMENT))
+    await db.execute(select(func.count(func.distinct(AnalyticsEvent.user_id))).filter(
+        AnalyticsEvent.user_id.isnot(None), AnalyticsEvent.timestamp >= cutoff,
+        AnalyticsEvent.environment == ENVIRONMENT))
+
+
+async def rollup_kpis(db, today):
+    await ActivityRollupService.event_counts(
+        db, ENVIRONMENT, ["signup_start", "signup_success"], since=today - timedelta(days=30))
+    await ActivityRollupService.retained_users(db, ENVIRONMENT, today - timedelta(days=7), today)
+    await ActivityRollupService.active_users(db, ENVIRONMENT, since=today - timedelta(days=30), until=today)
+
+
+async def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def main(args):
+    rng = random.Random(5)
+    today = datetime.now(timezone.utc).date()
+    first_day = today - timedelta(days=args.days - 1)
+
+    def event():
+        return {
+            "anonymous_id": f"anon-{rng.randint(1, 10 ** 9)}",
+            "user_id": rng.randint(1, args.users),
+            "event_type": "usage",
+            "event_name": rng.choice(EVENT_NAMES),
+            "timestamp": datetime.combine(first_day + timedelta(days=rng.randrange(args.days)), datetime.min.time())
+            + timedelta(seconds=rng.randrange(86400)),
+            "environment": ENVIRONMENT,
+        }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[
+                User.__table__, AnalyticsEvent.__table__,
+                AnalyticsDailyEventCount.__table__, AnalyticsDailyActiveUsers.__table__])
+            await conn.execute(insert(User), [
+                {"id": i, "username": f"user{i}", "password_hash": "x"} for i in range(1, args.users + 1)])
+            for offset in range(0, args.events, 20000):
+                await conn.execute(insert(AnalyticsEvent), [event() for _ in range(min(20000, args.events - offset))])
+
+        async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+            start = time.perf_counter()
+            stats = await ActivityRollupService.backfill(db)
+            backfill_s = time.perf_counter() - start
+
+            scan_ms = await timed(lambda: scan_kpis(db, today), 3)
+            rollup_ms = await timed(lambda: rollup_kpis(db, today), 20)
+
+            async def write_one():
+                await ActivityRollupService.record_events(db, [AnalyticsEvent(**event())])
+                await db.commit()
+            write_ms = await timed(write_one, 200)
+        await engine.dispose()
+
+    print("=" * 60)
+    print(f"KPIs over {args.events} events, {args.users} users, {args.days} days")
+    print(f"Backfill: {backfill_s:.1f}s, {stats['days']} daily user sets "
+          f"({stats['days'] - stats['exact_days']} HyperLogLog)")
+    print("=" * 60)
+    print(f"{'':<34}{'ms':>12}")
+    print(f"{'KPI summary, event scan':<34}{scan_ms:>12.1f}")
+    print(f"{'KPI summary, rollups':<34}{rollup_ms:>12.2f}")
+    print(f"{'rollup upkeep per logged event':<34}{write_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=500000)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=60)
+    asyncio.run(main(parser.parse_args()))
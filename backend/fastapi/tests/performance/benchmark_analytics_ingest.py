@@ -0,0 +1,120 @@
+"""
+Analytics event ingestion: one commit per event vs the ingest buffer.
+
+Writes ``--events`` events into a temporary SQLite database both ways:
+
+* per-event — the previous ``log_event`` path: ORM insert, rollup update,
+              commit and refresh for every event
+* buffered  — AnalyticsIngestBuffer.submit per event, with the background
+              flusher writing multi-row INSERT batches of ``--batch-size``
+
+and reports throughput, the request-side cost of logging one event and the
+flush latency.
+
+Usage: python tests/performance/benchmark_analytics_ingest.py [--events 5000] [--batch-size 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import AnalyticsDailyActiveUsers, AnalyticsDailyEventCount, AnalyticsEvent, Base, OutboxEvent, User
+from api.services.activity_rollups import ActivityRollupService
+from api.services.analytics_ingest import AnalyticsIngestBuffer
+
+
+def event_row(i):
+    return {
+        "anonymous_id": f"anon-{i % 2000}",
+        "event_type": "usage",
+        "event_name": "page_view" if i % 10 else "signup_start",
+        "event_data": "{}",
+        "ip_address": "127.0.0.1",
+        "timestamp": datetime.now(timezone.utc),
+        "environment": "production",
+    }
+
+
+async def make_session_factory(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[
+            User.__table__, AnalyticsEvent.__table__, OutboxEvent.__table__,
+            AnalyticsDailyEventCount.__table__, AnalyticsDailyActiveUsers.__table__])
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def count_events(session_factory):
+    async with session_factory() as db:
+        return (await db.execute(select(func.count(AnalyticsEvent.id)))).scalar()
+
+
+async def per_event(session_factory, n):
+    async with session_factory() as db:
+        start = time.perf_counter()
+        for i in range(n):
+            event = AnalyticsEvent(**event_row(i))
+            db.add(event)
+            await ActivityRollupService.record_events(db, [event])
+            await db.commit()
+            await db.refresh(event)
+        return time.perf_counter() - start, (time.perf_counter() - start) / n * 1000
+
+
+async def buffered(session_factory, n, batch_size):
+    buffer = AnalyticsIngestBuffer(max_queue=n, batch_size=batch_size, flush_interval_ms=50, redis_stream="")
+    task = asyncio.create_task(buffer.run(session_factory))
+    start = time.perf_counter()
+    submit_s = 0.0
+    for i in range(n):
+        t = time.perf_counter()
+        await buffer.submit(event_row(i))
+        submit_s += time.perf_counter() - t
+        if i % 100 == 0:
+            # Let the flusher run, as it would between requests
+            await asyncio.sleep(0)
+    while buffer.stats()["flushed"] < n:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return elapsed, submit_s / n * 1000, buffer.stats()
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, session_factory = await make_session_factory(os.path.join(tmp, "per_event.db"))
+        per_event_s, per_event_ms = await per_event(session_factory, args.events)
+        assert await count_events(session_factory) == args.events
+        await engine.dispose()
+
+        engine, session_factory = await make_session_factory(os.path.join(tmp, "buffered.db"))
+        buffered_s, submit_ms, stats = await buffered(session_factory, args.events, args.batch_size)
+        assert await count_events(session_factory) == args.events
+        await engine.dispose()
+
+    print("=" * 64)
+    print(f"Ingesting {args.events} analytics events (batch size {args.batch_size})")
+    print("=" * 64)
+    print(f"{'':<14}{'events/s':>12}{'request ms':>14}{'flush ms p50':>14}")
+    print(f"{'per-event':<14}{args.events / per_event_s:>12.0f}{per_event_ms:>14.3f}{'-':>14}")
+    print(f"{'buffered':<14}{args.events / buffered_s:>12.0f}{submit_ms:>14.3f}{stats['flush_ms_p50']:>14.1f}")
+    print(f"\nbuffered: {stats['batches']} batches, max flush {stats['flush_ms_max']:.1f} ms, {stats['dropped']} dropped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
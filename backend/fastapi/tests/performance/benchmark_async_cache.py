@@ -0,0 +1,159 @@
+"""
+Latency benchmark for the ``cache_manager.cache`` decorator under concurrency.
+
+Compares the previous decorator (synchronous redis client called inside the
+async wrapper, blocking the event loop on every round trip) against the
+redis.asyncio implementation in api/utils/cache.py.
+
+Each simulated request awaits a cached coroutine plus a little unrelated
+async I/O, so time spent blocked on the cache shows up in every other
+request's latency.
+
+When no Redis server is reachable at --redis-url, in-memory stand-ins with a
+simulated network round trip (--rtt-ms) are used for both clients.
+
+Usage: python tests/performance/benchmark_async_cache.py [--requests 2000] [--concurrency 100] [--rtt-ms 0.5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from functools import wraps
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import redis
+import redis.asyncio as aioredis
+
+from api.utils.cache import RedisCache
+
+
+class _SimulatedSyncRedis:
+    def __init__(self, rtt):
+        self.rtt, self.data = rtt, {}
+
+    def get(self, key):
+        time.sleep(self.rtt)
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        time.sleep(self.rtt)
+        self.data[key] = value
+
+
+class _SimulatedPipeline:
+    def __init__(self, client):
+        self.client, self.ops = client, []
+
+    def setex(self, key, ttl, value):
+        self.ops.append((key, value))
+
+    def sadd(self, *args):
+        pass
+
+    def expire(self, *args):
+        pass
+
+    async def execute(self):
+        await asyncio.sleep(self.client.rtt)
+        self.client.data.update(self.ops)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _SimulatedAsyncRedis:
+    def __init__(self, rtt):
+        self.rtt, self.data = rtt, {}
+
+    async def get(self, key):
+        await asyncio.sleep(self.rtt)
+        return self.data.get(key)
+
+    def pipeline(self, transaction=True):
+        return _SimulatedPipeline(self)
+
+
+def legacy_cache(client, ttl=300, prefix="bench"):
+    """The previous decorator: sync client calls inside an async wrapper."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args):
+            key = f"{prefix}:{func.__name__}:{args}"
+            cached = client.get(key)
+            if cached:
+                return json.loads(cached)
+            result = await func(*args)
+            client.setex(key, ttl, json.dumps(result))
+            return result
+        return wrapper
+    return decorator
+
+
+async def drive(cached_func, total, concurrency, keys):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def request(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await cached_func(i % keys)
+            await asyncio.sleep(0.001)  # unrelated async I/O in the same request
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+async def main(args):
+    rtt = args.rtt_ms / 1000
+    try:
+        sync_client = redis.from_url(args.redis_url, socket_connect_timeout=0.5)
+        sync_client.ping()
+        async_client = aioredis.from_url(args.redis_url, decode_responses=True, max_connections=args.concurrency)
+        await async_client.ping()
+        backend = f"redis at {args.redis_url}"
+    except Exception:
+        sync_client, async_client = _SimulatedSyncRedis(rtt), _SimulatedAsyncRedis(rtt)
+        backend = f"simulated redis (rtt {args.rtt_ms} ms)"
+
+    async def analytics(user_id):
+        await asyncio.sleep(0.005)  # the DB work being cached
+        return {"user_id": user_id, "total_entries": 42}
+
+    legacy = await drive(legacy_cache(sync_client)(analytics), args.requests, args.concurrency, args.keys)
+
+    cache = RedisCache()
+    cache.client, cache._loop = async_client, asyncio.get_running_loop()
+    current = await drive(cache.cache(ttl=300, prefix="bench")(analytics), args.requests, args.concurrency, args.keys)
+
+    print("=" * 64)
+    print(f"Cache decorator benchmark: {args.requests} requests, concurrency "
+          f"{args.concurrency}, {args.keys} keys, {backend}")
+    print("=" * 64)
+    print(f"{'':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stats in (("sync client (legacy)", legacy), ("redis.asyncio", current)):
+        print(f"{name:<22}{stats['rps']:>10.0f}{stats['p50']:>10.2f}{stats['p99']:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,129 @@
+"""
+CQRS score projections: cost per Score event of a full refresh vs incremental sketches.
+
+Seeds a temporary SQLite database with ``--scores`` historical scores, then
+measures what keeping the read models current costs:
+
+* full refresh  — what update_score_projections did on every Score event:
+                  load every total_score for percentiles, then one SELECT per
+                  age group, score range and month before upserting
+* rebuild       — CQRSService.rebuild_score_projections (the repair tool;
+                  INSERT ... SELECT ... GROUP BY into the histograms)
+* incremental   — CQRSService.process_events for a single event, and for
+                  batches of ``--batch`` events as the worker drains them
+
+Usage: python tests/performance/benchmark_cqrs_projections.py [--scores 200000] [--events 200] [--batch 500]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import (
+    Base, CQRSAgeGroupStats, CQRSDistributionStats, CQRSGlobalStats, CQRSScoreHistogram,
+    CQRSScoreUser, CQRSTrendAnalytics, Score, User,
+)
+from api.services.cqrs_service import SCORE_RANGES, CQRSService
+
+AGE_GROUPS = ["13-17", "18-24", "25-34", "35-44", "45-54", "55+"]
+
+
+def make_score(rng, i):
+    return {
+        "id": i,
+        "username": f"user{rng.randint(1, 20000)}",
+        "total_score": rng.randint(0, 40),
+        "sentiment_score": rng.random(),
+        "detailed_age_group": rng.choice(AGE_GROUPS),
+        "is_rushed": rng.random() < 0.1,
+        "is_inconsistent": rng.random() < 0.05,
+        "timestamp": f"20{rng.randint(23, 26)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00",
+    }
+
+
+async def full_refresh(db):
+    """The per-event refresh the worker used to run, reduced to its queries."""
+    await db.execute(select(
+        func.count(Score.id), func.count(func.distinct(Score.username)), func.avg(Score.total_score),
+        func.avg(Score.sentiment_score), func.sum(case((Score.is_rushed == True, 1), else_=0)),
+        func.sum(case((Score.is_inconsistent == True, 1), else_=0)),
+    ))
+    (await db.execute(select(Score.total_score).order_by(Score.total_score))).scalars().all()
+    rows = (await db.execute(select(
+        Score.detailed_age_group, func.count(Score.id), func.avg(Score.total_score),
+        func.min(Score.total_score), func.max(Score.total_score), func.avg(Score.sentiment_score),
+    ).group_by(Score.detailed_age_group))).all()
+    for row in rows:
+        await db.execute(select(CQRSAgeGroupStats).filter(CQRSAgeGroupStats.age_group == row[0]))
+    for _, start, end in SCORE_RANGES:
+        await db.execute(select(func.count(Score.id)).filter(Score.total_score.between(start, end)))
+    periods = (await db.execute(select(
+        func.strftime('%Y-%m', Score.timestamp).label('period'), func.avg(Score.total_score), func.count(Score.id),
+    ).group_by('period'))).all()
+    for row in periods:
+        await db.execute(select(CQRSTrendAnalytics).filter(CQRSTrendAnalytics.period == row[0]))
+    await db.commit()
+
+
+async def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def main(args):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        tables = [User, Score, CQRSGlobalStats, CQRSAgeGroupStats, CQRSDistributionStats,
+                  CQRSTrendAnalytics, CQRSScoreHistogram, CQRSScoreUser]
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[t.__table__ for t in tables])
+            for offset in range(0, args.scores, 10000):
+                await conn.execute(insert(Score), [
+                    make_score(rng, i) for i in range(offset + 1, min(offset + 10000, args.scores) + 1)
+                ])
+
+        async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+            refresh_ms = await timed(lambda: full_refresh(db), 3)
+            rebuild_ms = await timed(lambda: CQRSService.rebuild_score_projections(db), 3)
+
+            next_id = iter(range(args.scores + 1, args.scores + 10 ** 7))
+
+            def events(n):
+                return [{"type": "CREATED", "entity": "Score", "payload": make_score(rng, next(next_id))}
+                        for _ in range(n)]
+
+            single_ms = await timed(lambda: CQRSService.process_events(db, events(1)), args.events)
+            batch_ms = await timed(lambda: CQRSService.process_events(db, events(args.batch)), 5)
+        await engine.dispose()
+
+    rows = [
+        ("full refresh", refresh_ms, 1),
+        ("rebuild (repair)", rebuild_ms, 1),
+        ("incremental x1", single_ms, 1),
+        (f"incremental x{args.batch}", batch_ms, args.batch),
+    ]
+    print("=" * 62)
+    print(f"CQRS score projections over {args.scores} existing scores")
+    print("=" * 62)
+    print(f"{'':<20}{'ms/call':>14}{'ms/event':>14}{'events/s':>14}")
+    for name, ms, per_call in rows:
+        print(f"{name:<20}{ms:>14.2f}{ms / per_call:>14.3f}{1000 * per_call / ms:>14.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scores", type=int, default=200000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,143 @@
+"""
+Journal embedding reindex throughput: one embedding per entry vs chunked batches.
+
+Seeds a temporary SQLite database with journal entries lacking embeddings,
+then fills them in two ways:
+
+* per-entry — what one generate_journal_embedding_task did per queued entry:
+              load the entry, embed its text alone, update it, commit
+* chunked   — SemanticSearchService.reindex_journal_entries: id-ordered
+              chunks, one batched embedding call per micro-batch, one bulk
+              UPDATE and commit per chunk
+
+The inference process is replaced by an in-process stand-in charging a fixed
+round-trip per call plus a per-text encode cost (batched encode amortises the
+round-trip, not the model work), so the numbers reflect call and commit count.
+
+Usage: python tests/performance/benchmark_embedding_reindex.py [--entries 5000] [--rtt-ms 3.0]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import Base, JournalEntry, User
+from api.services.semantic_search_service import SemanticSearchService
+
+DIMENSION = 384
+
+
+class InferenceStandIn:
+    model_name = "bench-model"
+
+    def __init__(self, rtt_ms, per_text_ms, batch_size):
+        self.rtt = rtt_ms / 1000
+        self.per_text = per_text_ms / 1000
+        self.batch_size = batch_size
+        self.calls = 0
+
+    async def generate_embeddings(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            self.calls += 1
+            await asyncio.sleep(self.rtt + self.per_text * len(batch))
+            vectors.extend([[len(t) / 1000.0] * DIMENSION for t in batch])
+        return vectors
+
+    async def generate_embedding(self, text):
+        return (await self.generate_embeddings([text]))[0]
+
+
+class NullCheckpoints:
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ttl_seconds=3600):
+        pass
+
+    async def delete(self, key):
+        pass
+
+
+async def seed(session_factory, entries):
+    async with session_factory() as db:
+        await db.execute(User.__table__.insert(), [{"id": 1, "username": "bench", "password_hash": "x",
+                                                     "is_active": True, "is_deleted": False}])
+        await db.execute(
+            text("INSERT INTO journal_entries (id, user_id, title, content, timestamp, is_deleted, privacy_level) "
+                 "VALUES (:id, 1, :title, :content, '2024-01-01T00:00:00', 0, 'private')"),
+            [{"id": i, "title": f"day {i}", "content": f"journal entry number {i} " * 20}
+             for i in range(1, entries + 1)],
+        )
+        await db.commit()
+
+
+async def reindex_per_entry(session_factory, embedder):
+    async with session_factory() as db:
+        ids = (await db.execute(select(JournalEntry.id).where(JournalEntry.embedding.is_(None)))).scalars().all()
+    for entry_id in ids:
+        async with session_factory() as db:
+            entry = (await db.execute(select(JournalEntry).where(JournalEntry.id == entry_id))).scalar_one()
+            entry.embedding = await embedder.generate_embedding(f"{entry.title}: {entry.content}")
+            entry.embedding_model = embedder.model_name
+            await db.commit()
+    return len(ids)
+
+
+async def reindex_chunked(session_factory, embedder, chunk_size):
+    async with session_factory() as db:
+        stats = await SemanticSearchService.reindex_journal_entries(db, chunk_size=chunk_size)
+    return stats["embedded"]
+
+
+async def run(kind, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[User.__table__, JournalEntry.__table__])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        await seed(session_factory, args.entries)
+
+        embedder = InferenceStandIn(args.rtt_ms, args.per_text_ms, args.batch_size)
+        with patch("api.services.semantic_search_service.embedding_service", embedder), \
+                patch("api.services.semantic_search_service.cache_service", NullCheckpoints()):
+            start = time.perf_counter()
+            if kind == "per-entry":
+                embedded = await reindex_per_entry(session_factory, embedder)
+            else:
+                embedded = await reindex_chunked(session_factory, embedder, args.chunk_size)
+            elapsed = time.perf_counter() - start
+        await engine.dispose()
+
+    return {"embedded": embedded, "calls": embedder.calls, "seconds": elapsed, "rate": embedded / elapsed}
+
+
+async def main(args):
+    results = {kind: await run(kind, args) for kind in ("per-entry", "chunked")}
+
+    print("=" * 66)
+    print(f"Embedding reindex: {args.entries} entries, inference RTT {args.rtt_ms} ms, "
+          f"batch {args.batch_size}, chunk {args.chunk_size}")
+    print("=" * 66)
+    print(f"{'':<12}{'entries':>10}{'ML calls':>10}{'seconds':>10}{'entries/s':>12}")
+    for kind, r in results.items():
+        print(f"{kind:<12}{r['embedded']:>10}{r['calls']:>10}{r['seconds']:>10.2f}{r['rate']:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--rtt-ms", type=float, default=3.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    asyncio.run(main(parser.parse_args()))
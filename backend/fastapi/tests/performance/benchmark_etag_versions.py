@@ -0,0 +1,126 @@
+"""
+Question ETags: hashing every response body vs resource versions.
+
+Serves ``GET /api/v1/questions`` (QuestionService.get_questions and
+QuestionListResponse, as in routers/questions.py) from a temporary SQLite
+question bank of ``--questions`` rows, behind ETagMiddleware in both modes:
+
+* hashed    — the handler runs and the body is MD5-hashed on every request
+* versioned — ETag from the stored content version; 304s and repeated
+              fetches are answered without running the handler
+
+For each mode it times ``--requests`` revalidations (matching
+If-None-Match), plain fetches and gzip fetches.
+
+Usage: python tests/performance/benchmark_etag_versions.py [--questions 200] [--requests 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.middleware.etag_middleware import ETagMiddleware
+from api.models import Base, Question, QuestionCategory
+from api.schemas import QuestionListResponse, QuestionResponse
+from api.services import cache_service as cache_module
+from api.services.db_service import QuestionService
+from api.services.resource_versions import ResourceVersions
+
+
+def build_app(session_factory, versions):
+    app = FastAPI()
+
+    async def get_db():
+        async with session_factory() as db:
+            yield db
+
+    @app.get("/api/v1/questions")
+    async def get_questions(db: AsyncSession = Depends(get_db)):
+        questions, total = await QuestionService.get_questions(db=db, limit=200)
+        return QuestionListResponse(
+            total=total,
+            questions=[QuestionResponse.model_validate(q) for q in questions],
+            page=1,
+            page_size=200,
+        )
+
+    app.add_middleware(ETagMiddleware, versions=versions)
+    return app
+
+
+async def timed_requests(client, n, headers):
+    start = time.perf_counter()
+    for _ in range(n):
+        response = await client.get("/api/v1/questions", headers=headers)
+        assert response.status_code in (200, 304)
+    return (time.perf_counter() - start) / n * 1000
+
+
+async def run_mode(session_factory, versions, n):
+    transport = httpx.ASGITransport(app=build_app(session_factory, versions))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        first = await client.get("/api/v1/questions", headers={"Accept-Encoding": "identity"})
+        etag = first.headers["etag"]
+        revalidate = await timed_requests(client, n, {"If-None-Match": etag, "Accept-Encoding": "identity"})
+        plain = await timed_requests(client, n, {"Accept-Encoding": "identity"})
+        gzipped = await timed_requests(client, n, {"Accept-Encoding": "gzip"})
+    return revalidate, plain, gzipped, len(first.content)
+
+
+async def main(args):
+    store = {}
+
+    async def cache_get(key):
+        return store.get(key)
+
+    async def cache_set(key, value, ttl_seconds=3600):
+        store[key] = value
+
+    # Stand-in for Redis; the worker-local tier serves these reads in production
+    cache_module.cache_service.get = cache_get
+    cache_module.cache_service.set = cache_set
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'questions.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Question.__table__, QuestionCategory.__table__])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            db.add_all([
+                Question(question_text=f"Question {i}: how often do you notice what you are feeling?",
+                         category_id=i % 5, difficulty=i % 3, tooltip="Think about the last two weeks")
+                for i in range(args.questions)
+            ])
+            await db.commit()
+
+        versions = ResourceVersions(session_factory=session_factory)
+        versions.register("questions", Question)
+
+        hashed = await run_mode(session_factory, None, args.requests)
+        versioned = await run_mode(session_factory, versions, args.requests)
+        await engine.dispose()
+
+    print("=" * 68)
+    print(f"GET /api/v1/questions, {args.questions} questions ({hashed[3]} byte body), "
+          f"{args.requests} requests each")
+    print("=" * 68)
+    print(f"{'ms/request':<12}{'revalidate 304':>16}{'fetch':>12}{'fetch gzip':>14}")
+    print(f"{'hashed':<12}{hashed[0]:>16.3f}{hashed[1]:>12.3f}{hashed[2]:>14.3f}")
+    print(f"{'versioned':<12}{versioned[0]:>16.3f}{versioned[1]:>12.3f}{versioned[2]:>14.3f}")
+    print(f"\nrevalidation speedup {hashed[0] / versioned[0]:.1f}x, "
+          f"fetch speedup {hashed[1] / versioned[1]:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
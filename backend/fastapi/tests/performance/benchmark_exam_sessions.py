@@ -0,0 +1,127 @@
+"""
+Exam answers: a database write per click vs the write-behind session buffer.
+
+Runs ``--users`` concurrent exam takers against a temporary SQLite database.
+Each one starts an exam, answers ``--questions`` questions (replaying
+``--replays`` of them, as a flaky client would) and submits the score, two
+ways:
+
+* direct   — the previous save_response: load and validate the ExamSession,
+             look for an existing answer, insert and commit, per click
+* buffered — ExamService with the write-behind store (in-process here):
+             clicks go to the session buffer and save_score flushes them
+             in one multi-row insert
+
+and reports per-click latency, exam submit latency and the number of SQL
+statements executed.
+
+Usage: python tests/performance/benchmark_exam_sessions.py [--users 50] [--questions 40] [--replays 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import Base, ExamSession, OutboxEvent, Response, Score, User, UserScoreSummary
+from api.schemas import ExamResponseCreate, ExamResultCreate
+from api.services import exam_service
+from api.services.exam_service import ExamService
+from api.services.exam_session_store import ExamSessionStore
+from api.services.gamification_service import GamificationService
+
+
+async def _no_xp(db, user_id, amount, reason):
+    return None
+
+
+GamificationService.award_xp = _no_xp  # XP has its own tables; not part of this comparison
+
+
+async def take_exam(session_factory, user_id, args, clicks, submits):
+    async with session_factory() as db:
+        user = await db.get(User, user_id)
+        session_id = await ExamService.start_exam(db, user)
+        order = list(range(1, args.questions + 1)) + list(range(1, args.replays + 1))
+        for question_id in order:
+            data = ExamResponseCreate(question_id=question_id, value=question_id % 5 + 1, session_id=session_id)
+            start = time.perf_counter()
+            await ExamService.save_response(db, user, session_id, data)
+            clicks.append(time.perf_counter() - start)
+            await asyncio.sleep(0)  # think time: let the other exam takers in
+        result = ExamResultCreate(total_score=50, sentiment_score=0.0, age=30, age_group="adult",
+                                  detailed_age_group="26-35", session_id=session_id)
+        start = time.perf_counter()
+        await ExamService.save_score(db, user, session_id, result)
+        submits.append(time.perf_counter() - start)
+
+
+async def run(mode, args, tmp):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, f'{mode}.db')}",
+                                 connect_args={"timeout": 60})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[
+            User.__table__, OutboxEvent.__table__, ExamSession.__table__, Response.__table__,
+            Score.__table__, UserScoreSummary.__table__])
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        await db.execute(insert(User), [
+            {"id": u, "username": f"user_{u}", "password_hash": "x"} for u in range(1, args.users + 1)
+        ])
+        await db.commit()
+
+    store = ExamSessionStore(key_prefix=f"bench-{mode}")
+    store._redis_retry_at = float("inf")
+    exam_service.exam_sessions = store
+    ExamService._buffered = staticmethod(lambda: mode == "buffered")
+
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(1))
+    clicks, submits = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(take_exam(session_factory, u, args, clicks, submits) for u in range(1, args.users + 1)))
+    elapsed = time.perf_counter() - start
+
+    async with session_factory() as db:
+        stored = (await db.execute(select(func.count(Response.id)))).scalar()
+    assert stored == args.users * args.questions, stored
+    await engine.dispose()
+    clicks.sort()
+    return {
+        "click_ms": statistics.mean(clicks) * 1000,
+        "click_p95_ms": clicks[int(len(clicks) * 0.95)] * 1000,
+        "submit_ms": statistics.mean(submits) * 1000,
+        "statements": len(statements),
+        "elapsed": elapsed,
+    }
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {mode: await run(mode, args, tmp) for mode in ("direct", "buffered")}
+
+    print("=" * 78)
+    print(f"Exam answers: {args.users} concurrent users x {args.questions} questions (+{args.replays} replays)")
+    print("=" * 78)
+    print(f"{'':<10}{'click ms':>11}{'click p95':>11}{'submit ms':>11}{'SQL stmts':>11}{'total s':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['click_ms']:>11.2f}{r['click_p95_ms']:>11.2f}{r['submit_ms']:>11.2f}"
+              f"{r['statements']:>11}{r['elapsed']:>10.2f}")
+    direct, buffered = results["direct"], results["buffered"]
+    print(f"\nclick speedup {direct['click_ms'] / buffered['click_ms']:.1f}x, "
+          f"{direct['statements'] / buffered['statements']:.1f}x fewer statements")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--replays", type=int, default=5, help="Answers each user re-sends")
+    asyncio.run(main(parser.parse_args()))
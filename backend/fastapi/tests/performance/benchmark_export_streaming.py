@@ -0,0 +1,123 @@
+"""
+Data export memory: materialized vs streamed, across history sizes.
+
+Seeds a temporary SQLite database with one user holding ``N`` journal
+entries, scores, responses, assessments and satisfaction records for each
+size in ``--sizes``, then writes a ``--format`` export two ways:
+
+* materialized — the previous pipeline: every section loaded into one dict
+                 (ExportServiceV2._fetch_export_data) and serialized in one go
+* streamed     — ExportServiceV2.stream_export written chunk by chunk
+
+and reports the peak traced Python memory (tracemalloc) and wall time of
+each. The streamed peak should stay flat as the history grows.
+
+Usage: python tests/performance/benchmark_export_streaming.py [--sizes 1000,10000,50000] [--format json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import (
+    AssessmentResult, Base, JournalEntry, MedicalProfile, OutboxEvent, PersonalProfile,
+    Response, SatisfactionRecord, Score, User, UserEmotionalPatterns, UserSettings, UserStrengths,
+)
+from api.services.export_service_v2 import ExportServiceV2
+
+TABLES = [
+    User.__table__, OutboxEvent.__table__, JournalEntry.__table__, Score.__table__, Response.__table__,
+    AssessmentResult.__table__, SatisfactionRecord.__table__, PersonalProfile.__table__,
+    MedicalProfile.__table__, UserStrengths.__table__, UserEmotionalPatterns.__table__, UserSettings.__table__,
+]
+
+
+async def seed(db, rows):
+    await db.execute(insert(User), [{"id": 1, "username": "alice", "password_hash": "x"}])
+    stamps = [f"20{20 + i // 100000:02d}-{i // 28 % 12 + 1:02d}-{i % 28 + 1:02d}T12:00:00" for i in range(rows)]
+    batches = {
+        JournalEntry: lambda i: {"user_id": 1, "username": "alice", "entry_date": stamps[i], "stress_level": i % 10,
+                                 "emotional_patterns": json.dumps(["calm", "focused", "tired"]), "tags": '["work"]'},
+        Score: lambda i: {"user_id": 1, "username": "alice", "total_score": i % 100, "timestamp": stamps[i],
+                          "reflection_text": "A short reflection on how the week went."},
+        Response: lambda i: {"user_id": 1, "username": "alice", "question_id": i % 50, "response_value": i % 5 + 1,
+                             "timestamp": stamps[i]},
+        AssessmentResult: lambda i: {"user_id": 1, "assessment_type": "strengths", "overall_score": i % 10,
+                                     "details": '{"answers": [1, 2, 3, 4, 5]}', "timestamp": stamps[i]},
+        SatisfactionRecord: lambda i: {"user_id": 1, "satisfaction_category": "work", "satisfaction_score": 3,
+                                       "timestamp": stamps[i]},
+    }
+    for model, make in batches.items():
+        for offset in range(0, rows, 5000):
+            await db.execute(insert(model), [make(i) for i in range(offset, min(offset + 5000, rows))])
+    await db.commit()
+
+
+async def materialized(db, user, fmt, path):
+    data = await ExportServiceV2._fetch_export_data(db, user, {})
+    data['_export_metadata'] = ExportServiceV2._build_metadata(user, "bench", fmt, {}, datetime.now(timezone.utc))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+
+
+async def streamed(db, user, fmt, path):
+    await ExportServiceV2._write_chunks(path, ExportServiceV2.stream_export(db, user, fmt))
+
+
+async def measure(session_factory, fn, fmt, path):
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        tracemalloc.start()
+        start = time.perf_counter()
+        await fn(db, user, fmt, path)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak / 2 ** 20, elapsed, os.path.getsize(path) / 2 ** 20
+
+
+async def main(args):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, f'export_{rows}.db')}")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+            session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+            async with session_factory() as db:
+                await seed(db, rows)
+
+            path = os.path.join(tmp, f"export.{args.format}")
+            row = [rows]
+            if args.format == "json":
+                row += await measure(session_factory, materialized, args.format, path)
+            else:
+                row += [None, None, None]
+            row += await measure(session_factory, streamed, args.format, path)
+            results.append(row)
+            await engine.dispose()
+
+    print("=" * 78)
+    print(f"Export memory ({args.format}): rows per data type, peak traced MiB, seconds, output MiB")
+    print("=" * 78)
+    print(f"{'rows':>8}{'materialized MiB':>18}{'s':>7}{'streamed MiB':>15}{'s':>7}{'output MiB':>12}")
+    for rows, m_peak, m_s, _, s_peak, s_s, size in results:
+        m = f"{m_peak:>18.1f}{m_s:>7.2f}" if m_peak is not None else f"{'-':>18}{'-':>7}"
+        print(f"{rows:>8}{m}{s_peak:>15.1f}{s_s:>7.2f}{size:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda s: [int(v) for v in s.split(",")], default=[1000, 10000, 50000])
+    parser.add_argument("--format", choices=sorted(ExportServiceV2.STREAMABLE_FORMATS), default="json")
+    asyncio.run(main(parser.parse_args()))
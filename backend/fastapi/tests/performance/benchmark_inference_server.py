@@ -0,0 +1,123 @@
+"""
+ML inference server load test: throughput and tail latency under concurrency.
+
+Starts inference worker processes against a Redis server, then fires
+``--requests`` single-text ``generate_embedding`` calls from ``--concurrency``
+concurrent asyncio callers through one InferenceProxy. Configurations:
+
+* serial   — 1 worker, batch size 1 (one request per model call, as the old
+             BLPOP loop did)
+* batched  — 1 worker, dynamic micro-batches (--batch-size, --max-wait-ms)
+* parallel — --workers processes, dynamic micro-batches
+
+The model is an in-process stand-in whose encode() costs a fixed
+per-call overhead plus a per-text cost, like a batched transformer forward pass.
+Requires a reachable Redis >= 6.2 (LPOP with count).
+
+Usage: python tests/performance/benchmark_inference_server.py --redis-url redis://localhost:6379/15
+       [--requests 2000] [--concurrency 64] [--workers 4]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import numpy as np
+import redis
+
+from api.ml.inference_server import REQUEST_QUEUE, InferenceProxy, ModelPersistenceSingleton, _serve_forever
+
+MODEL_NAME = "bench-model"
+
+
+class ModelStandIn:
+    def __init__(self, call_ms, per_text_ms, dim=384):
+        self.call = call_ms / 1000
+        self.per_text = per_text_ms / 1000
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32):
+        time.sleep(self.call + self.per_text * len(texts))
+        return np.zeros((len(texts), self.dim), dtype=np.float32)
+
+
+def worker(redis_url, batch_size, max_wait_ms, call_ms, per_text_ms):
+    ModelPersistenceSingleton._models[MODEL_NAME] = ModelStandIn(call_ms, per_text_ms)
+    _serve_forever(redis_url=redis_url, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+
+
+async def load(args):
+    proxy = InferenceProxy(redis_url=args.redis_url)
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+
+    async def caller():
+        while not queue.empty():
+            i = queue.get_nowait()
+            start = time.perf_counter()
+            await proxy.run_inference("generate_embedding", {"text": f"journal entry {i}", "model_name": MODEL_NAME})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[caller() for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rate": args.requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+def run(args, workers, batch_size, max_wait_ms):
+    redis.from_url(args.redis_url).delete(REQUEST_QUEUE)
+    processes = [
+        multiprocessing.Process(target=worker, daemon=True,
+                                args=(args.redis_url, batch_size, max_wait_ms, args.call_ms, args.per_text_ms))
+        for _ in range(workers)
+    ]
+    for proc in processes:
+        proc.start()
+    try:
+        return asyncio.run(load(args))
+    finally:
+        for proc in processes:
+            proc.terminate()
+            proc.join()
+
+
+def main(args):
+    configs = [
+        ("serial", 1, 1, 0.0),
+        ("batched", 1, args.batch_size, args.max_wait_ms),
+        (f"parallel x{args.workers}", args.workers, args.batch_size, args.max_wait_ms),
+    ]
+    results = [(name, run(args, *config)) for name, *config in configs]
+
+    print("=" * 58)
+    print(f"Inference server: {args.requests} requests, {args.concurrency} concurrent callers, "
+          f"model {args.call_ms} ms/call + {args.per_text_ms} ms/text")
+    print("=" * 58)
+    print(f"{'':<14}{'req/s':>12}{'p50 ms':>12}{'p99 ms':>12}")
+    for name, r in results:
+        print(f"{name:<14}{r['rate']:>12.0f}{r['p50']:>12.1f}{r['p99']:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--call-ms", type=float, default=8.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.3)
+    main(parser.parse_args())
@@ -0,0 +1,217 @@
+"""
+Journal search latency: ILIKE substring scans vs the full-text index.
+
+Seeds a temporary SQLite database with synthetic journal entries spread
+over a few hundred users (one heavy user owns a large share), then runs the
+same searches two ways for that user:
+
+* ilike — the former filters: ``content ILIKE '%q%'``, tag and emotion
+          ``ILIKE`` over the JSON columns, exact ``COUNT(*)`` subquery
+* fts   — ``JournalSearchIndex`` (FTS5 over blind prefix tokens + bm25 rank,
+          normalized tag / emotion tables) with the total capped at ``--count-cap``
+
+Content is stored in plaintext here so the ILIKE baseline can match at all;
+in production it is encrypted and the substring scan finds nothing.
+
+Usage: python tests/performance/benchmark_journal_search.py [--entries 100000] [--queries 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import String, func, or_, select, text, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import Base, JournalEntry, JournalEntryEmotion, JournalEntryTag, User
+from api.services.journal_search import (
+    JournalSearchIndex, SQLITE_FTS_TABLE, index_tokens, normalize_tags, search_key,
+)
+
+WORDS = (
+    "morning walk river coffee meeting deadline family dinner sleep anxious calm "
+    "gratitude workout run headache friend call project launch rain garden book "
+    "music therapy stress relief breathing journal weekend travel train office "
+    "lunch argument apology laugh movie quiet tired energy focus plan goal"
+).split()
+TAGS = ["work", "family", "health", "sleep", "travel", "friends", "fitness", "study"]
+EMOTIONS = ["joy", "sadness", "anger", "fear", "calm", "anxious", "hopeful", "tired"]
+HEAVY_USER = 1
+
+
+def user_search_key(user_id):
+    """Stand-in for the key derived from the user's DEK."""
+    return search_key(user_id.to_bytes(32, "big"))
+
+
+def build_vocabulary(rng, size=5000):
+    """Zipf-weighted vocabulary with the query words spread over mid ranks."""
+    vocab = [f"w{rng.getrandbits(32):x}" for _ in range(size)]
+    for rank, word in zip(range(100, 2000, 2000 // len(WORDS)), WORDS):
+        vocab[rank] = word
+    cum_weights, total = [], 0.0
+    for rank in range(size):
+        total += 1.0 / (rank + 1)
+        cum_weights.append(total)
+    return vocab, cum_weights
+
+
+async def seed(session_factory, entries, users, rng):
+    heavy_share = entries // 5
+    vocab, cum_weights = build_vocabulary(rng)
+    async with session_factory() as db:
+        await db.execute(
+            User.__table__.insert(),
+            [{"id": uid, "username": f"user{uid}", "password_hash": "x",
+              "is_active": True, "is_deleted": False} for uid in range(1, users + 1)],
+        )
+        batch, search_rows = [], []
+        for entry_id in range(1, entries + 1):
+            user_id = HEAVY_USER if entry_id <= heavy_share else rng.randint(2, users)
+            content = " ".join(rng.choices(vocab, cum_weights=cum_weights, k=rng.randint(30, 120)))
+            tags = rng.sample(TAGS, 2)
+            emotions = rng.sample(EMOTIONS, 2)
+            batch.append({
+                "id": entry_id, "user_id": user_id, "content": content,
+                "entry_date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "tags": json.dumps(tags), "emotional_patterns": json.dumps(emotions),
+                "is_deleted": False, "word_count": len(content.split()),
+            })
+            search_rows.append((entry_id, user_id, content, tags, emotions))
+            if len(batch) == 5000:
+                await flush(db, batch, search_rows)
+                batch, search_rows = [], []
+        if batch:
+            await flush(db, batch, search_rows)
+    return heavy_share
+
+
+async def flush(db, batch, search_rows):
+    # Raw inserts: the ORM column type would try to encrypt content
+    await db.execute(
+        text(
+            "INSERT INTO journal_entries (id, user_id, content, entry_date, tags, emotional_patterns, "
+            "is_deleted, word_count, privacy_level) VALUES (:id, :user_id, :content, :entry_date, :tags, "
+            ":emotional_patterns, :is_deleted, :word_count, 'private')"
+        ),
+        batch,
+    )
+    await db.execute(
+        text(f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, owner, body) VALUES (:rowid, :owner, :body)"),
+        [{"rowid": eid, "owner": f"u{uid}", "body": " ".join(index_tokens(content, user_search_key(uid)))}
+         for eid, uid, content, _, _ in search_rows],
+    )
+    await db.execute(
+        JournalEntryTag.__table__.insert(),
+        [{"entry_id": eid, "user_id": uid, "tag": t} for eid, uid, _, tags, _ in search_rows
+         for t in normalize_tags(tags)],
+    )
+    await db.execute(
+        JournalEntryEmotion.__table__.insert(),
+        [{"entry_id": eid, "user_id": uid, "emotion": e} for eid, uid, _, _, emotions in search_rows
+         for e in normalize_tags(emotions)],
+    )
+    await db.commit()
+
+
+def base_stmt():
+    return select(JournalEntry.id, JournalEntry.entry_date).where(
+        JournalEntry.user_id == HEAVY_USER, JournalEntry.is_deleted == False  # noqa: E712
+    )
+
+
+async def search_ilike(db, query, tags, emotions, limit):
+    stmt = base_stmt()
+    if query:
+        # Coerced to String so the pattern is not run through the encrypting type
+        stmt = stmt.where(type_coerce(JournalEntry.content, String).ilike(f"%{query}%"))
+    if tags:
+        stmt = stmt.where(or_(*[JournalEntry.tags.ilike(f"%{t}%") for t in tags]))
+    if emotions:
+        stmt = stmt.where(or_(*[JournalEntry.emotional_patterns.ilike(f"%{e}%") for e in emotions]))
+    total = (await db.execute(select(func.count()).select_from(stmt.subquery()))).scalar()
+    rows = (await db.execute(stmt.order_by(JournalEntry.entry_date.desc()).limit(limit))).all()
+    return rows, total
+
+
+async def search_fts(db, query, tags, emotions, limit, count_cap):
+    stmt, rank = base_stmt(), None
+    if query:
+        stmt, rank = JournalSearchIndex.apply_text_search(
+            stmt, "sqlite", HEAVY_USER, query, key=user_search_key(HEAVY_USER))
+    if tags:
+        stmt = stmt.where(JournalSearchIndex.tag_filter(HEAVY_USER, tags))
+    if emotions:
+        stmt = stmt.where(JournalSearchIndex.emotion_filter(HEAVY_USER, emotions))
+    capped = stmt.with_only_columns(JournalEntry.id).limit(count_cap)
+    total = (await db.execute(select(func.count()).select_from(capped.subquery()))).scalar()
+    order = [rank.desc()] if rank is not None else []
+    rows = (await db.execute(stmt.order_by(*order, JournalEntry.entry_date.desc()).limit(limit))).all()
+    return rows, total
+
+
+async def measure(session_factory, search, workload):
+    latencies = []
+    async with session_factory() as db:
+        for args in workload[:10]:  # warm-up
+            await search(db, *args)
+        for args in workload:
+            start = time.perf_counter()
+            await search(db, *args)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {"p50": statistics.median(latencies), "p99": latencies[int(len(latencies) * 0.99) - 1]}
+
+
+async def main(args):
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all,
+                tables=[User.__table__, JournalEntry.__table__, JournalEntryTag.__table__,
+                        JournalEntryEmotion.__table__],
+            )
+            await JournalSearchIndex.ensure_schema(conn)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        start = time.perf_counter()
+        heavy = await seed(session_factory, args.entries, args.users, rng)
+        print(f"Seeded {args.entries} entries ({heavy} for the searched user) in {time.perf_counter() - start:.1f}s")
+
+        workload = [
+            (rng.choice(WORDS), None, None),
+            (None, [rng.choice(TAGS)], None),
+            (None, None, [rng.choice(EMOTIONS)]),
+            (rng.choice(WORDS), [rng.choice(TAGS)], [rng.choice(EMOTIONS)]),
+        ] * (args.queries // 4)
+        results = {
+            "ilike": await measure(session_factory, lambda db, q, t, e: search_ilike(db, q, t, e, 20), workload),
+            "fts": await measure(session_factory,
+                                 lambda db, q, t, e: search_fts(db, q, t, e, 20, args.count_cap), workload),
+        }
+        await engine.dispose()
+
+    print("=" * 48)
+    print(f"Journal search: {args.entries} entries, {len(workload)} queries")
+    print("=" * 48)
+    print(f"{'':<10}{'p50 ms':>12}{'p99 ms':>12}")
+    for kind, stats in results.items():
+        print(f"{kind:<10}{stats['p50']:>12.2f}{stats['p99']:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--count-cap", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
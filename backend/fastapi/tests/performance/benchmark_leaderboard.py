@@ -0,0 +1,114 @@
+"""
+Leaderboard reads: sorting user_xp per request vs the sorted-set boards.
+
+Seeds a temporary SQLite database with ``--users`` users and XP rows, then
+times ``--requests`` calls of each read:
+
+* top     — the top ``--limit`` entries: ORDER BY total_xp over user_xp
+            vs a range of the global board plus one lookup for names
+* rank    — a random user's rank: COUNT of users with more XP
+            vs ZREVRANK-style lookup with the two entries either side
+
+and ``--awards`` XP awards, whose board update runs after each commit.
+Boards are served by Redis when ``redis_url`` is reachable, otherwise by the
+in-process stand-in (the backend is printed).
+
+Usage: python tests/performance/benchmark_leaderboard.py [--users 50000] [--requests 500] [--limit 10] [--awards 500]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import desc, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import Base, OutboxEvent, User, UserXP
+from api.services import gamification_service
+from api.services.gamification_service import GamificationService
+from api.services.leaderboard_service import GLOBAL, LeaderboardStore
+
+
+async def sql_top(db, limit):
+    stmt = select(UserXP, User.username).join(User, UserXP.user_id == User.id).order_by(desc(UserXP.total_xp)).limit(limit)
+    return [(i + 1, username, xp.total_xp) for i, (xp, username) in enumerate((await db.execute(stmt)).all())]
+
+
+async def sql_rank(db, user_id):
+    total = select(UserXP.total_xp).where(UserXP.user_id == user_id).scalar_subquery()
+    return await db.scalar(select(func.count(UserXP.id) + 1).where(UserXP.total_xp > total))
+
+
+async def time_calls(session_factory, requests, call):
+    rng = random.Random(9)
+    async with session_factory() as db:
+        start = time.perf_counter()
+        for _ in range(requests):
+            await call(db, rng)
+        return (time.perf_counter() - start) / requests * 1000
+
+
+async def main(args):
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'leaderboard.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[User.__table__, OutboxEvent.__table__, UserXP.__table__])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            for offset in range(1, args.users + 1, 5000):
+                ids = range(offset, min(offset + 5000, args.users + 1))
+                await db.execute(insert(User), [{"id": u, "username": f"user_{u}", "password_hash": "x"} for u in ids])
+                await db.execute(insert(UserXP), [{"user_id": u, "total_xp": rng.randint(0, 100000)} for u in ids])
+            await db.commit()
+
+        store = LeaderboardStore(key_prefix="bench-leaderboard")
+        gamification_service.leaderboards = store
+        async with session_factory() as db:
+            start = time.perf_counter()
+            await store.reconcile(db)
+            reconcile_s = time.perf_counter() - start
+
+        users = args.users
+        calls = {
+            "top": (
+                lambda db, r: sql_top(db, args.limit),
+                lambda db, r: GamificationService.get_leaderboard(db, args.limit),
+            ),
+            "rank": (
+                lambda db, r: sql_rank(db, r.randint(1, users)),
+                lambda db, r: store.position(db, r.randint(1, users), GLOBAL),
+            ),
+        }
+        results = {name: [await time_calls(session_factory, args.requests, call) for call in pair]
+                   for name, pair in calls.items()}
+
+        async with session_factory() as db:
+            award_rng = random.Random(3)
+            start = time.perf_counter()
+            for _ in range(args.awards):
+                await GamificationService.award_xp(db, award_rng.randint(1, users), 50, "benchmark")
+            award_ms = (time.perf_counter() - start) / args.awards * 1000
+        await engine.dispose()
+
+    print("=" * 56)
+    print(f"Leaderboard reads: {args.users} users, {args.requests} requests each ({store.stats()['backend']} boards)")
+    print("=" * 56)
+    print(f"{'':<10}{'SQL ms':>12}{'board ms':>14}{'speedup':>10}")
+    for name, (sql_ms, board_ms) in results.items():
+        print(f"{name:<10}{sql_ms:>12.3f}{board_ms:>14.3f}{sql_ms / board_ms:>9.0f}x")
+    print(f"\naward_xp with board update: {award_ms:.3f} ms; reconcile of {args.users} users: {reconcile_s:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10, help="Entries per leaderboard page")
+    parser.add_argument("--awards", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
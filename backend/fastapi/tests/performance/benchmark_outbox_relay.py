@@ -0,0 +1,141 @@
+"""
+Outbox relay throughput: serial per-event relay vs bulk relay mode.
+
+Seeds a temporary SQLite database with journal entries and pending
+``search_indexing`` outbox events (a share of them repeated updates to the
+same journal, as produced by edit bursts), then drains the outbox with:
+
+* serial — process_pending_indexing_events (50 events per pass, one journal
+           SELECT and one ES request per event)
+* bulk   — process_pending_indexing_events_bulk (one claim, one IN prefetch,
+           one _bulk request per batch, events coalesced per journal)
+
+Elasticsearch is replaced by an in-process stand-in that charges a fixed
+round-trip time per request plus a small per-document cost, so the numbers
+reflect request count rather than a real cluster.
+
+Usage: python tests/performance/benchmark_outbox_relay.py [--events 5000] [--rtt-ms 2.0]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import Base, JournalEntry, OutboxEvent, User
+from api.services.outbox_relay_service import OutboxRelayService
+
+
+class ElasticsearchStandIn:
+    """Counts requests and sleeps for the configured network + indexing cost."""
+
+    def __init__(self, rtt_ms, per_doc_ms):
+        self.rtt = rtt_ms / 1000
+        self.per_doc = per_doc_ms / 1000
+        self.requests = 0
+        self.documents = {}
+
+    async def index_document(self, entity, doc_id, data):
+        self.requests += 1
+        await asyncio.sleep(self.rtt + self.per_doc)
+        self.documents[f"{entity}_{doc_id}"] = data
+
+    async def delete_document(self, entity, doc_id):
+        self.requests += 1
+        await asyncio.sleep(self.rtt + self.per_doc)
+        self.documents.pop(f"{entity}_{doc_id}", None)
+
+    async def bulk(self, operations):
+        self.requests += 1
+        await asyncio.sleep(self.rtt + self.per_doc * len(operations))
+        for action, entity, doc_id, data in operations:
+            if action == "index":
+                self.documents[f"{entity}_{doc_id}"] = data
+            else:
+                self.documents.pop(f"{entity}_{doc_id}", None)
+        return {}
+
+
+async def seed(session_factory, events, journals, rng):
+    async with session_factory() as db:
+        await db.execute(User.__table__.insert(), [{"id": 1, "username": "bench", "password_hash": "x",
+                                                     "is_active": True, "is_deleted": False}])
+        await db.execute(
+            text("INSERT INTO journal_entries (id, user_id, content, timestamp, is_deleted, word_count, privacy_level) "
+                 "VALUES (:id, 1, :content, '2024-01-01T00:00:00', :deleted, 10, 'private')"),
+            [{"id": i, "content": f"entry {i}", "deleted": i % 20 == 0} for i in range(1, journals + 1)],
+        )
+        await db.execute(OutboxEvent.__table__.insert(), [
+            {"topic": "search_indexing", "status": "pending", "retry_count": 0, "payload": {
+                "event_id": str(uuid.uuid4()), "journal_id": rng.randint(1, journals),
+                "action": "delete" if rng.random() < 0.05 else "upsert", "event_version": 1,
+            }} for _ in range(events)
+        ])
+        await db.commit()
+
+
+async def drain(session_factory, relay):
+    total = 0
+    while True:
+        async with session_factory() as db:
+            count = await relay(db)
+        if not count:
+            return total
+        total += count
+
+
+async def run(kind, args):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all,
+                                tables=[User.__table__, JournalEntry.__table__, OutboxEvent.__table__])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        await seed(session_factory, args.events, args.journals, rng)
+
+        es = ElasticsearchStandIn(args.rtt_ms, args.per_doc_ms)
+        if kind == "serial":
+            relay = OutboxRelayService.process_pending_indexing_events
+        else:
+            async def relay(db):
+                return await OutboxRelayService.process_pending_indexing_events_bulk(db, batch_size=args.batch_size)
+
+        with patch("api.services.outbox_relay_service.get_es_service", return_value=es):
+            start = time.perf_counter()
+            relayed = await drain(session_factory, relay)
+            elapsed = time.perf_counter() - start
+        await engine.dispose()
+
+    return {"relayed": relayed, "seconds": elapsed, "requests": es.requests, "rate": relayed / elapsed}
+
+
+async def main(args):
+    results = {kind: await run(kind, args) for kind in ("serial", "bulk")}
+
+    print("=" * 64)
+    print(f"Outbox relay: {args.events} events over {args.journals} journals, "
+          f"ES stand-in RTT {args.rtt_ms} ms")
+    print("=" * 64)
+    print(f"{'':<10}{'events':>10}{'ES reqs':>10}{'seconds':>10}{'events/s':>12}")
+    for kind, r in results.items():
+        print(f"{kind:<10}{r['relayed']:>10}{r['requests']:>10}{r['seconds']:>10.2f}{r['rate']:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--journals", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=2.0)
+    parser.add_argument("--per-doc-ms", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,105 @@
+"""
+Question lookups: SQL per request vs the in-memory question catalog.
+
+Seeds a temporary SQLite database with ``--questions`` questions (random age
+ranges and categories) and times ``--requests`` calls of each QuestionService
+lookup, with the catalog disabled and enabled:
+
+* random  — get_random_questions(age, --sample): ORDER BY random() LIMIT k
+            vs random.sample over the age bracket
+* by age  — get_questions_by_age(age)
+* page    — get_questions(category_id, skip, 20): COUNT subquery + OFFSET
+            page vs a slice of the category list
+
+The catalog's one-off load (query + index build) is reported separately.
+
+Usage: python tests/performance/benchmark_question_catalog.py [--questions 5000] [--requests 500] [--sample 20]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import Base, Question
+from api.services import db_service
+from api.services.db_service import QuestionService
+from api.services.question_catalog import QuestionCatalog
+
+
+class FixedVersion:
+    """Stands in for resource_versions: the question bank does not change during the run."""
+
+    async def get(self, name):
+        return "bench"
+
+
+async def time_calls(session_factory, requests, call):
+    rng = random.Random(9)
+    async with session_factory() as db:
+        start = time.perf_counter()
+        for _ in range(requests):
+            await call(db, rng)
+        return (time.perf_counter() - start) / requests * 1000
+
+
+async def main(args):
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'questions.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Question.__table__])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            rows = []
+            for i in range(1, args.questions + 1):
+                low = rng.choice([10, 13, 18, 26, 40, 60])
+                rows.append({"id": i, "question_text": f"Question {i}", "category_id": rng.randint(1, 12),
+                             "min_age": low, "max_age": rng.choice([h for h in (17, 25, 39, 65, 120) if h >= low]),
+                             "is_active": 0 if rng.random() < 0.05 else 1, "tooltip": "Answer honestly."})
+            await db.execute(insert(Question), rows)
+            await db.commit()
+
+        calls = {
+            "random": lambda db, r: QuestionService.get_random_questions(db, age=r.randint(10, 90), count=args.sample),
+            "by age": lambda db, r: QuestionService.get_questions_by_age(db, age=r.randint(10, 90)),
+            "page": lambda db, r: QuestionService.get_questions(db, skip=r.randint(0, 10) * 20, limit=20,
+                                                                category_id=r.randint(1, 12)),
+        }
+        catalog = QuestionCatalog(session_factory=session_factory, versions=FixedVersion())
+        db_service.question_catalog = catalog
+
+        results = {}
+        for enabled in (False, True):
+            db_service.settings.question_catalog_enabled = enabled
+            if enabled:
+                start = time.perf_counter()
+                await catalog.get()
+                load_ms = (time.perf_counter() - start) * 1000
+            for name, call in calls.items():
+                results[(name, enabled)] = await time_calls(session_factory, args.requests, call)
+        await engine.dispose()
+
+    print("=" * 56)
+    print(f"Question lookups: {args.questions} questions, {args.requests} requests each")
+    print("=" * 56)
+    print(f"{'':<10}{'SQL ms':>12}{'catalog ms':>14}{'speedup':>10}")
+    for name in calls:
+        sql_ms, catalog_ms = results[(name, False)], results[(name, True)]
+        print(f"{name:<10}{sql_ms:>12.3f}{catalog_ms:>14.3f}{sql_ms / catalog_ms:>9.0f}x")
+    print(f"\ncatalog load: {load_ms:.1f} ms, {catalog.get_stats()['age_brackets']} age brackets")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--sample", type=int, default=20, help="Questions per random exam sample")
+    asyncio.run(main(parser.parse_args()))
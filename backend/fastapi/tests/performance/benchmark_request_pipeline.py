@@ -0,0 +1,143 @@
+"""
+Per-request overhead of the auth/context middleware layers.
+
+Compares three FastAPI apps serving the same trivial endpoint:
+
+* bare      — no middleware
+* legacy    — the former stack: MaintenanceMiddleware, feature_flag_middleware,
+              rbac_middleware, DynamicQuotaMiddleware, ConsentValidationMiddleware
+              and StepUpAuthMiddleware, each mounted separately
+* pipeline  — RequestPipelineMiddleware running the same checks as stages
+
+Backends (maintenance state, RBAC sidecar cache, quota, feature flags) are
+replaced by in-process stand-ins, so the numbers isolate middleware overhead
+(task hops, response re-streaming, repeated JWT decoding) from I/O.
+
+Usage: python tests/performance/benchmark_request_pipeline.py [--requests 3000] [--concurrency 1]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import httpx
+from fastapi import FastAPI, Request
+from jose import jwt
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from api.config import get_settings_instance
+from api.middleware.consent_middleware import ConsentValidationMiddleware
+from api.middleware.feature_flags import feature_flag_middleware
+from api.middleware.maintenance import MaintenanceMiddleware
+from api.middleware.quota_middleware import DynamicQuotaMiddleware
+from api.middleware.rbac_middleware import rbac_middleware
+from api.middleware.request_pipeline import RequestPipelineMiddleware
+from api.middleware.step_up_auth_middleware import StepUpAuthMiddleware
+from api.services.cache_service import cache_service
+from api.services.rbac_cache import rbac_permission_cache
+
+settings = get_settings_instance()
+
+
+class _Flags:
+    def get_all_flags(self):
+        return {"new_dashboard": {"enabled": True}, "beta_journal": {"enabled": False}}
+
+    def is_enabled(self, name, user_id=None, tenant_id=None):
+        return name == "new_dashboard"
+
+
+async def _no_maintenance(key):
+    return None
+
+
+async def _cached_permission(username, user_id):
+    return False
+
+
+async def _quota(tenant_id, client_ip):
+    return {"tier": "pro", "daily_limit": 10000, "daily_count": 1, "tokens_remaining": 99}
+
+
+def build_app(kind):
+    app = FastAPI()
+
+    @app.get("/api/v1/journal")
+    async def journal(request: Request):
+        return {"user_id": getattr(request.state, "user_id", None)}
+
+    if kind == "legacy":
+        # Added inner to outer, matching the previous create_app order
+        app.add_middleware(StepUpAuthMiddleware)
+        app.add_middleware(ConsentValidationMiddleware)
+        app.add_middleware(DynamicQuotaMiddleware)
+        app.add_middleware(BaseHTTPMiddleware, dispatch=rbac_middleware)
+        app.add_middleware(BaseHTTPMiddleware, dispatch=feature_flag_middleware)
+        app.add_middleware(MaintenanceMiddleware)
+    elif kind == "pipeline":
+        app.add_middleware(RequestPipelineMiddleware)
+    return app
+
+
+async def measure(app, token, total, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):  # warm-up
+            (await client.get("/api/v1/journal", headers=headers)).raise_for_status()
+
+        async def request():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get("/api/v1/journal", headers=headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+
+        await asyncio.gather(*(request() for _ in range(total)))
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+async def main(args):
+    token = jwt.encode(
+        {"sub": "bench", "uid": 1, "tid": "tenant-1", "is_admin": False,
+         "exp": datetime.now(timezone.utc) + timedelta(hours=1)},
+        settings.SECRET_KEY, algorithm=settings.jwt_algorithm,
+    )
+
+    with patch.object(cache_service, "get", _no_maintenance), \
+         patch.object(rbac_permission_cache, "get", _cached_permission), \
+         patch("api.middleware.feature_flags.get_feature_service", return_value=_Flags()), \
+         patch("api.middleware.quota_middleware.enforce_quota", _quota), \
+         patch("api.middleware.request_pipeline.enforce_quota", _quota):
+        results = {kind: await measure(build_app(kind), token, args.requests, args.concurrency)
+                   for kind in ("bare", "legacy", "pipeline")}
+
+    bare = results["bare"]
+    print("=" * 64)
+    print(f"Middleware overhead: {args.requests} requests, concurrency {args.concurrency}")
+    print("=" * 64)
+    print(f"{'':<12}{'p50 ms':>10}{'p99 ms':>10}{'p50 +ms':>12}{'p99 +ms':>12}")
+    for kind, stats in results.items():
+        print(f"{kind:<12}{stats['p50']:>10.3f}{stats['p99']:>10.3f}"
+              f"{stats['p50'] - bare['p50']:>12.3f}{stats['p99'] - bare['p99']:>12.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,122 @@
+"""
+Dashboard summary: per-load aggregation vs the maintained score summary.
+
+Seeds a temporary SQLite database with ``--users`` users and ``--scores``
+scores each, then times ``--loads`` dashboard loads for random users:
+
+* aggregate — the previous get_dashboard_summary queries: COUNT/AVG/MAX,
+              the latest score, every score (for statistics.stdev) and the
+              last five
+* summary   — UserAnalyticsService.get_dashboard_summary, one primary-key
+              read of user_score_summaries
+
+It also times ScoreSummaryService.record_score (the extra work per saved
+score) and a full rebuild.
+
+Usage: python tests/performance/benchmark_score_summary.py [--users 2000] [--scores 100] [--loads 1000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import desc, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import Base, OutboxEvent, Score, User, UserScoreSummary
+from api.services.score_summary import ScoreSummaryService
+from api.services.user_analytics_service import UserAnalyticsService
+
+
+async def aggregate_summary(db, user_id):
+    total, average, best = (await db.execute(
+        select(func.count(Score.id), func.avg(Score.total_score), func.max(Score.total_score))
+        .filter(Score.user_id == user_id)
+    )).first()
+    latest = (await db.execute(
+        select(Score).filter(Score.user_id == user_id).order_by(desc(Score.id)).limit(1)
+    )).scalar_one_or_none()
+    values = (await db.execute(select(Score.total_score).filter(Score.user_id == user_id))).scalars().all()
+    stdev = statistics.stdev(values) if len(values) > 1 else None
+    recent = (await db.execute(
+        select(Score.total_score).filter(Score.user_id == user_id).order_by(desc(Score.id)).limit(5)
+    )).scalars().all()
+    return total, average, best, latest.total_score if latest else 0, stdev, recent[::-1]
+
+
+async def time_loads(session_factory, loads, users, fn):
+    rng = random.Random(5)
+    async with session_factory() as db:
+        start = time.perf_counter()
+        for _ in range(loads):
+            await fn(db, rng.randint(1, users))
+        return (time.perf_counter() - start) / loads * 1000
+
+
+async def main(args):
+    rng = random.Random(1)
+    start_day = datetime.now(timezone.utc) - timedelta(days=365)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'scores.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[
+                User.__table__, OutboxEvent.__table__, Score.__table__, UserScoreSummary.__table__])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with session_factory() as db:
+            await db.execute(insert(User), [
+                {"id": u, "username": f"user_{u}", "password_hash": "x"} for u in range(1, args.users + 1)
+            ])
+            rows = [
+                {"user_id": u, "username": f"user_{u}", "total_score": rng.randint(0, 100),
+                 "timestamp": (start_day + timedelta(days=i * 365 / args.scores)).isoformat()}
+                for i in range(args.scores) for u in range(1, args.users + 1)
+            ]
+            for offset in range(0, len(rows), 5000):
+                await db.execute(insert(Score), rows[offset:offset + 5000])
+            await db.commit()
+
+            start = time.perf_counter()
+            await ScoreSummaryService.rebuild(db)
+            rebuild_s = time.perf_counter() - start
+
+        aggregate_ms = await time_loads(session_factory, args.loads, args.users, aggregate_summary)
+        summary_ms = await time_loads(session_factory, args.loads, args.users, UserAnalyticsService.get_dashboard_summary)
+
+        async with session_factory() as db:
+            start = time.perf_counter()
+            for i in range(args.loads):
+                score = Score(user_id=rng.randint(1, args.users), total_score=rng.randint(0, 100),
+                              timestamp=datetime.now(timezone.utc).isoformat())
+                db.add(score)
+                await db.flush()
+                await ScoreSummaryService.record_score(db, score)
+            record_ms = (time.perf_counter() - start) / args.loads * 1000
+            await db.commit()
+            assert await ScoreSummaryService.check(db, user_ids=range(1, 51)) == []
+
+        await engine.dispose()
+
+    print("=" * 64)
+    print(f"Dashboard summary: {args.users} users x {args.scores} scores, {args.loads} loads")
+    print("=" * 64)
+    print(f"{'':<14}{'ms/load':>12}")
+    print(f"{'aggregate':<14}{aggregate_ms:>12.3f}")
+    print(f"{'summary':<14}{summary_ms:>12.3f}")
+    print(f"\nspeedup {aggregate_ms / summary_ms:.1f}x; record_score adds {record_ms:.3f} ms per saved score; "
+          f"full rebuild {rebuild_s:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--scores", type=int, default=100, help="Scores per user")
+    parser.add_argument("--loads", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
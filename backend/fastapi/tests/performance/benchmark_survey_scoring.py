@@ -0,0 +1,100 @@
+"""
+Survey scoring: the rule interpreter vs the compiled DSL.
+
+Generates a template with ``--rules`` rules over ``--questions`` questions
+(a mix of ==, > and < conditions) and ``--submissions`` answer sets, each
+answering about half of the questions, then scores them:
+
+* interpreted — the previous SurveyService._calculate_scores_dsl: every
+                rule, str()/float() conversions per rule, per submission
+* compiled    — CompiledScoring.score per submission (rules by question id)
+* batch       — CompiledScoring.score_many over all submissions (NumPy)
+
+Compilation time is reported separately; it is paid once per template version.
+
+Usage: python tests/performance/benchmark_survey_scoring.py [--rules 300] [--questions 60] [--submissions 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.services.survey_scoring import compile_scoring
+
+
+def interpret(logic, answers):
+    scores = {}
+    for rule in logic:
+        condition = rule.get('if', {})
+        qid = condition.get('qid')
+        op = condition.get('op', '==')
+        target_val = condition.get('val')
+        actual_val = answers.get(qid)
+        if actual_val is None:
+            continue
+        match = False
+        if op == '==':
+            match = str(actual_val) == str(target_val)
+        elif op == '>':
+            try:
+                match = float(actual_val) > float(target_val)
+            except Exception:
+                pass
+        elif op == '<':
+            try:
+                match = float(actual_val) < float(target_val)
+            except Exception:
+                pass
+        if match:
+            for dimension, delta in rule.get('then', {}).items():
+                scores[dimension] = scores.get(dimension, 0.0) + float(delta)
+    return scores
+
+
+def main(args):
+    rng = random.Random(1)
+    dimensions = ["anxiety", "resilience", "focus", "mood", "energy", "social"]
+    logic = [
+        {"if": {"qid": rng.randint(1, args.questions), "op": rng.choice(["==", ">", "<"]), "val": rng.randint(0, 10)},
+         "then": {rng.choice(dimensions): rng.choice([-2, -1, 1, 2, 3])}}
+        for _ in range(args.rules)
+    ]
+    submissions = [
+        {qid: str(rng.randint(0, 10)) for qid in range(1, args.questions + 1) if rng.random() < 0.5}
+        for _ in range(args.submissions)
+    ]
+
+    start = time.perf_counter()
+    compiled = compile_scoring(logic)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    timings = {}
+    start = time.perf_counter()
+    expected = [interpret(logic, answers) for answers in submissions]
+    timings["interpreted"] = time.perf_counter() - start
+    start = time.perf_counter()
+    single = [compiled.score(answers) for answers in submissions]
+    timings["compiled"] = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = compiled.score_many(submissions)
+    timings["batch"] = time.perf_counter() - start
+    assert single == expected and batch == expected
+
+    print("=" * 56)
+    print(f"Survey scoring: {args.rules} rules, {args.questions} questions, {args.submissions} submissions")
+    print("=" * 56)
+    print(f"{'':<13}{'us/submission':>15}{'speedup':>10}")
+    for name, seconds in timings.items():
+        print(f"{name:<13}{seconds / args.submissions * 1e6:>15.1f}{timings['interpreted'] / seconds:>9.1f}x")
+    print(f"\ncompile: {compile_ms:.2f} ms once per template version")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--submissions", type=int, default=5000)
+    main(parser.parse_args())
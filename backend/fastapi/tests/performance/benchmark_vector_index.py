@@ -0,0 +1,93 @@
+"""
+Local vector index: IVF recall@k and latency against brute-force search.
+
+Writes one user shard of synthetic embeddings (Gaussian clusters of varying
+spread, standing in for topic-heavy journal text) to a temporary directory,
+then for each query compares:
+
+* brute force — exact cosine scan (one matrix-vector product) over every
+                vector, held in RAM as a contiguous float32 matrix
+* ivf         — VectorIndex search probing ``nprobe`` inverted lists
+
+recall@k is the share of the exact top-k returned by the IVF search.
+
+Usage: python tests/performance/benchmark_vector_index.py [--vectors 100000] [--dim 384] [--k 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import numpy as np
+
+from api.services.vector_index import VectorIndex
+
+USER_ID = 1
+
+
+def synthetic_embeddings(n, dim, clusters, rng):
+    centres = rng.normal(size=(clusters, dim))
+    spread = rng.uniform(0.8, 1.6, size=(clusters, 1))
+    labels = rng.integers(0, clusters, size=n)
+    return (centres[labels] + spread[labels] * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def brute_force(matrix, q, k):
+    scores = matrix @ (q / np.linalg.norm(q))
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top])].tolist()
+
+
+def measure(search, queries):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(search(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return results, {"p50": statistics.median(latencies), "p99": latencies[int(len(latencies) * 0.99) - 1]}
+
+
+def main(args):
+    rng = np.random.default_rng(3)
+    data = synthetic_embeddings(args.vectors + args.queries, args.dim, args.clusters, rng)
+    vectors, queries = data[:args.vectors], data[args.vectors:]
+    matrix = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(root=tmp, ivf_min_vectors=1, max_loaded_shards=4)
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), 10000):
+            index.upsert(USER_ID, list(enumerate(vectors[offset:offset + 10000].tolist(), start=offset)), create=True)
+        index.search(USER_ID, queries[0], k=1)  # load + train
+        print(f"Wrote and trained {args.vectors} x {args.dim} shard in {time.perf_counter() - start:.1f}s")
+
+        exact, exact_latency = measure(lambda q: brute_force(matrix, q, args.k), queries)
+        rows = [("brute force", 1.0, exact_latency)]
+        for nprobe in args.nprobe:
+            approx, latency = measure(
+                lambda q: [i for i, _ in index.search(USER_ID, q, k=args.k, nprobe=nprobe)], queries)
+            recall = statistics.mean(len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact))
+            rows.append((f"ivf nprobe={nprobe}", recall, latency))
+
+    print("=" * 60)
+    print(f"Vector index: {args.vectors} vectors, dim {args.dim}, {args.queries} queries, k={args.k}")
+    print("=" * 60)
+    print(f"{'':<18}{f'recall@{args.k}':>12}{'p50 ms':>12}{'p99 ms':>12}")
+    for name, recall, latency in rows:
+        print(f"{name:<18}{recall:>12.3f}{latency['p50']:>12.2f}{latency['p99']:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    main(parser.parse_args())
@@ -0,0 +1,120 @@
+"""
+WebSocket fan-out: sequential send_json vs per-connection send queues.
+
+Simulates ``--connections`` WebSockets on one node, one of which is a slow
+client taking ``--slow-ms`` per frame, and delivers ``--messages``
+broadcasts both ways:
+
+* sequential — the previous ``_broadcast_local``: decode the Pub/Sub
+               envelope, then ``await send_json`` on every connection in
+               turn (one json.dumps per socket)
+* queued     — ConnectionManager._dispatch: the pre-encoded text is put on
+               each connection's bounded queue and written by its own task
+
+and reports how long it takes until every fast client has all messages, and
+how long the broadcaster itself is blocked.
+
+Usage: python tests/performance/benchmark_websocket_fanout.py [--connections 10000] [--messages 20] [--slow-ms 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.services.websocket_manager import BROADCAST_CHANNEL, ConnectionManager, encode_message
+
+
+class SimulatedWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        # A socket write yields to the loop; the slow client also waits
+        await asyncio.sleep(self.delay)
+        self.received += 1
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+    async def close(self, code=1000):
+        pass
+
+
+def make_sockets(n, slow_ms):
+    return [SimulatedWebSocket(delay=slow_ms / 1000 if i == 0 else 0.0) for i in range(n)]
+
+
+def message(i):
+    return {"type": "notification", "id": i, "title": "New insight available", "data": {"score": 42, "tags": ["a", "b"]}}
+
+
+async def wait_fast_clients(sockets, expected):
+    while any(ws.received < expected for ws in sockets[1:]):
+        await asyncio.sleep(0.001)
+
+
+async def sequential(n, messages, slow_ms):
+    sockets = make_sockets(n, slow_ms)
+    connections = {user_id: [ws] for user_id, ws in enumerate(sockets)}
+    start = time.perf_counter()
+    for i in range(messages):
+        envelope = json.dumps({"user_id": None, "payload": message(i)})
+        payload = json.loads(envelope)["payload"]
+        for user_connections in connections.values():
+            for connection in user_connections:
+                await connection.send_json(payload)
+    blocked_s = time.perf_counter() - start
+    await wait_fast_clients(sockets, messages)
+    return time.perf_counter() - start, blocked_s, 0
+
+
+async def queued(n, messages, slow_ms, max_queue):
+    sockets = make_sockets(n, slow_ms)
+    manager = ConnectionManager(max_queue=max_queue, slow_consumer_policy="drop_oldest")
+    manager._is_connected = True
+    for user_id, ws in enumerate(sockets):
+        await manager.connect(ws, user_id)
+    start = time.perf_counter()
+    blocked_s = 0.0
+    for i in range(messages):
+        t = time.perf_counter()
+        manager._dispatch(BROADCAST_CHANNEL, encode_message(message(i)))
+        blocked_s += time.perf_counter() - t
+        await asyncio.sleep(0)
+    await wait_fast_clients(sockets, messages)
+    elapsed = time.perf_counter() - start
+    dropped = manager.get_stats()["dropped"]
+    await manager.shutdown()
+    return elapsed, blocked_s, dropped
+
+
+async def main(args):
+    seq_s, seq_blocked, _ = await sequential(args.connections, args.messages, args.slow_ms)
+    q_s, q_blocked, dropped = await queued(args.connections, args.messages, args.slow_ms, args.queue_size)
+
+    total = args.connections * args.messages
+    print("=" * 68)
+    print(f"Broadcasting {args.messages} messages to {args.connections} connections "
+          f"(1 slow client, {args.slow_ms} ms/frame)")
+    print("=" * 68)
+    print(f"{'':<12}{'delivered s':>14}{'frames/s':>14}{'broadcaster ms':>16}")
+    print(f"{'sequential':<12}{seq_s:>14.2f}{total / seq_s:>14.0f}{seq_blocked * 1000:>16.1f}")
+    print(f"{'queued':<12}{q_s:>14.2f}{total / q_s:>14.0f}{q_blocked * 1000:>16.1f}")
+    print(f"\nqueued: queue size {args.queue_size}, {dropped} frames dropped for the slow client")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--slow-ms", type=float, default=5.0)
+    parser.add_argument("--queue-size", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
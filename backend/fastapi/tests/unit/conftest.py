@@ -0,0 +1,35 @@
+"""Shared fixtures for the unit tests."""
+import pytest_asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from api.models import Base
+
+
+@pytest_asyncio.fixture
+async def make_session_factory():
+    """
+    Build async session factories over fresh aiosqlite databases.
+
+    Call with the models (or tables) a test needs, e.g.
+    ``factory = await make_session_factory(User, JournalEntry)``; pass ``url``
+    for a file-backed database. Every engine is disposed at teardown and stays
+    reachable as ``factory.kw["bind"]``.
+    """
+    engines = []
+
+    async def make(*tables, url: str = "sqlite+aiosqlite:///:memory:") -> async_sessionmaker:
+        engine = create_async_engine(url)
+        engines.append(engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all,
+                                tables=[getattr(table, "__table__", table) for table in tables])
+        return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    yield make
+    for engine in engines:
+        await engine.dispose()
@@ -0,0 +1,200 @@
+"""
+Unit tests for the event-driven achievement engine (api/services/achievement_engine.py):
+the per-day counter ring, rule evaluation per event, one unlock and one XP
+award per achievement, requirements overrides and counter rebuilds.
+"""
+import json
+import pytest
+import pytest_asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import event, func, select
+
+from api.models import (
+    Achievement, AssessmentResult, JournalEntry, OutboxEvent, User, UserAchievement,
+    UserActivityCounter, UserXP,
+)
+from api.services.achievement_engine import COUNTER_RING_DAYS, AchievementEngine, AchievementRule, CounterState
+from api.services.gamification_service import GamificationService
+
+UTC = timezone.utc
+NOW = datetime(2025, 3, 31, 12, 0, tzinfo=UTC)
+
+
+@pytest_asyncio.fixture
+async def session_factory(make_session_factory):
+    factory = await make_session_factory(
+        User, OutboxEvent, Achievement, UserAchievement, UserActivityCounter, UserXP, JournalEntry, AssessmentResult)
+    async with factory() as db:
+        db.add(User(id=1, username="alice", password_hash="x"))
+        await db.commit()
+        await GamificationService.seed_initial_achievements(db)
+    return factory
+
+
+@pytest_asyncio.fixture
+async def db(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = AchievementEngine()
+    monkeypatch.setattr("api.services.gamification_service.achievement_engine", engine)
+    return engine
+
+
+async def unlocked(db):
+    return sorted((await db.execute(
+        select(UserAchievement.achievement_id).where(UserAchievement.unlocked == True)  # noqa: E712
+    )).scalars())
+
+
+async def journal_days(engine, db, days, per_day=1):
+    """Journal events on consecutive days ending at NOW; returns every unlock in order."""
+    unlocks = []
+    for offset in range(days - 1, -1, -1):
+        for _ in range(per_day):
+            result = await engine.handle(db, 1, "journal", at=NOW - timedelta(days=offset))
+            unlocks += [ua.achievement_id for ua, _ in result]
+            await db.commit()
+    return unlocks
+
+
+class TestCounterState:
+
+    def test_window_and_ring_expiry(self):
+        state = CounterState()
+        today = date(2025, 3, 31)
+        for offset in (40, 29, 29, 10, 0):
+            state.add(today - timedelta(days=offset))
+
+        assert state.total == 5
+        assert state.in_window(today, 30) == 4
+        assert state.in_window(today, 11) == 2
+        assert state.in_window(today, 1) == 1
+        # Thirty days on, every bucket has been overwritten or dropped from the window
+        later = today + timedelta(days=COUNTER_RING_DAYS)
+        state.add(later)
+        assert state.in_window(later, 30) == 1 and state.total == 6
+
+    def test_late_events_and_round_trip(self):
+        state = CounterState()
+        today = date(2025, 3, 31)
+        state.add(today)
+        state.add(today - timedelta(days=3))
+        state.add(today - timedelta(days=45))  # outside the ring: only the total moves
+
+        assert state.in_window(today, 30) == 2 and state.total == 3
+        row = UserActivityCounter(user_id=1, event="journal", **state.to_values())
+        assert CounterState.from_row(row) == state
+
+    def test_consecutive_days(self):
+        state = CounterState()
+        today = date(2025, 3, 31)
+        for offset in (9, 4, 3, 2, 1, 0):
+            state.add(today - timedelta(days=offset))
+
+        assert state.consecutive_days(today) == 5
+        assert state.consecutive_days(today + timedelta(days=1)) == 0
+
+    def test_rule_validation(self):
+        with pytest.raises(ValueError):
+            AchievementRule("TOO_LONG", events=("journal",), counter="journal", window_days=COUNTER_RING_DAYS + 1)
+        rule = AchievementRule.from_requirements("X", json.dumps({"events": "journal", "threshold": 3}))
+        assert rule.events == ("journal",) and rule.counter == "journal" and rule.threshold == 3
+
+
+class TestAchievementEngine:
+
+    @pytest.mark.asyncio
+    async def test_first_journal_unlocks_once_with_one_xp_award(self, db, engine):
+        first = await GamificationService.check_achievements(db, 1, "journal")
+        second = await GamificationService.check_achievements(db, 1, "journal")
+
+        assert [ua.achievement_id for ua in first] == ["FIRST_JOURNAL"]
+        assert second == []
+        assert await unlocked(db) == ["FIRST_JOURNAL"]
+        assert (await db.execute(select(UserXP.total_xp))).scalar() == 50
+        assert (await engine.get_counter(db, 1, "journal")).total == 2
+
+    @pytest.mark.asyncio
+    async def test_only_rules_for_the_event_are_evaluated(self, db, engine):
+        await engine.handle(db, 1, "assessment", at=NOW)
+        assert engine.stats["rules_evaluated"] == 1  # EQ_EXPLORER only
+        assert await unlocked(db) == ["EQ_EXPLORER"]
+
+        await engine.handle(db, 1, "journal", at=NOW)
+        assert engine.stats["rules_evaluated"] == 4  # + FIRST_JOURNAL, WEEK_WARRIOR, MONTHLY_MASTER
+        await engine.handle(db, 1, "journal", at=NOW)
+        assert engine.stats["rules_evaluated"] == 6  # FIRST_JOURNAL is no longer checked
+
+    @pytest.mark.asyncio
+    async def test_unlock_check_does_not_count_journal_rows(self, db, engine, session_factory):
+        statements = []
+        event.listen(session_factory.kw["bind"].sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *a: statements.append(statement))
+        await engine.handle(db, 1, "journal", at=NOW)
+        await engine.handle(db, 1, "journal", at=NOW)
+
+        assert not any("journal_entries" in s for s in statements)
+
+    @pytest.mark.asyncio
+    async def test_monthly_master_needs_thirty_entries_within_thirty_days(self, db, engine, session_factory):
+        # Ten entries 31-40 days ago fall outside the window
+        unlocks = [ua.achievement_id for offset in range(40, 30, -1)
+                   for ua, _ in await engine.handle(db, 1, "journal", at=NOW - timedelta(days=offset))]
+        unlocks += await journal_days(engine, db, days=15, per_day=2)
+
+        assert unlocks.count("MONTHLY_MASTER") == 1
+        assert unlocks[-1] == "MONTHLY_MASTER"  # on the 30th entry inside the window
+        assert "WEEK_WARRIOR" in unlocks
+
+    @pytest.mark.asyncio
+    async def test_week_warrior_needs_seven_consecutive_days(self, db, engine):
+        assert "WEEK_WARRIOR" not in await journal_days(engine, db, days=6)
+        # A gap resets the run
+        assert await engine.handle(db, 1, "journal", at=NOW + timedelta(days=2)) == []
+        for day in range(3, 9):
+            result = await engine.handle(db, 1, "journal", at=NOW + timedelta(days=day))
+        assert [ua.achievement_id for ua, _ in result] == ["WEEK_WARRIOR"]
+
+    @pytest.mark.asyncio
+    async def test_requirements_override_the_builtin_rule(self, db, engine):
+        db.add(Achievement(achievement_id="THREE_CHECKINS", name="Three Check-ins", description="d",
+                           category="awareness", points_reward=10,
+                           requirements=json.dumps({"events": ["assessment"], "threshold": 3})))
+        first = await db.get(Achievement, 1)
+        first.requirements = json.dumps({"events": ["journal"], "threshold": 2})
+        await db.commit()
+
+        results = []
+        for activity in ("journal", "journal", "assessment", "assessment", "assessment"):
+            results += await GamificationService.check_achievements(db, 1, activity)
+
+        assert [ua.achievement_id for ua in results] == ["FIRST_JOURNAL", "EQ_EXPLORER", "THREE_CHECKINS"]
+        assert await db.scalar(select(func.count(UserAchievement.id))) == 3
+
+    @pytest.mark.asyncio
+    async def test_rebuild_counters_from_history(self, db, engine, monkeypatch):
+        for offset in range(12):
+            db.add(JournalEntry(user_id=1, username="alice", timestamp=(NOW - timedelta(days=offset)).isoformat()))
+        db.add(JournalEntry(user_id=1, username="alice", timestamp=NOW.isoformat(), is_deleted=True))
+        db.add(AssessmentResult(user_id=1, assessment_type="strengths", details="{}", timestamp=NOW.isoformat()))
+        await db.commit()
+
+        assert await AchievementEngine.rebuild_counters(db) == 2
+        journal = await engine.get_counter(db, 1, "journal")
+        assert journal.total == 12
+        assert journal.in_window(NOW.date(), 7) == 7
+        assert journal.consecutive_days(NOW.date()) == 12
+        assert (await engine.get_counter(db, 1, "assessment")).total == 1
+
+        # The next entry unlocks from the rebuilt counter, without a query over the history
+        result = await engine.handle(db, 1, "journal", at=NOW)
+        assert {ua.achievement_id for ua, _ in result} == {"FIRST_JOURNAL", "WEEK_WARRIOR"}
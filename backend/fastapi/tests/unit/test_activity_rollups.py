@@ -0,0 +1,190 @@
+"""
+Unit tests for the daily activity rollups (api/services/activity_rollups.py):
+the exact / HyperLogLog active-user sketch, incremental recording as events
+are logged, the KPI reads, the backfill from analytics_events and the KPIs
+served by AnalyticsService.
+"""
+import random
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock
+import pytest
+import pytest_asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import select
+
+from api.models import AnalyticsDailyActiveUsers, AnalyticsDailyEventCount, AnalyticsEvent, OutboxEvent, User
+from api.services.activity_rollups import ActiveUserSketch, ActivityRollupService
+from api.services.analytics_service import AnalyticsService
+import api.services.analytics_service as analytics_service
+
+START = date(2026, 3, 1)
+
+
+class TestActiveUserSketch:
+
+    def test_exact_sets_merge_and_round_trip(self):
+        a = ActiveUserSketch.from_ids([3, 1, 2, 3])
+        b = ActiveUserSketch.from_bytes(ActiveUserSketch.from_ids([2, 3, 4, 5]).to_bytes())
+
+        assert a.is_exact and a.count() == 3
+        assert a.union(b).count() == 5
+        assert a.intersection_count(b) == 2
+        assert a.add([1, 2]) is False
+        assert a.add([9]) is True and a.count() == 4
+
+    def test_switches_to_hyperloglog_past_the_exact_limit(self):
+        sketch = ActiveUserSketch.from_ids(range(100), exact_max=100)
+        assert sketch.is_exact
+        sketch.add([100], exact_max=100)
+        assert not sketch.is_exact
+        assert len(sketch.to_bytes()) == 1 + 2 ** 14
+        assert ActiveUserSketch.from_bytes(sketch.to_bytes()).count() == sketch.count() == pytest.approx(101, abs=2)
+
+    def test_hyperloglog_estimates_within_a_few_percent(self):
+        a = ActiveUserSketch.from_ids(range(0, 60_000), exact_max=0)
+        b = ActiveUserSketch.from_ids(range(40_000, 100_000), exact_max=0)
+
+        assert a.count() == pytest.approx(60_000, rel=0.03)
+        assert a.union(b).count() == pytest.approx(100_000, rel=0.03)
+        assert a.intersection_count(b) == pytest.approx(20_000, rel=0.2)
+        # Mixed exact / HLL unions fall back to registers
+        assert b.union(ActiveUserSketch.from_ids([1, 2, 3])).count() == pytest.approx(60_003, rel=0.03)
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory):
+    session_factory = await make_session_factory(
+        User, AnalyticsEvent, OutboxEvent, AnalyticsDailyEventCount, AnalyticsDailyActiveUsers)
+    async with session_factory() as session:
+        session.add_all([User(id=i, username=f"user{i}", password_hash="x") for i in range(1, 61)])
+        await session.commit()
+        yield session
+
+
+def random_events(n, seed=0):
+    rng = random.Random(seed)
+    return [AnalyticsEvent(
+        anonymous_id=f"anon-{i}",
+        user_id=rng.choice([None, rng.randint(1, 60)]),
+        event_type="signup",
+        event_name=rng.choice(["signup_start", "signup_success", "page_view"]),
+        timestamp=datetime.combine(START + timedelta(days=rng.randint(0, 9)), datetime.min.time())
+        + timedelta(seconds=rng.randint(0, 86399)),
+        environment=rng.choice(["production", "staging"]),
+    ) for i in range(n)]
+
+
+def expected_active(events, environment, days):
+    return {e.user_id for e in events
+            if e.user_id is not None and e.environment == environment and e.timestamp.date() in days}
+
+
+async def rollup_rows(db):
+    counts = (await db.execute(select(AnalyticsDailyEventCount.__table__).order_by(
+        AnalyticsDailyEventCount.day, AnalyticsDailyEventCount.environment, AnalyticsDailyEventCount.event_name,
+    ))).all()
+    users = (await db.execute(select(
+        AnalyticsDailyActiveUsers.day, AnalyticsDailyActiveUsers.environment, AnalyticsDailyActiveUsers.user_count,
+    ).order_by(AnalyticsDailyActiveUsers.day, AnalyticsDailyActiveUsers.environment))).all()
+    return counts, users
+
+
+class TestActivityRollups:
+
+    @pytest.mark.asyncio
+    async def test_incremental_rollups_answer_kpis_and_match_backfill(self, db):
+        events = random_events(400)
+        for start in range(0, len(events), 7):
+            batch = events[start:start + 7]
+            db.add_all(batch)
+            await ActivityRollupService.record_events(db, batch, exact_max=20)
+            await db.commit()
+
+        counts = await ActivityRollupService.event_counts(
+            db, "production", ["signup_start", "signup_success"], since=START + timedelta(days=5)
+        )
+        assert counts["signup_start"] == sum(
+            1 for e in events if e.event_name == "signup_start" and e.environment == "production"
+            and e.timestamp.date() >= START + timedelta(days=5)
+        )
+
+        window = {START + timedelta(days=i) for i in range(2, 8)}
+        active = await ActivityRollupService.active_users(db, "staging", START + timedelta(days=2), START + timedelta(days=7))
+        assert active == len(expected_active(events, "staging", window))
+
+        day_0, day_n = START, START + timedelta(days=3)
+        cohort = expected_active(events, "production", {day_0})
+        returning = cohort & expected_active(events, "production", {day_n})
+        assert await ActivityRollupService.retained_users(db, "production", day_0, day_n) == (len(cohort), len(returning))
+        assert await ActivityRollupService.retained_users(db, "production", START - timedelta(days=1), day_n) == (0, 0)
+
+        incremental = await rollup_rows(db)
+        await ActivityRollupService.backfill(db, exact_max=20)
+        assert await rollup_rows(db) == incremental
+
+    @pytest.mark.asyncio
+    async def test_large_cohorts_are_stored_as_hyperloglog(self, db):
+        # Only recorded, never inserted: user_ids need no users rows
+        day = datetime(2026, 3, 2, 12, 0)
+        events = [AnalyticsEvent(anonymous_id=f"anon-{i}", user_id=i, event_type="usage", event_name="open",
+                                 timestamp=day, environment="production") for i in range(1, 3001)]
+        await ActivityRollupService.record_events(db, events[:2000], exact_max=1000)
+        # Repeat visitors leave the stored sketch untouched
+        await ActivityRollupService.record_events(db, events[:10], exact_max=1000)
+        await ActivityRollupService.record_events(db, events[2000:], exact_max=1000)
+        await db.commit()
+
+        row = (await db.execute(select(AnalyticsDailyActiveUsers.user_count, AnalyticsDailyActiveUsers.sketch))).one()
+        assert row.sketch[:1] == b"H"
+        assert row.user_count == pytest.approx(3000, rel=0.03)
+        assert await ActivityRollupService.active_users(db, "production", day.date(), day.date()) == row.user_count
+
+    @pytest.mark.asyncio
+    async def test_backfill_range_only_replaces_its_days(self, db):
+        events = random_events(200, seed=3)
+        db.add_all(events)
+        await db.commit()
+        await ActivityRollupService.backfill(db)
+        full = await rollup_rows(db)
+
+        await ActivityRollupService.backfill(db, since=START + timedelta(days=4), until=START + timedelta(days=6))
+        assert await rollup_rows(db) == full
+
+
+class TestAnalyticsServiceKpis:
+
+    @pytest.mark.asyncio
+    async def test_logged_events_feed_the_kpi_summary(self, db, monkeypatch):
+        monkeypatch.setattr(analytics_service, "get_telemetry_exporter", MagicMock)
+        monkeypatch.setattr(analytics_service, "get_current_environment", lambda: "production")
+        for i, (name, user_id) in enumerate([
+            ("signup_start", None), ("signup_start", None), ("signup_start", 1), ("signup_start", None),
+            ("signup_success", 1), ("signup_success", 2), ("page_view", 2), ("page_view", 3),
+        ]):
+            event = await AnalyticsService.log_event(db, {
+                "anonymous_id": f"anon-{i:08d}", "event_type": "signup", "event_name": name, "user_id": user_id,
+            })
+            assert event.id is not None and event.environment == "production"
+
+        today = datetime.utcnow().date()
+        week_ago = datetime.utcnow() - timedelta(days=7)
+        cohort = [AnalyticsEvent(anonymous_id=f"old-{u}", user_id=u, event_type="usage", event_name="open",
+                                 timestamp=week_ago, environment="production") for u in (2, 3, 4, 5)]
+        db.add_all(cohort)
+        await ActivityRollupService.record_events(db, cohort)
+        await db.commit()
+
+        summary = await AnalyticsService.get_kpi_summary(db)
+        assert summary["environment"] == "production"
+        assert summary["conversion_rate"]["signup_started"] == 4
+        assert summary["conversion_rate"]["signup_completed"] == 2
+        assert summary["conversion_rate"]["conversion_rate"] == 50.0
+        assert summary["retention_rate"]["day_0_users"] == 4
+        assert summary["retention_rate"]["day_n_active_users"] == 2
+        assert summary["arpu"]["total_active_users"] == 5
+        assert await ActivityRollupService.active_users(db, "production", today, today) == 3
+        assert (await AnalyticsService.calculate_conversion_rate(db, environment="staging"))["signup_started"] == 0
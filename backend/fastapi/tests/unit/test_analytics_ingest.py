@@ -0,0 +1,308 @@
+"""
+Unit tests for buffered analytics ingestion (api/services/analytics_ingest.py):
+size/time based batching into multi-row INSERTs, backpressure and drop
+accounting when the buffer is full, Redis Stream spill shared between
+workers, retry of failed flushes, the final flush on shutdown and
+POST /analytics/events feeding the buffer.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+import pytest
+import pytest_asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from api.models import AnalyticsDailyActiveUsers, AnalyticsDailyEventCount, AnalyticsEvent, User
+from api.services import analytics_ingest as ingest_module
+from api.services.analytics_ingest import AnalyticsIngestBuffer
+import api.services.analytics_service as analytics_service
+
+DAY = datetime(2026, 3, 2, 9, 0, tzinfo=timezone.utc)
+
+
+class _FakeStream:
+    """The consumer-group subset of the Redis Streams API used by the buffer."""
+
+    def __init__(self):
+        self.entries = []
+        self.delivered = 0
+        self.pending = set()
+
+    async def xgroup_create(self, name, group, id="0", mkstream=False):
+        pass
+
+    def pipeline(self, transaction=True):
+        stream = self
+
+        class _Pipeline:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def xadd(self, name, fields):
+                stream.entries.append((f"{len(stream.entries) + 1}-0", fields))
+
+            async def execute(self):
+                pass
+
+        return _Pipeline()
+
+    async def xautoclaim(self, name, group, consumer, min_idle_time, start_id="0-0", count=None):
+        return ["0-0", [], []]
+
+    async def xreadgroup(self, group, consumer, streams, count=None):
+        batch = self.entries[self.delivered:self.delivered + count]
+        self.delivered += len(batch)
+        self.pending.update(entry_id for entry_id, _ in batch)
+        return [["stream", batch]] if batch else []
+
+    async def xack(self, name, group, *ids):
+        self.pending.difference_update(ids)
+
+    async def xdel(self, name, *ids):
+        pass
+
+
+@pytest_asyncio.fixture
+async def session_factory(make_session_factory, tmp_path):
+    return await make_session_factory(User, AnalyticsEvent, AnalyticsDailyEventCount, AnalyticsDailyActiveUsers,
+                                      url=f"sqlite+aiosqlite:///{tmp_path / 'ingest.db'}")
+
+
+def make_row(i, event_name="page_view"):
+    return {
+        "anonymous_id": f"anon-{i}",
+        "event_type": "usage",
+        "event_name": event_name,
+        "event_data": "{}",
+        "ip_address": None,
+        "timestamp": DAY + timedelta(seconds=i),
+        "environment": "production",
+    }
+
+
+def make_buffer(**kwargs):
+    options = dict(max_queue=1000, batch_size=100, flush_interval_ms=20, enqueue_timeout_ms=10, redis_stream="")
+    options.update(kwargs)
+    return AnalyticsIngestBuffer(**options)
+
+
+async def stored(session_factory):
+    async with session_factory() as db:
+        events = (await db.execute(select(func.count(AnalyticsEvent.id)))).scalar()
+        counted = (await db.execute(select(func.sum(AnalyticsDailyEventCount.count)))).scalar()
+    return events, counted or 0
+
+
+async def wait_for_flushed(buffer, n):
+    for _ in range(200):
+        if buffer.stats()["flushed"] >= n:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"only {buffer.stats()} flushed")
+
+
+class TestAnalyticsIngestBuffer:
+
+    @pytest.mark.asyncio
+    async def test_events_are_flushed_in_batches_with_rollups(self, session_factory):
+        buffer = make_buffer()
+        for i in range(250):
+            assert await buffer.submit(make_row(i, "signup_start" if i % 5 == 0 else "page_view"))
+
+        task = asyncio.create_task(buffer.run(session_factory))
+        await wait_for_flushed(buffer, 250)
+        # A lone event is flushed once the interval passes
+        await buffer.submit(make_row(999))
+        await wait_for_flushed(buffer, 251)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        stats = buffer.stats()
+        assert await stored(session_factory) == (251, 251)
+        assert stats["batches"] == 4 and stats["queue_depth"] == 0 and stats["dropped"] == 0
+        assert stats["flush_ms_max"] >= stats["flush_ms_p50"] > 0
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_applies_backpressure_then_drops(self):
+        buffer = make_buffer(max_queue=2, enqueue_timeout_ms=50)
+        assert await buffer.submit(make_row(1)) and await buffer.submit(make_row(2))
+
+        async def consume_one():
+            await asyncio.sleep(0.01)
+            buffer._queue.get_nowait()
+        consumer = asyncio.create_task(consume_one())
+        # Waits for the consumer to make room
+        assert await buffer.submit(make_row(3)) is True
+        await consumer
+        # Nobody consumes: rejected once the enqueue timeout passes
+        assert await buffer.submit(make_row(4)) is False
+
+        stats = buffer.stats()
+        assert stats["queue_depth"] == 2
+        assert stats["enqueued"] == 3 and stats["dropped"] == 1 and stats["backpressure_waits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_overflow_spills_to_stream_and_any_worker_persists_it(self, session_factory):
+        stream = _FakeStream()
+        overloaded = make_buffer(max_queue=1, enqueue_timeout_ms=1, redis_stream="analytics:events")
+        overloaded._get_queue()
+        overloaded._redis = stream
+        for i in range(5):
+            assert await overloaded.submit(make_row(i))
+        assert overloaded.stats()["spilled"] == 4 and overloaded.stats()["dropped"] == 0
+
+        other_worker = make_buffer(batch_size=3, redis_stream="analytics:events")
+        other_worker._get_queue()
+        other_worker._redis = stream
+        task = asyncio.create_task(other_worker.run(session_factory))
+        await wait_for_flushed(other_worker, 4)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert await stored(session_factory) == (4, 4)
+        assert other_worker.stats()["stream_flushed"] == 4
+        assert not stream.pending
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, session_factory, monkeypatch):
+        monkeypatch.setattr(ingest_module, "FLUSH_RETRY_DELAY_SECONDS", 0.01)
+        failures = [OperationalError("connect", {}, ConnectionRefusedError("database unavailable"))]
+
+        def flaky_factory():
+            if failures:
+                raise failures.pop()
+            return session_factory()
+
+        buffer = make_buffer()
+        for i in range(30):
+            await buffer.submit(make_row(i))
+        task = asyncio.create_task(buffer.run(flaky_factory))
+        await wait_for_flushed(buffer, 30)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert buffer.stats()["flush_errors"] == 1 and buffer.stats()["dropped"] == 0
+        assert await stored(session_factory) == (30, 30)
+
+    @pytest.mark.asyncio
+    async def test_rejected_row_is_dead_lettered_without_blocking_the_batch(self, session_factory):
+        buffer = make_buffer()
+        for i in range(30):
+            await buffer.submit(make_row(i, event_name=None if i == 17 else "page_view"))
+        task = asyncio.create_task(buffer.run(session_factory))
+        await wait_for_flushed(buffer, 29)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        stats = buffer.stats()
+        assert stats["dead_lettered"] == 1 and stats["retry_depth"] == 0 and stats["dropped"] == 0
+        assert await stored(session_factory) == (29, 29)
+
+    @pytest.mark.asyncio
+    async def test_rejected_stream_entries_are_acknowledged(self, session_factory):
+        stream = _FakeStream()
+        producer = make_buffer(max_queue=1, enqueue_timeout_ms=1, redis_stream="analytics:events")
+        producer._redis = stream
+        await producer._spill([make_row(1), make_row(2, event_name=None), make_row(3)])
+        stream.entries.append(("4-0", {"e": "not json"}))
+
+        consumer = make_buffer(redis_stream="analytics:events")
+        consumer._get_queue()
+        consumer._redis = stream
+        assert await consumer._drain_stream(session_factory) == 4
+
+        stats = consumer.stats()
+        assert (stats["stream_flushed"], stats["dead_lettered"]) == (2, 2)
+        assert not stream.pending
+        assert await stored(session_factory) == (2, 2)
+
+    @pytest.mark.asyncio
+    async def test_shutdown_flushes_queued_events(self, session_factory):
+        buffer = make_buffer(flush_interval_ms=60_000, batch_size=1000)
+        task = asyncio.create_task(buffer.run(session_factory))
+        await asyncio.sleep(0)
+        assert buffer.running
+        for i in range(40):
+            await buffer.submit(make_row(i))
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert not buffer.running
+        assert await stored(session_factory) == (40, 40)
+
+
+@pytest_asyncio.fixture
+async def events_client(session_factory, monkeypatch):
+    from api.middleware.rate_limiter import rate_limit_analytics
+    from api.routers import analytics as analytics_router
+    from api.services.db_router import get_db
+
+    monkeypatch.setattr(analytics_service, "get_telemetry_exporter", MagicMock)
+
+    async def session():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(analytics_router.router, prefix="/api/v1/analytics")
+    app.dependency_overrides[get_db] = session
+    app.dependency_overrides[rate_limit_analytics] = lambda: None
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+def event_body(i):
+    return {"anonymous_id": f"anonymous-{i:04d}", "event_type": "signup", "event_name": "signup_start"}
+
+
+class TestTrackEventEndpoint:
+
+    @pytest.mark.asyncio
+    async def test_posted_events_are_buffered_then_inserted(self, events_client, session_factory, monkeypatch):
+        buffer = make_buffer()
+        monkeypatch.setattr(analytics_service, "analytics_ingest", buffer)
+        task = asyncio.create_task(buffer.run(session_factory))
+        await asyncio.sleep(0)
+
+        for i in range(25):
+            response = await events_client.post("/api/v1/analytics/events", json=event_body(i))
+            assert response.status_code == 201
+        assert buffer.stats()["enqueued"] == 25
+        await wait_for_flushed(buffer, 25)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert await stored(session_factory) == (25, 25)
+        async with session_factory() as db:
+            row = (await db.execute(select(AnalyticsEvent).limit(1))).scalar_one()
+        assert row.event_name == "signup_start" and row.ip_address == "127.0.0.1"
+
+    @pytest.mark.asyncio
+    async def test_overloaded_buffer_returns_503(self, events_client, monkeypatch):
+        buffer = make_buffer(max_queue=1, enqueue_timeout_ms=1)
+        buffer._get_queue()
+        buffer.running = True  # flusher stalled: nothing drains the queue
+        monkeypatch.setattr(analytics_service, "analytics_ingest", buffer)
+
+        assert (await events_client.post("/api/v1/analytics/events", json=event_body(1))).status_code == 201
+        response = await events_client.post("/api/v1/analytics/events", json=event_body(2))
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
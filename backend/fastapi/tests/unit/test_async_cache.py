@@ -0,0 +1,213 @@
+"""
+Unit tests for the async Redis cache decorator (api/utils/cache.py).
+
+An in-memory stand-in for the redis.asyncio client is injected so the
+tests cover hit/miss handling, stampede protection and invalidation
+without a running Redis server.
+"""
+import pytest
+import asyncio
+import fnmatch
+import json
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.utils.cache import RedisCache
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.ops = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeAsyncRedis:
+    """Minimal async Redis stand-in covering the commands RedisCache uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.zsets = {}
+        self.commands = []
+
+    async def get(self, key):
+        self.commands.append("GET")
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        low, high = float(low), float(high)
+        for member in [m for m, score in zset.items() if low <= score <= high]:
+            del zset[member]
+
+    async def zrangebyscore(self, key, low, high):
+        low, high = float(low), float(high)
+        return [m for m, score in self.zsets.get(key, {}).items() if low <= score <= high]
+
+    async def expire(self, key, ttl):
+        return True
+
+    async def unlink(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += int(self.data.pop(key, None) is not None or self.zsets.pop(key, None) is not None)
+        return removed
+
+    async def scan_iter(self, match=None, count=None):
+        self.commands.append("SCAN")
+        for key in list(self.data):
+            if match is None or fnmatch.fnmatch(key, match):
+                yield key
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+@pytest.fixture
+def cache():
+    instance = RedisCache()
+    instance.client = _FakeAsyncRedis()
+    return instance
+
+
+def _bind_loop(cache):
+    """Attach the fake client to the running test loop."""
+    cache._loop = asyncio.get_running_loop()
+
+
+class TestCacheDecorator:
+
+    @pytest.mark.asyncio
+    async def test_miss_then_hit(self, cache):
+        _bind_loop(cache)
+        calls = []
+
+        @cache.cache(ttl=60, prefix="t")
+        async def compute(x):
+            calls.append(x)
+            return {"value": x * 2}
+
+        assert await compute(2) == {"value": 4}
+        assert await compute(2) == {"value": 4}
+        assert calls == [2]
+        assert any(key.startswith("t:compute:") for key in cache.client.data)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_are_collapsed(self, cache):
+        _bind_loop(cache)
+        calls = 0
+
+        @cache.cache(ttl=60, prefix="t")
+        async def slow():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return [1, 2, 3]
+
+        results = await asyncio.gather(*(slow() for _ in range(20)))
+        assert all(r == [1, 2, 3] for r in results)
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_none_results_are_not_cached(self, cache):
+        _bind_loop(cache)
+
+        @cache.cache(ttl=60, prefix="t")
+        async def nothing():
+            return None
+
+        assert await nothing() is None
+        assert cache.client.data == {}
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_passes_through(self):
+        instance = RedisCache()
+        instance.enabled = False
+        calls = 0
+
+        @instance.cache(ttl=60)
+        async def compute():
+            nonlocal calls
+            calls += 1
+            return 1
+
+        await compute()
+        await compute()
+        assert calls == 2
+
+
+class TestInvalidation:
+
+    @pytest.mark.asyncio
+    async def test_invalidate_prefix_uses_tag_set(self, cache):
+        _bind_loop(cache)
+
+        @cache.cache(ttl=60, prefix="journal_analytics")
+        async def analytics(user):
+            return {"user": user}
+
+        @cache.cache(ttl=60, prefix="stats")
+        async def stats(user):
+            return {"user": user}
+
+        for user in ("a", "b", "c"):
+            await analytics(user)
+        await stats("a")
+
+        assert await cache.invalidate_prefix("journal_analytics") == 3
+        assert "SCAN" not in cache.client.commands
+        remaining = list(cache.client.data)
+        assert len(remaining) == 1 and remaining[0].startswith("stats:")
+
+    @pytest.mark.asyncio
+    async def test_invalidate_pattern_scans_in_batches(self, cache):
+        _bind_loop(cache)
+        for i in range(7):
+            cache.client.data[f"stats:get:{i}"] = json.dumps(i)
+        cache.client.data["other:1"] = "1"
+
+        assert await cache.invalidate("stats:*", batch_size=3) == 7
+        assert list(cache.client.data) == ["other:1"]
+
+    @pytest.mark.asyncio
+    async def test_expired_keys_are_pruned_from_the_prefix_index(self, cache, monkeypatch):
+        _bind_loop(cache)
+        clock = [1000.0]
+        monkeypatch.setattr(time, "time", lambda: clock[0])
+
+        @cache.cache(ttl=60, prefix="t")
+        async def compute(x):
+            return x
+
+        for x in range(5):
+            await compute(x)
+        # Redis has expired the first five keys by the time the next ones are written
+        clock[0] += 61
+        for key in list(cache.client.data):
+            del cache.client.data[key]
+        await compute(99)
+
+        assert len(cache.client.zsets["t:__key_expiry__"]) == 1
+        assert await cache.invalidate_prefix("t") == 1
@@ -0,0 +1,184 @@
+"""
+Unit tests for the in-process L1 tier of CacheService (#1123).
+
+A fake redis.asyncio client records round trips so the tests can assert
+which reads stay in-process, and how invalidation keeps the tier coherent.
+"""
+import pytest
+import json
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.services.cache_service import CacheService, LocalCacheTier, CACHE_INVALIDATION_CHANNEL
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.ops = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+        return queue
+
+    async def execute(self):
+        self.client.round_trips += 1
+        return [await getattr(self.client, "_" + name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeAsyncRedis:
+    """Minimal async Redis stand-in covering the commands CacheService uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.published = []
+        self.round_trips = 0
+
+    async def _get(self, key):
+        return self.data.get(key)
+
+    async def _pttl(self, key):
+        return -1 if key in self.data else -2
+
+    async def _setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def _set(self, key, value):
+        self.data[key] = str(value)
+
+    async def _delete(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    async def _publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+    async def get(self, key):
+        self.round_trips += 1
+        return await self._get(key)
+
+    async def publish(self, channel, message):
+        self.round_trips += 1
+        await self._publish(channel, message)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+@pytest.fixture
+def service():
+    svc = CacheService()
+    svc.redis = _FakeAsyncRedis()
+    return svc
+
+
+class TestLocalCacheTier:
+
+    def test_entries_expire(self):
+        now = [0.0]
+        tier = LocalCacheTier(max_entries=10, ttl_seconds=5, timer=lambda: now[0])
+        tier.store("a:1", "x")
+        assert tier.lookup("a:1") == (True, "x")
+        now[0] = 6.0
+        assert tier.lookup("a:1") == (False, None)
+
+    def test_redis_ttl_caps_local_lifetime(self):
+        now = [0.0]
+        tier = LocalCacheTier(max_entries=10, ttl_seconds=30, timer=lambda: now[0])
+        tier.store("a:1", "x", ttl_seconds=2)
+        now[0] = 3.0
+        assert tier.lookup("a:1") == (False, None)
+
+    def test_size_bound_evicts_lru_and_counts_per_prefix(self):
+        tier = LocalCacheTier(max_entries=2, ttl_seconds=30)
+        tier.store("a:1", "1")
+        tier.store("b:1", "2")
+        tier.lookup("a:1")
+        tier.store("c:1", "3")
+
+        assert len(tier) == 2
+        assert tier.lookup("b:1") == (False, None)
+        stats = tier.stats()["prefixes"]
+        assert stats["b"]["evictions"] == 1
+        assert stats["a"]["hits"] == 1
+
+    def test_stale_generation_is_not_stored(self):
+        tier = LocalCacheTier(max_entries=10, ttl_seconds=30)
+        generation = tier.generation
+        tier.discard("a:1")
+        tier.store("a:1", "old", generation=generation)
+        assert tier.lookup("a:1") == (False, None)
+
+    def test_zero_size_disables_tier(self):
+        tier = LocalCacheTier(max_entries=0, ttl_seconds=30)
+        tier.store("a:1", "x")
+        assert tier.lookup("a:1") == (False, None)
+
+
+class TestCacheServiceTwoTier:
+
+    @pytest.mark.asyncio
+    async def test_hot_key_is_served_locally(self, service):
+        service.redis.data["soulsense:maintenance_state"] = json.dumps({"mode": "READ_ONLY"})
+
+        for _ in range(5):
+            assert await service.get("soulsense:maintenance_state") == {"mode": "READ_ONLY"}
+        assert service.redis.round_trips == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_key_is_cached(self, service):
+        assert await service.get("soulsense:maintenance_state") is None
+        assert await service.get("soulsense:maintenance_state") is None
+        assert service.redis.round_trips == 1
+
+    @pytest.mark.asyncio
+    async def test_hits_return_independent_objects(self, service):
+        await service.set("user_data:1", {"tags": []})
+        first = await service.get("user_data:1")
+        first["tags"].append("mutated")
+        assert await service.get("user_data:1") == {"tags": []}
+
+    @pytest.mark.asyncio
+    async def test_set_writes_through_and_notifies_peers(self, service):
+        await service.set("rbac:user:alice", {"is_admin": True}, ttl_seconds=60)
+        trips = service.redis.round_trips
+
+        assert await service.get("rbac:user:alice") == {"is_admin": True}
+        assert service.redis.round_trips == trips
+        channel, message = service.redis.published[-1]
+        assert channel == CACHE_INVALIDATION_CHANNEL
+        assert message["target"] == "rbac:user:alice"
+        assert message["origin"] == service._instance_id
+
+    @pytest.mark.asyncio
+    async def test_peer_invalidation_drops_local_copy(self, service):
+        service.redis.data["user_data:7"] = json.dumps({"v": 1})
+        await service.get("user_data:7")
+
+        service.redis.data["user_data:7"] = json.dumps({"v": 2})
+        service._apply_local_invalidation("invalidate_key", "user_data:7")
+        assert await service.get("user_data:7") == {"v": 2}
+
+    @pytest.mark.asyncio
+    async def test_prefix_invalidation(self, service):
+        for i in range(3):
+            service.redis.data[f"rbac:user:{i}"] = json.dumps(i)
+            await service.get(f"rbac:user:{i}")
+        service._apply_local_invalidation("invalidate_prefix", "rbac:")
+        assert len(service.l1) == 0
+        assert service.get_local_stats()["prefixes"]["rbac"]["invalidations"] == 3
+
+    @pytest.mark.asyncio
+    async def test_version_lookups_stay_local(self, service):
+        await service.update_version("user", 3, 4)
+        trips = service.redis.round_trips
+        assert await service.get_latest_version("user", 3) == 4
+        assert service.redis.round_trips == trips
@@ -0,0 +1,157 @@
+"""
+Unit tests for the incremental CQRS score projections (api/services/cqrs_service.py).
+
+Projections built event by event from the score histograms must match both a
+brute-force computation over all scores and a full rebuild.
+"""
+import random
+import statistics
+import pytest
+import pytest_asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import select
+
+from api.models import (
+    CQRSAgeGroupStats, CQRSDistributionStats, CQRSGlobalStats, CQRSScoreHistogram,
+    CQRSScoreUser, CQRSTrendAnalytics, Score, User,
+)
+from api.services.cqrs_service import CQRSService, _percentile
+
+TABLES = [User, Score, CQRSGlobalStats, CQRSAgeGroupStats, CQRSDistributionStats,
+          CQRSTrendAnalytics, CQRSScoreHistogram, CQRSScoreUser]
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory):
+    async with (await make_session_factory(*TABLES))() as session:
+        yield session
+
+
+def random_scores(n, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "id": i + 1,
+        "username": f"user{rng.randint(1, n // 3 + 1)}",
+        "total_score": rng.randint(0, 40),
+        "sentiment_score": round(rng.random(), 3),
+        "detailed_age_group": rng.choice([None, "18-24", "25-34", "35-44"]),
+        "is_rushed": rng.random() < 0.1,
+        "is_inconsistent": rng.random() < 0.05,
+        "timestamp": f"2026-{rng.randint(1, 6):02d}-{rng.randint(1, 28):02d}T10:00:00",
+    } for i in range(n)]
+
+
+def sorted_list_percentile(values, p):
+    values = sorted(values)
+    idx = (len(values) - 1) * p / 100
+    f = int(idx)
+    c = min(f + 1, len(values) - 1)
+    return float(values[f] + (idx - f) * (values[c] - values[f]))
+
+
+async def read_models(db):
+    gs = (await db.execute(select(
+        CQRSGlobalStats.total_assessments, CQRSGlobalStats.unique_users, CQRSGlobalStats.global_average_score,
+        CQRSGlobalStats.global_average_sentiment, CQRSGlobalStats.rushed_assessments,
+        CQRSGlobalStats.inconsistent_assessments, CQRSGlobalStats.p25_score, CQRSGlobalStats.p50_score,
+        CQRSGlobalStats.p75_score, CQRSGlobalStats.p90_score,
+    ))).all()
+    ages = (await db.execute(select(
+        CQRSAgeGroupStats.age_group, CQRSAgeGroupStats.total_assessments, CQRSAgeGroupStats.average_score,
+        CQRSAgeGroupStats.min_score, CQRSAgeGroupStats.max_score, CQRSAgeGroupStats.average_sentiment,
+    ).order_by(CQRSAgeGroupStats.age_group))).all()
+    dist = (await db.execute(select(CQRSDistributionStats.score_range, CQRSDistributionStats.count)
+                             .order_by(CQRSDistributionStats.score_range))).all()
+    trends = (await db.execute(select(
+        CQRSTrendAnalytics.period, CQRSTrendAnalytics.average_score, CQRSTrendAnalytics.assessment_count,
+    ).order_by(CQRSTrendAnalytics.period))).all()
+    return [tuple(r) for r in gs], [tuple(r) for r in ages], [tuple(r) for r in dist], [tuple(r) for r in trends]
+
+
+def assert_same(a, b):
+    assert len(a) == len(b)
+    for rows_a, rows_b in zip(a, b):
+        assert len(rows_a) == len(rows_b)
+        for row_a, row_b in zip(rows_a, rows_b):
+            assert row_a == pytest.approx(row_b)
+
+
+class TestPercentileSketch:
+
+    def test_histogram_percentile_matches_sorted_list(self):
+        rng = random.Random(1)
+        for n in (1, 2, 5, 101):
+            values = [rng.randint(0, 40) for _ in range(n)]
+            bins = sorted((v, values.count(v)) for v in set(values))
+            for p in (25, 50, 75, 90):
+                assert _percentile(bins, n, p) == pytest.approx(sorted_list_percentile(values, p))
+
+
+class TestIncrementalProjections:
+
+    @pytest.mark.asyncio
+    async def test_incremental_batches_match_brute_force_and_rebuild(self, db):
+        scores = random_scores(300)
+        for start in range(0, len(scores), 37):
+            await CQRSService.process_events(db, [
+                {"type": "CREATED", "entity": "Score", "payload": s} for s in scores[start:start + 37]
+            ])
+
+        gs, ages, dist, trends = await read_models(db)
+        totals = [s["total_score"] for s in scores]
+        assert gs == [pytest.approx((
+            300, len({s["username"] for s in scores}), statistics.mean(totals), statistics.mean(s["sentiment_score"] for s in scores),
+            sum(s["is_rushed"] for s in scores), sum(s["is_inconsistent"] for s in scores),
+            *[sorted_list_percentile(totals, p) for p in (25, 50, 75, 90)],
+        ))]
+        group = [s["total_score"] for s in scores if s["detailed_age_group"] == "25-34"]
+        assert ages[1][:5] == pytest.approx(("25-34", len(group), statistics.mean(group), min(group), max(group)))
+        assert sum(count for _, count in dist) == 300
+        assert [t[0] for t in trends] == [f"2026-{m:02d}" for m in range(1, 7)]
+
+        db.add_all([Score(**s) for s in scores])
+        await db.commit()
+        await CQRSService.rebuild_score_projections(db)
+        assert_same(await read_models(db), (gs, ages, dist, trends))
+
+    @pytest.mark.asyncio
+    async def test_retracting_scores_restores_previous_projections(self, db):
+        scores = random_scores(60, seed=2)
+        await CQRSService.apply_scores(db, scores[:40])
+        await db.commit()
+        before = await read_models(db)
+
+        await CQRSService.apply_scores(db, scores[40:])
+        await CQRSService.apply_scores(db, scores[40:], sign=-1)
+        await db.commit()
+
+        assert_same(await read_models(db), before)
+        users = (await db.execute(select(CQRSScoreUser.username))).scalars().all()
+        assert set(users) == {s["username"] for s in scores[:40]}
+
+    @pytest.mark.asyncio
+    async def test_partial_payloads_are_resolved_and_other_events_ignored(self, db):
+        db.add_all([
+            Score(id=1, username="a", total_score=10, sentiment_score=0.5, detailed_age_group="18-24",
+                  timestamp="2026-03-01T00:00:00"),
+            Score(id=2, username="b", total_score=30, sentiment_score=0.7, timestamp="2026-03-02T00:00:00"),
+        ])
+        await db.commit()
+
+        applied = await CQRSService.process_events(db, [
+            {"type": "CREATED", "entity": "Score", "payload": {"id": 1}},
+            {"type": "CREATED", "entity": "Score", "payload": {"id": 2}},
+            {"type": "DELETED", "entity": "Score", "payload": {"id": 1}},
+            {"type": "CREATED", "entity": "User", "payload": {"id": 9}},
+        ])
+
+        assert applied == 2
+        gs, ages, dist, trends = await read_models(db)
+        assert gs[0][:4] == pytest.approx((2, 2, 20.0, 0.6))
+        assert ages == [("18-24", 1, 10.0, 10.0, 10.0, 0.5)]
+        assert dict(dist) == {"0-10": 1, "11-20": 0, "21-30": 1, "31-40": 0}
+        assert trends == [("2026-03", 20.0, 2)]
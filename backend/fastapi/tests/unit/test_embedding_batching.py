@@ -0,0 +1,250 @@
+"""
+Unit tests for batched embedding generation (EmbeddingService.generate_embeddings)
+and the chunked, resumable journal reindex (SemanticSearchService.reindex_journal_entries).
+
+The model, inference proxy and checkpoint store are replaced by in-process fakes;
+the reindex runs against an in-memory SQLite database.
+"""
+import pytest
+import pytest_asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import numpy as np
+from sqlalchemy import select, text
+
+from api.models import JournalEntry, OutboxEvent, User, UserEncryptionKey
+from api.services.embedding_cache import EmbeddingCache
+from api.services.embedding_service import EmbeddingService
+from api.services.encryption_service import EncryptionService
+from api.services.semantic_search_service import SemanticSearchService
+
+
+class _FakeEmbedder:
+    """Stands in for the embedding service: records batches, embeds text length."""
+
+    model_name = "local-model"
+    active_model_name = "fake-model"
+
+    def __init__(self, fail_after=None):
+        self.batches = []
+        self.fail_after = fail_after
+
+    async def generate_embeddings(self, texts):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise RuntimeError("inference unavailable")
+        self.batches.append(list(texts))
+        return [[float(len(t)), 1.0] if t else [] for t in texts]
+
+
+class _FakeCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl_seconds=3600):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory):
+    async with (await make_session_factory(User, UserEncryptionKey, JournalEntry, OutboxEvent))() as session:
+        session.add_all([User(id=1, username="alice", password_hash="x"),
+                         User(id=2, username="bob", password_hash="x")])
+        await session.commit()
+        yield session
+
+
+async def add_entries(db, specs):
+    # Raw insert: the ORM column type would try to encrypt content
+    await db.execute(
+        text("INSERT INTO journal_entries (id, user_id, title, content, is_deleted, timestamp, privacy_level) "
+             "VALUES (:id, :user_id, :title, :content, :deleted, '2024-01-01', 'private')"),
+        [{"id": entry_id, "user_id": user_id, "title": title, "content": f"entry {entry_id}", "deleted": deleted}
+         for entry_id, user_id, title, deleted in specs],
+    )
+    await db.commit()
+
+
+async def embeddings(db):
+    rows = await db.execute(
+        select(JournalEntry.id, JournalEntry.embedding, JournalEntry.embedding_model).order_by(JournalEntry.id)
+    )
+    return {r.id: (r.embedding, r.embedding_model) for r in rows}
+
+
+async def reindex(db, embedder, cache, **kwargs):
+    with patch("api.services.semantic_search_service.embedding_service", embedder), \
+            patch("api.services.semantic_search_service.cache_service", cache):
+        return await SemanticSearchService.reindex_journal_entries(db, **kwargs)
+
+
+def uncached_service(dimension=1):
+    service = EmbeddingService()
+    service.cache = EmbeddingCache(max_entries=0, redis_enabled=False)
+    service.dimension = dimension
+    return service
+
+
+class TestGenerateEmbeddings:
+
+    @pytest.mark.asyncio
+    async def test_micro_batches_preserve_order_and_skip_empty_texts(self):
+        service = uncached_service()
+        calls = []
+
+        async def fake_proxy(texts):
+            calls.append(texts)
+            return [[float(len(t))] for t in texts]
+
+        service._generate_local_embeddings_via_proxy = fake_proxy
+        result = await service.generate_embeddings(["a", "", "bbb", "cc", None, "dddd"], batch_size=2)
+
+        assert calls == [["a", "bbb"], ["cc", "dddd"]]
+        assert result == [[1.0], [], [3.0], [2.0], [], [4.0]]
+        assert await service.generate_embeddings([]) == []
+
+    @pytest.mark.asyncio
+    async def test_proxy_failure_falls_back_to_batched_local_encode(self):
+        class _Model:
+            def __init__(self):
+                self.calls = []
+
+            def encode(self, texts, batch_size=32):
+                self.calls.append((list(texts), batch_size))
+                return np.array([[1.0, 2.0]] * len(texts))
+
+        service = uncached_service(dimension=2)
+        service._model = _Model()
+        proxy = SimpleNamespace(run_inference=lambda *a, **k: (_ for _ in ()).throw(ConnectionError("down")))
+        with patch("api.ml.inference_server.inference_proxy", proxy):
+            result = await service.generate_embeddings(["x", "y", "z"], batch_size=8)
+
+        assert result == [[1.0, 2.0]] * 3
+        assert service._model.calls == [(["x", "y", "z"], 3)]
+
+    @pytest.mark.asyncio
+    async def test_openai_client_is_reused_and_results_follow_input_order(self):
+        created = []
+        requested = []
+
+        class _Embeddings:
+            async def create(self, input, model, **kwargs):
+                requested.append(kwargs)
+                data = [SimpleNamespace(index=i, embedding=[float(len(t))]) for i, t in enumerate(input)]
+                return SimpleNamespace(data=list(reversed(data)))
+
+        def _client(api_key=None):
+            created.append(api_key)
+            return SimpleNamespace(embeddings=_Embeddings())
+
+        service = uncached_service()
+        service.use_openai = True
+        with patch.dict(sys.modules, {"openai": SimpleNamespace(AsyncOpenAI=_client)}):
+            assert await service.generate_embeddings(["aa", "b", "ccc"], batch_size=2) == [[2.0], [1.0], [3.0]]
+            assert await service.generate_embedding("dddd") == [4.0]
+
+        assert len(created) == 1
+        assert requested == [{"dimensions": 1}] * 3
+
+    @pytest.mark.asyncio
+    async def test_vectors_must_match_the_column_dimension(self):
+        service = uncached_service(dimension=384)
+
+        async def fake_proxy(texts):
+            return [[0.0] * 768 for _ in texts]
+
+        service._generate_local_embeddings_via_proxy = fake_proxy
+        with pytest.raises(ValueError, match="768-d"):
+            await service.generate_embeddings(["a"])
+
+    def test_openai_model_that_cannot_shorten_is_rejected_at_startup(self):
+        service = uncached_service(dimension=384)
+        service.use_openai = True
+        service.validate_dimension()  # text-embedding-3-small is asked for 384-d vectors
+
+        service.openai_model = "text-embedding-ada-002"
+        with pytest.raises(ValueError, match="EMBEDDING_DIMENSION=1536"):
+            service.validate_dimension()
+        service.dimension = 1536
+        service.validate_dimension()
+
+
+class TestChunkedReindex:
+
+    @pytest.mark.asyncio
+    async def test_embeds_missing_entries_in_chunks(self, db):
+        await add_entries(db, [(1, 1, None, False), (2, 1, "t", False), (3, 1, None, True),
+                               (4, 2, None, False), (5, 1, None, False)])
+        embedder, cache = _FakeEmbedder(), _FakeCache()
+
+        stats = await reindex(db, embedder, cache, chunk_size=2)
+
+        assert [len(b) for b in embedder.batches] == [2, 2]
+        assert embedder.batches[0][1] == "t: entry 2"
+        assert (stats["processed"], stats["embedded"], stats["chunks"], stats["last_id"]) == (4, 4, 2, 5)
+        stored = await embeddings(db)
+        assert stored[3] == (None, None)
+        assert stored[4] == ([7.0, 1.0], "fake-model")
+        # Finished runs leave no checkpoint behind
+        assert cache.data == {}
+
+        # Nothing left to do on a second pass
+        assert (await reindex(db, embedder, cache))["processed"] == 0
+
+    @pytest.mark.asyncio
+    async def test_user_scope(self, db):
+        await add_entries(db, [(1, 1, None, False), (2, 2, None, False)])
+
+        stats = await reindex(db, _FakeEmbedder(), _FakeCache(), user_id=2)
+
+        assert stats["embedded"] == 1
+        assert (await embeddings(db))[1] == (None, None)
+
+    @pytest.mark.asyncio
+    async def test_interrupted_forced_run_resumes_from_checkpoint(self, db):
+        await add_entries(db, [(i, 1, None, False) for i in range(1, 6)])
+        cache = _FakeCache()
+        await reindex(db, _FakeEmbedder(), cache)
+
+        with pytest.raises(RuntimeError):
+            await reindex(db, _FakeEmbedder(fail_after=1), cache, force=True, chunk_size=2)
+        assert list(cache.data.values()) == [{"last_id": 2}]
+
+        resumed = _FakeEmbedder()
+        stats = await reindex(db, resumed, cache, force=True, chunk_size=2)
+
+        assert stats["resumed_from_id"] == 2
+        assert resumed.batches == [["entry 3", "entry 4"], ["entry 5"]]
+        assert cache.data == {}
+
+    @pytest.mark.asyncio
+    async def test_encrypted_entries_are_decrypted_with_the_owners_dek(self, db):
+        dek = bytes(range(32))
+        db.add(UserEncryptionKey(user_id=1, wrapped_dek=EncryptionService.wrap_dek(dek)))
+        await db.execute(
+            text("INSERT INTO journal_entries (id, user_id, content, is_deleted, timestamp, privacy_level) "
+                 "VALUES (:id, :user_id, :content, 0, '2024-01-01', 'private')"),
+            [{"id": 1, "user_id": 1, "content": EncryptionService.encrypt_data("a quiet walk", dek)},
+             # bob has no DEK, so his entry can't be read outside a request
+             {"id": 2, "user_id": 2, "content": EncryptionService.encrypt_data("hidden", bytes(32))}],
+        )
+        await db.commit()
+        embedder = _FakeEmbedder()
+
+        stats = await reindex(db, embedder, _FakeCache())
+
+        assert embedder.batches == [["a quiet walk", ""]]
+        assert (stats["embedded"], stats["skipped"]) == (1, 1)
+        stored = await embeddings(db)
+        assert stored[1] == ([12.0, 1.0], "fake-model")
+        assert stored[2] == (None, None)
@@ -0,0 +1,156 @@
+"""
+Unit tests for the content-hash embedding cache (api/services/embedding_cache.py)
+and its use in EmbeddingService.generate_embeddings.
+
+Redis is replaced by a small in-memory fake supporting mget and pipelined setex.
+"""
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.services.embedding_cache import EmbeddingCache, cache_key
+from api.services.embedding_service import EmbeddingService
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def setex(self, key, ttl, value):
+        self.ops.append((key, ttl, value))
+
+    async def execute(self):
+        for key, ttl, value in self.ops:
+            self.redis.data[key] = value
+            self.redis.ttls[key] = ttl
+
+
+class _FakeRedis:
+    def __init__(self, fail=False):
+        self.data, self.ttls = {}, {}
+        self.fail = fail
+
+    async def mget(self, keys):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction=False):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return _FakePipeline(self)
+
+
+def make_cache(redis=None, max_entries=100):
+    cache = EmbeddingCache(max_entries=max_entries, ttl_seconds=3600, redis_enabled=redis is not None)
+
+    async def _redis():
+        return redis
+    cache._redis = _redis
+    return cache
+
+
+def make_service(cache):
+    service = EmbeddingService()
+    service.cache = cache
+    service.dimension = 2
+    service.calls = []
+
+    async def fake_proxy(texts):
+        service.calls.append(list(texts))
+        return [[float(len(t)), 0.5] for t in texts]
+
+    service._generate_local_embeddings_via_proxy = fake_proxy
+    return service
+
+
+class TestCacheKey:
+
+    def test_whitespace_and_unicode_form_are_normalized(self):
+        assert cache_key("m", "  feeling   anxious\n") == cache_key("m", "feeling anxious")
+        assert cache_key("m", "caf\u00e9") == cache_key("m", "cafe\u0301")
+
+    def test_model_and_case_are_part_of_the_key(self):
+        assert cache_key("m1", "sleep") != cache_key("m2", "sleep")
+        assert cache_key("m", "Sleep") != cache_key("m", "sleep")
+
+
+class TestEmbeddingCache:
+
+    @pytest.mark.asyncio
+    async def test_repeated_texts_skip_the_model(self):
+        service = make_service(make_cache())
+
+        first = await service.generate_embeddings(["anxiety", "sleep", "anxiety"])
+        second = await service.generate_embeddings(["sleep", "", "anxiety  "])
+
+        # Duplicates within a call are embedded once; the second call is all hits
+        assert service.calls == [["anxiety", "sleep"]]
+        assert first == [[7.0, 0.5], [5.0, 0.5], [7.0, 0.5]]
+        assert second == [[5.0, 0.5], [], [7.0, 0.5]]
+        stats = service.cache.stats()
+        assert (stats["local_hits"], stats["misses"], stats["stores"]) == (2, 3, 2)
+        assert stats["hit_ratio"] == 0.4
+
+    @pytest.mark.asyncio
+    async def test_redis_tier_is_shared_between_workers(self):
+        redis = _FakeRedis()
+        await make_service(make_cache(redis)).generate_embeddings(["journal text"])
+        assert list(redis.ttls.values()) == [3600]
+
+        other_worker = make_service(make_cache(redis))
+        assert await other_worker.generate_embedding("journal text") == [12.0, 0.5]
+        assert other_worker.calls == []
+        # Promoted into the local tier: no Redis round-trip on the next lookup
+        redis.data.clear()
+        assert await other_worker.generate_embedding("journal text") == [12.0, 0.5]
+        assert other_worker.cache.stats()["redis_hits"] == 1
+        assert other_worker.cache.stats()["local_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_bound(self):
+        cache = make_cache(max_entries=2)
+        await cache.put_many("m", [("a", [1.0]), ("b", [2.0]), ("c", [3.0])])
+
+        assert await cache.get_many("m", ["a", "b", "c"]) == [None, [2.0], [3.0]]
+        assert cache.stats()["local_size"] == 2
+
+    @pytest.mark.asyncio
+    async def test_redis_failures_fall_back_to_the_model(self):
+        service = make_service(make_cache(_FakeRedis(fail=True)))
+
+        assert await service.generate_embedding("stress") == [6.0, 0.5]
+        assert service.calls == [["stress"]]
+        assert service.cache.stats()["redis_errors"] == 2
+
+    @pytest.mark.asyncio
+    async def test_switching_model_misses(self):
+        service = make_service(make_cache())
+        await service.generate_embedding("sleep")
+        service.model_name = "another-model"
+
+        await service.generate_embedding("sleep")
+        assert len(service.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_changing_the_dimension_misses(self):
+        service = make_service(make_cache())
+        await service.generate_embedding("sleep")
+        service.dimension = 3
+
+        async def fake_proxy(texts):
+            service.calls.append(list(texts))
+            return [[float(len(t)), 0.5, 0.0] for t in texts]
+        service._generate_local_embeddings_via_proxy = fake_proxy
+
+        assert await service.generate_embedding("sleep") == [5.0, 0.5, 0.0]
+        assert len(service.calls) == 2
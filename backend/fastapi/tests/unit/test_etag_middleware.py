@@ -7,6 +7,7 @@ Tests:
 - ETag skipped for streaming responses
 - ETag skipped for non-GET requests
 - ETag skipped for non-configured paths
+- Versioned mode: 304 before the handler, cached bodies and gzip variants
 """
 
 import pytest
@@ -312,5 +313,109 @@ class TestETagComputation:
         assert response1.headers["etag"] != response2.headers["etag"]
 
 
+class _FakeVersions:
+    """Stands in for ResourceVersions: fixed versions, bumped by tests."""
+
+    def __init__(self):
+        self.current = {"questions": "v1", "question_categories": "c1"}
+        self.fail = False
+
+    async def get(self, name):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        return self.current[name]
+
+
+class TestVersionedETagMiddleware:
+    """Test suite for resource-versioned ETags."""
+
+    @pytest.fixture
+    def versioned(self):
+        versions = _FakeVersions()
+        calls = {"questions": 0, "categories": 0}
+        app = FastAPI()
+
+        @app.get("/api/v1/questions")
+        async def get_questions():
+            calls["questions"] += 1
+            return {"questions": [{"id": i, "text": "How often do you notice your feelings?"} for i in range(40)]}
+
+        @app.get("/api/v1/questions/categories")
+        async def get_categories():
+            calls["categories"] += 1
+            return [{"id": 1, "name": "Self-awareness"}]
+
+        @app.get("/api/v1/questions/{question_id}")
+        async def get_question(question_id: int):
+            if question_id == 404:
+                return JSONResponse({"detail": "missing"}, status_code=404)
+            return {"id": question_id}
+
+        app.add_middleware(ETagMiddleware, versions=versions)
+        return TestClient(app), versions, calls
+
+    def test_matching_etag_answers_304_without_running_handler(self, versioned):
+        client, versions, calls = versioned
+        etag = client.get("/api/v1/questions").headers["etag"]
+        assert etag == '"questions-v1-en"'
+
+        response = client.get("/api/v1/questions", headers={"If-None-Match": f'W/{etag}, "other"'})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert calls["questions"] == 1
+
+    def test_body_is_cached_per_version_language_and_url(self, versioned):
+        client, versions, calls = versioned
+        first = client.get("/api/v1/questions")
+        assert client.get("/api/v1/questions").json() == first.json()
+        assert calls["questions"] == 1
+
+        client.get("/api/v1/questions?limit=5")
+        spanish = client.get("/api/v1/questions", headers={"Accept-Language": "es-MX,es;q=0.9"})
+        assert spanish.headers["etag"] == '"questions-v1-es"'
+        assert calls["questions"] == 3
+
+        versions.current["questions"] = "v2"
+        response = client.get("/api/v1/questions", headers={"If-None-Match": first.headers["etag"]})
+        assert response.status_code == 200
+        assert response.headers["etag"] == '"questions-v2-en"'
+        assert calls["questions"] == 4
+
+    def test_categories_are_versioned_separately(self, versioned):
+        client, versions, calls = versioned
+        assert client.get("/api/v1/questions/categories").headers["etag"] == '"question_categories-c1-en"'
+        versions.current["questions"] = "v2"
+        assert client.get("/api/v1/questions/categories").headers["etag"] == '"question_categories-c1-en"'
+        assert client.get("/api/v1/questions/7").headers["etag"] == '"questions-v2-en"'
+
+    def test_gzip_variant_served_to_clients_that_accept_it(self, versioned):
+        client, versions, calls = versioned
+        plain = client.get("/api/v1/questions", headers={"Accept-Encoding": "identity"})
+        compressed = client.get("/api/v1/questions", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in plain.headers
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.json() == plain.json()
+        assert int(compressed.headers["content-length"]) < int(plain.headers["content-length"])
+        assert "Accept-Language" in compressed.headers["vary"]
+        assert calls["questions"] == 1
+
+    def test_errors_are_not_cached(self, versioned):
+        client, versions, calls = versioned
+        response = client.get("/api/v1/questions/404")
+        assert response.status_code == 404
+        assert "etag" not in response.headers
+
+    def test_falls_back_to_body_hash_when_version_unavailable(self, versioned):
+        client, versions, calls = versioned
+        versions.fail = True
+        response = client.get("/api/v1/questions")
+
+        assert response.status_code == 200
+        assert len(response.headers["etag"]) == 34  # quoted MD5
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
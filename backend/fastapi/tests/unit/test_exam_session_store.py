@@ -0,0 +1,201 @@
+"""
+Unit tests for the write-behind exam session store (api/services/exam_session_store.py).
+
+Redis is disabled so the in-process store is exercised; ExamService and the
+sweeper flush into an in-memory SQLite database.
+"""
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta, timezone
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import func, select
+
+from api.exceptions import APIException
+from api.models import ExamSession, OutboxEvent, Response, Score, User, UserScoreSummary
+from api.schemas import ExamResponseCreate, ExamResultCreate
+from api.services import exam_session_store
+from api.services.exam_service import ExamService
+from api.services.exam_session_store import ExamSessionStore
+from api.services.gamification_service import GamificationService
+from api.services.score_summary import ScoreSummaryService
+
+UTC = timezone.utc
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = ExamSessionStore(key_prefix="test-exam")
+    store._redis_retry_at = float("inf")  # never try Redis
+    monkeypatch.setattr("api.services.exam_service.exam_sessions", store)
+
+    async def _no_xp(db, user_id, amount, reason):
+        return None
+
+    monkeypatch.setattr(GamificationService, "award_xp", _no_xp)
+    return store
+
+
+@pytest_asyncio.fixture
+async def session_factory(make_session_factory):
+    factory = await make_session_factory(User, OutboxEvent, ExamSession, Response, Score, UserScoreSummary)
+    async with factory() as session:
+        session.add_all([User(id=1, username="alice", password_hash="x"), User(id=2, username="bob", password_hash="x")])
+        await session.commit()
+    return factory
+
+
+@pytest_asyncio.fixture
+async def db(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+async def answer(db, user, session_id, question_id, value=3):
+    return await ExamService.save_response(
+        db, user, session_id, ExamResponseCreate(question_id=question_id, value=value, session_id=session_id))
+
+
+async def stored_responses(db, session_id):
+    return (await db.execute(
+        select(Response.question_id, Response.response_value)
+        .where(Response.session_id == session_id).order_by(Response.question_id)
+    )).all()
+
+
+def result(total=30):
+    return ExamResultCreate(total_score=total, sentiment_score=0.0, age=30, age_group="adult", detailed_age_group="26-35")
+
+
+class TestBufferedExam:
+
+    @pytest.mark.asyncio
+    async def test_answers_are_buffered_and_flushed_with_the_score(self, db, store):
+        alice = await db.get(User, 1)
+        session_id = await ExamService.start_exam(db, alice)
+
+        for question_id in (1, 2, 3):
+            assert await answer(db, alice, session_id, question_id, value=question_id + 1)
+        assert await answer(db, alice, session_id, 2, value=5)  # replay is ignored
+        assert await stored_responses(db, session_id) == []
+        assert store.stats()["duplicates"] == 1
+
+        score = await ExamService.save_score(db, alice, session_id, result())
+
+        assert score.total_score == 30
+        assert await stored_responses(db, session_id) == [(1, 2), (2, 3), (3, 4)]
+        assert (await db.get(ExamSession, 1, populate_existing=True)).status == "COMPLETED"
+        assert store.stats()["local_sessions"] == 0
+
+    @pytest.mark.asyncio
+    async def test_session_validation(self, db, store):
+        alice, bob = await db.get(User, 1), await db.get(User, 2)
+        session_id = await ExamService.start_exam(db, alice)
+
+        with pytest.raises(APIException) as exc:
+            await answer(db, bob, session_id, 1)
+        assert exc.value.status_code == 403
+
+        await ExamService.mark_as_submitted(db, alice.id, session_id)
+        with pytest.raises(APIException) as exc:
+            await answer(db, alice, session_id, 1)
+        assert "SUBMITTED" in str(exc.value.detail)
+
+        await store.open("expired", alice.id, alice.username, datetime.now(UTC) - timedelta(minutes=1))
+        with pytest.raises(APIException) as exc:
+            await answer(db, alice, "expired", 1)
+        assert exc.value.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_untracked_session_is_loaded_from_the_database(self, db, store):
+        alice = await db.get(User, 1)
+        db.add(ExamSession(session_id="legacy", user_id=1, status="IN_PROGRESS",
+                           expires_at=datetime.now(UTC) + timedelta(minutes=30)))
+        db.add(Response(user_id=1, username="alice", question_id=1, response_value=4, session_id="legacy"))
+        await db.commit()
+
+        await answer(db, alice, "legacy", 1, value=2)  # already stored by the old path
+        await answer(db, alice, "legacy", 2, value=2)
+        await ExamService.save_score(db, alice, "legacy", result())
+
+        assert await stored_responses(db, "legacy") == [(1, 4), (2, 2)]
+
+    @pytest.mark.asyncio
+    async def test_failed_score_keeps_the_answers(self, db, store, monkeypatch):
+        alice = await db.get(User, 1)
+        session_id = await ExamService.start_exam(db, alice)
+        await answer(db, alice, session_id, 1)
+
+        record_score = ScoreSummaryService.record_score
+        failures = [RuntimeError("boom")]
+
+        async def _fail_once(db, score):
+            if failures:
+                raise failures.pop()
+            return await record_score(db, score)
+
+        monkeypatch.setattr(ScoreSummaryService, "record_score", _fail_once)
+        with pytest.raises(RuntimeError):
+            await ExamService.save_score(db, alice, session_id, result())
+        assert await stored_responses(db, session_id) == []
+        alice = await db.get(User, 1)  # expired by the rollback
+        await answer(db, alice, session_id, 2)  # session is live again
+
+        await ExamService.save_score(db, alice, session_id, result())
+        assert [q for q, _ in await stored_responses(db, session_id)] == [1, 2]
+
+
+class TestSweeper:
+
+    @pytest.mark.asyncio
+    async def test_expired_sessions_are_flushed_and_abandoned(self, db, store, session_factory):
+        alice = await db.get(User, 1)
+        abandoned = await ExamService.start_exam(db, alice)
+        await answer(db, alice, abandoned, 1)
+        await answer(db, alice, abandoned, 2)
+
+        later = datetime.now(UTC) + timedelta(minutes=ExamService.EXAM_DURATION_MINUTES)
+        assert await store.sweep(session_factory, now=later) == 0  # still within the grace period
+
+        later += timedelta(seconds=exam_session_store.SWEEP_GRACE_SECONDS + 1)
+        assert await store.sweep(session_factory, now=later) == 1
+        assert [q for q, _ in await stored_responses(db, abandoned)] == [1, 2]
+        row = (await db.execute(select(ExamSession).where(ExamSession.session_id == abandoned)
+                                .execution_options(populate_existing=True))).scalar_one()
+        assert row.status == "ABANDONED"
+        assert await store.sweep(session_factory, now=later) == 0
+
+    @pytest.mark.asyncio
+    async def test_sweeper_leaves_completed_sessions_alone(self, db, store, session_factory):
+        alice = await db.get(User, 1)
+        session_id = await ExamService.start_exam(db, alice)
+        await answer(db, alice, session_id, 1)
+        # A worker froze the session and committed the score, then died before discarding it
+        state = await store.freeze(session_id)
+        await store.flush_answers(db, state)
+        row = (await db.execute(select(ExamSession).where(ExamSession.session_id == session_id))).scalar_one()
+        row.status = "COMPLETED"
+        await db.commit()
+
+        later = datetime.now(UTC) + timedelta(days=1)
+        assert await store.sweep(session_factory, now=later) == 1
+        assert (await db.execute(select(func.count(Response.id)))).scalar() == 1
+        await db.refresh(row)
+        assert row.status == "COMPLETED"
+
+    @pytest.mark.asyncio
+    async def test_shutdown_flushes_local_answers(self, db, store, session_factory):
+        alice = await db.get(User, 1)
+        session_id = await ExamService.start_exam(db, alice)
+        await answer(db, alice, session_id, 1)
+        await answer(db, alice, session_id, 2)
+
+        assert await store.flush_local(session_factory) == 2
+        assert await store.flush_local(session_factory) == 0
+        # The exam carries on and completes without duplicating rows
+        await answer(db, alice, session_id, 3)
+        await ExamService.save_score(db, alice, session_id, result())
+        assert [q for q, _ in await stored_responses(db, session_id)] == [1, 2, 3]
@@ -0,0 +1,225 @@
+"""
+Unit tests for the streaming exports in api/services/export_service_v2.py:
+each incremental writer against the materialized data, chunking, chunked
+encryption, generate_export writing through the stream and the
+GET /export/v2/stream route.
+"""
+import contextlib
+import csv
+import io
+import json
+import zipfile
+import xml.etree.ElementTree as ET
+import pytest
+import pytest_asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import httpx
+from cryptography.fernet import Fernet
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from api.models import (
+    AssessmentResult, ExportRecord, JournalEntry, MedicalProfile, OutboxEvent,
+    PersonalProfile, Response, SatisfactionRecord, Score, User, UserEmotionalPatterns,
+    UserSettings, UserStrengths,
+)
+from api.services.export_service_v2 import ExportServiceV2
+import api.utils.distributed_lock as distributed_lock
+
+ROWS = 40
+ROW_TYPES = ['journal', 'scores', 'assessments', 'satisfaction', 'responses']
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory):
+    session_factory = await make_session_factory(
+        User, OutboxEvent, JournalEntry, Score, Response, AssessmentResult, SatisfactionRecord,
+        PersonalProfile, MedicalProfile, UserStrengths, UserEmotionalPatterns, UserSettings, ExportRecord,
+    )
+    async with session_factory() as session:
+        session.add_all([User(id=1, username="alice", password_hash="x"), User(id=2, username="bob", password_hash="x")])
+        session.add(UserSettings(user_id=1, theme="dark", language="en"))
+        for i in range(ROWS):
+            ts = f"2024-01-{i % 28 + 1:02d}T{i % 24:02d}:00:00"
+            session.add(JournalEntry(user_id=1, username="alice", entry_date=ts, emotional_patterns="=SUM(A1)", stress_level=i % 10))
+            session.add(Score(user_id=1, username="alice", total_score=i, timestamp=ts))
+            session.add(Response(user_id=1, username="alice", question_id=i, response_value=i % 5 + 1, timestamp=ts))
+            session.add(AssessmentResult(user_id=1, assessment_type="strengths", overall_score=i / 2, details="{}", timestamp=ts))
+            session.add(SatisfactionRecord(user_id=1, satisfaction_category="work", satisfaction_score=3, timestamp=ts))
+        session.add(Score(user_id=2, username="bob", total_score=99, timestamp="2024-01-01T00:00:00"))
+        await session.commit()
+        yield session
+
+
+async def user(db, user_id=1):
+    return await db.get(User, user_id)
+
+
+async def collect(db, fmt, options=None):
+    return [chunk async for chunk in ExportServiceV2.stream_export(db, await user(db), fmt, options)]
+
+
+class TestStreamingWriters:
+
+    @pytest.mark.asyncio
+    async def test_json_stream_matches_materialized_data(self, db):
+        data = json.loads(b"".join(await collect(db, "json")))
+        expected = await ExportServiceV2._fetch_export_data(db, await user(db), {})
+
+        assert data.pop("_export_metadata")["format"] == "json"
+        assert data == json.loads(json.dumps(expected, default=str))
+        assert [len(data[name]) for name in ROW_TYPES] == [ROWS] * 5
+        assert data["profile"] == {} and data["settings"]["theme"] == "dark"
+
+    @pytest.mark.asyncio
+    async def test_chunks_are_bounded(self, db, monkeypatch):
+        monkeypatch.setattr(ExportServiceV2, "STREAM_CHUNK_BYTES", 1024)
+        monkeypatch.setattr(ExportServiceV2, "STREAM_BATCH_ROWS", 7)
+        chunks = await collect(db, "json")
+
+        assert len(chunks) > 5
+        # A chunk overshoots the target by at most one serialized row
+        assert all(len(chunk) < 2048 for chunk in chunks)
+        json.loads(b"".join(chunks))
+
+    @pytest.mark.asyncio
+    async def test_csv_stream_is_a_zip_of_sections(self, db, monkeypatch):
+        monkeypatch.setattr(ExportServiceV2, "STREAM_CHUNK_BYTES", 512)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(await collect(db, "csv"))))
+
+        names = set(archive.namelist())
+        assert names == {"metadata.json", "settings.csv", *(f"{name}.csv" for name in ROW_TYPES)}
+        rows = list(csv.DictReader(io.StringIO(archive.read("journal.csv").decode("utf-8-sig"))))
+        assert len(rows) == ROWS
+        assert list(rows[0]) == sorted(rows[0])
+        assert rows[0]["emotional_patterns"] == "'=SUM(A1)"  # formula injection guard
+
+    @pytest.mark.asyncio
+    async def test_xml_stream_is_well_formed(self, db):
+        root = ET.fromstring(b"".join(await collect(db, "xml")))
+
+        assert root.tag == "SoulSenseExport"
+        assert root.find("ExportMetadata/format").text == "xml"
+        assert len(root.findall("scores/Item")) == ROWS
+        assert root.find("settings/theme").text == "dark"
+
+    @pytest.mark.asyncio
+    async def test_html_shows_a_preview_of_each_section(self, db, monkeypatch):
+        monkeypatch.setattr(ExportServiceV2, "HTML_PREVIEW_ROWS", 5)
+        page = b"".join(await collect(db, "html", {"data_types": ["scores"]})).decode("utf-8")
+
+        assert page.count("<tr>") == 6  # header + preview rows
+        assert f"...and {ROWS - 5} more entries" in page
+        assert page.endswith("</body></html>")
+
+    @pytest.mark.asyncio
+    async def test_date_range_and_user_scoping(self, db):
+        options = {"data_types": ["scores"], "date_range": {"start": "2024-01-10T00:00:00", "end": "2024-01-12T23:59:59"}}
+        data = json.loads(b"".join(await collect(db, "json", options)))
+
+        assert data["scores"] and all("2024-01-10" <= s["timestamp"][:10] <= "2024-01-12" for s in data["scores"])
+        assert 99 not in [s["total_score"] for s in data["scores"]]
+
+    @pytest.mark.asyncio
+    async def test_pdf_cannot_be_streamed(self, db):
+        with pytest.raises(ValueError):
+            await collect(db, "pdf")
+
+
+class TestEncryptedExports:
+
+    @pytest.mark.asyncio
+    async def test_chunked_encryption_round_trips(self, db, monkeypatch, tmp_path):
+        monkeypatch.setattr(ExportServiceV2, "STREAM_CHUNK_BYTES", 1024)
+        key = Fernet.generate_key()
+        path = str(tmp_path / "export.encrypted")
+        chunks = ExportServiceV2.stream_export(db, await user(db), "json")
+        await ExportServiceV2._write_chunks(path, ExportServiceV2._encrypt_chunks(chunks, Fernet(key)))
+
+        with open(path, "rb") as f:
+            assert len(f.readlines()) > 1
+            f.seek(0)
+            plain = b"".join(ExportServiceV2.decrypt_export(f, key))
+        assert len(json.loads(plain)["responses"]) == ROWS
+
+    def test_single_token_files_still_decrypt(self):
+        key = Fernet.generate_key()
+        token = Fernet(key).encrypt(b'{"a": 1}')
+        assert b"".join(ExportServiceV2.decrypt_export([token], key)) == b'{"a": 1}'
+
+    @pytest.mark.asyncio
+    async def test_generate_export_streams_to_disk(self, db, monkeypatch, tmp_path):
+        monkeypatch.setattr(distributed_lock, "DistributedLock", lambda **kwargs: contextlib.nullcontext())
+        monkeypatch.setattr(ExportServiceV2, "EXPORT_DIR", tmp_path)
+
+        alice = await user(db)
+        path, export_id = await ExportServiceV2.generate_export(
+            db, alice, "json", {"encrypt": True, "password": "secret", "data_types": ["journal"]}
+        )
+
+        assert path.endswith(".json.encrypted") and not os.path.exists(path[:-len(".encrypted")])
+        with open(path[:-len(".encrypted")] + ".key", "rb") as f:
+            key = f.read()
+        with open(path, "rb") as f:
+            data = json.loads(b"".join(ExportServiceV2.decrypt_export(f, key)))
+        assert data["_export_metadata"]["export_id"] == export_id
+        assert len(data["journal"]) == ROWS
+        history = await ExportServiceV2.get_export_history(db, alice)
+        assert [h["export_id"] for h in history] == [export_id]
+
+
+@pytest_asyncio.fixture
+async def client(db, monkeypatch):
+    from api.routers import export as export_router
+
+    monkeypatch.setattr(export_router, "_export_rate_limits", {})
+    monkeypatch.setattr(export_router, "AsyncSessionLocal",
+                        async_sessionmaker(db.bind, class_=AsyncSession, expire_on_commit=False))
+    app = FastAPI()
+    app.include_router(export_router.router, prefix="/api/v1/export")
+    alice = await user(db)
+    app.dependency_overrides[export_router.get_current_user] = lambda: alice
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+class TestStreamRoute:
+
+    @pytest.mark.asyncio
+    async def test_json_is_streamed_to_the_client(self, client, db):
+        async with client.stream("GET", "/api/v1/export/v2/stream", params={"format": "json"}) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/json")
+            assert response.headers["content-disposition"].endswith('.json"')
+            assert "content-length" not in response.headers  # sent as it is produced
+            body = b"".join([chunk async for chunk in response.aiter_bytes()])
+
+        data = json.loads(body)
+        assert [len(data[name]) for name in ROW_TYPES] == [ROWS] * 5
+        # Recorded for the audit trail like the file-based exports
+        record = (await db.execute(select(ExportRecord))).scalar_one()
+        assert (record.export_id, record.format, record.status, record.file_path) == (
+            data["_export_metadata"]["export_id"], "json", "streamed", "")
+
+    @pytest.mark.asyncio
+    async def test_csv_is_streamed_as_a_zip(self, client):
+        response = await client.get("/api/v1/export/v2/stream",
+                                    params={"format": "CSV", "data_types": ["scores"], "start": "2024-01-10"})
+
+        assert response.status_code == 200
+        assert response.headers["content-disposition"].endswith('.zip"')
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        scores = list(csv.DictReader(io.StringIO(archive.read("scores.csv").decode("utf-8-sig"))))
+        assert scores and all(s["timestamp"][:10] >= "2024-01-10" for s in scores)
+
+    @pytest.mark.asyncio
+    async def test_unstreamable_requests_are_rejected(self, client):
+        assert (await client.get("/api/v1/export/v2/stream", params={"format": "pdf"})).status_code == 422
+        response = await client.get("/api/v1/export/v2/stream", params={"start": "not a date"})
+        assert response.status_code == 422
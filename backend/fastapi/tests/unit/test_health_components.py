@@ -0,0 +1,64 @@
+"""
+Unit tests for the component diagnostics in api/routers/health.py: the
+registry of per-worker stats served at /health/components[/{name}].
+"""
+import pytest
+import httpx
+from fastapi import FastAPI
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+@pytest.fixture
+def health():
+    from api.routers import health
+    return health
+
+
+@pytest.fixture
+def client(health):
+    app = FastAPI()
+    app.include_router(health.router, prefix="/api/v1/health")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+class TestComponentStats:
+
+    @pytest.mark.asyncio
+    async def test_one_component_by_name(self, client):
+        from api.services.leaderboard_service import leaderboards
+
+        async with client:
+            response = await client.get("/api/v1/health/components/leaderboards")
+
+        assert response.status_code == 200
+        assert response.json().keys() == leaderboards.stats().keys()
+
+    @pytest.mark.asyncio
+    async def test_unknown_component_is_404(self, client):
+        async with client:
+            response = await client.get("/api/v1/health/components/nope")
+
+        assert response.status_code == 404
+        assert "leaderboards" in response.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_every_registered_component_is_reported(self, client, health, monkeypatch):
+        def stats(name):
+            if name == "websockets":
+                raise RuntimeError("manager not started")
+            return {"name": name}
+        monkeypatch.setattr(health, "_component_stats", stats)
+
+        async with client:
+            components = (await client.get("/api/v1/health/components")).json()["components"]
+
+        assert set(components) == set(health.COMPONENT_STATS)
+        assert components["leaderboards"] == {"name": "leaderboards"}
+        assert components["websockets"] == {"error": "manager not started"}
+
+    def test_registry_resolves_every_stats_method(self, health):
+        for name in health.COMPONENT_STATS:
+            assert isinstance(health._component_stats(name), dict), name
@@ -0,0 +1,204 @@
+"""
+Unit tests for the dynamic-batching ML inference server and the asyncio
+InferenceProxy (api/ml/inference_server.py).
+
+Redis is replaced by small in-memory fakes: a synchronous one for the server's
+queue draining, and an asyncio one shared by the proxy and a fake server loop.
+"""
+import asyncio
+import json
+import pytest
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import numpy as np
+
+from api.ml.inference_server import (
+    REQUEST_QUEUE, InferenceProxy, ModelPersistenceSingleton, next_batch, process_batch,
+)
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32):
+        self.calls.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+
+@pytest.fixture
+def model(monkeypatch):
+    fake = _FakeModel()
+    monkeypatch.setitem(ModelPersistenceSingleton._models, "mini", fake)
+    return fake
+
+
+def request(request_id, task_type, payload, deadline=None):
+    return {"id": request_id, "type": task_type, "payload": payload, "reply_to": "replies", "deadline": deadline}
+
+
+class _SyncQueue:
+    def __init__(self, items):
+        self.items = [json.dumps(i) for i in items]
+        self.blpops = 0
+
+    def blpop(self, key, timeout=0):
+        self.blpops += 1
+        return (key, self.items.pop(0)) if self.items else None
+
+    def lpop(self, key, count=None):
+        taken, self.items = self.items[:count], self.items[count:]
+        return taken or None
+
+
+class TestProcessBatch:
+
+    def test_embedding_requests_share_one_encode_call(self, model):
+        replies = process_batch([
+            request("a", "generate_embedding", {"text": "abc", "model_name": "mini"}),
+            request("b", "ping", {}),
+            request("c", "generate_embeddings", {"texts": ["de", "f"], "model_name": "mini"}),
+        ])
+
+        assert model.calls == [["abc", "de", "f"]]
+        by_id = {m["id"]: r for m, r in replies}
+        assert by_id["a"] == {"result": [3.0, 1.0]}
+        assert by_id["b"] == {"result": "pong"}
+        assert by_id["c"] == {"result": [[2.0, 1.0], [1.0, 1.0]]}
+
+    def test_expired_requests_are_dropped_and_errors_are_per_group(self, model, monkeypatch):
+        def broken(*args, **kwargs):
+            raise RuntimeError("model missing")
+        monkeypatch.setattr(ModelPersistenceSingleton, "get_model", broken)
+
+        replies = process_batch([
+            request("old", "ping", {}, deadline=99.0),
+            request("e", "generate_embeddings", {"texts": ["x"], "model_name": "other"}),
+            request("z", "burnout_detection", {"stats": [{"sentiment": s, "stress": 1.0} for s in (5, 5, 6, 4, 0)]}),
+        ], now=100.0)
+
+        by_id = {m["id"]: r for m, r in replies}
+        assert "old" not in by_id
+        assert by_id["e"] == {"error": "model missing"}
+        assert by_id["z"]["result"]["z_sentiment"] < -4
+
+    def test_next_batch_drains_up_to_max_size(self):
+        queue = _SyncQueue([request(str(i), "ping", {}) for i in range(5)])
+
+        assert [m["id"] for m in next_batch(queue, max_batch_size=3, max_wait=0.01)] == ["0", "1", "2"]
+        assert [m["id"] for m in next_batch(queue, max_batch_size=3, max_wait=0.01)] == ["3", "4"]
+        assert next_batch(queue, max_batch_size=3, max_wait=0.01) == []
+
+
+class _AsyncRedis:
+    """In-memory lists with blocking pops, shared by proxy and fake server."""
+
+    def __init__(self):
+        self.lists = {}
+        self.changed = asyncio.Condition()
+
+    async def rpush(self, key, value):
+        async with self.changed:
+            self.lists.setdefault(key, []).append(value)
+            self.changed.notify_all()
+
+    async def blpop(self, key, timeout=0):
+        async with self.changed:
+            try:
+                await asyncio.wait_for(self.changed.wait_for(lambda: self.lists.get(key)), timeout)
+            except asyncio.TimeoutError:
+                return None
+            return key, self.lists[key].pop(0)
+
+
+async def fake_server(r, reverse=True, batches=None):
+    """Collect whatever is queued, answer it in reverse order (replies may arrive out of order)."""
+    while True:
+        _, first = await r.blpop(REQUEST_QUEUE, timeout=5)
+        raw = [first] + r.lists.pop(REQUEST_QUEUE, [])
+        messages = [json.loads(m) for m in raw]
+        if batches is not None:
+            batches.append(len(messages))
+        replies = process_batch(messages)
+        for message, reply in (reversed(replies) if reverse else replies):
+            await r.rpush(message["reply_to"], json.dumps(dict(reply, id=message["id"])))
+
+
+def make_proxy(r):
+    proxy = InferenceProxy()
+    proxy._loop = asyncio.get_running_loop()
+    proxy._redis = r
+    return proxy
+
+
+class TestInferenceProxy:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_listener(self, model):
+        r = _AsyncRedis()
+        proxy = make_proxy(r)
+        batches = []
+        server = asyncio.create_task(fake_server(r, batches=batches))
+
+        results = await asyncio.gather(*[
+            proxy.run_inference("generate_embedding", {"text": "x" * n, "model_name": "mini"}) for n in range(1, 6)
+        ])
+
+        assert results == [[float(n), 1.0] for n in range(1, 6)]
+        assert batches == [5]
+        assert model.calls == [["x", "xx", "xxx", "xxxx", "xxxxx"]]
+        assert proxy._pending == {}
+        server.cancel()
+
+    @pytest.mark.asyncio
+    async def test_error_reply_and_timeout(self, model):
+        r = _AsyncRedis()
+        proxy = make_proxy(r)
+
+        with pytest.raises(TimeoutError):
+            await proxy.run_inference("ping", {}, timeout=0.05)
+        assert proxy._pending == {}
+
+        async def failing_server():
+            _, raw = await r.blpop(REQUEST_QUEUE, timeout=5)
+            message = json.loads(raw)
+            await r.rpush(message["reply_to"], json.dumps({"id": message["id"], "error": "OOM"}))
+
+        r.lists.clear()
+        server = asyncio.create_task(failing_server())
+        with pytest.raises(RuntimeError, match="OOM"):
+            await proxy.run_inference("ping", {}, timeout=1)
+        await server
+
+    @pytest.mark.asyncio
+    async def test_requests_carry_deadline_and_reply_queue(self):
+        r = _AsyncRedis()
+        proxy = make_proxy(r)
+        before = time.time()
+
+        with pytest.raises(TimeoutError):
+            await proxy.run_inference("ping", {}, timeout=0.01)
+
+        message = json.loads(r.lists[REQUEST_QUEUE][0])
+        assert message["reply_to"] == proxy.reply_queue
+        assert before < message["deadline"] <= time.time() + 0.01
+
+    @pytest.mark.asyncio
+    async def test_forked_process_gets_its_own_reply_queue(self, monkeypatch):
+        r = _AsyncRedis()
+        proxy = make_proxy(r)
+        parent_queue = proxy.reply_queue
+
+        # As seen from a child forked after the proxy was created
+        child_pid = proxy._pid + 1
+        monkeypatch.setattr(os, "getpid", lambda: child_pid)
+        monkeypatch.setattr("api.ml.inference_server.aioredis.from_url", lambda url: r)
+        with pytest.raises(TimeoutError):
+            await proxy.run_inference("ping", {}, timeout=0.01)
+
+        message = json.loads(r.lists[REQUEST_QUEUE][0])
+        assert message["reply_to"] == proxy.reply_queue != parent_queue
@@ -0,0 +1,220 @@
+"""
+Unit tests for the journal full-text index (api/services/journal_search.py).
+
+Runs against an in-memory SQLite database, so the FTS5 code path is exercised
+end to end: content is encrypted with each user's DEK and matches come only
+from the blind tokens indexed at write time.
+"""
+import pytest
+import pytest_asyncio
+from types import SimpleNamespace
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import select, text
+
+from api.models import (
+    JournalEntry, JournalEntryEmotion, JournalEntryTag, OutboxEvent, User, UserEncryptionKey,
+)
+from api.services.encryption_service import EncryptionService
+from api.services.journal_search import (
+    SQLITE_FTS_TABLE, JournalSearchIndex, fts5_match_expression, index_tokens, normalize_tags,
+    query_tokens, search_key,
+)
+from api.services.journal_service import JournalService
+from api.utils.encrypted_type import current_dek
+
+DEKS = {1: bytes(range(32)), 2: bytes(range(32, 64))}
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory, monkeypatch):
+    # search_entries checks the cold-storage pointer, which this model lacks
+    monkeypatch.setattr(JournalEntry, "archive_pointer", None, raising=False)
+    session_factory = await make_session_factory(
+        User, UserEncryptionKey, JournalEntry, JournalEntryTag, JournalEntryEmotion, OutboxEvent)
+    async with session_factory.kw["bind"].begin() as conn:
+        await JournalSearchIndex.ensure_schema(conn)
+
+    async with session_factory() as session:
+        session.add_all([User(id=uid, username=f"user{uid}", password_hash="x") for uid in (1, 2)])
+        session.add_all([UserEncryptionKey(user_id=uid, wrapped_dek=EncryptionService.wrap_dek(dek))
+                         for uid, dek in DEKS.items()])
+        await session.commit()
+        yield session
+
+
+async def add_entry(db, user_id, content, entry_date, tags=(), emotions=()):
+    entry = JournalEntry(user_id=user_id, title=None, content=content, entry_date=entry_date, tags=None)
+    # Writes need the owner's DEK in context: it encrypts the content and keys the index
+    token = current_dek.set(DEKS[user_id])
+    try:
+        db.add(entry)
+        await db.flush()
+        await JournalSearchIndex.index_entry(
+            db, entry.id, user_id, content=content, tags=list(tags), emotions=list(emotions)
+        )
+        await db.commit()
+    finally:
+        current_dek.reset(token)
+    return entry
+
+
+async def search(db, user_id, dek=None, **filters):
+    token = current_dek.set(dek or DEKS[user_id])
+    try:
+        return await JournalService(db).search_entries(SimpleNamespace(id=user_id), **filters)
+    finally:
+        current_dek.reset(token)
+
+
+async def fts_rows(db):
+    return (await db.execute(text(f"SELECT count(*) FROM {SQLITE_FTS_TABLE}"))).scalar()
+
+
+class TestBlindTokens:
+
+    def test_words_become_keyed_prefix_tokens(self):
+        key = search_key(DEKS[1])
+        walked = index_tokens("Walked", key)
+        assert len(walked) == len("walked") - 2  # wal, walk, walke, walked
+        assert query_tokens("WALK", key)[0] in walked
+        assert query_tokens("walk", search_key(DEKS[2]))[0] not in walked
+        assert all(token.isalpha() and token.islower() for token in walked)
+        assert "walk" not in " ".join(walked)
+
+    def test_operators_and_quotes_cannot_reach_fts5(self):
+        tokens = query_tokens('body:"x" OR NEAR(a', search_key(DEKS[1]))
+        assert len(tokens) == 5
+        assert fts5_match_expression(tokens) == " ".join(f'"{t}"' for t in tokens)
+        assert query_tokens("!!! ???", search_key(DEKS[1])) == []
+        assert fts5_match_expression([]) is None
+
+    def test_tags_are_normalized(self):
+        assert normalize_tags([" Work ", "work", "Sleep", "", None]) == ["work", "sleep"]
+
+
+class TestJournalSearch:
+
+    @pytest.mark.asyncio
+    async def test_text_search_matches_indexed_plaintext(self, db):
+        await add_entry(db, 1, "Long walk by the river, felt calm", "2024-01-01")
+        await add_entry(db, 1, "Stressful meeting at work", "2024-01-02")
+        await add_entry(db, 2, "River swim", "2024-01-03")
+
+        entries, total = await search(db, 1, query="river")
+        assert total == 1
+        assert [e.entry_date for e in entries] == ["2024-01-01"]
+
+    @pytest.mark.asyncio
+    async def test_results_are_ranked_by_relevance(self, db):
+        await add_entry(db, 1, "river", "2024-01-05")
+        await add_entry(db, 1, "river river river rapids", "2024-01-01")
+        await add_entry(db, 1, "a long day, then a short look at the river", "2024-01-09")
+
+        entries, _ = await search(db, 1, query="river")
+        assert entries[-1].entry_date == "2024-01-09"
+
+    @pytest.mark.asyncio
+    async def test_tag_and_emotion_filters(self, db):
+        await add_entry(db, 1, "one", "2024-01-01", tags=["Work"], emotions=["anxious"])
+        await add_entry(db, 1, "two", "2024-01-02", tags=["homework"], emotions=["calm"])
+        await add_entry(db, 1, "three", "2024-01-03", tags=["sleep"], emotions=["anxious"])
+
+        # Exact (case-insensitive) tag match, not substring
+        entries, total = await search(db, 1, tags=["work"])
+        assert (total, [e.entry_date for e in entries]) == (1, ["2024-01-01"])
+
+        entries, total = await search(db, 1, emotion_types=["anxious"])
+        assert total == 2
+        assert [e.entry_date for e in entries] == ["2024-01-03", "2024-01-01"]
+
+    @pytest.mark.asyncio
+    async def test_count_cap_and_paging(self, db):
+        for day in range(1, 8):
+            await add_entry(db, 1, "gratitude note", f"2024-01-0{day}")
+
+        entries, total = await search(db, 1, query="gratitude", limit=2)
+        assert (len(entries), total) == (2, 7)
+
+        entries, total = await search(db, 1, query="gratitude", limit=2, count_cap=5)
+        assert (len(entries), total) == (2, 5)
+
+        entries, total = await search(db, 1, query="gratitude", skip=50, limit=2)
+        assert (entries, total) == ([], 7)
+
+    @pytest.mark.asyncio
+    async def test_removed_entries_stop_matching(self, db):
+        entry = await add_entry(db, 1, "private thought", "2024-01-01", tags=["secret"])
+        await JournalSearchIndex.remove_entry(db, entry.id)
+        await db.commit()
+
+        assert await search(db, 1, query="private") == ([], 0)
+        assert (await db.execute(select(JournalEntryTag))).all() == []
+
+    @pytest.mark.asyncio
+    async def test_prefix_queries_match_whole_words(self, db):
+        await add_entry(db, 1, "Feeling anxious before the presentation", "2024-01-01")
+
+        assert (await search(db, 1, query="anx present"))[1] == 1
+        assert (await search(db, 1, query="anxiety"))[1] == 0
+
+
+class TestIndexPrivacy:
+
+    @pytest.mark.asyncio
+    async def test_index_holds_no_plaintext_words(self, db):
+        await add_entry(db, 1, "Long walk by the river", "2024-01-01")
+        match = text(f"SELECT count(*) FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH :m")
+
+        assert await fts_rows(db) == 1
+        assert (await db.execute(match, {"m": "body:river"})).scalar() == 0
+        assert (await db.execute(text("SELECT content FROM journal_entries"))).scalar().startswith("ENC:")
+
+    @pytest.mark.asyncio
+    async def test_text_search_needs_the_owners_dek(self, db):
+        await add_entry(db, 1, "river", "2024-01-01")
+
+        assert await search(db, 1, dek=DEKS[2], query="river") == ([], 0)
+        assert await JournalService(db).search_entries(SimpleNamespace(id=1), query="river") == ([], 0)
+
+    @pytest.mark.asyncio
+    async def test_backfill_unwraps_each_owners_dek(self, db):
+        token = current_dek.set(DEKS[1])
+        db.add(JournalEntry(user_id=1, content="backfilled river walk", entry_date="2024-01-01"))
+        await db.commit()
+        current_dek.reset(token)
+        token = current_dek.set(DEKS[2])
+        db.add(JournalEntry(user_id=2, content="river swim", entry_date="2024-01-02", tags='["Swim"]'))
+        await db.commit()
+        current_dek.reset(token)
+        assert await fts_rows(db) == 0
+
+        assert await JournalSearchIndex.backfill(db, batch_size=1) == 2
+        assert [e.entry_date for e in (await search(db, 1, query="backfilled"))[0]] == ["2024-01-01"]
+        assert (await search(db, 2, query="swim", tags=["swim"]))[1] == 1
+
+    @pytest.mark.asyncio
+    async def test_remove_user_clears_every_index_row(self, db):
+        await add_entry(db, 1, "mine", "2024-01-01", tags=["a"], emotions=["calm"])
+        await add_entry(db, 2, "theirs", "2024-01-02", tags=["b"], emotions=["calm"])
+
+        await JournalSearchIndex.remove_user(db, 1)
+        await db.commit()
+
+        assert await fts_rows(db) == 1
+        assert (await db.execute(select(JournalEntryTag.user_id))).scalars().all() == [2]
+        assert (await db.execute(select(JournalEntryEmotion.user_id))).scalars().all() == [2]
+        assert (await search(db, 2, query="theirs"))[1] == 1
+
+    @pytest.mark.asyncio
+    async def test_legacy_plaintext_table_is_dropped(self, db):
+        await db.execute(text("CREATE VIRTUAL TABLE journal_search_fts USING fts5(owner, body)"))
+        await db.commit()
+        async with db.bind.begin() as conn:
+            await JournalSearchIndex.ensure_schema(conn)
+
+        tables = (await db.execute(text("SELECT name FROM sqlite_master WHERE name = 'journal_search_fts'"))).all()
+        assert tables == []
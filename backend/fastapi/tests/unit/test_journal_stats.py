@@ -0,0 +1,202 @@
+"""
+Unit tests for the incrementally maintained journal analytics (api/services/journal_stats.py).
+
+Uses an in-memory SQLite database. The key property checked is that applying
+per-write deltas leaves the aggregate tables identical to a full rebuild.
+"""
+import json
+import pytest
+import pytest_asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import Select, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.dml import Delete
+
+from api.models import (
+    JournalEntry, JournalEntryEmotion, JournalEntryTag, JournalUserDailyStats,
+    JournalUserStats, JournalUserTagStats, OutboxEvent, User,
+)
+from api.services.journal_service import JournalService
+from api.services.journal_stats import JournalStatsService
+
+NOW = datetime(2024, 3, 31, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory, monkeypatch):
+    # get_entry_by_id checks the cold-storage pointer, which this model lacks
+    monkeypatch.setattr(JournalEntry, "archive_pointer", None, raising=False)
+    session_factory = await make_session_factory(
+        User, JournalEntry, JournalEntryTag, JournalEntryEmotion,
+        JournalUserStats, JournalUserDailyStats, JournalUserTagStats, OutboxEvent,
+    )
+    async with session_factory() as session:
+        session.add(User(id=1, username="alice", password_hash="x"))
+        await session.commit()
+        yield session
+
+
+async def add_entry(db, entry_date, sentiment=None, stress=None, sleep=None, tags=None, track=True):
+    entry = JournalEntry(
+        user_id=1, username="alice", entry_date=entry_date, sentiment_score=sentiment,
+        stress_level=stress, sleep_quality=sleep, tags=json.dumps(tags) if tags is not None else None,
+    )
+    db.add(entry)
+    await db.flush()
+    if track:
+        await JournalStatsService.record_change(db, 1, None, JournalStatsService.snapshot(entry))
+    await db.commit()
+    return entry
+
+
+async def dump(db):
+    """Aggregate tables as comparable plain values."""
+    def rows(result):
+        return sorted(tuple(r) for r in result.all())
+
+    totals = rows(await db.execute(select(
+        JournalUserStats.entry_count, JournalUserStats.sentiment_sum, JournalUserStats.sentiment_count,
+        JournalUserStats.stress_sum, JournalUserStats.stress_count,
+        JournalUserStats.sleep_quality_sum, JournalUserStats.sleep_quality_count,
+    )))
+    daily = rows(await db.execute(select(
+        JournalUserDailyStats.day, JournalUserDailyStats.entry_count,
+        JournalUserDailyStats.sentiment_sum, JournalUserDailyStats.sentiment_count,
+    )))
+    tags = rows(await db.execute(select(JournalUserTagStats.tag, JournalUserTagStats.entry_count)))
+    return totals, daily, tags
+
+
+class TestIncrementalMaintenance:
+
+    @pytest.mark.asyncio
+    async def test_first_write_rebuilds_existing_history(self, db):
+        await add_entry(db, "2024-03-01 09:00:00", sentiment=40.0, tags=["work"], track=False)
+        await add_entry(db, "2024-03-02 09:00:00", sentiment=60.0, tags=["work", "sleep"])
+
+        totals, daily, tags = await dump(db)
+        assert totals == [(2, 100.0, 2, 0, 0, 0, 0)]
+        assert [d[0] for d in daily] == ["2024-03-01", "2024-03-02"]
+        assert tags == [("sleep", 1), ("work", 2)]
+
+    @pytest.mark.asyncio
+    async def test_deltas_match_full_rebuild(self, db):
+        await add_entry(db, "2024-03-01 09:00:00", sentiment=40.0, stress=6, tags=["work"])
+        second = await add_entry(db, "2024-03-01 18:00:00", sentiment=70.0, sleep=8, tags=["work", "gym"])
+        third = await add_entry(db, "2024-03-29 08:00:00", sentiment=55.0, stress=3, tags=["gym"])
+
+        # Edit: change tags, stress and move the day
+        before = JournalStatsService.snapshot(second)
+        second.tags = json.dumps(["family"])
+        second.stress_level = 9
+        second.entry_date = "2024-03-30 10:00:00"
+        await JournalStatsService.record_change(db, 1, before, JournalStatsService.snapshot(second))
+
+        # Soft delete
+        before = JournalStatsService.snapshot(third)
+        third.is_deleted = True
+        await JournalStatsService.record_change(db, 1, before, None)
+        await db.commit()
+
+        incremental = await dump(db)
+        await JournalStatsService.rebuild_user(db, 1)
+        await db.commit()
+        assert incremental == await dump(db)
+
+        _, daily, tags = incremental
+        assert ("gym", 0) not in tags and ("family", 1) in tags
+        assert "2024-03-29" not in [d[0] for d in daily]
+
+    @pytest.mark.asyncio
+    async def test_update_entry_keeps_aggregates_current(self, db):
+        entry = await add_entry(db, "2024-03-01 09:00:00", sentiment=50.0, tags=["work"])
+
+        await JournalService(db).update_entry(entry.id, SimpleNamespace(id=1), tags=["rest"], stress_level=4)
+
+        totals, _, tags = await dump(db)
+        assert totals[0][3:5] == (4, 1)
+        assert tags == [("rest", 1)]
+
+    @pytest.mark.asyncio
+    async def test_racing_first_rebuild_does_not_conflict(self, db, monkeypatch):
+        await add_entry(db, "2024-03-01 09:00:00", sentiment=40.0, tags=["work"], track=False)
+        await JournalStatsService.rebuild_user(db, 1)
+        await db.commit()
+        expected = await dump(db)
+
+        # The other rebuild's rows land after our DELETE, as if it committed in between
+        execute = db.execute
+
+        async def execute_without_deletes(statement, *args, **kwargs):
+            if isinstance(statement, Delete):
+                return None
+            return await execute(statement, *args, **kwargs)
+
+        monkeypatch.setattr(db, "execute", execute_without_deletes)
+        await JournalStatsService.rebuild_user(db, 1)
+        await db.commit()
+        assert await dump(db) == expected
+
+    @pytest.mark.asyncio
+    async def test_deltas_and_rebuilds_lock_the_user_first(self, db, monkeypatch):
+        entry = await add_entry(db, "2024-03-01 09:00:00", sentiment=40.0, track=False)
+        statements = []
+        execute = db.execute
+
+        async def recording_execute(statement, *args, **kwargs):
+            # Only SELECTs: the upserts are built for the test's SQLite dialect
+            statements.append(str(statement.compile(dialect=postgresql.dialect()))
+                              if isinstance(statement, Select) else type(statement).__name__)
+            return await execute(statement, *args, **kwargs)
+
+        monkeypatch.setattr(db, "execute", recording_execute)
+        await JournalStatsService.rebuild_user(db, 1)
+        rebuild, statements[:] = list(statements), []
+        await JournalStatsService.record_change(db, 1, None, JournalStatsService.snapshot(entry))
+
+        # The recompute or delta must not read anything before the lock is held
+        for sql in (rebuild[0], statements[0]):
+            assert "FROM users" in sql and sql.endswith("FOR UPDATE")
+
+
+class TestAnalyticsRead:
+
+    @pytest.mark.asyncio
+    async def test_windows_trend_and_top_tags(self, db):
+        await add_entry(db, "2024-03-28 09:00:00", sentiment=80.0, stress=4, sleep=7, tags=["gym", "work"])
+        await add_entry(db, "2024-03-27 09:00:00", sentiment=70.0, stress=6, tags=["work"])
+        await add_entry(db, "2024-03-20 09:00:00", sentiment=40.0, tags=["family"])
+        await add_entry(db, "2024-01-05 09:00:00", sentiment=50.0)
+
+        analytics = await JournalStatsService.get_analytics(db, 1, now=NOW)
+        assert analytics == {
+            "total_entries": 4,
+            "average_sentiment": 60.0,
+            "sentiment_trend": "improving",
+            "most_common_tags": ["work", "family", "gym"],
+            "average_stress_level": 5.0,
+            "average_sleep_quality": 7.0,
+            "entries_this_week": 2,
+            "entries_this_month": 3,
+        }
+
+    @pytest.mark.asyncio
+    async def test_missing_aggregates_are_rebuilt_on_read(self, db):
+        await add_entry(db, "2024-03-30 09:00:00", sentiment=30.0, track=False)
+
+        analytics = await JournalStatsService.get_analytics(db, 1, now=NOW)
+        assert analytics["total_entries"] == 1
+        assert analytics["entries_this_week"] == 1
+        assert (await db.execute(select(JournalUserStats.user_id))).scalars().all() == [1]
+
+    @pytest.mark.asyncio
+    async def test_empty_journal(self, db):
+        analytics = await JournalStatsService.get_analytics(db, 1, now=NOW)
+        assert analytics["total_entries"] == 0
+        assert analytics["sentiment_trend"] == "stable"
@@ -0,0 +1,205 @@
+"""
+Unit tests for the XP leaderboards (api/services/leaderboard_service.py).
+
+Redis is disabled so the in-process sorted sets are exercised; XP is awarded
+through GamificationService against an in-memory SQLite database.
+"""
+import random
+import uuid
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import redis.asyncio as redis
+from sqlalchemy import update
+
+from api.models import OutboxEvent, User, UserXP
+from api.services.gamification_service import GamificationService
+from api.services.leaderboard_service import GLOBAL, TENANT, WEEKLY, LeaderboardStore, SortedSet
+
+TENANT_A = uuid.UUID("aaaaaaaa-0000-4000-8000-00000000000a")
+TENANT_B = uuid.UUID("bbbbbbbb-0000-4000-8000-00000000000b")
+
+
+class _RejectingRedis:
+    """A reachable Redis whose MULTI is rejected, e.g. under maxmemory."""
+
+    def pipeline(self, transaction=True):
+        class _Pipeline:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: None
+
+            async def execute(self):
+                raise redis.ResponseError("OOM command not allowed when used memory > 'maxmemory'")
+
+        return _Pipeline()
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = LeaderboardStore(key_prefix="test-leaderboard")
+    store._redis_retry_at = float("inf")  # never try Redis
+    monkeypatch.setattr("api.services.gamification_service.leaderboards", store)
+    return store
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory):
+    factory = await make_session_factory(User, OutboxEvent, UserXP)
+    async with factory() as session:
+        session.add_all([User(id=i, username=name, password_hash="x")
+                         for i, name in enumerate(["alice", "bob", "carol", "dave"], start=1)])
+        await session.commit()
+        # Core updates: the user audit payload does not serialize UUIDs
+        await session.execute(update(User).where(User.id.in_([1, 2])).values(tenant_id=TENANT_A))
+        await session.execute(update(User).where(User.id == 3).values(tenant_id=TENANT_B))
+        await session.commit()
+        yield session
+
+
+async def award(db, *amounts):
+    """Award (user_id, amount) pairs."""
+    for user_id, amount in amounts:
+        await GamificationService.award_xp(db, user_id, amount, "test")
+
+
+class TestSortedSet:
+
+    def test_matches_a_sorted_reference(self):
+        rng = random.Random(5)
+        board, reference = SortedSet(), {}
+        for _ in range(2000):
+            member, score = str(rng.randint(1, 60)), rng.randint(0, 40)
+            action = rng.random()
+            if action < 0.5:
+                board.add(member, score)
+                reference[member] = score
+            elif action < 0.8:
+                reference[member] = board.incr(member, score)
+            elif action < 0.9:
+                board.add(member, score, gt=True)
+                reference[member] = max(reference.get(member, score), score)
+            else:
+                board.remove(member)
+                reference.pop(member, None)
+
+        # Redis order: score descending, then member descending
+        expected = sorted(reference.items(), key=lambda item: (item[1], item[0]), reverse=True)
+        assert board.rev_range(0, len(reference)) == expected
+        for rank, (member, _) in enumerate(expected):
+            assert board.rev_rank(member) == rank
+        assert board.rev_range(5, 9) == expected[5:10]
+        assert board.rev_range(len(expected), len(expected) + 5) == []
+
+
+class TestLeaderboards:
+
+    @pytest.mark.asyncio
+    async def test_awards_update_the_boards_without_reloading(self, db, store):
+        await award(db, (1, 100), (2, 300), (3, 200))
+        first = await GamificationService.get_leaderboard(db)
+        assert [(e["rank"], e["username"], e["total_xp"]) for e in first] == [
+            (1, "bob***", 300), (2, "car***", 200), (3, "ali***", 100)]
+
+        await award(db, (1, 250), (4, 50))
+        board = await GamificationService.get_leaderboard(db, limit=2)
+        assert [(e["username"], e["score"]) for e in board] == [("ali***", 350), ("bob***", 300)]
+        assert store.stats()["reconciles"] == 1  # only the first read loaded from user_xp
+
+    @pytest.mark.asyncio
+    async def test_tenant_and_weekly_boards(self, db, store):
+        await award(db, (1, 100), (2, 300), (3, 900), (4, 50))
+        tenant = await GamificationService.get_leaderboard(db, board=TENANT, tenant_id=TENANT_A)
+        assert [e["username"] for e in tenant] == ["bob***", "ali***"]
+
+        await award(db, (1, 400))
+        weekly = await GamificationService.get_leaderboard(db, board=WEEKLY)
+        assert [(e["username"], e["score"], e["total_xp"]) for e in weekly][:2] == [
+            ("car***", 900, 900), ("ali***", 500, 500)]
+        assert (await db.get(UserXP, 1)).tenant_id == TENANT_A
+
+    @pytest.mark.asyncio
+    async def test_position_and_neighbourhood(self, db, store):
+        await award(db, (1, 100), (2, 300), (3, 200), (4, 50))
+        alice = await db.get(User, 1)
+
+        position = await GamificationService.get_leaderboard_position(db, alice, GLOBAL, radius=1)
+        assert (position["rank"], position["score"], position["size"]) == (3, 100, 4)
+        assert [(e["rank"], e["username"]) for e in position["neighbours"]] == [
+            (2, "car***"), (3, "ali***"), (4, "dav***")]
+
+        tenant = await GamificationService.get_leaderboard_position(db, alice, TENANT)
+        assert (tenant["rank"], tenant["size"]) == (2, 2)
+
+        unranked = await db.get(User, 4)
+        assert (await GamificationService.get_leaderboard_position(db, unranked, TENANT))["rank"] is None
+
+    @pytest.mark.asyncio
+    async def test_reconcile_repairs_drift_and_prunes_the_week(self, db, store):
+        await award(db, (1, 100), (2, 300), (3, 200))
+        await GamificationService.get_leaderboard(db)
+        # Changes that bypassed award_xp: a correction, a row without its
+        # tenant and an award from before this week
+        await db.execute(update(UserXP).where(UserXP.user_id == 1).values(total_xp=1000, tenant_id=None))
+        await db.execute(update(UserXP).where(UserXP.user_id == 3).values(
+            last_xp_awarded_at=datetime.utcnow() - timedelta(days=8)))
+        await db.commit()
+
+        assert await store.reconcile(db) == 3
+        top = await store.top(db, GLOBAL)
+        assert top == [(1, 1000), (2, 300), (3, 200)]
+        assert (await store.top(db, TENANT, tenant_id=TENANT_A))[0] == (1, 1000)
+        assert [user_id for user_id, _ in await store.top(db, WEEKLY)] == [2, 1]
+
+    @pytest.mark.asyncio
+    async def test_rejected_update_marks_the_boards_stale(self, db, store, monkeypatch):
+        store._redis = _RejectingRedis()
+
+        user_xp = await GamificationService.award_xp(db, 2, 300, "test")
+        assert user_xp.total_xp == 300
+        stats = store.stats()
+        assert stats["stale"] and stats["update_errors"] == 1 and stats["backend"] == "redis"
+
+        # The next read reconciles the boards before serving them
+        reconciled = []
+
+        async def reconcile(session):
+            reconciled.append(session)
+            store._stale = False
+            return 0
+        monkeypatch.setattr(store, "reconcile", reconcile)
+        assert await store._ready(db) is store._redis
+        assert reconciled == [db]
+
+    @pytest.mark.asyncio
+    async def test_failed_reconnect_keeps_the_in_process_boards(self, db, store, monkeypatch):
+        await award(db, (1, 100))
+        assert await store.top(db, WEEKLY) == [(1, 100)]
+
+        class _Unreachable:
+            async def ping(self):
+                raise redis.ConnectionError("connection refused")
+
+        monkeypatch.setattr("api.services.leaderboard_service.redis.from_url", lambda *a, **k: _Unreachable())
+        store._redis_retry_at = 0.0  # the retry interval has passed
+        await award(db, (1, 50))
+
+        assert await store.top(db, WEEKLY) == [(1, 150)]
+        assert store.stats()["reconciles"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_board_is_rejected(self, db, store):
+        with pytest.raises(ValueError):
+            await store.top(db, "monthly")
+        with pytest.raises(ValueError):
+            await store.top(db, TENANT)
@@ -0,0 +1,142 @@
+"""
+Unit tests for the bulk outbox relay mode (OutboxRelayService.process_pending_indexing_events_bulk).
+
+Runs against an in-memory SQLite database with a fake Elasticsearch service
+that records each ``_bulk`` call.
+"""
+import pytest
+import pytest_asyncio
+import uuid
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import select
+
+from api.models import JournalEntry, OutboxEvent, User
+from api.services.es_service import ElasticSearchService
+from api.services.outbox_relay_service import OutboxRelayService
+
+
+class _FakeES:
+    def __init__(self, failures=None, error=None):
+        self.calls = []
+        self.failures = failures or {}
+        self.error = error
+
+    async def bulk(self, operations):
+        self.calls.append(list(operations))
+        if self.error:
+            raise self.error
+        return dict(self.failures)
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory):
+    async with (await make_session_factory(User, JournalEntry, OutboxEvent))() as session:
+        session.add(User(id=1, username="alice", password_hash="x"))
+        for journal_id, deleted in ((10, False), (11, False), (12, True)):
+            session.add(JournalEntry(id=journal_id, user_id=1, is_deleted=deleted, timestamp="2024-01-01"))
+        await session.commit()
+        yield session
+
+
+async def add_events(db, *specs):
+    for journal_id, action in specs:
+        db.add(OutboxEvent(topic="search_indexing", payload={
+            "event_id": str(uuid.uuid4()), "journal_id": journal_id, "action": action, "event_version": 1,
+        }))
+    await db.commit()
+
+
+async def statuses(db):
+    rows = (await db.execute(select(OutboxEvent.status, OutboxEvent.retry_count).order_by(OutboxEvent.id))).all()
+    return [tuple(r) for r in rows]
+
+
+async def relay(db, es, batch_size=500):
+    with patch("api.services.outbox_relay_service.get_es_service", return_value=es):
+        return await OutboxRelayService.process_pending_indexing_events_bulk(db, batch_size=batch_size)
+
+
+class TestBulkRelay:
+
+    @pytest.mark.asyncio
+    async def test_events_are_coalesced_into_one_bulk_request(self, db):
+        await add_events(db, (10, "upsert"), (10, "upsert"), (11, "upsert"), (11, "delete"), (12, "upsert"))
+        es = _FakeES()
+
+        assert await relay(db, es) == 5
+        assert len(es.calls) == 1
+        ops = {(action, doc_id) for action, _, doc_id, _ in es.calls[0]}
+        # 11: last event wins; 12: upsert of a soft-deleted journal becomes a delete
+        assert ops == {("index", 10), ("delete", 11), ("delete", 12)}
+        assert await statuses(db) == [("processed", 0)] * 5
+
+    @pytest.mark.asyncio
+    async def test_missing_journal_is_marked_processed_without_es_call(self, db):
+        await add_events(db, (999, "upsert"))
+        es = _FakeES()
+
+        assert await relay(db, es) == 1
+        assert es.calls == []
+
+    @pytest.mark.asyncio
+    async def test_item_failure_only_retries_that_journal(self, db):
+        await add_events(db, (10, "upsert"), (11, "upsert"), (11, "upsert"))
+        es = _FakeES(failures={"journal_11": "mapper_parsing_exception"})
+
+        assert await relay(db, es) == 1
+        assert await statuses(db) == [("processed", 0), ("pending", 1), ("pending", 1)]
+        event = (await db.execute(select(OutboxEvent).where(OutboxEvent.id == 2))).scalar_one()
+        assert event.next_retry_at is not None
+        assert event.last_error == "mapper_parsing_exception"
+
+    @pytest.mark.asyncio
+    async def test_transport_failure_backs_off_whole_batch(self, db):
+        await add_events(db, (10, "upsert"), (11, "delete"))
+
+        assert await relay(db, _FakeES(error=ConnectionError("es down"))) == 0
+        assert await statuses(db) == [("pending", 1), ("pending", 1)]
+        # Not yet due, so the next pass has nothing to claim
+        assert await relay(db, _FakeES()) == 0
+
+    @pytest.mark.asyncio
+    async def test_batch_size_limits_claim(self, db):
+        await add_events(db, *[(10, "upsert")] * 5)
+        es = _FakeES()
+
+        assert await relay(db, es, batch_size=2) == 2
+        assert await relay(db, es, batch_size=10) == 3
+        assert await relay(db, es) == 0
+
+
+class TestElasticSearchBulk:
+
+    @pytest.mark.asyncio
+    async def test_bulk_body_and_item_errors(self):
+        class _Client:
+            async def bulk(self, body):
+                self.body = body
+                return {"errors": True, "items": [
+                    {"index": {"_id": "journal_1", "status": 201}},
+                    {"delete": {"_id": "journal_2", "status": 404}},
+                    {"index": {"_id": "journal_3", "status": 400, "error": {"type": "mapper_parsing_exception"}}},
+                ]}
+
+        service = ElasticSearchService()
+        service.client = _Client()
+        failures = await service.bulk([
+            ("index", "journal", 1, {"content": "a"}),
+            ("delete", "journal", 2, None),
+            ("index", "journal", 3, {"content": "c"}),
+        ])
+
+        assert list(failures) == ["journal_3"]
+        assert service.client.body[:3] == [
+            {"index": {"_index": "soulsearch", "_id": "journal_1"}},
+            {"id": "1", "entity": "journal", "content": "a"},
+            {"delete": {"_index": "soulsearch", "_id": "journal_2"}},
+        ]
@@ -0,0 +1,171 @@
+"""
+Unit tests for the in-memory question catalog (api/services/question_catalog.py):
+age-bracket lookups against the SQL filters, sampling, pages, reloads on a
+question version change and QuestionService serving from the catalog.
+cache_service is replaced by an in-memory dict.
+"""
+import asyncio
+import random
+import pytest
+import pytest_asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import select
+
+from api.models import Question
+from api.services import cache_service as cache_module
+from api.services.db_service import QuestionService
+from api.services.question_catalog import QuestionCatalog, QuestionIndex
+from api.services.resource_versions import ResourceVersions
+
+# The module QuestionService runs in; some tests load db_service.py under its name directly
+db_service = sys.modules[QuestionService.__module__]
+
+AGE_RANGES = [(10, 120), (10, 17), (18, 25), (18, 65), (26, 65), (40, 120), (66, 120), (30, 30)]
+
+
+@pytest.fixture
+def fake_cache(monkeypatch):
+    store = {}
+
+    async def get(key):
+        return store.get(key)
+
+    async def set(key, value, ttl_seconds=3600):
+        store[key] = value
+
+    monkeypatch.setattr(cache_module.cache_service, "get", get)
+    monkeypatch.setattr(cache_module.cache_service, "set", set)
+    return store
+
+
+@pytest_asyncio.fixture
+async def session_factory(make_session_factory):
+    factory = await make_session_factory(Question)
+    async with factory() as db:
+        for i, (low, high) in enumerate(AGE_RANGES * 5, start=1):
+            db.add(Question(id=i, question_text=f"Q{i}", category_id=i % 3, min_age=low, max_age=high,
+                            is_active=0 if i % 7 == 0 else 1))
+        db.add(Question(id=100, question_text="No range", category_id=1, min_age=None, max_age=None))
+        await db.commit()
+    return factory
+
+
+@pytest.fixture
+def catalog(session_factory, fake_cache, monkeypatch):
+    versions = ResourceVersions(session_factory=session_factory, ttl_seconds=60)
+    versions.register("questions", Question)
+    versions.install_listeners()
+    catalog = QuestionCatalog(session_factory=session_factory, versions=versions)
+    monkeypatch.setattr(db_service, "question_catalog", catalog)
+    yield catalog
+    versions.remove_listeners()
+
+
+async def sql_ids(session_factory, *conditions):
+    async with session_factory() as db:
+        stmt = select(Question.id).filter(Question.is_active == 1, *conditions).order_by(Question.id)
+        return list((await db.execute(stmt)).scalars().all())
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+class TestQuestionIndex:
+
+    @pytest.mark.asyncio
+    async def test_age_brackets_match_the_sql_filter(self, catalog, session_factory):
+        index = await catalog.get()
+
+        for age in range(0, 125):
+            expected = await sql_ids(session_factory, Question.min_age <= age, Question.max_age >= age)
+            assert [q.id for q in index.for_age(age)] == expected, age
+
+    @pytest.mark.asyncio
+    async def test_pages_match_the_sql_filters(self, catalog, session_factory):
+        index = await catalog.get()
+
+        for category_id, min_age, max_age in [(None, None, None), (1, None, None), (None, 20, 60), (2, 40, None)]:
+            conditions = []
+            if category_id is not None:
+                conditions.append(Question.category_id == category_id)
+            if min_age is not None:
+                conditions.append(Question.min_age <= min_age)
+            if max_age is not None:
+                conditions.append(Question.max_age >= max_age)
+            expected = await sql_ids(session_factory, *conditions)
+
+            page, total = index.page(2, 5, category_id=category_id, min_age=min_age, max_age=max_age)
+            assert total == len(expected)
+            assert [q.id for q in page] == expected[2:7]
+
+    def test_sample_is_distinct_and_eligible(self):
+        questions = [Question(id=i, min_age=low, max_age=high) for i, (low, high) in enumerate(AGE_RANGES, start=1)]
+        index = QuestionIndex(questions)
+        rng = random.Random(3)
+
+        for _ in range(50):
+            sample = index.sample(20, 3, rng)
+            assert len({q.id for q in sample}) == 3
+            assert all(q.min_age <= 20 <= q.max_age for q in sample)
+        assert len(index.sample(30, 50, rng)) == len(index.for_age(30))
+        assert index.sample(5, 3, rng) == []
+
+
+class TestQuestionCatalog:
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_reused_until_the_version_changes(self, catalog, session_factory):
+        first = await catalog.get()
+        assert await catalog.get() is first
+        assert catalog.stats["loads"] == 1
+
+        async with session_factory() as db:
+            question = await db.get(Question, 2)
+            question.is_active = 0
+            await db.commit()
+        await settle()
+
+        second = await catalog.get()
+        assert second is not first and second.version != first.version
+        assert 2 not in second.by_id and 2 in first.by_id
+        assert catalog.stats["loads"] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_one_load(self, catalog):
+        indexes = await asyncio.gather(*(catalog.get() for _ in range(10)))
+
+        assert all(index is indexes[0] for index in indexes)
+        assert catalog.stats["loads"] == 1
+
+    @pytest.mark.asyncio
+    async def test_serves_the_last_snapshot_when_the_version_is_unavailable(self, catalog, monkeypatch):
+        index = await catalog.get()
+
+        async def broken(name):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(catalog._versions, "get", broken)
+        assert await catalog.get() is index
+        assert catalog.stats["version_errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_question_service_reads_from_the_catalog(self, catalog, session_factory, monkeypatch):
+        monkeypatch.setattr(db_service.settings, "question_catalog_enabled", True)
+        async with session_factory() as db:
+            sample = await QuestionService.get_random_questions(db, age=20, count=4)
+            by_age = await QuestionService.get_questions_by_age(db, age=20, limit=3)
+            page, total = await QuestionService.get_questions(db, skip=0, limit=10, category_id=1)
+            inactive, _ = await QuestionService.get_questions(db, limit=100, active_only=False)
+
+        eligible = await sql_ids(session_factory, Question.min_age <= 20, Question.max_age >= 20)
+        assert len(sample) == 4 and {q.id for q in sample} <= set(eligible)
+        assert [q.id for q in by_age] == eligible[:3]
+        assert total == len(await sql_ids(session_factory, Question.category_id == 1))
+        assert any(q.is_active == 0 for q in inactive)  # inactive questions still come from the database
+        assert catalog.stats["loads"] == 1
@@ -0,0 +1,290 @@
+"""
+Unit tests for Redis-backed quota counters with write-behind flushing (#1135).
+
+Redis is disabled so the in-process counter store is exercised (a small
+stand-in covers flushing across a Redis outage); the flush path runs against
+an in-memory SQLite database.
+"""
+import pytest
+import pytest_asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import redis.asyncio as redis
+from redis.exceptions import NoScriptError
+from sqlalchemy import select
+
+from api.models import TenantQuota
+from api.services.quota_counter_service import (
+    QuotaConfigCache,
+    QuotaCounterStore,
+    QUOTA_EXCEEDED_ML,
+    QUOTA_EXCEEDED_REQUESTS,
+    quota_day,
+)
+from api.services.quota_service import QuotaService, quota_limiter
+
+UTC = timezone.utc
+
+
+def _local_store() -> QuotaCounterStore:
+    store = QuotaCounterStore(key_prefix="test-quota")
+    store._redis_retry_at = float("inf")  # never try Redis
+    return store
+
+
+class _FakeRedis:
+    """
+    Counter subset of Redis used by QuotaCounterStore; ``down`` fails every call
+    and clearing ``scripts`` simulates a restart that dropped the script cache.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.down = False
+        self.scripts = {"sha"}
+
+    def _check(self):
+        if self.down:
+            raise redis.ConnectionError("connection refused")
+
+    async def script_load(self, script):
+        self._check()
+        self.scripts.add("reloaded-sha")
+        return "reloaded-sha"
+
+    async def evalsha(self, sha, numkeys, req_key, ml_key, requests, ml_units, *limits):
+        self._check()
+        if sha not in self.scripts:
+            raise NoScriptError("No matching script. Please use EVAL.")
+        self.values[req_key] = self.values.get(req_key, 0) + requests
+        self.values[ml_key] = self.values.get(ml_key, 0) + ml_units
+        return [1, self.values[req_key], self.values[ml_key], 0]
+
+    async def mget(self, keys):
+        self._check()
+        return [self.values.get(key) for key in keys]
+
+
+def _redis_store(fake: _FakeRedis) -> QuotaCounterStore:
+    store = QuotaCounterStore(key_prefix="test-quota")
+    store._redis, store._lua_sha = fake, "sha"
+    return store
+
+
+@pytest_asyncio.fixture
+async def session_factory(make_session_factory):
+    return await make_session_factory(TenantQuota)
+
+
+@pytest.fixture
+def local_quota(monkeypatch):
+    """Route QuotaService through a fresh local store and config cache."""
+    store = _local_store()
+    cache = QuotaConfigCache(ttl=60)
+    monkeypatch.setattr("api.services.quota_service.quota_counters", store)
+    monkeypatch.setattr("api.services.quota_service.quota_config_cache", cache)
+
+    async def _allow(identifier, capacity=None, refill_rate=None):
+        return True, capacity
+
+    monkeypatch.setattr(quota_limiter, "is_rate_limited", _allow)
+    return store, cache
+
+
+class TestQuotaCounterStore:
+
+    @pytest.mark.asyncio
+    async def test_consume_until_request_limit(self):
+        store = _local_store()
+        tenant = uuid.uuid4()
+
+        for i in range(3):
+            allowed, count, _, error = await store.consume(tenant, 1, 0, 3, 10)
+            assert allowed and error is None
+            assert count == i + 1
+
+        allowed, count, _, error = await store.consume(tenant, 1, 0, 3, 10)
+        assert not allowed
+        assert count == 3
+        assert error == QUOTA_EXCEEDED_REQUESTS
+
+    @pytest.mark.asyncio
+    async def test_ml_limit_rejects_without_consuming_requests(self):
+        store = _local_store()
+        tenant = uuid.uuid4()
+
+        allowed, _, ml, _ = await store.consume(tenant, 1, 2, 100, 2)
+        assert allowed and ml == 2
+
+        allowed, count, ml, error = await store.consume(tenant, 1, 1, 100, 2)
+        assert not allowed
+        assert error == QUOTA_EXCEEDED_ML
+        assert (count, ml) == (1, 2)
+
+    @pytest.mark.asyncio
+    async def test_counters_are_day_bucketed(self):
+        store = _local_store()
+        tenant = uuid.uuid4()
+        today = datetime.now(UTC)
+        tomorrow = today + timedelta(days=1)
+
+        await store.consume(tenant, 1, 0, 1, 1, now=today)
+        allowed, *_ = await store.consume(tenant, 1, 0, 1, 1, now=today)
+        assert not allowed
+
+        allowed, count, _, _ = await store.consume(tenant, 1, 0, 1, 1, now=tomorrow)
+        assert allowed and count == 1
+
+    @pytest.mark.asyncio
+    async def test_seed_does_not_overwrite_live_counts(self):
+        store = _local_store()
+        tenant = uuid.uuid4()
+        today = quota_day()
+
+        await store.seed(tenant, today, 40, 3)
+        await store.consume(tenant, 1, 0, 100, 10)
+        await store.seed(tenant, today, 0, 0)
+
+        assert await store.get_counts(tenant, today) == (41, 3)
+
+
+class TestWriteBehindFlush:
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_absolute_counts_in_one_batch(self, session_factory):
+        store = _local_store()
+        tenants = [uuid.uuid4() for _ in range(3)]
+        async with session_factory() as db:
+            for tenant in tenants:
+                db.add(TenantQuota(tenant_id=tenant, daily_request_count=0, ml_units_daily_count=0))
+            await db.commit()
+
+        for i, tenant in enumerate(tenants):
+            for _ in range(i + 1):
+                await store.consume(tenant, 1, 1, 100, 100)
+        assert store.pending_flush == 3
+
+        async with session_factory() as db:
+            assert await store.flush(db) == 3
+        assert store.pending_flush == 0
+
+        async with session_factory() as db:
+            rows = (await db.execute(select(TenantQuota))).scalars().all()
+            counts = {row.tenant_id: (row.daily_request_count, row.ml_units_daily_count) for row in rows}
+        assert counts == {tenant: (i + 1, i + 1) for i, tenant in enumerate(tenants)}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_tenants_dirty(self, session_factory, monkeypatch):
+        store = _local_store()
+        tenant = uuid.uuid4()
+        await store.consume(tenant, 1, 0, 100, 100)
+
+        async def _boom(*args, **kwargs):
+            raise RuntimeError("db down")
+
+        async with session_factory() as db:
+            monkeypatch.setattr(db, "execute", _boom)
+            with pytest.raises(RuntimeError):
+                await store.flush(db)
+        assert store.pending_flush == 1
+
+
+    @pytest.mark.asyncio
+    async def test_lost_script_is_reloaded_instead_of_counting_locally(self):
+        fake = _FakeRedis()
+        store = _redis_store(fake)
+        tenant = uuid.uuid4()
+        await store.consume(tenant, 1, 0, 100, 100)
+
+        fake.scripts.clear()  # Redis restarted
+        allowed, count, _, _ = await store.consume(tenant, 1, 0, 100, 100)
+
+        assert allowed and count == 2
+        assert store._lua_sha == "reloaded-sha"
+        assert store._redis is fake and store._local == {}
+
+    @pytest.mark.asyncio
+    async def test_redis_outage_does_not_overwrite_persisted_counts(self, session_factory):
+        fake = _FakeRedis()
+        store = _redis_store(fake)
+        in_redis, local_only = uuid.uuid4(), uuid.uuid4()
+        async with session_factory() as db:
+            db.add_all([
+                TenantQuota(tenant_id=in_redis, daily_request_count=50, ml_units_daily_count=5),
+                TenantQuota(tenant_id=local_only, daily_request_count=0, ml_units_daily_count=0),
+            ])
+            await db.commit()
+
+        req_key, ml_key = store._keys(in_redis, quota_day())
+        fake.values.update({req_key: 50, ml_key: 5})  # seeded from the row
+        for _ in range(3):
+            await store.consume(in_redis, 1, 1, 100, 100)
+
+        fake.down = True
+        # The first failing call switches to the in-process store
+        await store.consume(local_only, 1, 0, 100, 100)
+        await store.consume(local_only, 1, 0, 100, 100)
+        async with session_factory() as db:
+            assert await store.flush(db) == 1
+        assert store.pending_flush == 1
+
+        async def persisted():
+            async with session_factory() as db:
+                rows = (await db.execute(select(TenantQuota))).scalars().all()
+                return {row.tenant_id: (row.daily_request_count, row.ml_units_daily_count) for row in rows}
+        assert await persisted() == {in_redis: (50, 5), local_only: (2, 0)}
+
+        fake.down = False
+        store._redis, store._redis_retry_at = fake, 0.0
+        async with session_factory() as db:
+            assert await store.flush(db) == 1
+        assert store.pending_flush == 0
+        assert (await persisted())[in_redis] == (53, 8)
+
+
+class TestQuotaServiceHotPath:
+
+    @pytest.mark.asyncio
+    async def test_config_is_cached_and_counters_seeded(self, session_factory, local_quota):
+        store, cache = local_quota
+        tenant = uuid.uuid4()
+        async with session_factory() as db:
+            db.add(TenantQuota(
+                tenant_id=tenant, tier="pro", daily_request_limit=10,
+                daily_request_count=7, last_reset_date=datetime.now(UTC),
+            ))
+            await db.commit()
+
+        async with session_factory() as db:
+            allowed, status = await QuotaService.check_and_consume_quota(db, tenant)
+        assert allowed
+        assert status["tier"] == "pro"
+        assert status["daily_count"] == 8
+        assert cache.get(tenant) is not None
+
+        async def _no_db(*args, **kwargs):
+            raise AssertionError("hot path must not query the database")
+
+        async with session_factory() as db:
+            db.execute = _no_db
+            for _ in range(2):
+                allowed, status = await QuotaService.check_and_consume_quota(db, tenant)
+                assert allowed
+            allowed, status = await QuotaService.check_and_consume_quota(db, tenant)
+        assert not allowed
+        assert status["error"] == QUOTA_EXCEEDED_REQUESTS
+
+    @pytest.mark.asyncio
+    async def test_inactive_tenant_rejected(self, session_factory, local_quota):
+        tenant = uuid.uuid4()
+        async with session_factory() as db:
+            db.add(TenantQuota(tenant_id=tenant, is_active=False))
+            await db.commit()
+            allowed, status = await QuotaService.check_and_consume_quota(db, tenant)
+        assert not allowed
+        assert status["error"] == "Tenant account is inactive"
@@ -0,0 +1,199 @@
+"""
+Unit tests for the single-pass ASGI request pipeline (api/middleware/request_pipeline.py).
+
+Stage backends (maintenance state, RBAC lookup, quota, feature flags) are
+patched so the tests cover routing, short-circuiting and state propagation
+without Redis or a database.
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from api.config import get_settings_instance
+from api.middleware import request_pipeline
+from api.middleware.request_pipeline import (
+    PathTable,
+    RequestPipelineMiddleware,
+    default_stages,
+)
+
+settings = get_settings_instance()
+MODULE = "api.middleware.request_pipeline"
+
+
+def make_token(**claims):
+    claims.setdefault("sub", "alice")
+    claims.setdefault("uid", 7)
+    claims["exp"] = datetime.now(timezone.utc) + timedelta(minutes=5)
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.jwt_algorithm)
+
+
+def build_client():
+    app = FastAPI()
+    app.add_middleware(RequestPipelineMiddleware)
+
+    @app.get("/api/v1/profile")
+    async def profile(request: Request):
+        return {
+            "user_id": request.state.user_id,
+            "is_admin": request.state.is_admin,
+            "features": request.state.features,
+        }
+
+    @app.post("/api/v1/profile")
+    async def update_profile():
+        return {"ok": True}
+
+    @app.get("/api/v1/auth/captcha")
+    async def captcha():
+        return {"ok": True}
+
+    @app.delete("/api/v1/users/me")
+    async def delete_account():
+        return {"deleted": True}
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def backends():
+    with patch(f"{MODULE}.cache_service") as cache, \
+         patch(f"{MODULE}.authorize_user", new=AsyncMock(return_value=(7, False))) as authorize, \
+         patch(f"{MODULE}.enforce_quota", new=AsyncMock(return_value=None)) as quota, \
+         patch(f"{MODULE}.resolve_features", return_value={"beta": True}) as features, \
+         patch(f"{MODULE}.get_real_ip", return_value="203.0.113.9"):
+        cache.get = AsyncMock(return_value=None)
+        yield {"cache": cache, "authorize": authorize, "quota": quota, "features": features}
+
+
+class TestPathTable:
+
+    def test_exact_prefix_and_contains(self):
+        table = PathTable(exact=("/",), prefixes=("/docs", "/health"), contains=("/users/me",))
+        assert table.matches("GET", "/")
+        assert table.matches("GET", "/docs/oauth2-redirect")
+        assert table.matches("GET", "/api/v1/users/me")
+        assert not table.matches("GET", "/api/v1/journal")
+
+    def test_method_filter(self):
+        table = PathTable(contains=("/users/me",), methods=["delete"])
+        assert table.matches("DELETE", "/api/v1/users/me")
+        assert not table.matches("GET", "/api/v1/users/me")
+
+
+class TestStagePlanning:
+
+    def test_public_routes_skip_rbac_and_step_up(self):
+        pipeline = RequestPipelineMiddleware(app=None)
+        names = [stage.name for stage in pipeline.plan_for("GET", "/api/v1/auth/captcha")]
+        assert names == ["maintenance", "feature_flags", "quota"]
+        assert [s.name for s in pipeline.plan_for("GET", "/health")] == ["feature_flags"]
+
+    def test_privileged_route_includes_step_up(self):
+        pipeline = RequestPipelineMiddleware(app=None)
+        names = [stage.name for stage in pipeline.plan_for("DELETE", "/api/v1/users/me")]
+        assert names[-1] == "step_up"
+        assert "step_up" not in [s.name for s in pipeline.plan_for("GET", "/api/v1/users/me")]
+
+    def test_plans_are_memoized_and_bounded(self):
+        pipeline = RequestPipelineMiddleware(app=None, plan_cache_size=2)
+        first = pipeline.plan_for("GET", "/api/v1/a")
+        assert pipeline.plan_for("GET", "/api/v1/a") is first
+        pipeline.plan_for("GET", "/api/v1/b")
+        pipeline.plan_for("GET", "/api/v1/c")
+        assert len(pipeline._plans) <= 2
+
+    def test_default_stage_order(self):
+        assert [s.name for s in default_stages()] == [
+            "maintenance", "feature_flags", "rbac", "quota", "consent", "step_up",
+        ]
+
+
+class TestPipelineRequests:
+
+    def test_token_is_decoded_once(self, backends):
+        client = build_client()
+        with patch.object(request_pipeline.jwt, "decode", wraps=jwt.decode) as decode:
+            response = client.get("/api/v1/profile", headers={"Authorization": f"Bearer {make_token()}"})
+
+        assert response.status_code == 200
+        assert response.json() == {"user_id": 7, "is_admin": False, "features": {"beta": True}}
+        assert decode.call_count == 1
+        backends["authorize"].assert_awaited_once()
+
+    def test_missing_token_is_rejected_with_401(self, backends):
+        response = build_client().get("/api/v1/profile")
+        assert response.status_code == 401
+        assert response.json() == {"detail": "Missing authentication token"}
+        assert response.headers["WWW-Authenticate"] == "Bearer"
+
+    def test_invalid_token_is_rejected(self, backends):
+        response = build_client().get("/api/v1/profile", headers={"Authorization": "Bearer garbage"})
+        assert response.status_code == 401
+        assert response.json() == {"detail": "Invalid token"}
+        backends["authorize"].assert_not_awaited()
+
+    def test_exempt_route_needs_no_token(self, backends):
+        response = build_client().get("/api/v1/auth/captcha")
+        assert response.status_code == 200
+        backends["authorize"].assert_not_awaited()
+
+    def test_rbac_failure_short_circuits_later_stages(self, backends):
+        backends["authorize"].side_effect = HTTPException(status_code=403, detail="Role tampering detected")
+        response = build_client().get("/api/v1/profile", headers={"Authorization": f"Bearer {make_token()}"})
+        assert response.status_code == 403
+        backends["quota"].assert_not_awaited()
+
+    def test_quota_headers_are_added(self, backends):
+        backends["quota"].return_value = {
+            "tier": "pro", "daily_limit": 100, "daily_count": 40, "tokens_remaining": 9,
+        }
+        token = make_token(tid="tenant-1")
+        response = build_client().get("/api/v1/profile", headers={"Authorization": f"Bearer {token}"})
+
+        assert response.status_code == 200
+        assert response.headers["X-Tenant-Tier"] == "pro"
+        assert response.headers["X-Quota-Remaining-Today"] == "60"
+        assert backends["quota"].await_args.args[0] == "tenant-1"
+
+    def test_read_only_mode_blocks_writes_for_non_admins(self, backends):
+        backends["cache"].get = AsyncMock(return_value={"mode": "READ_ONLY"})
+        client = build_client()
+        headers = {"Authorization": f"Bearer {make_token()}"}
+
+        read = client.get("/api/v1/profile", headers=headers)
+        assert read.status_code == 200
+        assert read.headers["X-Maintenance-Mode"] == "READ_ONLY"
+
+        write = client.post("/api/v1/profile", headers=headers)
+        assert write.status_code == 503
+        assert write.json()["error"] == "READ_ONLY_MODE"
+        backends["authorize"].assert_awaited_once()
+
+    def test_step_up_is_checked_against_the_session_claim(self, backends):
+        client = build_client()
+        token = make_token(sid="session-1", jti="token-id")
+        with patch(f"{MODULE}.has_valid_step_up_auth", new=AsyncMock(return_value=False)) as step_up:
+            blocked = client.delete("/api/v1/users/me", headers={"Authorization": f"Bearer {token}"})
+            step_up.return_value = True
+            allowed = client.delete("/api/v1/users/me", headers={"Authorization": f"Bearer {token}"})
+
+        assert blocked.status_code == 403
+        assert allowed.json() == {"deleted": True}
+        assert step_up.await_args.args == (7, "session-1", "delete_account")
+
+    def test_step_up_is_skipped_without_a_session(self, backends):
+        with patch(f"{MODULE}.has_valid_step_up_auth", new=AsyncMock(return_value=False)) as step_up:
+            response = build_client().delete(
+                "/api/v1/users/me", headers={"Authorization": f"Bearer {make_token(jti='token-id')}"})
+
+        assert response.status_code == 200
+        step_up.assert_not_awaited()
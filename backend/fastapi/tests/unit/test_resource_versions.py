@@ -0,0 +1,115 @@
+"""
+Unit tests for resource content versions (api/services/resource_versions.py):
+content-hash versions, recompute after committed ORM changes only, and
+single-flight refreshes. cache_service is replaced by an in-memory dict.
+"""
+import asyncio
+import pytest
+import pytest_asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+from api.models import Question, QuestionCategory
+from api.services import cache_service as cache_module
+from api.services.resource_versions import RESOURCE_VERSION_KEY_PREFIX, ResourceVersions
+
+
+@pytest.fixture
+def fake_cache(monkeypatch):
+    store = {}
+
+    async def get(key):
+        return store.get(key)
+
+    async def set(key, value, ttl_seconds=3600):
+        store[key] = value
+
+    monkeypatch.setattr(cache_module.cache_service, "get", get)
+    monkeypatch.setattr(cache_module.cache_service, "set", set)
+    return store
+
+
+@pytest_asyncio.fixture
+async def session_factory(make_session_factory):
+    factory = await make_session_factory(Question, QuestionCategory)
+    async with factory() as db:
+        db.add_all([QuestionCategory(id=1, name="Self-awareness"), Question(id=1, question_text="Q1", category_id=1)])
+        await db.commit()
+    return factory
+
+
+@pytest.fixture
+def versions(session_factory, fake_cache):
+    registry = ResourceVersions(session_factory=session_factory, ttl_seconds=60)
+    registry.register("questions", Question)
+    registry.register("question_categories", QuestionCategory)
+    registry.install_listeners()
+    yield registry
+    registry.remove_listeners()
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+class TestResourceVersions:
+
+    @pytest.mark.asyncio
+    async def test_version_is_a_stored_content_hash(self, versions, session_factory, fake_cache):
+        version = await versions.get("questions")
+
+        assert fake_cache[f"{RESOURCE_VERSION_KEY_PREFIX}questions"] == version
+        assert await versions.get("questions") == version
+        assert versions.stats["computed"] == 1
+
+        # Another worker computes the same value from the same rows
+        other = ResourceVersions(session_factory=session_factory)
+        other.register("questions", Question)
+        assert await other.compute("questions") == version
+
+    @pytest.mark.asyncio
+    async def test_committed_change_bumps_only_its_resource(self, versions, session_factory):
+        questions = await versions.get("questions")
+        categories = await versions.get("question_categories")
+
+        async with session_factory() as db:
+            question = await db.get(Question, 1)
+            question.question_text = "Q1 (revised)"
+            await db.commit()
+        await settle()
+
+        assert await versions.get("questions") != questions
+        assert await versions.get("question_categories") == categories
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_change_keeps_version(self, versions, session_factory):
+        before = await versions.get("questions")
+
+        async with session_factory() as db:
+            db.add(Question(id=2, question_text="Q2", category_id=1))
+            await db.flush()
+            await db.rollback()
+        await settle()
+
+        assert "questions" not in versions.get_stats()["stale"]
+        assert await versions.get("questions") == before
+        assert versions.stats["computed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_refreshes_share_one_computation(self, versions):
+        results = await asyncio.gather(*(versions.refresh("questions") for _ in range(10)))
+
+        assert len(set(results)) == 1
+        assert versions.stats["computed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_local_version_without_redis(self, versions, fake_cache):
+        version = await versions.get("questions")
+        fake_cache.clear()
+
+        assert await versions.get("questions") == version
+        assert versions.stats["computed"] == 1
@@ -0,0 +1,135 @@
+"""
+Unit tests for the per-user score summaries (api/services/score_summary.py):
+the incremental fold against direct statistics, maintenance as scores are
+recorded, the dashboard read and the bulk consistency check / rebuild.
+"""
+import random
+import statistics
+from datetime import date, datetime, timedelta, timezone
+import pytest
+import pytest_asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import update
+
+from api.models import OutboxEvent, Score, User, UserScoreSummary
+from api.services.score_summary import ScoreSummaryService, SummaryState
+from api.services.user_analytics_service import UserAnalyticsService
+
+TODAY = datetime.now(timezone.utc).date()
+
+
+class TestSummaryState:
+
+    def test_fold_matches_direct_statistics(self):
+        rng = random.Random(3)
+        values = [rng.randint(0, 100) for _ in range(50)]
+        state = SummaryState()
+        for i, value in enumerate(values, start=1):
+            state.add(i, value, None)
+
+        assert state.exam_count == 50
+        assert state.average == pytest.approx(statistics.mean(values))
+        assert state.stdev == pytest.approx(statistics.stdev(values))
+        assert state.best_score == max(values)
+        assert state.latest_score == values[-1]
+        assert state.recent_scores == values[-5:]
+
+    def test_replayed_score_is_ignored(self):
+        state = SummaryState()
+        state.add(1, 40, None)
+        state.add(2, 60, None)
+        state.add(2, 60, None)
+        assert state.exam_count == 2 and state.recent_scores == [40, 60]
+
+    def test_streak_counts_consecutive_days(self):
+        state = SummaryState()
+        for score_id, day in enumerate(["2026-03-01", "2026-03-02", "2026-03-02", "2026-03-03"], start=1):
+            state.add(score_id, 50, day)
+        assert (state.streak_days, state.last_exam_day) == (3, "2026-03-03")
+
+        state.add(5, 50, "2026-03-06")
+        assert state.streak_days == 1
+        assert state.current_streak(date(2026, 3, 7)) == 1
+        assert state.current_streak(date(2026, 3, 8)) == 0
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory):
+    session_factory = await make_session_factory(User, OutboxEvent, Score, UserScoreSummary)
+    async with session_factory() as session:
+        session.add_all([User(id=1, username="alice", password_hash="x"), User(id=2, username="bob", password_hash="x")])
+        await session.commit()
+        yield session
+
+
+async def save(db, user_id, total_score, day, username=None):
+    score = Score(user_id=user_id, username=username, total_score=total_score,
+                  timestamp=f"{day.isoformat()}T12:00:00+00:00")
+    db.add(score)
+    await db.flush()
+    await ScoreSummaryService.record_score(db, score)
+    await db.commit()
+    return score
+
+
+class TestScoreSummaryService:
+
+    @pytest.mark.asyncio
+    async def test_dashboard_reads_maintained_summary(self, db):
+        values = [50, 62, 58, 70, 75, 80]
+        for i, value in enumerate(values):
+            await save(db, 1, value, TODAY - timedelta(days=len(values) - 1 - i))
+        await save(db, 2, 90, TODAY - timedelta(days=10))
+
+        summary = await UserAnalyticsService.get_dashboard_summary(db, 1)
+
+        assert summary.total_exams == 6
+        assert summary.average_score == round(statistics.mean(values), 1)
+        assert summary.best_score == 80 and summary.latest_score == 80
+        assert summary.consistency_score == round(statistics.stdev(values) / statistics.mean(values) * 100, 1)
+        assert summary.sentiment_trend == "improving"  # 62 -> 80 over the last five
+        assert summary.streak_days == 6
+
+        other = await UserAnalyticsService.get_dashboard_summary(db, 2)
+        assert (other.total_exams, other.streak_days, other.consistency_score) == (1, 0, None)
+
+    @pytest.mark.asyncio
+    async def test_user_without_scores_gets_empty_summary(self, db):
+        summary = await UserAnalyticsService.get_dashboard_summary(db, 2)
+        assert (summary.total_exams, summary.best_score, summary.sentiment_trend) == (0, 0, "stable")
+
+    @pytest.mark.asyncio
+    async def test_check_finds_and_repairs_drift(self, db):
+        for value in (40, 60, 80):
+            await save(db, 1, value, TODAY)
+        await save(db, 2, 70, TODAY)
+        assert await ScoreSummaryService.check(db) == []
+
+        # A score written without the summary hook, and a corrupted row
+        db.add(Score(user_id=None, username="bob", total_score=30, timestamp=f"{TODAY.isoformat()}T13:00:00"))
+        await db.execute(update(UserScoreSummary).where(UserScoreSummary.user_id == 1).values(best_score=99))
+        await db.commit()
+
+        assert await ScoreSummaryService.check(db) == [1, 2]
+        assert await ScoreSummaryService.check(db, repair=True) == [1, 2]
+        assert await ScoreSummaryService.check(db) == []
+
+        bob = await ScoreSummaryService.get_summary(db, 2)
+        assert (bob.exam_count, bob.recent_scores) == (2, [70, 30])
+        assert (await ScoreSummaryService.get_summary(db, 1)).best_score == 80
+
+    @pytest.mark.asyncio
+    async def test_rebuild_matches_incremental_maintenance(self, db):
+        rng = random.Random(8)
+        for _ in range(60):
+            await save(db, rng.choice([1, 2]), rng.randint(0, 100), TODAY - timedelta(days=rng.randint(0, 20)))
+        maintained = {u: await ScoreSummaryService.get_summary(db, u) for u in (1, 2)}
+
+        assert await ScoreSummaryService.rebuild(db) == 2
+        rebuilt = {u: await ScoreSummaryService.get_summary(db, u) for u in (1, 2)}
+
+        assert rebuilt == maintained
@@ -310,7 +310,7 @@ class TestStepUpAuthMiddleware:
             mock_auth_service.check_step_up_auth_valid.return_value = False
             mock_auth_service_class.return_value = mock_auth_service
 
-            with patch('api.middleware.step_up_auth_middleware.get_db_session', return_value=AsyncMock()):
+            with patch('api.middleware.step_up_auth_middleware.AsyncSessionLocal'):
                 call_next = AsyncMock()
 
                 # Execute
@@ -346,4 +346,66 @@ class TestStepUpAuthAPI:
             "code": "123456"
         })
 
-        assert response.status_code == 401
\ No newline at end of file
+        assert response.status_code == 401
+
+class TestStepUpEndToEnd:
+    """Initiate -> verify -> privileged call, keyed by the access token's session claim."""
+
+    @pytest.mark.asyncio
+    async def test_privileged_call_is_allowed_after_step_up(self):
+        import httpx
+        import pyotp
+        from fastapi import FastAPI
+        from jose import jwt
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from api.config import get_settings_instance
+        from api.constants.security_constants import SESSION_ID_CLAIM
+        from api.middleware.request_pipeline import RBACStage, RequestPipelineMiddleware, StepUpStage
+        from api.models import Base
+
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[User.__table__, StepUpToken.__table__])
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        secret = pyotp.random_base32()
+        async with session_factory() as db:
+            user = User(id=1, username="testuser", password_hash="x", is_2fa_enabled=True, otp_secret=secret)
+            db.add(user)
+            await db.commit()
+            auth_service = AuthService(db)
+            # As issued by /auth/login; create_access_token replaces "jti" but keeps the session claim
+            access_token = auth_service.create_access_token(data={
+                "sub": user.username, "uid": user.id, SESSION_ID_CLAIM: "session-abc"})
+
+        app = FastAPI()
+        app.add_middleware(RequestPipelineMiddleware, stages=[RBACStage(), StepUpStage()])
+
+        @app.delete("/api/v1/users/me")
+        async def delete_account():
+            return {"deleted": True}
+
+        headers = {"Authorization": f"Bearer {access_token}"}
+        with patch("api.middleware.request_pipeline.authorize_user", new=AsyncMock(return_value=(1, False))), \
+             patch("api.middleware.step_up_auth_middleware.AsyncSessionLocal", session_factory):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                assert (await client.delete("/api/v1/users/me", headers=headers)).status_code == 403
+
+                settings = get_settings_instance()
+                claims = jwt.decode(access_token, settings.SECRET_KEY, algorithms=[settings.jwt_algorithm])
+                async with session_factory() as db:
+                    auth_service = AuthService(db)
+                    step_up_token = await auth_service.initiate_step_up_auth(
+                        user=await db.get(User, 1),
+                        session_id=claims[SESSION_ID_CLAIM],
+                        purpose="delete_account",
+                    )
+                    assert await auth_service.verify_step_up_auth(step_up_token, pyotp.TOTP(secret).now())
+
+                response = await client.delete("/api/v1/users/me", headers=headers)
+
+        await engine.dispose()
+        assert claims["jti"] != claims[SESSION_ID_CLAIM]
+        assert response.status_code == 200
+        assert response.json() == {"deleted": True}
@@ -0,0 +1,223 @@
+"""
+Unit tests for the compiled survey scoring DSL (api/services/survey_scoring.py):
+parity with the interpreter it replaced, batch scoring, write-time checks
+and lenient compiling of stored logic, the per-version cache and re-scoring
+stored submissions.
+"""
+import random
+from types import SimpleNamespace
+import pytest
+import pytest_asyncio
+from datetime import datetime
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from sqlalchemy import select
+
+from api.models import (
+    OutboxEvent, QuestionType, SurveyQuestion, SurveyResponse, SurveySection,
+    SurveySubmission, SurveyTemplate, User,
+)
+from api.services.survey_scoring import ScoringCache, compile_scoring
+from api.services.survey_service import SurveyService
+
+
+def interpret(logic, answers):
+    """The interpreter SurveyService used before the DSL was compiled."""
+    scores = {}
+    if not logic: return scores
+    for rule in logic:
+        condition = rule.get('if', {})
+        qid = condition.get('qid')
+        op = condition.get('op', '==')
+        target_val = condition.get('val')
+        actual_val = answers.get(qid)
+        if actual_val is None: continue
+        match = False
+        if op == '==':
+            match = str(actual_val) == str(target_val)
+        elif op == '>':
+            try: match = float(actual_val) > float(target_val)
+            except: pass  # noqa: E722
+        elif op == '<':
+            try: match = float(actual_val) < float(target_val)
+            except: pass  # noqa: E722
+        if match:
+            for dimension, delta in rule.get('then', {}).items():
+                scores[dimension] = scores.get(dimension, 0.0) + float(delta)
+    return scores
+
+
+VALUES = ["0", "1", "2.5", "3", "7", "10", "High Stress", "Low", "", "nan", "abc", " 4 "]
+
+
+def random_logic(rng, rules=40, questions=8):
+    logic = []
+    for _ in range(rules):
+        op = rng.choice(["==", "==", ">", "<", "!=", None])
+        condition = {"qid": rng.randint(1, questions), "val": rng.choice(VALUES + [3, 1.5, None])}
+        if op:
+            condition["op"] = op
+        then = {rng.choice(["anxiety", "resilience", "focus", "mood"]): rng.choice([1, -2, 5, "3", 0.5, 0])
+                for _ in range(rng.randint(1, 2))}
+        logic.append({"if": condition, "then": then})
+    return logic
+
+
+def random_answers(rng, questions=8):
+    return {qid: rng.choice(VALUES) for qid in range(1, questions + 1) if rng.random() < 0.7}
+
+
+class TestCompiledScoring:
+
+    def test_score_matches_the_interpreter(self):
+        rng = random.Random(11)
+        for _ in range(50):
+            logic = random_logic(rng)
+            compiled = compile_scoring(logic)
+            for _ in range(40):
+                answers = random_answers(rng)
+                assert compiled.score(answers) == interpret(logic, answers)
+
+    def test_score_many_matches_score(self):
+        rng = random.Random(12)
+        for _ in range(20):
+            logic = random_logic(rng)
+            compiled = compile_scoring(logic)
+            batch = [random_answers(rng) for _ in range(200)]
+            for answers, scores in zip(batch, compiled.score_many(batch)):
+                expected = compiled.score(answers)
+                assert scores.keys() == expected.keys()
+                assert scores == pytest.approx(expected)
+
+    def test_rules_that_cannot_match_are_dropped(self):
+        compiled = compile_scoring([
+            {"if": {"qid": 1, "op": ">", "val": "high"}, "then": {"a": 1}},
+            {"if": {"qid": 1, "op": "between", "val": 3}, "then": {"a": 1}},
+            {"if": {"op": "==", "val": 3}, "then": {"a": 1}},
+            {"if": {"qid": 2, "op": "<", "val": "5"}, "then": {"b": 2}},
+        ])
+        assert [rule.index for rule in compiled.rules] == [3]
+        assert list(compiled.by_qid) == [2]
+        assert compiled.score({1: "9", 2: "4"}) == {"b": 2.0}
+        assert compile_scoring(None).score({1: "x"}) == {}
+
+    @pytest.mark.parametrize("logic", [
+        ["not a rule"],
+        [{"if": "qid 1", "then": {"a": 1}}],
+        [{"if": {"qid": 1, "val": "x"}, "then": {"a": "lots"}}],
+    ])
+    def test_malformed_rules_are_rejected(self, logic):
+        with pytest.raises(ValueError):
+            compile_scoring(logic)
+
+    def test_stored_malformed_rules_are_skipped(self, caplog):
+        logic = [
+            "not a rule",
+            {"if": {"qid": 1, "val": "x"}, "then": {"a": "lots"}},
+            {"if": {"qid": 1, "val": "x"}, "then": {"a": 2}},
+        ]
+        compiled = compile_scoring(logic, strict=False)
+        assert [rule.index for rule in compiled.rules] == [2]
+        assert compiled.score({1: "x"}) == {"a": 2.0}
+        assert caplog.text.count("Skipping malformed stored scoring rule") == 2
+
+        template = SimpleNamespace(id=1, version=1, updated_at=datetime(2025, 1, 1), scoring_logic=logic)
+        assert ScoringCache().get(template).score({1: "x"}) == {"a": 2.0}
+
+    def test_cache_recompiles_edited_templates(self):
+        cache = ScoringCache(max_entries=2)
+        template = SimpleNamespace(id=1, version=1, updated_at=datetime(2025, 1, 1),
+                                   scoring_logic=[{"if": {"qid": 1, "val": "x"}, "then": {"a": 1}}])
+        first = cache.get(template)
+        assert cache.get(template) is first
+
+        template.scoring_logic = [{"if": {"qid": 1, "val": "x"}, "then": {"a": 2}}]
+        template.updated_at = datetime(2025, 1, 2)
+        assert cache.get(template).score({1: "x"}) == {"a": 2.0}
+        assert cache.stats == {"hits": 1, "compiles": 2}
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory):
+    factory = await make_session_factory(
+        User, OutboxEvent, SurveyTemplate, SurveySection, SurveyQuestion, SurveySubmission, SurveyResponse)
+    async with factory() as session:
+        session.add(User(id=1, username="alice", password_hash="x"))
+        await session.commit()
+        yield session
+
+
+async def published_survey(service):
+    template = await service.create_template(1, {
+        "title": "Stress check",
+        "scoring_logic": [{"if": {"qid": 1, "op": ">", "val": 5}, "then": {"anxiety": 5}}],
+        "sections": [{"title": "Now", "questions": [
+            {"question_text": "Stress 0-10", "question_type": QuestionType.RANGE},
+            {"question_text": "Mood", "question_type": QuestionType.TEXT, "is_required": False},
+        ]}],
+    })
+    return await service.publish_template(template.id)
+
+
+class TestSurveyRescoring:
+
+    @pytest.mark.asyncio
+    async def test_submissions_are_rescored_when_the_logic_changes(self, db):
+        service = SurveyService(db)
+        template = await published_survey(service)
+        stress, mood = [q.id for q in template.sections[0].questions]
+        for value in range(11):
+            answers = [{"question_id": stress, "answer_value": str(value)}]
+            if value % 2:
+                answers.append({"question_id": mood, "answer_value": "Low"})
+            submission = await service.submit_responses(1, template.id, answers)
+            assert submission.total_scores == ({"anxiety": 5.0} if value > 5 else {})
+
+        new_logic = [
+            {"if": {"qid": stress, "op": "<", "val": "3"}, "then": {"resilience": 2}},
+            {"if": {"qid": mood, "val": "Low"}, "then": {"mood": -1, "resilience": -1}},
+        ]
+        assert await service.update_scoring_logic(template.id, new_logic) == 11
+
+        stored = (await db.execute(
+            select(SurveySubmission.total_scores).order_by(SurveySubmission.id)
+        )).scalars().all()
+        assert stored[0] == {"resilience": 2.0}
+        assert stored[1] == {"resilience": 1.0, "mood": -1.0}
+        assert stored[9] == {"mood": -1.0, "resilience": -1.0}
+        assert stored[10] == {}
+
+    @pytest.mark.asyncio
+    async def test_rescore_in_batches(self, db):
+        service = SurveyService(db)
+        template = await published_survey(service)
+        stress = template.sections[0].questions[0].id
+        for value in range(7):
+            await service.submit_responses(1, template.id, [{"question_id": stress, "answer_value": str(value)}])
+
+        assert await service.rescore_submissions(template.id, batch_size=3) == 7
+        with pytest.raises(ValueError):
+            await service.rescore_submissions(999)
+        with pytest.raises(ValueError):
+            await service.update_scoring_logic(template.id, [{"if": {"qid": stress}, "then": {"a": "x"}}])
+
+    @pytest.mark.asyncio
+    async def test_malformed_logic_is_rejected_on_write_and_skipped_on_read(self, db):
+        service = SurveyService(db)
+        with pytest.raises(ValueError):
+            await service.create_template(1, {"title": "Bad", "scoring_logic": [{"if": {"qid": 1}, "then": "x"}]})
+
+        template = await published_survey(service)
+        stress = template.sections[0].questions[0].id
+        # Saved before write-time validation existed
+        template.scoring_logic = [
+            {"if": {"qid": stress, "op": ">", "val": 5}, "then": {"anxiety": "high"}},
+            {"if": {"qid": stress, "op": ">", "val": 5}, "then": {"anxiety": 5}},
+        ]
+        await db.commit()
+
+        submission = await service.submit_responses(1, template.id, [{"question_id": stress, "answer_value": "8"}])
+        assert submission.total_scores == {"anxiety": 5.0}
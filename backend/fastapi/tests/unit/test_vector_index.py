@@ -0,0 +1,157 @@
+"""
+Unit tests for the local ANN vector index (api/services/vector_index.py) and the
+semantic search fallback that uses it on databases without pgvector.
+
+Shard files live in pytest's tmp_path; search runs against in-memory SQLite.
+"""
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import numpy as np
+from sqlalchemy import text
+
+from api.models import JournalEntry, User
+from api.services import semantic_search_service as semantic_module
+from api.services.semantic_search_service import SemanticSearchService
+from api.services.vector_index import VectorIndex
+
+DIM = 16
+
+
+def clustered_vectors(n, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, DIM))
+    return centres[rng.integers(0, clusters, size=n)] + 0.1 * rng.normal(size=(n, DIM))
+
+
+def make_index(tmp_path, **kwargs):
+    kwargs.setdefault("ivf_min_vectors", 10_000)
+    return VectorIndex(root=str(tmp_path), nprobe=kwargs.pop("nprobe", 4), max_loaded_shards=8, **kwargs)
+
+
+class TestVectorIndex:
+
+    def test_exact_scan_ranks_by_cosine(self, tmp_path):
+        index = make_index(tmp_path)
+        index.upsert(1, [(10, [1.0, 0.0]), (11, [0.6, 0.8]), (12, [0.0, 1.0])], create=True)
+
+        hits = index.search(1, [1.0, 0.1], k=2)
+        assert [entry_id for entry_id, _ in hits] == [10, 11]
+        assert hits[0][1] == pytest.approx(0.995, abs=1e-3)
+
+    def test_upsert_without_shard_is_skipped(self, tmp_path):
+        index = make_index(tmp_path)
+        assert index.upsert(1, [(10, [1.0, 0.0])]) is False
+        assert not index.has_shard(1, 2)
+
+    def test_newest_record_wins_and_remove_tombstones(self, tmp_path):
+        index = make_index(tmp_path)
+        index.upsert(1, [(10, [1.0, 0.0]), (11, [0.0, 1.0])], create=True)
+        assert index.search(1, [1.0, 0.0], k=1)[0][0] == 10
+
+        # A second process appending is picked up by this reader on the next query
+        make_index(tmp_path).upsert(1, [(10, [0.0, -1.0])])
+        assert index.search(1, [1.0, 0.0], k=1)[0][0] == 11
+
+        index.remove(1, [11], dim=2)
+        assert [entry_id for entry_id, _ in index.search(1, [1.0, 0.0], k=5)] == [10]
+
+    def test_compaction_keeps_live_entries(self, tmp_path):
+        index = make_index(tmp_path)
+        for _ in range(3):
+            index.upsert(1, [(i, [float(i), 1.0]) for i in range(1, 701)], create=True)
+
+        path = index.shard_path(1, 2)
+        assert os.path.getsize(path) // (8 + 2 * 4) == 700
+        assert len(index.search(1, [1.0, 1.0], k=1000)) == 700
+
+    def test_ivf_recall_against_brute_force(self, tmp_path):
+        vectors = clustered_vectors(3000)
+        index = make_index(tmp_path, ivf_min_vectors=1000, nprobe=6)
+        index.upsert(7, list(enumerate(vectors.tolist())), create=True)
+
+        queries = clustered_vectors(50, seed=1)
+        recall = []
+        for q in queries:
+            approx = {i for i, _ in index.search(7, q, k=10)}
+            exact = {i for i, _ in index.search(7, q, k=10, exact=True)}
+            recall.append(len(approx & exact) / 10)
+        assert np.mean(recall) >= 0.9
+
+        # Rows appended after training are still found
+        index.upsert(7, [(99_999, queries[0].tolist())])
+        assert index.search(7, queries[0], k=1)[0][0] == 99_999
+
+
+@pytest_asyncio.fixture
+async def db(make_session_factory):
+    async with (await make_session_factory(User, JournalEntry))() as session:
+        session.add_all([User(id=1, username="alice", password_hash="x"),
+                         User(id=2, username="bob", password_hash="x")])
+        await session.commit()
+        yield session
+
+
+class _QueryEmbedder:
+    async def generate_embedding(self, text):
+        return [1.0, 0.0]
+
+
+class TestSemanticSearchFallback:
+
+    @pytest.mark.asyncio
+    async def test_sqlite_search_builds_shard_and_filters(self, db, tmp_path):
+        await db.execute(
+            text("INSERT INTO journal_entries (id, user_id, title, content, embedding, is_deleted, privacy_level) "
+                 "VALUES (:id, :user_id, :title, 'text', :embedding, :deleted, 'private')"),
+            [
+                {"id": 1, "user_id": 1, "title": "close", "embedding": "[0.9,0.1]", "deleted": False},
+                {"id": 2, "user_id": 1, "title": "far", "embedding": "[0.0,1.0]", "deleted": False},
+                {"id": 3, "user_id": 1, "title": "deleted", "embedding": "[1.0,0.0]", "deleted": True},
+                {"id": 4, "user_id": 2, "title": "other user", "embedding": "[1.0,0.0]", "deleted": False},
+                {"id": 5, "user_id": 1, "title": "unindexed", "embedding": None, "deleted": False},
+            ],
+        )
+        await db.commit()
+        index = make_index(tmp_path)
+
+        with patch.object(semantic_module, "get_vector_index", return_value=index), \
+                patch.object(semantic_module, "embedding_service", _QueryEmbedder()):
+            results = await SemanticSearchService.search_journal_entries(db, "q", user_id=1, min_similarity=0.5)
+
+            assert [r["title"] for r in results] == ["close"]
+            assert results[0]["similarity"] == pytest.approx(0.994, abs=1e-3)
+            assert index.has_shard(1, 2)
+
+            # Embedding task updates land in the existing shard
+            SemanticSearchService.update_local_index([(1, 5, [1.0, 0.0])])
+            results = await SemanticSearchService.search_journal_entries(db, "q", user_id=1, min_similarity=0.5)
+            assert [r["title"] for r in results] == ["unindexed", "close"]
+
+    @pytest.mark.asyncio
+    async def test_entries_deleted_after_indexing_are_skipped_and_tombstoned(self, db, tmp_path):
+        await db.execute(
+            text("INSERT INTO journal_entries (id, user_id, title, content, embedding, is_deleted, privacy_level) "
+                 "VALUES (:id, 1, :title, 'text', :embedding, 0, 'private')"),
+            [{"id": i, "title": f"entry {i}", "embedding": f"[1.0,{i / 100}]"} for i in range(1, 7)],
+        )
+        await db.commit()
+        index = make_index(tmp_path)
+
+        with patch.object(semantic_module, "get_vector_index", return_value=index), \
+                patch.object(semantic_module, "embedding_service", _QueryEmbedder()):
+            results = await SemanticSearchService.search_journal_entries(db, "q", user_id=1, limit=2)
+            assert [r["id"] for r in results] == [1, 2]
+
+            # Deleted on another host: this shard still holds the four best matches
+            await db.execute(text("UPDATE journal_entries SET is_deleted = 1 WHERE id <= 4"))
+            await db.commit()
+            results = await SemanticSearchService.search_journal_entries(db, "q", user_id=1, limit=2)
+
+            assert [r["id"] for r in results] == [5, 6]
+            assert [entry_id for entry_id, _ in index.search(1, [1.0, 0.0], k=10)] == [5, 6]
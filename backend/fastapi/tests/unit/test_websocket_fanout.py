@@ -0,0 +1,185 @@
+"""
+Unit tests for WebSocket fan-out (api/services/websocket_manager.py): per-user
+channel subscriptions, single serialization, bounded per-connection send
+queues with the drop_oldest / disconnect slow-consumer policies, and
+removal of connections whose sends fail.
+"""
+import asyncio
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from api.services.websocket_manager import (
+    BROADCAST_CHANNEL, SLOW_CONSUMER_CLOSE_CODE, ConnectionManager, encode_message, user_channel,
+)
+
+
+class _FakeWebSocket:
+    def __init__(self, blocked=False, fail=False):
+        self.received = []
+        self.closed_with = None
+        self.fail = fail
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.unblocked.wait()
+        if self.fail:
+            raise ConnectionError("client went away")
+        self.received.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class _FakePubSub:
+    def __init__(self):
+        self.channels = set()
+        self.commands = []
+
+    async def subscribe(self, *channels):
+        self.commands.append(("subscribe",) + channels)
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        self.commands.append(("unsubscribe",) + channels)
+        self.channels.difference_update(channels)
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, channel, text):
+        self.published.append((channel, text))
+
+
+def with_fake_redis(manager):
+    manager.redis_client = _FakeRedis()
+    manager.pubsub = _FakePubSub()
+    manager._is_connected = True
+    return manager
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestWebSocketFanout:
+
+    @pytest.mark.asyncio
+    async def test_local_broadcast_and_personal_messages(self):
+        manager = ConnectionManager(max_queue=8)
+        manager._is_connected = True  # no Redis: local delivery
+        sockets = {user_id: _FakeWebSocket() for user_id in (1, 2, 3)}
+        for user_id, ws in sockets.items():
+            await manager.connect(ws, user_id)
+
+        await manager.broadcast({"type": "notice", "text": "héllo"})
+        await manager.send_personal_message(2, {"type": "ack"})
+        await settle()
+
+        assert [ws.received for ws in sockets.values()] == [
+            [{"type": "notice", "text": "héllo"}],
+            [{"type": "notice", "text": "héllo"}, {"type": "ack"}],
+            [{"type": "notice", "text": "héllo"}],
+        ]
+        assert manager.get_stats()["sent"] == 4
+
+    @pytest.mark.asyncio
+    async def test_messages_are_published_pre_encoded_on_per_user_channels(self):
+        manager = with_fake_redis(ConnectionManager())
+        await manager.send_personal_message(7, {"type": "ack", "n": 1})
+        await manager.broadcast({"type": "notice"})
+
+        assert manager.redis_client.published == [
+            (user_channel(7), '{"type":"ack","n":1}'),
+            (BROADCAST_CHANNEL, encode_message({"type": "notice"})),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_node_subscribes_only_while_it_holds_the_user(self):
+        manager = with_fake_redis(ConnectionManager())
+        first, second, other = _FakeWebSocket(), _FakeWebSocket(), _FakeWebSocket()
+        await manager.connect(first, 5)
+        await manager.connect(second, 5)
+        await manager.connect(other, 6)
+        assert manager.pubsub.channels == {user_channel(5), user_channel(6)}
+        assert manager.pubsub.commands.count(("subscribe", user_channel(5))) == 1
+
+        manager._dispatch(user_channel(5), '{"type":"direct"}')
+        manager._dispatch(BROADCAST_CHANNEL, '{"type":"all"}')
+        await settle()
+        assert first.received == second.received == [{"type": "direct"}, {"type": "all"}]
+        assert other.received == [{"type": "all"}]
+
+        manager.disconnect(first, 5)
+        await settle()
+        assert user_channel(5) in manager.pubsub.channels
+        manager.disconnect(second, 5)
+        await settle()
+        assert manager.pubsub.channels == {user_channel(6)}
+        assert manager.get_stats()["subscribed_user_channels"] == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_drops_oldest_without_stalling_others(self):
+        manager = ConnectionManager(max_queue=2, slow_consumer_policy="drop_oldest")
+        manager._is_connected = True
+        slow, fast = _FakeWebSocket(blocked=True), _FakeWebSocket()
+        await manager.connect(slow, 1)
+        await manager.connect(fast, 2)
+
+        for n in range(5):
+            await manager.broadcast({"n": n})
+            await settle()
+        assert fast.received == [{"n": n} for n in range(5)]
+
+        slow.unblocked.set()
+        await settle()
+        # n=0 was in flight; 1 and 2 were dropped from the full queue
+        assert slow.received == [{"n": 0}, {"n": 3}, {"n": 4}]
+        assert manager.get_stats()["dropped"] == 2
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_disconnect_policy(self):
+        manager = ConnectionManager(max_queue=1, slow_consumer_policy="disconnect")
+        manager._is_connected = True
+        slow, fast = _FakeWebSocket(blocked=True), _FakeWebSocket()
+        await manager.connect(slow, 1)
+        await manager.connect(fast, 2)
+
+        for n in range(3):
+            await manager.broadcast({"n": n})
+            await settle()
+
+        assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert list(manager.active_connections) == [2]
+        assert fast.received == [{"n": 0}, {"n": 1}, {"n": 2}]
+        assert manager.get_stats()["slow_disconnects"] == 1
+        # The endpoint's own disconnect afterwards is a no-op
+        manager.disconnect(slow, 1)
+
+    @pytest.mark.asyncio
+    async def test_failed_send_removes_connection(self):
+        manager = ConnectionManager()
+        manager._is_connected = True
+        broken, healthy = _FakeWebSocket(fail=True), _FakeWebSocket()
+        await manager.connect(broken, 1)
+        await manager.connect(healthy, 1)
+
+        await manager.send_personal_message(1, {"type": "a"})
+        await settle()
+        await manager.send_personal_message(1, {"type": "b"})
+        await settle()
+
+        assert manager.active_connections == {1: [healthy]}
+        assert healthy.received == [{"type": "a"}, {"type": "b"}]
+        assert manager.get_stats()["send_errors"] == 1
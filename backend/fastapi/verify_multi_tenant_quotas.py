@@ -84,7 +84,7 @@ async def verify_quotas():
         for i in range(4):
             logger.info(f"Circuit Breaker Test Run {i+1}...")
             # We bypass the internal network part and just test our wrapping logic
-            result = inference_proxy._run_inference_with_breaker("test_task", {"data": 1}, 5.0)
+            result = await inference_proxy._run_inference_with_breaker("test_task", {"data": 1}, 5.0)
             logger.info(f"Result: {result}")
     except Exception as e:
         logger.error(f"Breaker error: {e}")
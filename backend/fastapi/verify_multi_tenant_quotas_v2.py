@@ -60,8 +60,10 @@ async def verify_quotas():
     # Since we can't easily trip it without 3 failures, we just check if it runs
     try:
         # We wrap the internal call to return immediately to avoid Redis timeout
-        inference_proxy._run_inference_internal = lambda task, payload, timeout: "mock_success"
-        res = inference_proxy._run_inference_with_breaker("test", {}, 1.0)
+        async def _mock_internal(task, payload, timeout):
+            return "mock_success"
+        inference_proxy._run_inference_internal = _mock_internal
+        res = await inference_proxy._run_inference_with_breaker("test", {}, 1.0)
         report.append(f"  Breaker Wrapped Call: OK (Result: {res})")
     except Exception as e:
         report.append(f"  Breaker Wrapped Call: ERROR ({str(e)})")
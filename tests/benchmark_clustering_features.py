@@ -0,0 +1,98 @@
+"""
+Performance benchmark for clustering feature extraction.
+
+Compares the two ways EmotionalFeatureExtractor can build the clustering
+feature table on a temporary SQLite database:
+- per-user: extract_user_features for every username (one session and two
+  queries per user, statistics in Python)
+- bulk: extract_all_users_features (one streamed score query, one grouped
+  response query, vectorized statistics)
+
+and checks that both produce the same features.
+
+Usage: python tests/benchmark_clustering_features.py [--users 5000] [--scores 8] [--responses 20]
+"""
+import os
+import sys
+import tempfile
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.db
+from app.models import Base, Response, Score, User
+from app.ml.clustering import EmotionalFeatureExtractor
+
+
+def seed(engine, users: int, scores: int, responses: int) -> None:
+    """Insert `scores` scores and `responses` responses for each of `users` users."""
+    rng = np.random.default_rng(11)
+    score_rows, response_rows = [], []
+    for u in range(users):
+        username = f"user_{u:06d}"
+        for i in range(scores):
+            score_rows.append({
+                "username": username,
+                "total_score": int(rng.integers(0, 100)),
+                "sentiment_score": float(rng.uniform(-1, 1)),
+                "timestamp": f"2026-01-{i % 28 + 1:02d}T{i // 28:02d}:00:00",
+            })
+        for q in range(responses):
+            response_rows.append({"username": username, "question_id": q, "response_value": int(rng.integers(1, 6))})
+    with engine.begin() as conn:
+        conn.execute(insert(Score), score_rows)
+        conn.execute(insert(Response), response_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--scores", type=int, default=8, help="Scores per user")
+    parser.add_argument("--responses", type=int, default=20, help="Responses per user")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'features.db')}")
+        Base.metadata.create_all(engine, tables=[User.__table__, Score.__table__, Response.__table__])
+        seed(engine, args.users, args.scores, args.responses)
+        app.db.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        extractor = EmotionalFeatureExtractor()
+
+        start = time.perf_counter()
+        per_user = pd.DataFrame([
+            extractor.extract_user_features(f"user_{u:06d}") for u in range(args.users)
+        ])
+        per_user_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bulk = extractor.extract_all_users_features()
+        bulk_s = time.perf_counter() - start
+
+        engine.dispose()
+
+    pd.testing.assert_frame_equal(
+        bulk.set_index("username").astype(float),
+        per_user.set_index("username")[extractor.feature_names].astype(float),
+        check_exact=False, rtol=1e-9,
+    )
+
+    print("=" * 60)
+    print(f"Feature extraction: {args.users} users, {args.scores} scores "
+          f"and {args.responses} responses each")
+    print("=" * 60)
+    print(f"{'':<12}{'seconds':>12}{'users/s':>14}")
+    print(f"{'per-user':<12}{per_user_s:>12.2f}{args.users / per_user_s:>14.0f}")
+    print(f"{'bulk':<12}{bulk_s:>12.2f}{args.users / bulk_s:>14.0f}")
+    print(f"\nSpeedup: {per_user_s / bulk_s:.1f}x (features identical)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Performance benchmark for clustering model selection.
+
+Times EmotionalProfileClusterer on synthetic feature tables:
+- exact: _find_optimal_clusters with KMeans(n_init=10) and full silhouette
+  for k = 2..8 (skipped above --exact-max users, it is O(n²))
+- scalable: MiniBatchKMeans and sampled silhouette, k candidates across a
+  process pool
+- nightly update: partial_fit with --changed users vs a full scalable fit()
+
+Usage: python tests/benchmark_clustering_model_selection.py [--users 10000 50000 200000] [--changed 0.01] [--jobs 4]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.clustering import EmotionalFeatureExtractor, EmotionalProfileClusterer
+
+
+def blob_features(n_users: int, centers: int = 5, seed: int = 0, prefix: str = "user") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    names = EmotionalFeatureExtractor().feature_names
+    means = rng.uniform(-3, 3, size=(centers, len(names)))
+    groups = rng.integers(0, centers, n_users)
+    data = pd.DataFrame(means[groups] + rng.normal(0, 1.0, size=(n_users, len(names))), columns=names)
+    data.insert(0, 'username', [f"{prefix}_{i}" for i in range(n_users)])
+    return data
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--exact-max", type=int, default=10000, help="Largest population timed on the exact path")
+    parser.add_argument("--changed", type=float, default=0.01, help="Fraction of users changed for the nightly update")
+    parser.add_argument("--jobs", type=int, default=None, help="Process pool size (default: CPU count)")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"Clustering model selection (k = 2..8), {os.cpu_count()} CPU(s)")
+    print("=" * 72)
+    print(f"{'users':>8}{'exact s':>10}{'k':>4}{'scalable s':>12}{'k':>4}{'full fit s':>12}{'update s':>10}")
+
+    for n_users in args.users:
+        data = blob_features(n_users)
+        X = data.drop(columns='username').values
+        X = (X - X.mean(axis=0)) / X.std(axis=0)
+
+        if n_users <= args.exact_max:
+            exact_s, exact_k = timed(lambda: EmotionalProfileClusterer(scalable=False)._find_optimal_clusters(X))
+            exact = f"{exact_s:>10.2f}{exact_k:>4}"
+        else:
+            exact = f"{'-':>10}{'-':>4}"
+
+        scalable = EmotionalProfileClusterer(n_clusters=5, scalable=True, n_jobs=args.jobs)
+        scalable_s, scalable_k = timed(lambda: scalable._find_optimal_clusters(X))
+
+        fit_s, _ = timed(lambda: scalable.fit(data=data))
+        changed = blob_features(max(1, int(n_users * args.changed)), seed=1, prefix="changed")
+        update_s, _ = timed(lambda: scalable.partial_fit(data=changed))
+
+        print(f"{n_users:>8}{exact}{scalable_s:>12.2f}{scalable_k:>4}{fit_s:>12.2f}{update_s:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
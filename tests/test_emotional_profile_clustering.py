@@ -10,6 +10,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.ml.clustering import (
+    _get_sklearn_imports as real_sklearn_imports,
     EmotionalFeatureExtractor,
     EmotionalProfileClusterer,
     ClusteringVisualizer,
@@ -254,6 +255,162 @@ class TestEmotionalFeatureExtractor:
         assert variance == 0.0, "Uniform responses should have zero variance"
 
 
+@pytest.fixture
+def feature_db(monkeypatch):
+    """In-memory app database that safe_db_context() in app.ml.clustering uses."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.models import Base, Score, Response, User
+
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[User.__table__, Score.__table__, Response.__table__])
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr("app.db.SessionLocal", TestSessionLocal)
+    session = TestSessionLocal()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def seed_assessments(session, n_users=40, seed=7):
+    """Scores and responses covering the edge cases of the feature formulas."""
+    from app.models import Score, Response
+
+    rng = np.random.default_rng(seed)
+    for u in range(n_users):
+        username = f"user_{u:03d}"
+        n_scores = int(rng.integers(1, 9))
+        constant = u % 7 == 0
+        for i in range(n_scores):
+            session.add(Score(
+                username=username,
+                # Some rows without a total score, some users with a flat series
+                total_score=None if u % 5 == 0 and i == 0 else (30 if constant else int(rng.integers(0, 100))),
+                sentiment_score=None if u % 3 == 0 else float(rng.uniform(-1, 1)),
+                timestamp=f"2026-01-{i + 1:02d}T{int(rng.integers(0, 24)):02d}:00:00",
+            ))
+        if u % 4 == 0:
+            continue  # no responses at all
+        for q in range(int(rng.integers(1, 12))):
+            session.add(Response(
+                username=username,
+                question_id=q,
+                response_value=None if u % 6 == 1 and q % 2 == 0 else int(rng.integers(1, 6)),
+                timestamp="2026-01-15T00:00:00",
+            ))
+    # Only null total scores: no features; empty username: ignored
+    session.add(Score(username="user_nulls", total_score=None, sentiment_score=0.2, timestamp="2026-01-01T00:00:00"))
+    session.add(Score(username="", total_score=50, sentiment_score=0.0, timestamp="2026-01-01T00:00:00"))
+    session.commit()
+
+
+class TestBulkFeatureExtraction:
+    """The set-based extract_all_users_features against the per-user path."""
+
+    def test_matches_per_user_extraction(self, feature_db, feature_extractor):
+        seed_assessments(feature_db)
+
+        bulk = feature_extractor.extract_all_users_features()
+        per_user = pd.DataFrame([
+            features for features in (
+                feature_extractor.extract_user_features(f"user_{u:03d}") for u in range(40)
+            ) if features
+        ])
+
+        assert list(bulk.columns) == ['username'] + feature_extractor.feature_names
+        assert list(bulk['username']) == list(per_user['username'])
+        pd.testing.assert_frame_equal(
+            bulk.set_index('username').astype(float),
+            per_user.set_index('username')[feature_extractor.feature_names].astype(float),
+            check_exact=False, rtol=1e-9, atol=1e-12,
+        )
+        assert feature_extractor.extract_user_features("user_nulls") is None
+        assert "user_nulls" not in set(bulk['username'])
+
+    def test_empty_database(self, feature_db, feature_extractor):
+        assert feature_extractor.extract_all_users_features().empty
+
+    def test_since_limits_to_changed_users_with_full_history(self, feature_db, feature_extractor):
+        from app.models import Score, Response
+
+        seed_assessments(feature_db)
+        feature_db.add(Score(username="user_003", total_score=90, sentiment_score=0.1, timestamp="2026-02-01T00:00:00"))
+        feature_db.add(Response(username="user_011", question_id=1, response_value=5, timestamp="2026-02-02T00:00:00"))
+        feature_db.commit()
+
+        changed = feature_extractor.extract_all_users_features(since="2026-02-01T00:00:00")
+
+        assert list(changed['username']) == ["user_003", "user_011"]
+        for _, row in changed.iterrows():
+            expected = feature_extractor.extract_user_features(row['username'])
+            for name in feature_extractor.feature_names:
+                assert row[name] == pytest.approx(expected[name])
+
+
+def blob_features(n_users, centers=4, seed=0, prefix="user"):
+    """Feature table with `centers` well separated groups of users."""
+    rng = np.random.default_rng(seed)
+    names = EmotionalFeatureExtractor().feature_names
+    means = rng.uniform(-20, 20, size=(centers, len(names)))
+    groups = rng.integers(0, centers, n_users)
+    data = pd.DataFrame(means[groups] + rng.normal(0, 0.5, size=(n_users, len(names))), columns=names)
+    data.insert(0, 'username', [f"{prefix}_{i}" for i in range(n_users)])
+    return data
+
+
+class TestScalableClustering:
+    """MiniBatchKMeans / sampled-silhouette mode and partial_fit warm starts."""
+
+    @pytest.fixture(autouse=True)
+    def real_sklearn(self, monkeypatch):
+        monkeypatch.setattr('app.ml.clustering._get_sklearn_imports', real_sklearn_imports)
+
+    def test_parallel_model_selection_finds_blob_count(self):
+        X = blob_features(600, centers=5).drop(columns='username').values
+        X = (X - X.mean(axis=0)) / X.std(axis=0)
+
+        serial = EmotionalProfileClusterer(scalable=True, n_jobs=1)._find_optimal_clusters(X)
+        parallel = EmotionalProfileClusterer(scalable=True, n_jobs=2)._find_optimal_clusters(X)
+
+        assert serial == parallel == 5
+
+    def test_scalable_fit_uses_minibatch_and_skips_quadratic_passes(self):
+        clusterer = EmotionalProfileClusterer(n_clusters=4, scalable=True, n_jobs=1)
+        results = clusterer.fit(data=blob_features(400))
+
+        assert type(clusterer.kmeans).__name__ == 'MiniBatchKMeans'
+        assert clusterer.hierarchical is None and clusterer.dbscan is None
+        assert results['metrics']['silhouette_score'] > 0.5
+        assert sum(results['cluster_distribution'].values()) == 400
+        assert clusterer.last_fit_at is not None
+
+    @pytest.mark.parametrize("scalable", [True, False])
+    def test_partial_fit_assigns_only_new_users(self, scalable):
+        clusterer = EmotionalProfileClusterer(n_clusters=4, scalable=scalable, n_jobs=1)
+        clusterer.fit(data=blob_features(300))
+        before = {u: p['cluster_id'] for u, p in clusterer.user_profiles.items()}
+        centers_before = np.array(clusterer.cluster_centers_)
+
+        new_users = blob_features(50, prefix="new")
+        results = clusterer.partial_fit(data=new_users)
+
+        assert results['n_users_updated'] == 50
+        assert type(clusterer.kmeans).__name__ == 'MiniBatchKMeans'
+        assert {u: clusterer.user_profiles[u]['cluster_id'] for u in before} == before
+        assert sum(results['cluster_distribution'].values()) == 350
+        # Same blobs: new users land with the training users of their group
+        X_new = clusterer.scaler.transform(new_users.drop(columns='username').values)
+        nearest = np.argmin(np.linalg.norm(X_new[:, None] - centers_before[None], axis=2), axis=1)
+        assert results['labels'] == nearest.tolist()
+        assert np.abs(clusterer.cluster_centers_ - centers_before).max() < 0.5
+
+    def test_partial_fit_requires_fitted_model(self, monkeypatch):
+        clusterer = EmotionalProfileClusterer()
+        monkeypatch.setattr(clusterer, '_load_model', lambda: False)
+        assert 'error' in clusterer.partial_fit(data=blob_features(10))
+
+
 # ==============================================================================
 # TEST CLUSTERER
 # ==============================================================================
@@ -119,3 +119,23 @@ def test_get_question_count_optimized():
     assert get_question_count(age=15) == 2
     assert get_question_count(age=35) == 1
     assert get_question_count(age=99) == 0
+
+def test_age_index_bounds_and_rebuild():
+    """Age bounds are inclusive and the age index follows a replaced question list"""
+    from app.questions import get_question_count
+    import app.questions
+
+    app.questions._ALL_QUESTIONS = [
+        (1, "Q1", "", 18, 25),
+        (2, "Q2", "", 25, 40),
+    ]
+
+    assert [q[0] for q in load_questions(age=18)] == [1]
+    assert [q[0] for q in load_questions(age=25)] == [1, 2]
+    assert [q[0] for q in load_questions(age=40)] == [2]
+    assert load_questions(age=17) == [] and load_questions(age=41) == []
+
+    # A reload swaps in a new list; lookups must not use the old index
+    app.questions._ALL_QUESTIONS = [(3, "Q3", "", 10, 120)]
+    assert [q[0] for q in load_questions(age=25)] == [3]
+    assert get_question_count(age=41) == 1